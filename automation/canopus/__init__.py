@@ -11,6 +11,9 @@ __description__ = 'Automação de download de boletos do sistema Canopus'
 from .canopus_config import CanopusConfig, PontoVenda, Consultor, ExcelColumns
 from .excel_importer import ExcelImporter, ExcelMonitor, importar_planilha, importar_todas
 from .canopus_automation import CanopusAutomation
+from .canopus_backends import CanopusBackend, criar_backend
+from .canopus_pool import CanopusPool
+from .canopus_api_async import CanopusAPIAsync
 
 # Exportar para uso externo
 __all__ = [
@@ -28,4 +31,8 @@ __all__ = [
 
     # Automação
     'CanopusAutomation',
+    'CanopusBackend',
+    'criar_backend',
+    'CanopusPool',
+    'CanopusAPIAsync',
 ]
@@ -0,0 +1,297 @@
+"""
+Cliente HTTP Assíncrono para Canopus (aiohttp)
+Mesmo fluxo mapeado do CanopusHTTPClient, sem threads.
+
+CanopusAPIAsync é uma sessão autenticada (cookies + VIEWSTATE próprios),
+com a mesma interface do CanopusAPIFinal (login, buscar_cliente_por_cpf,
+emitir_boleto). É usada pelo backend 'http_async' (canopus_backends.py):
+no CanopusPool cada worker loga a própria sessão e os CPFs são distribuídos
+entre elas pela fila do pool.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from canopus_config import CanopusConfig
+from canopus_http_client import (
+    HEADERS_NAVEGADOR,
+    PaginaInesperadaError,
+    dados_formulario_emissao,
+    extrair_campos_asp,
+    extrair_link_cliente,
+    extrair_url_pdf,
+)
+
+logger = logging.getLogger('CanopusAsync')
+
+
+class CanopusAPIAsync:
+    """Sessão HTTP assíncrona autenticada no Canopus"""
+
+    BASE_URL = 'https://cnp3.consorciocanopus.com.br/WWW'
+
+    def __init__(self, timeout: int = 30, indice: int = 0):
+        """
+        Args:
+            timeout: Timeout total de cada requisição (segundos)
+            indice: Identificador da sessão nos logs do pool
+        """
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.indice = indice
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.ultima_pagina_emissao = ''
+        self._pagina_busca = ''
+        self._logged_in = False
+        self._credenciais = None
+
+    async def _obter_sessao(self) -> aiohttp.ClientSession:
+        """Cria a sessão (cookie jar exclusivo) na primeira requisição"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                headers=HEADERS_NAVEGADOR,
+                timeout=self.timeout,
+                cookie_jar=aiohttp.CookieJar(),
+            )
+        return self.session
+
+    async def _get(self, url: str) -> aiohttp.ClientResponse:
+        sessao = await self._obter_sessao()
+        async with sessao.get(url) as response:
+            await response.read()
+            return response
+
+    async def _post(self, url: str, dados: Dict[str, str]) -> aiohttp.ClientResponse:
+        sessao = await self._obter_sessao()
+        async with sessao.post(url, data=dados) as response:
+            await response.read()
+            return response
+
+    async def login(self, usuario: str, senha: str) -> bool:
+        """
+        Login no Canopus (mesmos campos do CanopusHTTPClient.login)
+
+        Returns:
+            True se autenticou
+        """
+        self._credenciais = (usuario, senha)
+        self._logged_in = False
+
+        try:
+            usuario_formatado = usuario.zfill(10)
+            logger.info(f"🔐 [Sessão {self.indice}] Login: {usuario} → {usuario_formatado}")
+
+            url_login = f'{self.BASE_URL}/frmCorCCCnsLogin.aspx'
+            response = await self._get(url_login)
+            response.raise_for_status()
+
+            login_data = {
+                **extrair_campos_asp(await response.text()),
+                '__LASTFOCUS': '',
+                '__EVENTTARGET': 'btnLogin',
+                '__EVENTARGUMENT': '',
+                'edtUsuario': usuario_formatado,
+                'edtSenha': senha,
+                'hdnTokenRecaptcha': '',
+                'as_fid': '',
+            }
+
+            response = await self._post(url_login, login_data)
+            html = await response.text()
+
+            if 'frmMain.aspx' in str(response.url) or response.status == 200:
+                if 'ValidaSessaoLogin' in html or 'frmMain' in html:
+                    self._logged_in = True
+                    logger.info(f"✅ [Sessão {self.indice}] Login OK!")
+                    return True
+
+            logger.error(f"❌ [Sessão {self.indice}] Login falhou ({response.url})")
+            return False
+
+        except Exception as e:
+            logger.error(f"❌ [Sessão {self.indice}] Erro no login: {e}")
+            return False
+
+    async def relogin(self) -> bool:
+        """Refaz o login com as últimas credenciais (sessão expirada)"""
+        if not self._credenciais:
+            return False
+
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+        return await self.login(*self._credenciais)
+
+    async def buscar_cliente_por_cpf(self, cpf: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca cliente por CPF (Atendimento → frmBuscaCota → busca por CPF)
+
+        Returns:
+            Dicionário com cpf, cpf_formatado, encontrado, url e link_elemento,
+            ou None se o CPF não existir no Canopus
+
+        Raises:
+            PaginaInesperadaError: Fora do fluxo (sessão expirada, layout novo)
+        """
+        if not self._logged_in:
+            raise PaginaInesperadaError('Sessão não autenticada')
+
+        cpf_limpo = CanopusConfig.limpar_cpf(cpf)
+        cpf_formatado = CanopusConfig.formatar_cpf(cpf_limpo)
+
+        logger.info(f"🔍 [Sessão {self.indice}] Buscando: {cpf_formatado}")
+
+        # 1. Clicar em Atendimento
+        url_main = f'{self.BASE_URL}/frmMain.aspx'
+        response = await self._get(url_main)
+
+        await self._post(url_main, {
+            **extrair_campos_asp(await response.text()),
+            '__EVENTTARGET': '',
+            '__EVENTARGUMENT': '',
+            'ctl00$hdnID_Modulo': '',
+            'ctl00$img_Atendimento.x': '12',
+            'ctl00$img_Atendimento.y': '23',
+            'as_fid': '',
+        })
+
+        # 2. Tela de busca
+        url_busca = f'{self.BASE_URL}/CONAT/frmBuscaCota.aspx'
+        response = await self._get(url_busca)
+
+        # 3. Selecionar CPF no dropdown
+        response = await self._post(url_busca, {
+            **extrair_campos_asp(await response.text()),
+            '__LASTFOCUS': '',
+            '__EVENTTARGET': 'ctl00$Conteudo$cbxCriterioBusca',
+            '__EVENTARGUMENT': '',
+            'ctl00$hdnID_Modulo': '',
+            'ctl00$Conteudo$cbxCriterioBusca': 'F',
+            'ctl00$Conteudo$edtContextoBusca': '',
+            'as_fid': '',
+        })
+
+        # 4. Preencher CPF e buscar
+        response = await self._post(url_busca, {
+            **extrair_campos_asp(await response.text()),
+            '__LASTFOCUS': '',
+            '__EVENTTARGET': '',
+            '__EVENTARGUMENT': '',
+            'ctl00$hdnID_Modulo': '',
+            'ctl00$Conteudo$cbxCriterioBusca': 'F',
+            'ctl00$Conteudo$edtContextoBusca': cpf_formatado,
+            'ctl00$Conteudo$btnBuscar': 'Buscar',
+        })
+
+        html = await response.text()
+        link_elemento = extrair_link_cliente(html)
+
+        if not link_elemento:
+            logger.warning(f"⚠️ [Sessão {self.indice}] CPF não encontrado: {cpf_formatado}")
+            return None
+
+        # A postback do link só vale com o VIEWSTATE desta resposta
+        self._pagina_busca = html
+
+        return {
+            'cpf': cpf_limpo,
+            'cpf_formatado': cpf_formatado,
+            'encontrado': True,
+            'url': url_busca,
+            'link_elemento': link_elemento,
+        }
+
+    async def _acessar_cliente(self, cliente: Dict[str, Any]):
+        """Clica no link do resultado da busca (abre o atendimento)"""
+        url_busca = cliente['url']
+
+        response = await self._post(url_busca, {
+            **extrair_campos_asp(self._pagina_busca),
+            '__LASTFOCUS': '',
+            '__EVENTTARGET': cliente['link_elemento'],
+            '__EVENTARGUMENT': '',
+            'ctl00$hdnID_Modulo': '',
+            'ctl00$Conteudo$cbxCriterioBusca': 'F',
+            'ctl00$Conteudo$edtContextoBusca': cliente['cpf_formatado'],
+            'as_fid': '',
+        })
+
+        if response.status != 200:
+            raise PaginaInesperadaError(f'Falha ao abrir atendimento ({response.status})')
+
+    async def emitir_boleto(self, cliente_url: Dict[str, Any]) -> Optional[bytes]:
+        """
+        Abre o atendimento do cliente e emite o boleto avulso
+
+        Args:
+            cliente_url: Resultado de buscar_cliente_por_cpf
+
+        Returns:
+            Bytes do PDF ou None se o PDF baixado for inválido
+
+        Raises:
+            PaginaInesperadaError: Fora do fluxo mapeado
+        """
+        await self._acessar_cliente(cliente_url)
+
+        logger.info(f"📄 [Sessão {self.indice}] Emitindo boleto...")
+
+        url_emissao = f'{self.BASE_URL}/CONCO/frmConCoRelBoletoAvulso.aspx'
+        response = await self._get(url_emissao)
+        html = await response.text()
+        self.ultima_pagina_emissao = html
+
+        if 'grdBoleto_Avulso' not in html:
+            raise PaginaInesperadaError(f'Tela de emissão não retornada ({response.url})')
+
+        # Checkbox do boleto → Emitir → Verificar popup
+        response = await self._post(url_emissao, dados_formulario_emissao(
+            extrair_campos_asp(html),
+            **{
+                'ctl00$Conteudo$grdBoleto_Avulso$ctl03$imgEmite_Boleto.x': '11',
+                'ctl00$Conteudo$grdBoleto_Avulso$ctl03$imgEmite_Boleto.y': '7',
+                'as_fid': '',
+            }
+        ))
+        for event_target in ('ctl00$Conteudo$btnEmitir', 'ctl00$Conteudo$btnVerificaPopUp'):
+            response = await self._post(url_emissao, dados_formulario_emissao(
+                extrair_campos_asp(await response.text()),
+                event_target
+            ))
+
+        pdf_url = extrair_url_pdf(await response.text())
+        if not pdf_url:
+            raise PaginaInesperadaError('URL do PDF não encontrada após emissão')
+
+        if not pdf_url.startswith('http'):
+            pdf_url = f'{self.BASE_URL}/{pdf_url}'
+
+        response = await self._get(pdf_url)
+        conteudo = await response.read()
+
+        if response.status == 200 and len(conteudo) > 1000:
+            logger.info(f"✅ [Sessão {self.indice}] PDF baixado: {len(conteudo)} bytes")
+            return conteudo
+
+        logger.error(f"❌ [Sessão {self.indice}] PDF inválido")
+        return None
+
+    @property
+    def logado(self) -> bool:
+        """Sessão autenticada"""
+        return self._logged_in
+
+    async def fechar(self):
+        """Fecha a sessão HTTP"""
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        self._logged_in = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.fechar()
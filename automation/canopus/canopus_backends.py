@@ -0,0 +1,579 @@
+"""
+Backends de Download Canopus
+Interface única para buscar/emitir boletos, com duas implementações:
+
+- playwright: navegador Chromium (CanopusAutomation) - fluxo original
+- http: requisições diretas às postbacks ASP.NET (CanopusHTTPClient),
+        com fallback automático para o Playwright por CPF quando o
+        Canopus devolve uma página fora do fluxo mapeado (um Chromium
+        compartilhado pelos workers, ver NavegadorFallback)
+- http_async: o mesmo fluxo em aiohttp (CanopusAPIAsync), sem threads nem
+        navegador; no CanopusPool cada worker é uma sessão logada própria
+"""
+
+import asyncio
+import logging
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+from canopus_config import CanopusConfig
+from canopus_automation import (
+    CanopusAutomation,
+    buscar_cliente_banco,
+    gerar_nome_arquivo_boleto,
+    limpar_nome_cliente,
+    obter_nome_mes,
+)
+from canopus_api_async import CanopusAPIAsync
+from canopus_http_client import CanopusHTTPClient, PaginaInesperadaError
+from sessao_canopus import TIPO_HTTP, carregar_sessao_async, salvar_sessao_async
+
+logger = logging.getLogger(__name__)
+
+
+BACKEND_PLAYWRIGHT = 'playwright'
+BACKEND_HTTP = 'http'
+BACKEND_HTTP_ASYNC = 'http_async'
+BACKENDS_DISPONIVEIS = (BACKEND_PLAYWRIGHT, BACKEND_HTTP, BACKEND_HTTP_ASYNC)
+
+
+# ============================================================================
+# INTERFACE
+# ============================================================================
+
+class CanopusBackend:
+    """
+    Interface comum dos backends de download
+
+    Mesmo contrato usado pelo orquestrador e pela rota
+    /baixar-boletos-ponto-venda: login uma vez, depois
+    processar_cliente_completo por CPF, retornando o mesmo dicionário
+    de resultado do CanopusAutomation.
+    """
+
+    nome = None
+
+    def __init__(self, config: CanopusConfig = None, headless: bool = None):
+        self.config = config or CanopusConfig
+        self.headless = headless
+
+    async def iniciar(self):
+        """Aloca recursos (navegador, sessão HTTP...)"""
+
+    async def fechar(self):
+        """Libera recursos"""
+
+    async def login(
+        self,
+        usuario: str,
+        senha: str,
+        codigo_empresa: str = None,
+        ponto_venda: str = None,
+        slot_sessao: int = 0
+    ) -> bool:
+        """
+        Autentica no Canopus (reaproveita a sessão em cache do ponto de venda
+        quando ainda válida)
+
+        Args:
+            slot_sessao: Sessão em cache usada (um por worker do pool)
+        """
+        raise NotImplementedError
+
+    async def processar_cliente_completo(
+        self,
+        cpf: str,
+        mes: str,
+        ano: int,
+        destino: Path,
+        nome_arquivo: str = None
+    ) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def log_estatisticas(self):
+        """Loga estatísticas da sessão (opcional)"""
+
+    async def __aenter__(self):
+        await self.iniciar()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.log_estatisticas()
+        await self.fechar()
+
+
+# ============================================================================
+# BACKEND PLAYWRIGHT
+# ============================================================================
+
+class PlaywrightBackend(CanopusBackend):
+    """Backend baseado no navegador (CanopusAutomation)"""
+
+    nome = BACKEND_PLAYWRIGHT
+
+    def __init__(self, config: CanopusConfig = None, headless: bool = None, browser=None):
+        super().__init__(config, headless)
+        self.bot = CanopusAutomation(config=self.config, headless=headless, browser=browser)
+
+    @property
+    def browser(self):
+        """Navegador aberto (para compartilhar com outros contextos)"""
+        return self.bot.browser
+
+    async def iniciar(self):
+        await self.bot.iniciar_navegador()
+
+    async def fechar(self):
+        await self.bot.fechar_navegador()
+
+    async def login(self, usuario, senha, codigo_empresa=None, ponto_venda=None, slot_sessao=0) -> bool:
+        return await self.bot.login(
+            usuario=usuario,
+            senha=senha,
+            codigo_empresa=codigo_empresa,
+            ponto_venda=ponto_venda,
+            slot_sessao=slot_sessao
+        )
+
+    async def processar_cliente_completo(self, cpf, mes, ano, destino, nome_arquivo=None):
+        return await self.bot.processar_cliente_completo(
+            cpf=cpf,
+            mes=mes,
+            ano=ano,
+            destino=destino,
+            nome_arquivo=nome_arquivo
+        )
+
+    def log_estatisticas(self):
+        self.bot.log_estatisticas()
+
+
+# ============================================================================
+# BACKEND HTTP
+# ============================================================================
+
+def extrair_mes_boleto_html(html: str) -> str:
+    """
+    Extrai o mês do vencimento da ÚLTIMA linha da grade de boletos
+
+    Mesma regra do script executado pelo Playwright na tela de emissão.
+
+    Returns:
+        Nome do mês em maiúsculas ou '' se não encontrado
+    """
+    if not html:
+        return ''
+
+    soup = BeautifulSoup(html, 'html.parser')
+    tabela = soup.select_one('table[id*="grdBoleto_Avulso"]')
+    if not tabela:
+        return ''
+
+    linhas = tabela.find_all('tr')
+    if len(linhas) < 2:
+        return ''
+
+    for celula in linhas[-1].find_all('td'):
+        match = re.search(r'(\d{1,2})/(\d{1,2})/(\d{2,4})', celula.get_text(strip=True))
+        if match:
+            mes_numero = int(match.group(2))
+            if 1 <= mes_numero <= 12:
+                return obter_nome_mes(mes_numero)
+
+    return ''
+
+
+def gravar_boleto_http(
+    config: CanopusConfig,
+    resultado: Dict[str, Any],
+    pdf_bytes: bytes,
+    destino: Path,
+    nome_arquivo: Optional[str],
+    pagina_emissao: str
+) -> Dict[str, Any]:
+    """Salva o PDF emitido pelos backends HTTP e completa o resultado como sucesso"""
+    if not nome_arquivo:
+        dados_banco = buscar_cliente_banco(resultado['cpf'])
+        nome_cliente = limpar_nome_cliente(dados_banco.get('nome', '')) if dados_banco else ''
+        mes_boleto = extrair_mes_boleto_html(pagina_emissao) or obter_nome_mes(datetime.now().month)
+        nome_arquivo = gerar_nome_arquivo_boleto(nome_cliente, mes_boleto)
+
+    destino = Path(destino)
+    destino.mkdir(parents=True, exist_ok=True)
+    caminho_final = destino / nome_arquivo
+
+    with open(caminho_final, 'wb') as f:
+        f.write(pdf_bytes)
+
+    resultado['status'] = config.Status.SUCESSO
+    resultado['mensagem'] = 'Boleto baixado com sucesso'
+    resultado['dados_boleto'] = {
+        'arquivo_nome': nome_arquivo,
+        'arquivo_caminho': str(caminho_final),
+        'arquivo_tamanho': len(pdf_bytes),
+        'pdf_url': 'N/A',
+        'data_download': datetime.now(),
+        'sucesso': True,
+    }
+    return resultado
+
+
+class NavegadorFallback:
+    """
+    Chromium dos fallbacks Playwright, compartilhado pelos HTTPBackend de um pool
+
+    Aberto na primeira necessidade: o primeiro fallback lança o navegador e
+    os seguintes abrem só um contexto isolado nele (cookies/sessão próprios),
+    em vez de um Chromium por worker. O navegador fecha em fechar(), chamado
+    pelo HTTPBackend que criou esta instância.
+    """
+
+    def __init__(self, config: CanopusConfig = None, headless: bool = None):
+        self.config = config or CanopusConfig
+        self.headless = headless
+        self._lock = asyncio.Lock()
+        self._dono: Optional[PlaywrightBackend] = None
+        self._contextos: List[PlaywrightBackend] = []
+
+    async def abrir_contexto(self) -> PlaywrightBackend:
+        """Backend Playwright num contexto novo (lança o navegador na primeira vez)"""
+        async with self._lock:
+            if self._dono is None:
+                dono = PlaywrightBackend(config=self.config, headless=self.headless)
+                await dono.iniciar()
+                self._dono = dono
+                return dono
+
+        bot = PlaywrightBackend(config=self.config, headless=self.headless, browser=self._dono.browser)
+        await bot.iniciar()
+        self._contextos.append(bot)
+        return bot
+
+    async def liberar(self, bot: PlaywrightBackend):
+        """Fecha o contexto de um worker (o do dono leva o navegador, fica para fechar())"""
+        if bot in self._contextos:
+            self._contextos.remove(bot)
+            await bot.fechar()
+
+    async def fechar(self):
+        """Fecha os contextos restantes e por último o navegador"""
+        for bot in self._contextos:
+            await bot.fechar()
+        self._contextos = []
+
+        if self._dono:
+            await self._dono.fechar()
+            self._dono = None
+
+
+class HTTPBackend(CanopusBackend):
+    """
+    Backend HTTP puro (sem navegador)
+
+    Cada CPF percorre busca -> acesso -> emissão via postbacks. Se o
+    Canopus devolver algo fora do fluxo (PaginaInesperadaError ou erro
+    de rede), aquele CPF é refeito no Playwright, aberto sob demanda e
+    reutilizado para os próximos fallbacks.
+
+    Args:
+        navegador: NavegadorFallback de outro HTTPBackend (workers do mesmo
+            pool); sem ele, o backend cria e fecha o próprio
+    """
+
+    nome = BACKEND_HTTP
+
+    def __init__(self, config: CanopusConfig = None, headless: bool = None, fallback: bool = True,
+                 navegador: NavegadorFallback = None):
+        super().__init__(config, headless)
+        self.cliente = CanopusHTTPClient(timeout=self.config.TIMEOUTS['navegacao'] // 1000)
+        self.fallback_habilitado = fallback
+        self.fallback: Optional[PlaywrightBackend] = None
+        self.navegador_proprio = navegador is None
+        self.navegador = navegador or NavegadorFallback(self.config, headless)
+        self._credenciais = None
+        self.stats = {
+            'http_sucesso': 0,
+            'fallbacks': 0,
+        }
+
+    async def fechar(self):
+        if self.fallback:
+            self.fallback.log_estatisticas()
+            await self.navegador.liberar(self.fallback)
+            self.fallback = None
+
+        if self.navegador_proprio:
+            await self.navegador.fechar()
+
+        # Cookies mais recentes (o Canopus renova a validade a cada uso)
+        if self.cliente.logado and self._credenciais:
+            await self._salvar_sessao()
+
+        self.cliente.session.close()
+
+    async def _salvar_sessao(self):
+        await salvar_sessao_async(
+            self.config,
+            self._credenciais['ponto_venda'],
+            self._credenciais['usuario'],
+            TIPO_HTTP,
+            {'cookies': self.cliente.exportar_cookies()},
+            slot=self._credenciais['slot_sessao']
+        )
+
+    async def login(self, usuario, senha, codigo_empresa=None, ponto_venda=None, slot_sessao=0) -> bool:
+        self._credenciais = {
+            'usuario': usuario,
+            'senha': senha,
+            'codigo_empresa': codigo_empresa,
+            'ponto_venda': ponto_venda,
+            'slot_sessao': slot_sessao,
+        }
+
+        sessao = await carregar_sessao_async(self.config, ponto_venda, usuario, TIPO_HTTP, slot=slot_sessao)
+        if sessao and await asyncio.to_thread(self.cliente.restaurar_sessao, sessao.get('cookies', [])):
+            return True
+
+        if await asyncio.to_thread(self.cliente.login, usuario, senha):
+            await self._salvar_sessao()
+            return True
+
+        if not self.fallback_habilitado:
+            return False
+
+        # Login HTTP falhou: todo o lote vai pelo navegador
+        logger.warning("⚠️ Login HTTP falhou - usando Playwright para esta sessão")
+        return await self._obter_fallback() is not None
+
+    async def _obter_fallback(self) -> Optional[PlaywrightBackend]:
+        """Abre e autentica o Playwright na primeira necessidade"""
+        if self.fallback:
+            return self.fallback
+
+        logger.info("🌐 Abrindo Playwright para fallback...")
+        sys.stdout.flush()
+
+        fallback = await self.navegador.abrir_contexto()
+
+        if not await fallback.login(**self._credenciais):
+            logger.error("❌ Falha no login do Playwright (fallback)")
+            await self.navegador.liberar(fallback)
+            return None
+
+        self.fallback = fallback
+        return fallback
+
+    def _processar_http(self, cpf: str, mes: str, ano: int, destino: Path, nome_arquivo: str = None) -> Dict[str, Any]:
+        """Fluxo HTTP síncrono de um CPF (executado em thread)"""
+        cpf_limpo = self.config.limpar_cpf(cpf)
+
+        resultado = {
+            'cpf': cpf_limpo,
+            'cpf_formatado': self.config.formatar_cpf(cpf_limpo),
+            'mes': mes,
+            'ano': ano,
+            'status': None,
+            'mensagem': None,
+            'dados_cliente': None,
+            'dados_boleto': None,
+            'tempo_execucao_segundos': 0,
+            'backend': BACKEND_HTTP,
+        }
+
+        cliente = self.cliente.buscar_cpf(cpf_limpo)
+        if not cliente:
+            resultado['status'] = self.config.Status.CPF_NAO_ENCONTRADO
+            resultado['mensagem'] = 'Cliente não encontrado no sistema'
+            return resultado
+
+        resultado['dados_cliente'] = cliente
+
+        if not self.cliente.acessar_cliente(cliente['link_elemento']):
+            raise PaginaInesperadaError('Falha ao abrir atendimento do cliente')
+
+        pdf_bytes = self.cliente.emitir_boleto()
+        if not pdf_bytes:
+            resultado['status'] = self.config.Status.SEM_BOLETO
+            resultado['mensagem'] = 'Boleto não disponível ou erro ao baixar'
+            return resultado
+
+        return gravar_boleto_http(
+            self.config, resultado, pdf_bytes, destino, nome_arquivo, self.cliente.ultima_pagina_emissao
+        )
+
+    async def processar_cliente_completo(self, cpf, mes, ano, destino, nome_arquivo=None):
+        inicio = datetime.now()
+
+        # Sessão HTTP não autenticada (login caiu para o navegador)
+        if not self.cliente.logado and self.fallback:
+            return await self.fallback.processar_cliente_completo(cpf, mes, ano, destino, nome_arquivo)
+
+        try:
+            resultado = await asyncio.to_thread(self._processar_http, cpf, mes, ano, destino, nome_arquivo)
+            resultado['tempo_execucao_segundos'] = (datetime.now() - inicio).total_seconds()
+            if resultado['status'] == self.config.Status.SUCESSO:
+                self.stats['http_sucesso'] += 1
+            return resultado
+
+        except Exception as e:
+            if not self.fallback_habilitado:
+                return {
+                    'cpf': self.config.limpar_cpf(cpf),
+                    'status': self.config.Status.ERRO_NAVEGACAO,
+                    'mensagem': f'Erro HTTP: {str(e)}',
+                    'dados_boleto': None,
+                    'backend': BACKEND_HTTP,
+                }
+
+            logger.warning(f"⚠️ HTTP fora do fluxo para CPF {cpf} ({e}) - refazendo com Playwright")
+            sys.stdout.flush()
+
+        self.stats['fallbacks'] += 1
+        fallback = await self._obter_fallback()
+        if not fallback:
+            return {
+                'cpf': self.config.limpar_cpf(cpf),
+                'status': self.config.Status.ERRO,
+                'mensagem': 'HTTP falhou e fallback Playwright indisponível',
+                'dados_boleto': None,
+                'backend': BACKEND_HTTP,
+            }
+
+        resultado = await fallback.processar_cliente_completo(cpf, mes, ano, destino, nome_arquivo)
+        resultado['backend'] = BACKEND_PLAYWRIGHT
+        return resultado
+
+    def log_estatisticas(self):
+        logger.info(
+            f"📊 Backend HTTP - sucessos HTTP: {self.stats['http_sucesso']}, "
+            f"fallbacks Playwright: {self.stats['fallbacks']}"
+        )
+
+
+class HTTPAsyncBackend(CanopusBackend):
+    """
+    Backend HTTP assíncrono (aiohttp, sem threads nem navegador)
+
+    Uma sessão CanopusAPIAsync por instância, com VIEWSTATE e cookies
+    próprios; no CanopusPool cada worker loga a sua e os CPFs são
+    distribuídos pela fila do pool. Sem fallback para o Playwright: uma
+    página fora do fluxo refaz o login e devolve ERRO_NAVEGACAO, que o
+    pool tenta de novo.
+    """
+
+    nome = BACKEND_HTTP_ASYNC
+
+    def __init__(self, config: CanopusConfig = None, headless: bool = None):
+        super().__init__(config, headless)
+        self.cliente = CanopusAPIAsync(timeout=self.config.TIMEOUTS['navegacao'] // 1000)
+        self.stats = {
+            'http_sucesso': 0,
+            'relogins': 0,
+        }
+
+    async def fechar(self):
+        await self.cliente.fechar()
+
+    async def login(self, usuario, senha, codigo_empresa=None, ponto_venda=None, slot_sessao=0) -> bool:
+        self.cliente.indice = slot_sessao
+        return await self.cliente.login(usuario, senha)
+
+    async def processar_cliente_completo(self, cpf, mes, ano, destino, nome_arquivo=None):
+        inicio = datetime.now()
+        cpf_limpo = self.config.limpar_cpf(cpf)
+
+        resultado = {
+            'cpf': cpf_limpo,
+            'cpf_formatado': self.config.formatar_cpf(cpf_limpo),
+            'mes': mes,
+            'ano': ano,
+            'status': None,
+            'mensagem': None,
+            'dados_cliente': None,
+            'dados_boleto': None,
+            'tempo_execucao_segundos': 0,
+            'backend': BACKEND_HTTP_ASYNC,
+        }
+
+        try:
+            cliente = await self.cliente.buscar_cliente_por_cpf(cpf_limpo)
+            if not cliente:
+                resultado['status'] = self.config.Status.CPF_NAO_ENCONTRADO
+                resultado['mensagem'] = 'Cliente não encontrado no sistema'
+                return resultado
+
+            resultado['dados_cliente'] = cliente
+
+            pdf_bytes = await self.cliente.emitir_boleto(cliente)
+            if not pdf_bytes:
+                resultado['status'] = self.config.Status.SEM_BOLETO
+                resultado['mensagem'] = 'Boleto não disponível ou erro ao baixar'
+                return resultado
+
+            # Nome do arquivo consulta o banco: fora do event loop
+            await asyncio.to_thread(
+                gravar_boleto_http, self.config, resultado, pdf_bytes, destino, nome_arquivo,
+                self.cliente.ultima_pagina_emissao
+            )
+            self.stats['http_sucesso'] += 1
+            return resultado
+
+        except Exception as e:
+            # Sessão provavelmente expirou: novo login para a próxima tentativa
+            logger.warning(f"⚠️ HTTP assíncrono fora do fluxo para CPF {cpf} ({e}) - refazendo login")
+            self.stats['relogins'] += 1
+            await self.cliente.relogin()
+
+            resultado['status'] = self.config.Status.ERRO_NAVEGACAO
+            resultado['mensagem'] = f'Erro HTTP: {str(e)}'
+            return resultado
+
+        finally:
+            resultado['tempo_execucao_segundos'] = (datetime.now() - inicio).total_seconds()
+
+    def log_estatisticas(self):
+        logger.info(
+            f"📊 Backend HTTP assíncrono - sucessos: {self.stats['http_sucesso']}, "
+            f"relogins: {self.stats['relogins']}"
+        )
+
+
+# ============================================================================
+# FÁBRICA
+# ============================================================================
+
+def criar_backend(
+    tipo: str = None,
+    headless: bool = None,
+    config: CanopusConfig = None,
+    **kwargs
+) -> CanopusBackend:
+    """
+    Cria o backend de download escolhido
+
+    Args:
+        tipo: 'playwright', 'http' ou 'http_async' (padrão: CANOPUS_BACKEND / config)
+        headless: Modo headless do navegador (Playwright e fallback)
+        config: Configuração Canopus
+        **kwargs: Repasse específico (browser= para Playwright,
+            navegador= para o fallback do HTTP)
+
+    Returns:
+        Instância do backend
+    """
+    config = config or CanopusConfig
+    tipo = (tipo or config.EXECUCAO['backend']).lower()
+
+    if tipo == BACKEND_HTTP:
+        return HTTPBackend(config=config, headless=headless, navegador=kwargs.get('navegador'))
+    if tipo == BACKEND_HTTP_ASYNC:
+        return HTTPAsyncBackend(config=config, headless=headless)
+    if tipo == BACKEND_PLAYWRIGHT:
+        return PlaywrightBackend(config=config, headless=headless, browser=kwargs.get('browser'))
+
+    raise ValueError(f"Backend Canopus inválido: '{tipo}' (use {', '.join(BACKENDS_DISPONIVEIS)})")
@@ -129,6 +129,7 @@ class CanopusConfig:
     # URLs específicas (URLs REAIS do sistema)
     URLS = {
         'login': f'{CANOPUS_BASE_URL}/WWW/frmCorCCCnsLogin.aspx',
+        'principal': f'{CANOPUS_BASE_URL}/WWW/frmMain.aspx',  # Tela após o login (validação da sessão em cache)
         'home': f'{CANOPUS_BASE_URL}/WWW/',
         'busca_avancada': f'{CANOPUS_BASE_URL}/WWW/busca-avancada',
         'emissao_cobranca': f'{CANOPUS_BASE_URL}/WWW/emissao-cobranca',
@@ -209,13 +210,22 @@ class CanopusConfig:
         'busca': 20000,          # 20s - timeout para busca de cliente
     }
 
+    # Só atrasos deliberados: o resto espera por condição (esperas_adaptativas.py)
     DELAYS = {
-        'apos_login': 2.0,           # 2s após login
-        'apos_busca': 1.5,           # 1.5s após buscar cliente
-        'entre_downloads': 3.0,      # 3s entre downloads
+        'entre_downloads': float(os.getenv('CANOPUS_ENTRE_DOWNLOADS', '0')),  # Pausa extra entre clientes (s)
         'entre_tentativas': 5.0,     # 5s entre tentativas de retry
-        'minimo_humanizado': 0.5,    # 0.5s delay mínimo
-        'maximo_humanizado': 2.0,    # 2s delay máximo
+        'ritmo_humanizado': os.getenv('CANOPUS_RITMO_HUMANIZADO', 'true').lower() == 'true',  # Antes de cada envio ao Canopus
+        'minimo_humanizado': float(os.getenv('CANOPUS_RITMO_MINIMO', '0.5')),  # 0.5s delay mínimo
+        'maximo_humanizado': float(os.getenv('CANOPUS_RITMO_MAXIMO', '2.0')),  # 2s delay máximo
+    }
+
+    # Timeout aprendido por etapa: p95 das últimas amostras x margem, entre
+    # minimo_ms e o TIMEOUTS da etapa
+    ESPERAS = {
+        'janela': int(os.getenv('CANOPUS_ESPERAS_JANELA', '50')),          # Amostras por etapa
+        'amostras_minimas': int(os.getenv('CANOPUS_ESPERAS_AMOSTRAS', '5')),  # Antes disso vale o teto
+        'margem': float(os.getenv('CANOPUS_ESPERAS_MARGEM', '3.0')),
+        'minimo_ms': int(os.getenv('CANOPUS_ESPERAS_MINIMO_MS', '3000')),
     }
 
     # ========================================================================
@@ -246,6 +256,46 @@ class CanopusConfig:
 
         'accept_downloads': True,
         'downloads_path': str(TEMP_DIR),
+
+        # Log de cada request/response, console completo e log verbose do
+        # Chromium (--v=2). Desligado: só erros/avisos do console da página
+        'debug': os.getenv('CANOPUS_DEBUG', 'false').lower() == 'true',
+    }
+
+    # ========================================================================
+    # FILTRO DE REQUISIÇÕES DO NAVEGADOR
+    # ========================================================================
+
+    # Cada postback ASP.NET recarregava imagens, fontes e rastreadores. O
+    # contexto aborta o que não é necessário para buscar e emitir boletos.
+    FILTRO_REQUISICOES = {
+        'habilitado': os.getenv('CANOPUS_FILTRAR_REQUISICOES', 'true').lower() == 'true',
+
+        # Tipos de recurso abortados (request.resource_type do Playwright).
+        # stylesheet fica liberado: sem CSS menus e popups mudam de posição/visibilidade
+        'tipos_bloqueados': tuple(
+            t.strip() for t in os.getenv('CANOPUS_TIPOS_BLOQUEADOS', 'image,media,font').split(',') if t.strip()
+        ),
+
+        # Hosts liberados (o próprio e subdomínios); o resto é abortado
+        'hosts_permitidos': (
+            'consorciocanopus.com.br',
+            'www.google.com',    # reCAPTCHA do login
+            'www.gstatic.com',
+        ) + tuple(
+            h.strip() for h in os.getenv('CANOPUS_HOSTS_PERMITIDOS', '').split(',') if h.strip()
+        ),
+
+        # Sempre liberado, mesmo se o tipo estiver bloqueado (emissão do boleto).
+        # Os botões de imagem (img_Atendimento, imgEmite_Boleto) continuam
+        # clicáveis sem a imagem: o input mantém a caixa com o texto alternativo
+        'urls_permitidas': (
+            'frmConCmImpressao',  # Impressão do boleto (PDF)
+            '.pdf',
+            '.axd',               # WebResource/ScriptResource do ASP.NET
+        ) + tuple(
+            u.strip() for u in os.getenv('CANOPUS_URLS_PERMITIDAS', '').split(',') if u.strip()
+        ),
     }
 
     # ========================================================================
@@ -258,6 +308,20 @@ class CanopusConfig:
         'reiniciar_navegador_apos': 100,  # Reiniciar após N downloads
         'mes_padrao': 'DEZEMBRO',          # Mês padrão para download
         'codigo_empresa_padrao': '0101',   # Código empresa padrão
+
+        # Backend de download: 'playwright' (navegador), 'http' (postbacks diretas)
+        # ou 'http_async' (postbacks em aiohttp, uma sessão por worker do pool)
+        'backend': os.getenv('CANOPUS_BACKEND', 'playwright').lower(),
+
+        # Pool de downloads paralelos (1 = modo sequencial)
+        'concorrencia': int(os.getenv('CANOPUS_CONCORRENCIA', '1')),
+        'memoria_limite_mb': int(os.getenv('CANOPUS_MEMORIA_LIMITE_MB', '512')),  # Limite da instância Render
+        'memoria_por_contexto_mb': int(os.getenv('CANOPUS_MEMORIA_POR_CONTEXTO_MB', '80')),
+        'intervalo_minimo_requisicoes': float(os.getenv('CANOPUS_INTERVALO_MINIMO', '1.0')),  # Rate limit global (s)
+
+        # Cache da sessão autenticada por ponto de venda (sessao_canopus.py)
+        'cache_sessao': os.getenv('CANOPUS_CACHE_SESSAO', 'true').lower() == 'true',
+        'sessao_max_horas': float(os.getenv('CANOPUS_SESSAO_MAX_HORAS', '8')),  # Mais velha que isso nem é testada
     }
 
     # ========================================================================
@@ -8,7 +8,7 @@ Análise em: mapear_fluxo.py
 
 import re
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 from pathlib import Path
 import urllib3
@@ -16,7 +16,7 @@ import urllib3
 import requests
 from bs4 import BeautifulSoup
 
-from config import CanopusConfig
+from canopus_config import CanopusConfig
 
 # Suprimir warnings SSL
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -28,6 +28,127 @@ logging.basicConfig(
 logger = logging.getLogger('CanopusHTTP')
 
 
+class PaginaInesperadaError(Exception):
+    """
+    O Canopus devolveu uma página fora do fluxo mapeado (sessão expirada,
+    layout alterado, popup novo...). Quem chama pode cair para o Playwright.
+    """
+
+
+# Headers idênticos ao navegador
+HEADERS_NAVEGADOR = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+    'Accept-Language': 'pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Cache-Control': 'max-age=0',
+    'Sec-Ch-Ua': '"Not_A Brand";v="8", "Chromium";v="120"',
+    'Sec-Ch-Ua-Mobile': '?0',
+    'Sec-Ch-Ua-Platform': '"Windows"',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Sec-Fetch-User': '?1',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+# Campos obrigatórios do ASP.NET
+CAMPOS_ASP = [
+    '__VIEWSTATE',
+    '__VIEWSTATEGENERATOR',
+    '__EVENTVALIDATION',
+    '__VSIG',  # Campo específico do Canopus
+    '__VIEWSTATEENCRYPTED',
+    '__EVENTTARGET',
+    '__EVENTARGUMENT',
+    '__LASTFOCUS',
+    '__SCROLLPOSITIONX',
+    '__SCROLLPOSITIONY',
+]
+
+
+# ============================================================================
+# FUNÇÕES DE PARSING (compartilhadas com o cliente assíncrono)
+# ============================================================================
+
+def extrair_campos_asp(html: str) -> Dict[str, str]:
+    """Extrai campos ASP.NET (__VIEWSTATE etc.) do HTML"""
+    soup = BeautifulSoup(html, 'html.parser')
+    fields = {}
+
+    for field_name in CAMPOS_ASP:
+        field = soup.find('input', {'name': field_name})
+        if field and field.get('value'):
+            fields[field_name] = field.get('value', '')
+
+    return fields
+
+
+def dados_formulario_emissao(asp_fields: Dict[str, str], event_target: str = '', **extras) -> Dict[str, str]:
+    """
+    Monta o POST da tela frmConCoRelBoletoAvulso.aspx
+
+    Args:
+        asp_fields: Campos ASP.NET da página atual
+        event_target: Controle que dispara a postback
+        **extras: Campos adicionais (ex: coordenadas do checkbox)
+    """
+    return {
+        **asp_fields,
+        '__EVENTTARGET': event_target,
+        '__EVENTARGUMENT': '',
+        '__LASTFOCUS': '',
+        '__SCROLLPOSITIONX': '0',
+        '__SCROLLPOSITIONY': '0',
+        'ctl00$hdnID_Modulo': '',
+        'ctl00$Conteudo$edtForma': '',
+        'ctl00$Conteudo$edtDT_Compensacao': datetime.now().strftime('%d/%m/%Y'),
+        'ctl00$Conteudo$rdlTipoEmissao': 'BA',
+        'ctl00$Conteudo$hdn_VL_Total_Receber_Sem_TxCob': '',
+        'ctl00$Conteudo$hid_SN_Debito_Conta_Cota': 'N',
+        'ctl00$Conteudo$hid_SN_Debito_Conta_Forma_Recebimento': 'N',
+        'ctl00$Conteudo$hid_SN_Agenda_Debito_Avulso': 'N',
+        'ctl00$Conteudo$hid_SN_Mesma_Conta_Debito': 'N',
+        **extras,
+    }
+
+
+def extrair_url_pdf(html: str) -> Optional[str]:
+    """Procura o window.open(...) que abre o PDF após a emissão"""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    for script in soup.find_all('script'):
+        if script.string and 'window.open' in script.string:
+            match = re.search(r'window\.open\(["\']([^"\']+)["\']', script.string)
+            if match:
+                return match.group(1)
+
+    return None
+
+
+def extrair_link_cliente(html: str) -> Optional[str]:
+    """
+    Extrai o ID do link do cliente no resultado da busca
+
+    Raises:
+        PaginaInesperadaError: Se a resposta não for a tela de busca
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Fora da tela de busca = fluxo quebrou (não é "CPF não encontrado")
+    if not soup.find('input', {'id': 'ctl00_Conteudo_edtContextoBusca'}):
+        raise PaginaInesperadaError('Tela de busca não retornada')
+
+    # Procurar link do resultado (grdBuscaAvancada)
+    links = soup.select('a[id*="grdBuscaAvancada"][id*="lnkGrupoCota"]')
+    if not links:
+        return None
+
+    # Pegar primeiro link (ctl03)
+    link = links[0] if len(links) == 1 else links[1]
+    return link.get('id')  # Ex: ctl00_Conteudo_grdBuscaAvancada_ctl03_lnkGrupoCota
+
+
 class CanopusHTTPClient:
     """
     Cliente HTTP Real do Canopus
@@ -40,51 +161,23 @@ class CanopusHTTPClient:
         self.session = requests.Session()
 
         # Headers idênticos ao navegador
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-            'Accept-Language': 'pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Cache-Control': 'max-age=0',
-            'Sec-Ch-Ua': '"Not_A Brand";v="8", "Chromium";v="120"',
-            'Sec-Ch-Ua-Mobile': '?0',
-            'Sec-Ch-Ua-Platform': '"Windows"',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Sec-Fetch-User': '?1',
-            'Upgrade-Insecure-Requests': '1',
-        })
+        self.session.headers.update(HEADERS_NAVEGADOR)
 
         self.session.verify = False  # SSL pode dar problema
         self.timeout = timeout
         self._logged_in = False
 
+        # HTML da última página de emissão (usado para extrair o mês do boleto)
+        self.ultima_pagina_emissao: Optional[str] = None
+
+    @property
+    def logado(self) -> bool:
+        """Sessão autenticada (login feito ou cookies restaurados)"""
+        return self._logged_in
+
     def _extract_asp_fields(self, html: str) -> Dict[str, str]:
         """Extrai campos ASP.NET do HTML"""
-        soup = BeautifulSoup(html, 'html.parser')
-        fields = {}
-
-        # Campos obrigatórios do ASP.NET
-        asp_fields = [
-            '__VIEWSTATE',
-            '__VIEWSTATEGENERATOR',
-            '__EVENTVALIDATION',
-            '__VSIG',  # Campo específico do Canopus
-            '__VIEWSTATEENCRYPTED',
-            '__EVENTTARGET',
-            '__EVENTARGUMENT',
-            '__LASTFOCUS',
-            '__SCROLLPOSITIONX',
-            '__SCROLLPOSITIONY',
-        ]
-
-        for field_name in asp_fields:
-            field = soup.find('input', {'name': field_name})
-            if field and field.get('value'):
-                fields[field_name] = field.get('value', '')
-
-        return fields
+        return extrair_campos_asp(html)
 
     def login(self, usuario: str, senha: str) -> bool:
         """
@@ -153,6 +246,51 @@ class CanopusHTTPClient:
             logger.error(f"❌ Erro no login: {e}")
             return False
 
+    def exportar_cookies(self) -> List[Dict[str, Any]]:
+        """Cookies da sessão (mesmo formato dos cookies do storage_state do Playwright)"""
+        return [{
+            'name': cookie.name,
+            'value': cookie.value,
+            'domain': cookie.domain,
+            'path': cookie.path,
+            'secure': cookie.secure,
+            'expires': cookie.expires if cookie.expires is not None else -1,
+        } for cookie in self.session.cookies]
+
+    def restaurar_sessao(self, cookies: List[Dict[str, Any]]) -> bool:
+        """
+        Reaproveita cookies de uma sessão anterior
+
+        Valida com um GET em frmMain.aspx: sessão expirada redireciona para o
+        login. Se não valer, os cookies são descartados.
+        """
+        for cookie in cookies:
+            expira = cookie.get('expires')
+            self.session.cookies.set(
+                cookie['name'],
+                cookie['value'],
+                domain=cookie.get('domain'),
+                path=cookie.get('path', '/'),
+                secure=cookie.get('secure', False),
+                expires=int(expira) if expira and expira > 0 else None,
+            )
+
+        try:
+            response = self.session.get(f'{self.BASE_URL}/frmMain.aspx', timeout=self.timeout)
+            valida = response.ok and 'login' not in response.url.lower() and 'edtSenha' not in response.text
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao validar sessão em cache: {e}")
+            valida = False
+
+        if valida:
+            self._logged_in = True
+            logger.info("♻️ Sessão em cache válida - login pulado")
+            return True
+
+        self.session.cookies.clear()
+        logger.info("🔄 Sessão em cache expirada")
+        return False
+
     def buscar_cpf(self, cpf: str) -> Optional[Dict[str, Any]]:
         """
         Busca cliente por CPF
@@ -245,27 +383,23 @@ class CanopusHTTPClient:
             )
 
             # 5. Parsear resultado
-            soup = BeautifulSoup(response.text, 'html.parser')
+            link_elemento = extrair_link_cliente(response.text)
 
-            # Procurar link do resultado (grdBuscaAvancada)
-            links = soup.select('a[id*="grdBuscaAvancada"][id*="lnkGrupoCota"]')
-
-            if not links:
+            if not link_elemento:
                 logger.warning(f"⚠️ CPF não encontrado: {cpf_formatado}")
                 return None
 
-            # Pegar primeiro link (ctl03)
-            link = links[0] if len(links) == 1 else links[1]
-
             logger.info(f"✅ Cliente encontrado!")
 
             return {
                 'cpf': cpf_limpo,
                 'cpf_formatado': cpf_formatado,
-                'link_elemento': link.get('id'),  # Ex: ctl00_Conteudo_grdBuscaAvancada_ctl03_lnkGrupoCota
+                'link_elemento': link_elemento,  # Ex: ctl00_Conteudo_grdBuscaAvancada_ctl03_lnkGrupoCota
                 'encontrado': True,
             }
 
+        except PaginaInesperadaError:
+            raise
         except Exception as e:
             logger.error(f"❌ Erro na busca: {e}")
             import traceback
@@ -339,30 +473,22 @@ class CanopusHTTPClient:
             # 1. Acessar página de emissão
             url_emissao = f'{self.BASE_URL}/CONCO/frmConCoRelBoletoAvulso.aspx'
             response = self.session.get(url_emissao, timeout=self.timeout)
+            self.ultima_pagina_emissao = response.text
+
+            if 'grdBoleto_Avulso' not in response.text:
+                raise PaginaInesperadaError(f'Tela de emissão não retornada ({response.url})')
 
             asp_fields = self._extract_asp_fields(response.text)
 
             # 2. Clicar no checkbox do boleto (ctl03)
-            checkbox_data = {
-                **asp_fields,
-                '__EVENTTARGET': '',
-                '__EVENTARGUMENT': '',
-                '__LASTFOCUS': '',
-                '__SCROLLPOSITIONX': '0',
-                '__SCROLLPOSITIONY': '0',
-                'ctl00$hdnID_Modulo': '',
-                'ctl00$Conteudo$edtForma': '',
-                'ctl00$Conteudo$edtDT_Compensacao': datetime.now().strftime('%d/%m/%Y'),
-                'ctl00$Conteudo$rdlTipoEmissao': 'BA',
-                'ctl00$Conteudo$grdBoleto_Avulso$ctl03$imgEmite_Boleto.x': '11',
-                'ctl00$Conteudo$grdBoleto_Avulso$ctl03$imgEmite_Boleto.y': '7',
-                'ctl00$Conteudo$hdn_VL_Total_Receber_Sem_TxCob': '',
-                'ctl00$Conteudo$hid_SN_Debito_Conta_Cota': 'N',
-                'ctl00$Conteudo$hid_SN_Debito_Conta_Forma_Recebimento': 'N',
-                'ctl00$Conteudo$hid_SN_Agenda_Debito_Avulso': 'N',
-                'ctl00$Conteudo$hid_SN_Mesma_Conta_Debito': 'N',
-                'as_fid': '',
-            }
+            checkbox_data = dados_formulario_emissao(
+                asp_fields,
+                **{
+                    'ctl00$Conteudo$grdBoleto_Avulso$ctl03$imgEmite_Boleto.x': '11',
+                    'ctl00$Conteudo$grdBoleto_Avulso$ctl03$imgEmite_Boleto.y': '7',
+                    'as_fid': '',
+                }
+            )
 
             response = self.session.post(
                 url_emissao,
@@ -372,24 +498,7 @@ class CanopusHTTPClient:
 
             # 3. Clicar em "Emitir" (btnEmitir)
             asp_fields = self._extract_asp_fields(response.text)
-
-            emitir_data = {
-                **asp_fields,
-                '__EVENTTARGET': 'ctl00$Conteudo$btnEmitir',
-                '__EVENTARGUMENT': '',
-                '__LASTFOCUS': '',
-                '__SCROLLPOSITIONX': '0',
-                '__SCROLLPOSITIONY': '0',
-                'ctl00$hdnID_Modulo': '',
-                'ctl00$Conteudo$edtForma': '',
-                'ctl00$Conteudo$edtDT_Compensacao': datetime.now().strftime('%d/%m/%Y'),
-                'ctl00$Conteudo$rdlTipoEmissao': 'BA',
-                'ctl00$Conteudo$hdn_VL_Total_Receber_Sem_TxCob': '',
-                'ctl00$Conteudo$hid_SN_Debito_Conta_Cota': 'N',
-                'ctl00$Conteudo$hid_SN_Debito_Conta_Forma_Recebimento': 'N',
-                'ctl00$Conteudo$hid_SN_Agenda_Debito_Avulso': 'N',
-                'ctl00$Conteudo$hid_SN_Mesma_Conta_Debito': 'N',
-            }
+            emitir_data = dados_formulario_emissao(asp_fields, 'ctl00$Conteudo$btnEmitir')
 
             response = self.session.post(
                 url_emissao,
@@ -399,24 +508,7 @@ class CanopusHTTPClient:
 
             # 4. Verificar popup (btnVerificaPopUp)
             asp_fields = self._extract_asp_fields(response.text)
-
-            popup_data = {
-                **asp_fields,
-                '__EVENTTARGET': 'ctl00$Conteudo$btnVerificaPopUp',
-                '__EVENTARGUMENT': '',
-                '__LASTFOCUS': '',
-                '__SCROLLPOSITIONX': '0',
-                '__SCROLLPOSITIONY': '0',
-                'ctl00$hdnID_Modulo': '',
-                'ctl00$Conteudo$edtForma': '',
-                'ctl00$Conteudo$edtDT_Compensacao': datetime.now().strftime('%d/%m/%Y'),
-                'ctl00$Conteudo$rdlTipoEmissao': 'BA',
-                'ctl00$Conteudo$hdn_VL_Total_Receber_Sem_TxCob': '',
-                'ctl00$Conteudo$hid_SN_Debito_Conta_Cota': 'N',
-                'ctl00$Conteudo$hid_SN_Debito_Conta_Forma_Recebimento': 'N',
-                'ctl00$Conteudo$hid_SN_Agenda_Debito_Avulso': 'N',
-                'ctl00$Conteudo$hid_SN_Mesma_Conta_Debito': 'N',
-            }
+            popup_data = dados_formulario_emissao(asp_fields, 'ctl00$Conteudo$btnVerificaPopUp')
 
             response = self.session.post(
                 url_emissao,
@@ -424,24 +516,11 @@ class CanopusHTTPClient:
                 timeout=self.timeout
             )
 
-            # 5. Procurar URL do PDF no HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Procurar script que abre o PDF
-            scripts = soup.find_all('script')
-            pdf_url = None
-
-            for script in scripts:
-                if script.string and 'window.open' in script.string:
-                    # Extrair URL do window.open
-                    match = re.search(r'window\.open\(["\']([^"\']+)["\']', script.string)
-                    if match:
-                        pdf_url = match.group(1)
-                        break
+            # 5. Procurar URL do PDF no HTML (script que abre o PDF)
+            pdf_url = extrair_url_pdf(response.text)
 
             if not pdf_url:
-                logger.error("❌ URL do PDF não encontrada")
-                return None
+                raise PaginaInesperadaError('URL do PDF não encontrada após emissão')
 
             # 6. Baixar PDF
             if not pdf_url.startswith('http'):
@@ -457,6 +536,8 @@ class CanopusHTTPClient:
                 logger.error("❌ PDF inválido")
                 return None
 
+        except PaginaInesperadaError:
+            raise
         except Exception as e:
             logger.error(f"❌ Erro ao emitir: {e}")
             import traceback
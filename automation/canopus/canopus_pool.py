@@ -0,0 +1,359 @@
+"""
+Pool de Downloads Paralelos Canopus
+Distribui uma lista de CPFs entre N contextos isolados do Playwright
+(um login por contexto) ou N sessões HTTP, usando uma fila compartilhada
+"""
+
+import asyncio
+import gc
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from canopus_config import CanopusConfig
+from canopus_backends import CanopusBackend, HTTPBackend, PlaywrightBackend, criar_backend
+
+logger = logging.getLogger(__name__)
+
+
+# Status que valem nova tentativa (falhas transitórias de navegação/rede)
+STATUS_RETENTAVEIS = (
+    CanopusConfig.Status.TIMEOUT,
+    CanopusConfig.Status.ERRO,
+    CanopusConfig.Status.ERRO_NAVEGACAO,
+)
+
+
+# ============================================================================
+# FUNÇÕES AUXILIARES
+# ============================================================================
+
+def memoria_total_mb() -> float:
+    """
+    Memória RSS do processo Python + processos filhos (Chromium)
+
+    Returns:
+        Memória em MB (0 se psutil não estiver disponível)
+    """
+    try:
+        import psutil
+    except ImportError:
+        return 0.0
+
+    processo = psutil.Process()
+    total = processo.memory_info().rss
+    for filho in processo.children(recursive=True):
+        try:
+            total += filho.memory_info().rss
+        except psutil.Error:
+            pass
+    return total / 1024 / 1024
+
+
+def calcular_concorrencia(solicitada: int = None, config: CanopusConfig = CanopusConfig) -> int:
+    """
+    Limita a concorrência pedida ao orçamento de memória da instância
+
+    Args:
+        solicitada: Número de contextos desejado (padrão: config)
+        config: Configuração Canopus
+
+    Returns:
+        Número de contextos que cabem na memória (mínimo 1)
+    """
+    solicitada = solicitada or config.EXECUCAO['concorrencia']
+    limite_mb = config.EXECUCAO['memoria_limite_mb']
+    por_contexto_mb = config.EXECUCAO['memoria_por_contexto_mb']
+
+    uso_atual = memoria_total_mb()
+    # Reserva um "contexto" extra para o processo base do navegador
+    disponivel = limite_mb - uso_atual - por_contexto_mb
+    cabe = int(disponivel // por_contexto_mb) if por_contexto_mb > 0 else solicitada
+
+    concorrencia = max(1, min(solicitada, cabe))
+    if concorrencia < solicitada:
+        logger.warning(
+            f"⚠️ Concorrência reduzida de {solicitada} para {concorrencia} "
+            f"(memória atual {uso_atual:.0f} MB / limite {limite_mb} MB)"
+        )
+    return concorrencia
+
+
+class LimitadorTaxa:
+    """Garante um intervalo mínimo global entre requisições ao Canopus"""
+
+    def __init__(self, intervalo_minimo: float):
+        self.intervalo_minimo = intervalo_minimo
+        self._ultimo = 0.0
+        self._lock = asyncio.Lock()
+
+    async def aguardar(self):
+        """Bloqueia até que a próxima requisição seja permitida"""
+        async with self._lock:
+            espera = self._ultimo + self.intervalo_minimo - time.monotonic()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            self._ultimo = time.monotonic()
+
+
+# ============================================================================
+# CLASSE PRINCIPAL DO POOL
+# ============================================================================
+
+class CanopusPool:
+    """Pool de backends autenticados (contextos Playwright ou sessões HTTP) processando uma fila de CPFs"""
+
+    def __init__(
+        self,
+        usuario: str,
+        senha: str,
+        codigo_empresa: str = None,
+        ponto_venda: str = None,
+        headless: bool = None,
+        backend: str = None,
+        concorrencia: int = None,
+        max_tentativas: int = None,
+        intervalo_minimo: float = None,
+        config: CanopusConfig = None
+    ):
+        """
+        Inicializa o pool
+
+        Args:
+            usuario: Usuário de login no Canopus
+            senha: Senha
+            codigo_empresa: Código da empresa
+            ponto_venda: Código do ponto de venda
+            headless: Modo headless
+            backend: 'playwright' ou 'http' (padrão: config)
+            concorrencia: Número de contextos desejado (limitado pela memória)
+            max_tentativas: Tentativas por CPF em falhas transitórias
+            intervalo_minimo: Intervalo mínimo global entre CPFs (segundos)
+            config: Configuração (usa padrão se não fornecido)
+        """
+        self.config = config or CanopusConfig
+        self.usuario = usuario
+        self.senha = senha
+        self.codigo_empresa = codigo_empresa
+        self.ponto_venda = ponto_venda
+        self.headless = headless
+        self.backend = backend
+        self.concorrencia = concorrencia or self.config.EXECUCAO['concorrencia']
+        self.max_tentativas = max_tentativas or self.config.EXECUCAO['max_tentativas']
+
+        if intervalo_minimo is None:
+            intervalo_minimo = self.config.EXECUCAO['intervalo_minimo_requisicoes']
+        self.limitador = LimitadorTaxa(intervalo_minimo)
+
+        self.bots: List[CanopusBackend] = []
+        self.concluidos = 0
+
+    # ========================================================================
+    # CICLO DE VIDA DOS CONTEXTOS
+    # ========================================================================
+
+    async def _abrir_contextos(self, quantidade: int):
+        """Abre o navegador uma vez e um contexto autenticado por worker"""
+        principal = criar_backend(self.backend, headless=self.headless, config=self.config)
+        await principal.iniciar()
+        bots = [principal]
+
+        # Contextos Playwright extras reaproveitam o processo do navegador principal;
+        # sessões HTTP extras dividem o navegador de fallback do principal
+        if isinstance(principal, PlaywrightBackend):
+            extras = {'browser': principal.browser}
+        elif isinstance(principal, HTTPBackend):
+            extras = {'navegador': principal.navegador}
+        else:
+            extras = {}
+
+        for _ in range(quantidade - 1):
+            bot = criar_backend(principal.nome, headless=self.headless, config=self.config, **extras)
+            try:
+                await bot.iniciar()
+                bots.append(bot)
+            except Exception as e:
+                logger.warning(f"⚠️ Não foi possível abrir contexto extra: {e}")
+                break
+
+        for indice, bot in enumerate(bots):
+            await self.limitador.aguardar()
+            logger.info(f"🔐 [Worker {indice}] Fazendo login...")
+            login_ok = await bot.login(
+                usuario=self.usuario,
+                senha=self.senha,
+                codigo_empresa=self.codigo_empresa,
+                ponto_venda=self.ponto_venda,
+                slot_sessao=indice
+            )
+            if login_ok:
+                self.bots.append(bot)
+            else:
+                logger.error(f"❌ [Worker {indice}] Falha no login - worker descartado")
+
+        # Contextos sem login são fechados agora (o principal só no final)
+        for bot in bots[1:]:
+            if bot not in self.bots:
+                await bot.fechar()
+
+        self._principal = principal
+
+    async def _fechar_contextos(self):
+        """Fecha os contextos extras e por último o navegador principal"""
+        principal = getattr(self, '_principal', None)
+        for bot in self.bots:
+            if bot is not principal:
+                bot.log_estatisticas()
+                await bot.fechar()
+        if principal:
+            principal.log_estatisticas()
+            await principal.fechar()
+        self.bots = []
+
+    # ========================================================================
+    # PROCESSAMENTO
+    # ========================================================================
+
+    async def _processar_com_retry(
+        self,
+        bot: CanopusBackend,
+        indice: int,
+        cpf: str,
+        mes: str,
+        ano: int,
+        destino: Path
+    ) -> Dict[str, Any]:
+        """Processa um CPF com novas tentativas em falhas transitórias"""
+        resultado = None
+
+        for tentativa in range(1, self.max_tentativas + 1):
+            await self.limitador.aguardar()
+
+            resultado = await bot.processar_cliente_completo(
+                cpf=cpf,
+                mes=mes,
+                ano=ano,
+                destino=destino,
+                nome_arquivo=None
+            )
+            resultado['tentativas'] = tentativa
+
+            if resultado.get('status') not in STATUS_RETENTAVEIS:
+                break
+
+            if tentativa < self.max_tentativas:
+                logger.warning(
+                    f"🔁 [Worker {indice}] CPF {cpf}: {resultado.get('mensagem')} "
+                    f"- tentativa {tentativa + 1}/{self.max_tentativas}"
+                )
+                await asyncio.sleep(self.config.DELAYS['entre_tentativas'])
+
+        return resultado
+
+    async def _worker(
+        self,
+        indice: int,
+        bot: CanopusBackend,
+        fila: asyncio.Queue,
+        mes: str,
+        ano: int,
+        destino: Path,
+        ao_concluir: Optional[Callable[..., Awaitable[None]]]
+    ):
+        """Consome CPFs da fila compartilhada até esvaziá-la"""
+        limite_mb = self.config.EXECUCAO['memoria_limite_mb']
+
+        while True:
+            try:
+                posicao, cpf = fila.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            try:
+                try:
+                    resultado = await self._processar_com_retry(bot, indice, cpf, mes, ano, destino)
+                except Exception as e:
+                    logger.error(f"❌ [Worker {indice}] Exceção no CPF {cpf}: {e}")
+                    resultado = {
+                        'cpf': cpf,
+                        'status': self.config.Status.ERRO,
+                        'mensagem': f'Erro: {str(e)}',
+                    }
+
+                self.concluidos += 1
+                if ao_concluir:
+                    await ao_concluir(posicao, cpf, resultado, self.concluidos)
+            finally:
+                fila.task_done()
+
+            # Worker extra se aposenta se a memória estourar o orçamento
+            if indice > 0:
+                mem_mb = memoria_total_mb()
+                if mem_mb > limite_mb * 0.9:
+                    logger.warning(
+                        f"⚠️ [Worker {indice}] Memória {mem_mb:.0f} MB / {limite_mb} MB "
+                        f"- encerrando este worker"
+                    )
+                    gc.collect()
+                    return
+
+    async def processar(
+        self,
+        cpfs: List[str],
+        mes: str,
+        ano: int,
+        destino: Path,
+        ao_concluir: Optional[Callable[..., Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Processa todos os CPFs distribuindo-os entre os contextos
+
+        Args:
+            cpfs: Lista de CPFs (a ordem define a ordem de saída da fila)
+            mes: Mês do boleto
+            ano: Ano do boleto
+            destino: Diretório de destino dos PDFs
+            ao_concluir: Corrotina chamada após cada CPF com
+                         (posicao, cpf, resultado, total_concluidos)
+
+        Returns:
+            Dicionário com estatísticas (workers, concluidos)
+        """
+        concorrencia = min(calcular_concorrencia(self.concorrencia, self.config), len(cpfs)) or 1
+
+        logger.info("=" * 80)
+        logger.info(f"🚀 POOL CANOPUS - {len(cpfs)} CPFs em {concorrencia} contexto(s)")
+        logger.info("=" * 80)
+        sys.stdout.flush()
+
+        fila: asyncio.Queue = asyncio.Queue()
+        for posicao, cpf in enumerate(cpfs, 1):
+            fila.put_nowait((posicao, cpf))
+
+        self.concluidos = 0
+        workers = 0
+
+        try:
+            await self._abrir_contextos(concorrencia)
+
+            if not self.bots:
+                raise RuntimeError('Falha no login em todos os contextos')
+
+            # Contextos que não abriram ou não logaram ficam de fora
+            workers = len(self.bots)
+            if workers < concorrencia:
+                logger.warning(f"⚠️ Apenas {workers} de {concorrencia} contexto(s) disponíveis")
+
+            await asyncio.gather(*[
+                self._worker(indice, bot, fila, mes, ano, destino, ao_concluir)
+                for indice, bot in enumerate(self.bots)
+            ])
+        finally:
+            await self._fechar_contextos()
+
+        return {
+            'workers': workers,
+            'concluidos': self.concluidos,
+        }
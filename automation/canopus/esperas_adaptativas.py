@@ -0,0 +1,143 @@
+"""
+Esperas por condição com timeout aprendido por etapa
+
+O bot esperava com asyncio.sleep fixo depois de cada ação (login, busca,
+clique no cliente, emissão, PDF): o tempo do boleto era quase todo sono,
+mesmo com o Canopus respondendo em centenas de milissegundos, e ainda
+falhava quando o Canopus demorava mais que o sono.
+
+Agora cada espera é por uma condição concreta (seletor num estado, URL da
+página, load state, evento/resposta capturada) e registra a latência
+observada. O timeout de cada etapa é o p95 das últimas amostras vezes uma
+margem, limitado entre CanopusConfig.ESPERAS['minimo_ms'] e o TIMEOUTS da
+etapa (o teto de antes). Quando uma espera estoura o timeout aprendido, ela
+continua até o teto (só o teto falha uma etapa), o histórico da etapa é
+descartado e a latência real passa a ser a primeira amostra nova.
+
+O único atraso deliberado que sobra é o ritmo humanizado antes das ações
+que enviam algo ao Canopus (ver CanopusAutomation._delay_humanizado).
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+class LatenciasEtapas:
+    """Janela móvel das latências observadas por etapa (compartilhada entre bots do processo)"""
+
+    def __init__(self, janela: int = 50):
+        self.janela = janela
+        self._amostras: Dict[str, deque] = {}
+        self._lock = threading.RLock()
+
+    def registrar(self, etapa: str, segundos: float):
+        with self._lock:
+            self._amostras.setdefault(etapa, deque(maxlen=self.janela)).append(segundos)
+
+    def descartar(self, etapa: str):
+        """Esquece a etapa (depois de um estouro: volta a usar o teto)"""
+        with self._lock:
+            self._amostras.pop(etapa, None)
+
+    def p95(self, etapa: str, amostras_minimas: int = 1) -> Optional[float]:
+        """p95 da etapa em segundos (None se ainda não há amostras suficientes)"""
+        with self._lock:
+            amostras = sorted(self._amostras.get(etapa, ()))
+
+        if not amostras or len(amostras) < amostras_minimas:
+            return None
+        return amostras[min(len(amostras) - 1, int(len(amostras) * 0.95))]
+
+    def resumo(self) -> Dict[str, Dict[str, float]]:
+        """{etapa: {'amostras', 'p95'}} para as estatísticas da sessão"""
+        with self._lock:
+            return {
+                etapa: {'amostras': len(amostras), 'p95': self.p95(etapa)}
+                for etapa, amostras in self._amostras.items()
+            }
+
+
+_latencias_processo: Optional[LatenciasEtapas] = None
+
+
+def latencias_processo(janela: int = 50) -> LatenciasEtapas:
+    """Latências compartilhadas por todos os bots do processo (mesmo Canopus, mesma rede)"""
+    global _latencias_processo
+    if _latencias_processo is None:
+        _latencias_processo = LatenciasEtapas(janela)
+    return _latencias_processo
+
+
+class EsperaAdaptativa:
+    """Esperas do Playwright por condição, com timeout pelo p95 da etapa"""
+
+    def __init__(self, config, latencias: LatenciasEtapas = None):
+        self.config = config
+        self.esperas = config.ESPERAS
+        self.latencias = latencias or latencias_processo(self.esperas['janela'])
+
+    def timeout_ms(self, etapa: str, teto_ms: int) -> int:
+        """Timeout da etapa: p95 x margem, entre o mínimo e o teto"""
+        p95 = self.latencias.p95(etapa, self.esperas['amostras_minimas'])
+        if p95 is None:
+            return teto_ms
+
+        aprendido = int(p95 * self.esperas['margem'] * 1000)
+        return max(min(self.esperas['minimo_ms'], teto_ms), min(aprendido, teto_ms))
+
+    async def _medir(self, etapa: str, teto_ms: int, esperar: Callable[[int], Awaitable]):
+        timeout = self.timeout_ms(etapa, teto_ms)
+        inicio = time.monotonic()
+
+        try:
+            resultado = await esperar(timeout)
+        except (PlaywrightTimeoutError, asyncio.TimeoutError):
+            if timeout >= teto_ms:
+                raise
+
+            # Estourar o aprendido não é falha: espera o resto até o teto
+            logger.warning(
+                f"⏳ Etapa '{etapa}' passou do timeout aprendido ({timeout} ms) - "
+                f"aguardando até o teto ({teto_ms} ms)"
+            )
+            self.latencias.descartar(etapa)
+            resultado = await esperar(teto_ms - timeout)
+
+        self.latencias.registrar(etapa, time.monotonic() - inicio)
+        return resultado
+
+    async def seletor(self, page, etapa: str, seletor: str, teto_ms: int, state: str = 'visible'):
+        """Aguarda o seletor chegar ao estado (visible, attached, hidden...)"""
+        return await self._medir(
+            etapa, teto_ms,
+            lambda timeout: page.wait_for_selector(seletor, state=state, timeout=timeout)
+        )
+
+    async def url(self, page, etapa: str, condicao: Callable[[str], bool], teto_ms: int):
+        """Aguarda a URL da página satisfazer a condição (vale se já satisfaz)"""
+        return await self._medir(
+            etapa, teto_ms,
+            lambda timeout: page.wait_for_url(condicao, wait_until='commit', timeout=timeout)
+        )
+
+    async def carga(self, page, etapa: str, teto_ms: int, estado: str = 'networkidle'):
+        """Aguarda o load state da página (load, domcontentloaded, networkidle)"""
+        return await self._medir(
+            etapa, teto_ms,
+            lambda timeout: page.wait_for_load_state(estado, timeout=timeout)
+        )
+
+    async def evento(self, etapa: str, evento: asyncio.Event, teto_ms: int):
+        """Aguarda um asyncio.Event sinalizado por um listener (nova aba, PDF capturado...)"""
+        return await self._medir(
+            etapa, teto_ms,
+            lambda timeout: asyncio.wait_for(evento.wait(), timeout / 1000)
+        )
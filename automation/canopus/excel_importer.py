@@ -6,10 +6,11 @@ Lê planilhas dos consultores e detecta alterações automaticamente
 import pandas as pd
 import logging
 from pathlib import Path
-from typing import List, Dict, Optional, Any, Set
+from typing import List, Dict, Optional, Any, Set, Iterator
 from datetime import datetime
 import hashlib
 import time
+from openpyxl import load_workbook
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler, FileModifiedEvent
 
@@ -25,6 +26,12 @@ logger = logging.getLogger(__name__)
 class ExcelImporter:
     """Importa dados de planilhas Excel dos consultores"""
 
+    # Linhas processadas por vez (a planilha é lida em streaming)
+    TAMANHO_BLOCO = 10_000
+
+    # Valores da coluna "contemplado" considerados verdadeiros
+    VALORES_CONTEMPLADO = ['SIM', 'S', 'TRUE', '1', 'CONTEMPLADO']
+
     def __init__(self, config: CanopusConfig = None):
         """
         Inicializa o importador
@@ -145,6 +152,29 @@ class ExcelImporter:
         logger.info(f"📋 Colunas mapeadas: {list(mapeamento.keys())}")
         return mapeamento
 
+    def _ler_linhas(
+        self,
+        caminho_planilha: Path,
+        sheet_name: Optional[str] = None
+    ) -> Iterator[tuple]:
+        """
+        Itera os valores das linhas sem carregar a planilha inteira
+
+        .xlsx/.xlsm: openpyxl em modo somente leitura.
+        .xls: openpyxl não lê, cai no pandas.
+        """
+        if caminho_planilha.suffix.lower() in ('.xlsx', '.xlsm'):
+            wb = load_workbook(caminho_planilha, read_only=True, data_only=True)
+            try:
+                ws = wb[sheet_name] if sheet_name else wb.worksheets[0]
+                yield from ws.iter_rows(values_only=True)
+            finally:
+                wb.close()
+        else:
+            df = pd.read_excel(caminho_planilha, sheet_name=sheet_name or 0, header=None, dtype=str)
+            for linha in df.itertuples(index=False, name=None):
+                yield tuple(None if pd.isna(v) else v for v in linha)
+
     def extrair_clientes(
         self,
         caminho_planilha: Path,
@@ -153,6 +183,9 @@ class ExcelImporter:
         """
         Extrai dados dos clientes da planilha
 
+        Lê em streaming só as colunas mapeadas e limpa/valida cada bloco
+        de TAMANHO_BLOCO linhas de forma vetorizada.
+
         Args:
             caminho_planilha: Caminho do arquivo Excel
             sheet_name: Nome da aba (None = primeira aba)
@@ -163,51 +196,60 @@ class ExcelImporter:
         logger.info(f"📖 Lendo planilha: {caminho_planilha.name}")
 
         try:
-            # Ler Excel
-            df = pd.read_excel(
-                caminho_planilha,
-                sheet_name=sheet_name or 0,
-                dtype=str  # Ler tudo como string
-            )
-
-            # Remover linhas vazias
-            df = df.dropna(how='all')
+            linhas = self._ler_linhas(caminho_planilha, sheet_name)
 
-            if df.empty:
-                logger.warning(f"⚠️ Planilha vazia: {caminho_planilha.name}")
-                return []
-
-            logger.info(f"📊 Linhas encontradas: {len(df)}")
+            # Primeira linha = cabeçalho (nomes como o pandas gera)
+            cabecalho = next(linhas, None) or ()
+            colunas = [
+                str(nome).strip() if nome is not None else f'Unnamed: {idx}'
+                for idx, nome in enumerate(cabecalho)
+            ]
 
             # Identificar consultor
             consultor = self.identificar_consultor(caminho_planilha)
 
             # Mapear colunas
-            mapeamento = self.mapear_colunas(df)
+            mapeamento = self.mapear_colunas(pd.DataFrame(columns=colunas))
 
             if 'cpf' not in mapeamento:
                 raise ValueError("Coluna CPF não encontrada na planilha!")
 
-            # Extrair clientes
+            campos = list(mapeamento)
+            indices = [colunas.index(mapeamento[campo]) for campo in campos]
+
             clientes = []
+            total_linhas = 0
+            buffer = []
 
-            for idx, row in df.iterrows():
-                try:
-                    cliente = self._processar_linha(
-                        row=row,
-                        mapeamento=mapeamento,
-                        consultor=consultor,
-                        arquivo_origem=str(caminho_planilha),
-                        linha=idx + 2  # +2 porque Excel começa em 1 e tem cabeçalho
-                    )
-
-                    if cliente:
-                        clientes.append(cliente)
-
-                except Exception as e:
-                    logger.warning(f"Erro na linha {idx + 2}: {e}")
+            # +1 porque o Excel começa em 1 e +1 do cabeçalho
+            for numero_linha, linha in enumerate(linhas, start=2):
+                # Remover linhas vazias
+                if all(v is None for v in linha):
                     continue
 
+                tamanho = len(linha)
+                buffer.append([numero_linha] + [linha[i] if i < tamanho else None for i in indices])
+
+                if len(buffer) >= self.TAMANHO_BLOCO:
+                    total_linhas += len(buffer)
+                    clientes.extend(self._processar_bloco(
+                        pd.DataFrame(buffer, columns=['linha'] + campos, dtype=object),
+                        consultor, str(caminho_planilha)
+                    ))
+                    buffer = []
+
+            if buffer:
+                total_linhas += len(buffer)
+                clientes.extend(self._processar_bloco(
+                    pd.DataFrame(buffer, columns=['linha'] + campos, dtype=object),
+                    consultor, str(caminho_planilha)
+                ))
+
+            if not total_linhas:
+                logger.warning(f"⚠️ Planilha vazia: {caminho_planilha.name}")
+                return []
+
+            logger.info(f"📊 Linhas encontradas: {total_linhas}")
             logger.info(f"✅ {len(clientes)} clientes extraídos de {caminho_planilha.name}")
             return clientes
 
@@ -215,77 +257,87 @@ class ExcelImporter:
             logger.error(f"❌ Erro ao ler planilha {caminho_planilha.name}: {e}")
             raise
 
-    def _processar_linha(
+    @staticmethod
+    def _texto(valores: pd.Series) -> pd.Series:
+        """Texto sem espaços nas pontas (<NA> onde vazio); inteiros lidos como float sem '.0'"""
+        texto = valores.astype('string').str.strip()
+        return texto.str.replace(r'^(\d+)\.0$', r'\1', regex=True)
+
+    def _processar_bloco(
         self,
-        row: pd.Series,
-        mapeamento: Dict[str, str],
+        bloco: pd.DataFrame,
         consultor: Optional[Consultor],
-        arquivo_origem: str,
-        linha: int
-    ) -> Optional[Dict[str, Any]]:
+        arquivo_origem: str
+    ) -> List[Dict[str, Any]]:
         """
-        Processa uma linha da planilha
+        Limpa e valida um bloco de linhas (vetorizado)
+
+        Mesmas regras de CanopusConfig.limpar_cpf/validar_cpf/formatar_cpf e
+        limpar_telefone/formatar_telefone, aplicadas à coluna inteira.
 
         Args:
-            row: Linha do DataFrame
-            mapeamento: Mapeamento de colunas
+            bloco: DataFrame com 'linha' (número no Excel) + campos mapeados
             consultor: Dados do consultor
             arquivo_origem: Caminho do arquivo
-            linha: Número da linha
 
         Returns:
-            Dicionário com dados do cliente ou None
+            Lista de dicionários com dados dos clientes (campos opcionais
+            vazios não entram no dicionário)
         """
-        # Extrair CPF
-        cpf_raw = row.get(mapeamento['cpf'], '')
-        cpf_limpo = self.config.limpar_cpf(cpf_raw)
-
-        # Validar CPF
-        if not self.config.validar_cpf(cpf_limpo):
-            logger.debug(f"Linha {linha}: CPF inválido: {cpf_raw}")
-            return None
-
-        # Montar dados do cliente
-        cliente = {
-            'cpf': cpf_limpo,
-            'cpf_formatado': self.config.formatar_cpf(cpf_limpo),
-            'arquivo_origem': arquivo_origem,
-            'linha_planilha': linha,
-        }
+        cpfs = self._texto(bloco['cpf']).str.replace(r'\D', '', regex=True)
 
-        # Adicionar consultor se identificado
-        if consultor:
-            cliente['consultor_nome'] = consultor.nome
-            cliente['consultor_empresa'] = consultor.empresa
-            cliente['consultor_ponto_venda'] = consultor.ponto_venda
-            cliente['consultor_pasta'] = consultor.pasta_boletos
-
-        # Adicionar campos opcionais
-        if 'nome' in mapeamento and pd.notna(row.get(mapeamento['nome'])):
-            cliente['nome'] = str(row[mapeamento['nome']]).strip()
+        # Validar CPF (11 dígitos)
+        validos = cpfs.str.len().eq(11).fillna(False).astype(bool)
+        if not validos.all():
+            logger.debug(f"{int((~validos).sum())} linha(s) com CPF inválido "
+                         f"(ex.: linha {int(bloco.loc[~validos, 'linha'].iloc[0])})")
 
-        if 'grupo' in mapeamento and pd.notna(row.get(mapeamento['grupo'])):
-            cliente['grupo'] = str(row[mapeamento['grupo']]).strip()
+        bloco = bloco[validos]
+        cpfs = cpfs[validos]
 
-        if 'cota' in mapeamento and pd.notna(row.get(mapeamento['cota'])):
-            cliente['cota'] = str(row[mapeamento['cota']]).strip()
+        dados = pd.DataFrame({
+            'cpf': cpfs,
+            'cpf_formatado': cpfs.str.replace(r'^(\d{3})(\d{3})(\d{3})(\d{2})$',
+                                              r'\1.\2.\3-\4', regex=True),
+            'arquivo_origem': arquivo_origem,
+            'linha_planilha': bloco['linha'].astype(int),
+        })
 
-        if 'ponto_venda' in mapeamento and pd.notna(row.get(mapeamento['ponto_venda'])):
-            cliente['ponto_venda'] = str(row[mapeamento['ponto_venda']]).strip()
+        # Adicionar consultor se identificado
+        if consultor:
+            dados['consultor_nome'] = consultor.nome
+            dados['consultor_empresa'] = consultor.empresa
+            dados['consultor_ponto_venda'] = consultor.ponto_venda
+            dados['consultor_pasta'] = consultor.pasta_boletos
+
+        # Campos opcionais
+        for campo in ('nome', 'grupo', 'cota'):
+            if campo in bloco:
+                dados[campo] = self._texto(bloco[campo])
+
+        if 'ponto_venda' in bloco:
+            dados['ponto_venda'] = self._texto(bloco['ponto_venda'])
+            if consultor:
+                dados['ponto_venda'] = dados['ponto_venda'].fillna(consultor.ponto_venda)
         elif consultor:
-            cliente['ponto_venda'] = consultor.ponto_venda
-
-        if 'whatsapp' in mapeamento and pd.notna(row.get(mapeamento['whatsapp'])):
-            whatsapp_raw = row[mapeamento['whatsapp']]
-            whatsapp_limpo = self.config.limpar_telefone(whatsapp_raw)
-            if whatsapp_limpo:
-                cliente['whatsapp'] = self.config.formatar_telefone(whatsapp_limpo)
-
-        if 'contemplado' in mapeamento and pd.notna(row.get(mapeamento['contemplado'])):
-            contemplado_val = str(row[mapeamento['contemplado']]).strip().upper()
-            cliente['contemplado'] = contemplado_val in ['SIM', 'S', 'TRUE', '1', 'CONTEMPLADO']
-
-        return cliente
+            dados['ponto_venda'] = consultor.ponto_venda
+
+        if 'whatsapp' in bloco:
+            telefones = self._texto(bloco['whatsapp']).str.replace(r'\D', '', regex=True)
+            tamanho = telefones.str.len()
+            sem_pais = tamanho.isin([10, 11]).fillna(False).astype(bool)
+            telefones = telefones.mask(sem_pais, '55' + telefones)
+            dados['whatsapp'] = telefones.mask(tamanho.eq(0).fillna(False).astype(bool))
+
+        if 'contemplado' in bloco:
+            contemplado = self._texto(bloco['contemplado']).str.upper()
+            dados['contemplado'] = (contemplado.isin(self.VALORES_CONTEMPLADO)
+                                   .astype('boolean').where(contemplado.notna()))
+
+        return [
+            {campo: valor for campo, valor in registro.items() if valor is not pd.NA and valor is not None}
+            for registro in dados.to_dict('records')
+        ]
 
     def importar_todas_planilhas(self) -> Dict[str, List[Dict[str, Any]]]:
         """
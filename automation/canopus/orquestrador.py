@@ -32,8 +32,7 @@ if str(canopus_path) not in sys.path:
 # Importar módulos do canopus
 from canopus_config import CanopusConfig
 from excel_importer import ExcelImporter
-from canopus_automation import CanopusAutomation
-from db_config import get_connection_string, get_connection_params
+from canopus_backends import criar_backend
 
 logger = logging.getLogger(__name__)
 
@@ -52,10 +51,9 @@ class DatabaseManager:
         self.conn = None
 
     def conectar(self):
-        """Estabelece conexão com o banco"""
+        """Obtém uma conexão (dict_row) do pool compartilhado do backend"""
         try:
-            conn_params = get_connection_params()
-            self.conn = psycopg.connect(**conn_params, row_factory=dict_row)
+            self.conn = self.db.conexao(row_factory=dict_row)
             logger.info("✅ Conectado ao banco de dados")
             return self.conn
 
@@ -64,9 +62,10 @@ class DatabaseManager:
             raise
 
     def desconectar(self):
-        """Fecha conexão com o banco"""
+        """Devolve a conexão ao pool (o que não teve commit é descartado)"""
         if self.conn:
             self.conn.close()
+            self.conn = None
             logger.info("🔒 Desconectado do banco de dados")
 
     # ========================================================================
@@ -533,12 +532,14 @@ class CanopusOrquestrador:
     # IMPORTAÇÃO DE PLANILHAS
     # ========================================================================
 
-    def importar_planilhas(self, diretorio: Path = None) -> Dict[str, Any]:
+    def importar_planilhas(self, diretorio: Path = None, arquivos: List[Path] = None) -> Dict[str, Any]:
         """
         Importa planilhas Excel para a área de staging
 
         Args:
             diretorio: Diretório das planilhas (padrão: EXCEL_DIR)
+            arquivos: Só estas planilhas (ex.: as que mudaram no Drive);
+                ignora diretorio
 
         Returns:
             Dicionário com estatísticas da importação
@@ -564,7 +565,10 @@ class CanopusOrquestrador:
                 )
 
                 # Listar planilhas
-                planilhas = self.excel_importer.listar_planilhas(diretorio)
+                if arquivos is not None:
+                    planilhas = sorted(Path(arquivo) for arquivo in arquivos)
+                else:
+                    planilhas = self.excel_importer.listar_planilhas(diretorio)
                 stats['total_planilhas'] = len(planilhas)
 
                 if not planilhas:
@@ -656,9 +660,15 @@ class CanopusOrquestrador:
         """
         Sincroniza clientes do staging para clientes_finais
 
+        Tudo numa transação: COPY dos pendentes para uma tabela temporária,
+        um upsert por CPF (services/sincronizacao_clientes.py) e um UPDATE
+        marcando o staging como sincronizado com o cliente_final_id.
+
         Returns:
             Dicionário com estatísticas
         """
+        from services.sincronizacao_clientes import sincronizar_clientes_finais
+
         logger.info("=" * 80)
         logger.info("SINCRONIZAÇÃO DE CLIENTES")
         logger.info("=" * 80)
@@ -666,6 +676,9 @@ class CanopusOrquestrador:
         stats = {
             'total_pendentes': 0,
             'sincronizados': 0,
+            'criados': 0,
+            'atualizados': 0,
+            'inalterados': 0,
             'erros': 0,
         }
 
@@ -677,21 +690,60 @@ class CanopusOrquestrador:
 
                 logger.info(f"📋 {len(pendentes)} clientes pendentes de sincronização")
 
-                for cliente in pendentes:
-                    try:
-                        # TODO: Verificar se já existe em clientes_finais
-                        # TODO: Criar ou atualizar em clientes_finais
-                        # TODO: Marcar como sincronizado
-
-                        # Por enquanto, apenas marcar como processado
-                        self.db_manager.marcar_staging_processado(cliente['id'])
-                        stats['sincronizados'] += 1
+                if not pendentes:
+                    return stats
 
-                    except Exception as e:
-                        logger.error(f"Erro ao sincronizar cliente {cliente['cpf']}: {e}")
-                        stats['erros'] += 1
+                conn = self.db_manager.conn
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT id FROM clientes_nexus ORDER BY id LIMIT 1")
+                        row = cur.fetchone()
+                        cliente_nexus_id = row['id'] if row else None
+
+                    resultado = sincronizar_clientes_finais(
+                        conn,
+                        [{
+                            'cpf': cliente['cpf'],
+                            'nome_completo': cliente['nome'],
+                            'ponto_venda': cliente['ponto_venda'] or cliente['consultor_ponto_venda'],
+                            'grupo_consorcio': cliente['grupo'],
+                            'cota_consorcio': cliente['cota'],
+                            'consultor_id': cliente['consultor_id'],
+                        } for cliente in pendentes],
+                        padroes={
+                            'cliente_nexus_id': cliente_nexus_id,
+                            'origem': 'PLANILHA_CANOPUS',
+                        },
+                        atualizar=('nome_completo', 'ponto_venda', 'grupo_consorcio',
+                                   'cota_consorcio', 'consultor_id'),
+                    )
 
-                logger.info(f"✅ {stats['sincronizados']} clientes sincronizados")
+                    with conn.cursor() as cur:
+                        cur.execute("""
+                            UPDATE clientes_planilha_staging s
+                            SET status = 'sincronizado',
+                                cliente_final_id = cf.id,
+                                sincronizado_em = CURRENT_TIMESTAMP
+                            FROM clientes_finais cf
+                            WHERE cf.cpf = s.cpf
+                              AND s.id = ANY(%s)
+                        """, ([cliente['id'] for cliente in pendentes],))
+                        stats['sincronizados'] = cur.rowcount
+
+                    conn.commit()
+
+                except Exception:
+                    conn.rollback()
+                    raise
+
+                stats['criados'] = resultado['criados']
+                stats['atualizados'] = resultado['atualizados']
+                stats['inalterados'] = resultado['inalterados']
+                stats['erros'] = stats['total_pendentes'] - stats['sincronizados']
+
+                logger.info(f"✅ {stats['sincronizados']} clientes sincronizados "
+                            f"({stats['criados']} novos, {stats['atualizados']} atualizados, "
+                            f"{stats['inalterados']} inalterados)")
                 return stats
 
         except Exception as e:
@@ -707,7 +759,8 @@ class CanopusOrquestrador:
         consultor_nome: str,
         mes: str,
         ano: int = None,
-        limite: Optional[int] = None
+        limite: Optional[int] = None,
+        backend: str = None
     ) -> Dict[str, Any]:
         """
         Processa downloads de boletos
@@ -717,6 +770,7 @@ class CanopusOrquestrador:
             mes: Mês dos boletos
             ano: Ano dos boletos (padrão: ano atual)
             limite: Limitar quantidade de clientes
+            backend: 'playwright', 'http' ou 'http_async' (padrão: CANOPUS_BACKEND)
 
         Returns:
             Dicionário com estatísticas
@@ -782,7 +836,7 @@ class CanopusOrquestrador:
                     raise ValueError(f"Credenciais não encontradas para ponto {ponto_venda}")
 
                 # Iniciar automação
-                async with CanopusAutomation(headless=False) as bot:
+                async with criar_backend(backend, headless=False) as bot:
                     # Fazer login
                     logger.info(f"🔐 Fazendo login no ponto {ponto_venda}...")
 
@@ -852,8 +906,8 @@ class CanopusOrquestrador:
                                 mensagem_atual=f'Processando cliente {idx}/{len(clientes)}'
                             )
 
-                            # Delay entre downloads
-                            if idx < len(clientes):
+                            # Pausa extra entre downloads (o ritmo de cada envio já fica no bot)
+                            if idx < len(clientes) and self.config.DELAYS['entre_downloads']:
                                 await asyncio.sleep(self.config.DELAYS['entre_downloads'])
 
                         except Exception as e:
@@ -907,7 +961,8 @@ class CanopusOrquestrador:
         pasta_destino: str = None,
         usuario: str = None,
         senha: str = None,
-        codigo_empresa: str = '0101'
+        codigo_empresa: str = '0101',
+        backend: str = None
     ) -> Dict[str, Any]:
         """
         Baixa boleto de um CPF específico
@@ -920,6 +975,7 @@ class CanopusOrquestrador:
             usuario: Usuário do Canopus (opcional, busca do banco se não fornecido)
             senha: Senha do Canopus (opcional, busca do banco se não fornecido)
             codigo_empresa: Código da empresa (padrão: 0101)
+            backend: 'playwright', 'http' ou 'http_async' (padrão: CANOPUS_BACKEND)
 
         Returns:
             Dicionário com resultado do processamento
@@ -964,7 +1020,7 @@ class CanopusOrquestrador:
                     codigo_empresa = credenciais.get('codigo_empresa', '0101')
 
             # Iniciar automação
-            async with CanopusAutomation(headless=False) as bot:
+            async with criar_backend(backend, headless=False) as bot:
                 # Fazer login
                 logger.info("🔐 Fazendo login no ponto 24627...")
 
@@ -1031,62 +1087,39 @@ class CanopusOrquestrador:
         }
 
         try:
-            # Pasta de downloads
-            from pathlib import Path
-            from datetime import datetime
+            # Catálogo de PDFs (nomes já interpretados; ver services/catalogo_pdfs.py)
+            from services.catalogo_pdfs import (
+                MESES, PASTA_DOWNLOADS_CANOPUS, listar_pdfs_pasta, sincronizar_pasta
+            )
 
-            downloads_dir = Path(r"D:\Nexus\automation\canopus\downloads\Danner")
+            downloads_dir = PASTA_DOWNLOADS_CANOPUS
 
             if not downloads_dir.exists():
                 logger.error(f"Pasta de downloads não encontrada: {downloads_dir}")
                 return stats
 
-            # Listar todos os PDFs
-            pdfs = list(downloads_dir.glob("*.pdf"))
+            # Só arquivos novos/alterados são interpretados; o resto vem do catálogo
+            sincronizar_pasta(downloads_dir)
+            pdfs = listar_pdfs_pasta(downloads_dir)
             stats['total_pdfs'] = len(pdfs)
 
             logger.info(f"📁 Encontrados {len(pdfs)} PDFs na pasta")
 
-            # Mapeamento de meses
-            meses = {
-                'JANEIRO': 1, 'FEVEREIRO': 2, 'MARÇO': 3, 'MARCO': 3,
-                'ABRIL': 4, 'MAIO': 5, 'JUNHO': 6,
-                'JULHO': 7, 'AGOSTO': 8, 'SETEMBRO': 9,
-                'OUTUBRO': 10, 'NOVEMBRO': 11, 'DEZEMBRO': 12
-            }
+            nomes_meses = {num: nome for nome, num in MESES.items() if nome != 'MARCO'}
 
             with self.db_manager:
-                for pdf_file in pdfs:
+                for pdf in pdfs:
                     try:
-                        # Extrair informações do nome do arquivo
                         # Formato esperado: NOME_CLIENTE_MES.pdf ou NOME_CLIENTE_MES_ANO.pdf
-                        nome_arquivo = pdf_file.stem
-                        partes = nome_arquivo.split('_')
-
-                        if len(partes) < 2:
-                            logger.warning(f"⚠️ Nome de arquivo inválido: {pdf_file.name}")
+                        if not pdf['nome_cliente']:
+                            logger.warning(f"⚠️ Nome de arquivo inválido: {pdf['arquivo']}")
                             stats['erros'] += 1
                             continue
 
-                        # Última parte é mês (ou ano se tiver 4 dígitos)
-                        mes_str = partes[-1].upper()
-                        ano = datetime.now().year
-
-                        # Verificar se última parte é ano (4 dígitos)
-                        if mes_str.isdigit() and len(mes_str) == 4:
-                            ano = int(mes_str)
-                            mes_str = partes[-2].upper() if len(partes) > 2 else 'NOVEMBRO'
-
-                        # Nome do cliente (tudo antes do mês)
-                        if len(partes) > 2 and partes[-1].isdigit() and len(partes[-1]) == 4:
-                            nome_cliente = '_'.join(partes[:-2])
-                        else:
-                            nome_cliente = '_'.join(partes[:-1])
-
-                        nome_cliente_formatado = nome_cliente.replace('_', ' ').title()
-
-                        # Converter mês para número
-                        mes_num = meses.get(mes_str, datetime.now().month)
+                        nome_cliente_formatado = pdf['nome_cliente']
+                        ano = pdf['ano'] or datetime.now().year
+                        mes_num = pdf['mes'] or datetime.now().month
+                        mes_str = nomes_meses[mes_num]
 
                         logger.info(f"📄 Processando: {nome_cliente_formatado} - {mes_str}/{ano}")
 
@@ -1107,9 +1140,9 @@ class CanopusOrquestrador:
                                 stats['sem_cliente'] += 1
                                 continue
 
-                            cliente_id = cliente[0]
-                            cliente_cpf = cliente[1]
-                            logger.info(f"✅ Cliente encontrado: {cliente[2]} (ID: {cliente_id})")
+                            cliente_id = cliente['id']
+                            cliente_cpf = cliente['cpf']
+                            logger.info(f"✅ Cliente encontrado: {cliente['nome_completo']} (ID: {cliente_id})")
 
                             # REMOVIDO: Verificação de boleto já existente
                             # Agora sempre importa todos os boletos da lista
@@ -1154,20 +1187,20 @@ class CanopusOrquestrador:
                                 f"Boleto {mes_str}/{ano} - {nome_cliente_formatado}",
                                 'pendente',
                                 'nao_enviado',
-                                pdf_file.name,
-                                str(pdf_file),
-                                pdf_file.stat().st_size,
+                                pdf['arquivo'],
+                                pdf['caminho'],
+                                pdf['tamanho'],
                                 'automacao_canopus'
                             ))
 
-                            boleto_id = cur.fetchone()[0]
+                            boleto_id = cur.fetchone()['id']
                             self.db_manager.conn.commit()
 
                             logger.info(f"✅ Boleto importado! ID: {boleto_id}")
                             stats['importados'] += 1
 
                     except Exception as e:
-                        logger.error(f"❌ Erro ao importar {pdf_file.name}: {e}")
+                        logger.error(f"❌ Erro ao importar {pdf['arquivo']}: {e}")
                         stats['erros'] += 1
                         continue
 
@@ -1193,6 +1226,19 @@ class CanopusOrquestrador:
 # FUNÇÕES DE CONVENIÊNCIA PARA CLI
 # ============================================================================
 
+async def _fechando_pool(corrotina):
+    """
+    Aguarda a corrotina e fecha o pool async do banco no fim
+
+    Cada asyncio.run cria um loop novo e Database.conexao_async abre um pool
+    por loop: sem fechar, as conexões ficam abertas presas a um loop morto.
+    """
+    try:
+        return await corrotina
+    finally:
+        await Database.fechar_pool_async()
+
+
 def executar_importacao_planilhas(diretorio: str = None):
     """
     Executa importação de planilhas via CLI
@@ -1235,14 +1281,14 @@ def executar_download_boletos(
     try:
         orquestrador = CanopusOrquestrador()
 
-        stats = asyncio.run(
+        stats = asyncio.run(_fechando_pool(
             orquestrador.processar_downloads(
                 consultor_nome=consultor,
                 mes=mes,
                 ano=ano,
                 limite=limite
             )
-        )
+        ))
 
         print("\n✅ Downloads concluídos!")
         print(f"   Sucessos: {stats['sucessos']}")
@@ -1281,13 +1327,13 @@ def executar_fluxo_completo(
 
         # 3. Baixar boletos
         logger.info("\n🔄 ETAPA 3: Baixando boletos...")
-        asyncio.run(
+        asyncio.run(_fechando_pool(
             orquestrador.processar_downloads(
                 consultor_nome=consultor,
                 mes=mes,
                 ano=ano
             )
-        )
+        ))
 
         # 4. Importar para CRM
         logger.info("\n🔄 ETAPA 4: Importando boletos para CRM...")
@@ -1482,13 +1528,13 @@ Exemplos de uso:
                 for consultor in consultores:
                     logger.info(f"\n>>> Processando {consultor}...")
                     try:
-                        asyncio.run(
+                        asyncio.run(_fechando_pool(
                             orquestrador.processar_downloads(
                                 consultor_nome=consultor,
                                 mes=args.mes,
                                 ano=args.ano
                             )
-                        )
+                        ))
                     except Exception as e:
                         logger.error(f"Erro ao processar {consultor}: {e}")
 
@@ -0,0 +1,135 @@
+"""
+Cache das sessões autenticadas do Canopus
+
+Cada execução fazia login do zero (formulário, DELAYS['apos_login'],
+seleção da empresa): 5-10 s e mais carga no Canopus por execução, por
+worker do pool e por nova tentativa.
+
+Agora a sessão de cada ponto de venda fica em sessoes_canopus (migração 020),
+ao lado de credenciais_canopus e criptografada com a mesma chave Fernet da
+senha:
+
+- Playwright: context.storage_state() (cookies + localStorage)
+- HTTP: cookies da requests.Session
+
+Uma entrada por (credencial, tipo, slot): cada worker do pool tem a sua, sem
+dois contextos dividindo a mesma sessão ASP.NET. Antes de usar, quem carrega
+valida com uma requisição barata (frmMain.aspx sem redirecionar para o
+login); só faz login de novo quando a sessão expirou.
+"""
+
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+
+logger = logging.getLogger(__name__)
+
+
+TIPO_PLAYWRIGHT = 'playwright'
+TIPO_HTTP = 'http'
+
+# Mesma chave de cadastrar_credencial.py / DatabaseManager.obter_credenciais
+CHAVE_CRIPTOGRAFIA = os.getenv(
+    'CANOPUS_ENCRYPTION_KEY', '6vLPQxE7R8YfZ3kN9mQ2wT5uH8jK4nP1sD7gF0aB3cE='
+).encode()
+
+
+SQL_CARREGAR = """
+    SELECT s.estado_encrypted
+    FROM sessoes_canopus s
+    INNER JOIN credenciais_canopus c ON c.id = s.credencial_id
+    INNER JOIN pontos_venda pv ON c.ponto_venda_id = pv.id
+    WHERE pv.codigo = %s AND c.ativo = TRUE
+      AND s.tipo = %s AND s.slot = %s
+      AND s.atualizado_em > NOW() - make_interval(hours => %s)
+    ORDER BY s.atualizado_em DESC
+    LIMIT 1
+"""
+
+SQL_SALVAR = """
+    INSERT INTO sessoes_canopus (credencial_id, tipo, slot, estado_encrypted, atualizado_em)
+    SELECT c.id, %s, %s, %s, NOW()
+    FROM credenciais_canopus c
+    INNER JOIN pontos_venda pv ON c.ponto_venda_id = pv.id
+    WHERE pv.codigo = %s AND c.ativo = TRUE
+    ON CONFLICT (credencial_id, tipo, slot) DO UPDATE SET
+        estado_encrypted = EXCLUDED.estado_encrypted,
+        atualizado_em = EXCLUDED.atualizado_em
+"""
+
+
+def _database():
+    """Database do backend (pool compartilhado com as rotas e threads do app)"""
+    backend_path = str(Path(__file__).resolve().parent.parent.parent / "backend")
+    if backend_path not in sys.path:
+        sys.path.append(backend_path)
+
+    from models.database import Database
+    return Database
+
+
+def _cifrar(usuario: str, estado: Dict[str, Any]) -> str:
+    dados = json.dumps({'usuario': usuario, 'estado': estado})
+    return Fernet(CHAVE_CRIPTOGRAFIA).encrypt(dados.encode()).decode()
+
+
+def _decifrar(usuario: str, texto: str) -> Optional[Dict[str, Any]]:
+    """Estado salvo para este usuário (None se ilegível ou de outro usuário)"""
+    try:
+        dados = json.loads(Fernet(CHAVE_CRIPTOGRAFIA).decrypt(texto.encode()))
+    except (InvalidToken, ValueError):
+        logger.warning("⚠️ Sessão Canopus em cache ilegível (chave trocada?) - ignorada")
+        return None
+
+    if dados.get('usuario') != usuario:
+        return None
+    return dados.get('estado')
+
+
+def _habilitado(config, ponto_venda: Optional[str]) -> bool:
+    return bool(ponto_venda) and config.EXECUCAO['cache_sessao']
+
+
+async def carregar_sessao_async(config, ponto_venda: str, usuario: str, tipo: str,
+                                slot: int = 0) -> Optional[Dict[str, Any]]:
+    """
+    Sessão em cache do ponto de venda (ainda não validada)
+
+    Usa o AsyncConnectionPool do loop atual (Database.conexao_async).
+
+    Returns:
+        storage_state (Playwright) / {'cookies': [...]} (HTTP) ou None
+    """
+    if not _habilitado(config, ponto_venda):
+        return None
+
+    try:
+        async with _database().conexao_async() as conn:
+            cur = await conn.execute(
+                SQL_CARREGAR, (ponto_venda, tipo, slot, config.EXECUCAO['sessao_max_horas'])
+            )
+            linha = await cur.fetchone()
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível ler a sessão Canopus em cache: {e}")
+        return None
+
+    return _decifrar(usuario, linha['estado_encrypted']) if linha else None
+
+
+async def salvar_sessao_async(config, ponto_venda: str, usuario: str, tipo: str,
+                              estado: Dict[str, Any], slot: int = 0):
+    """Grava (ou renova) a sessão do ponto de venda"""
+    if not _habilitado(config, ponto_venda):
+        return
+
+    try:
+        async with _database().conexao_async() as conn:
+            await conn.execute(SQL_SALVAR, (tipo, slot, _cifrar(usuario, estado), ponto_venda))
+        logger.info(f"💾 Sessão Canopus ({tipo}, PV {ponto_venda}, slot {slot}) salva em cache")
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível salvar a sessão Canopus em cache: {e}")
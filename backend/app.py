@@ -4,7 +4,6 @@ Aqui seu tempo vale ouro
 """
 
 from flask import Flask, render_template, session, send_from_directory
-from flask_session import Session
 from flask_cors import CORS
 import os
 import sys
@@ -39,6 +38,7 @@ print("[INIT] Logging configurado para output em tempo real", flush=True)
 from config import Config
 from models import Database, log_sistema
 from health import health_bp
+from sessoes import configurar_sessoes
 from routes import auth_bp, crm_bp, whatsapp_bp, automation_bp, webhook_bp
 from routes.crm_disparo_individual import disparo_individual_bp
 from routes.whatsapp_baileys import whatsapp_baileys_bp
@@ -62,7 +62,7 @@ def create_app():
 
     # Inicializa extensões
     CORS(app, supports_credentials=True)
-    Session(app)
+    configurar_sessoes(app)
 
     # Inicializa pool de conexões do banco
     Database.initialize_pool()
@@ -92,6 +92,22 @@ def create_app():
     from services.automation_scheduler import automation_scheduler
     automation_scheduler.iniciar()
 
+    # Worker da fila de disparos na mesma instância (desligue com
+    # FILA_DISPAROS_WORKER_EMBUTIDO=false ao rodar services/fila_disparos.py à parte)
+    if os.getenv('FILA_DISPAROS_WORKER_EMBUTIDO', 'true').lower() == 'true':
+        from services.fila_disparos import worker_fila_disparos
+        worker_fila_disparos.iniciar_em_thread()
+
+    # Catálogo dos PDFs do Canopus acompanha a pasta de downloads
+    # (desligue com CATALOGO_PDFS_MONITOR=false)
+    if os.getenv('CATALOGO_PDFS_MONITOR', 'true').lower() == 'true':
+        from services.catalogo_pdfs import monitor_catalogo_pdfs
+        monitor_catalogo_pdfs.iniciar()
+
+    # Progresso em tempo real (SSE): escuta NOTIFY nexus_progresso
+    from services.progresso import barramento_progresso
+    barramento_progresso.iniciar()
+
     # =====================
     # ROTAS DE PÁGINAS HTML
     # =====================
@@ -252,6 +268,15 @@ def create_app():
     def shutdown_scheduler():
         automation_scheduler.parar()
 
+        from services.fila_disparos import worker_fila_disparos
+        worker_fila_disparos.parar()
+
+        from services.catalogo_pdfs import monitor_catalogo_pdfs
+        monitor_catalogo_pdfs.parar()
+
+        from services.progresso import barramento_progresso
+        barramento_progresso.parar()
+
     atexit.register(shutdown_scheduler)
 
     print("[OK] Aplicacao Flask inicializada com sucesso")
@@ -14,7 +14,8 @@ class Config:
     """Classe de configuração centralizada"""
 
     # Configurações do Flask
-    SECRET_KEY = os.getenv('FLASK_SECRET_KEY', 'nexus-crm-secret-key-2024')
+    SECRET_KEY_PADRAO = 'nexus-crm-secret-key-2024'
+    SECRET_KEY = os.getenv('FLASK_SECRET_KEY', SECRET_KEY_PADRAO)
     FLASK_ENV = os.getenv('FLASK_ENV', 'development')
     FLASK_PORT = int(os.getenv('PORT', os.getenv('FLASK_PORT', 5000)))  # Render usa PORT
 
@@ -56,6 +57,12 @@ class Config:
     DISPARO_INTERVAL_SECONDS = int(os.getenv('DISPARO_INTERVAL_SECONDS', 5))
     BOLETO_DIR = os.getenv('BOLETO_DIR', 'boletos')
 
+    # Configurações de log (logs_sistema gravado em lote por thread de fundo)
+    LOG_ASSINCRONO = os.getenv('LOG_ASSINCRONO', 'true').lower() == 'true'
+    LOG_LOTE_MAXIMO = int(os.getenv('LOG_LOTE_MAXIMO', 100))  # Registros por INSERT
+    LOG_INTERVALO_MS = int(os.getenv('LOG_INTERVALO_MS', 500))  # Intervalo máximo entre gravações
+    LOG_FILA_MAXIMA = int(os.getenv('LOG_FILA_MAXIMA', 5000))  # Acima disso logs info/success são descartados
+
     # Configurações WhatsApp
     WHATSAPP_SESSION_DIR = os.getenv('WHATSAPP_SESSION_DIR', 'whatsapp_sessions')
     WPPCONNECT_URL = os.getenv('WPPCONNECT_URL', 'http://localhost:3001')
@@ -69,8 +76,12 @@ class Config:
     BOLETO_PATH = os.path.join(BASE_DIR, BOLETO_DIR)
     WHATSAPP_PATH = os.path.join(BASE_DIR, WHATSAPP_SESSION_DIR)
 
-    # Configurações de sessão
-    SESSION_TYPE = 'filesystem'
+    # Configurações de sessão (ver sessoes.py)
+    # SESSION_BACKEND: 'postgres' (tabela UNLOGGED sessoes_http), 'cookie'
+    # (cookie assinado, sem estado no servidor) ou 'filesystem' (Flask-Session)
+    SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'postgres').lower()
+    SESSION_REFRESH_INTERVALO = int(os.getenv('SESSION_REFRESH_INTERVALO', 300))  # Segundos entre renovações da validade no banco
+    SESSION_TYPE = 'filesystem'  # Só para SESSION_BACKEND=filesystem
     SESSION_PERMANENT = False
     SESSION_USE_SIGNER = False  # Desabilitado para evitar erro com bytes/string
     PERMANENT_SESSION_LIFETIME = 3600  # 1 hora
@@ -5,6 +5,8 @@ Verifica se o serviço está funcionando corretamente
 
 from flask import Blueprint, jsonify
 
+from models.database import Database
+
 health_bp = Blueprint('health', __name__)
 
 @health_bp.route('/health', methods=['GET'])
@@ -12,9 +14,13 @@ def health_check():
     """
     Health check endpoint para Render.com
     Retorna status 200 se o serviço está funcionando
+
+    "pool": conexões do pool compartilhado (tamanho, livres, em uso,
+    aguardando) e latência de aquisição (média/p95/máx. em ms)
     """
     return jsonify({
         "status": "healthy",
         "service": "nexus-crm",
-        "message": "Service is running"
+        "message": "Service is running",
+        "pool": Database.estatisticas()
     }), 200
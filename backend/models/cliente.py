@@ -2,10 +2,11 @@
 Modelo de Cliente - Gerencia clientes Nexus e clientes finais
 """
 
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 from datetime import datetime
 import re
 from .database import execute_query, fetch_one, insert_and_return_id, log_sistema
+from .paginacao import decodificar_cursor
 
 
 class ClienteNexus:
@@ -242,36 +243,57 @@ class ClienteFinal:
         return fetch_one(query, (cpf,))
 
     @staticmethod
-    def listar_por_cliente_nexus(cliente_nexus_id: int, limit: int = 100, offset: int = 0) -> List[Dict]:
-        """Lista clientes finais de um cliente Nexus específico"""
-        # Se limit for None, busca todos os clientes
-        if limit is None:
-            query = """
-                SELECT cf.*,
-                       cf.nome_completo as nome,
-                       COUNT(b.id) as total_boletos,
-                       COUNT(CASE WHEN b.status_envio = 'enviado' THEN 1 END) as boletos_enviados
-                FROM clientes_finais cf
-                LEFT JOIN boletos b ON cf.id = b.cliente_final_id
-                WHERE cf.cliente_nexus_id = %s AND cf.ativo = true
-                GROUP BY cf.id
-                ORDER BY cf.created_at DESC
-            """
-            return execute_query(query, (cliente_nexus_id,), fetch=True)
-        else:
-            query = """
-                SELECT cf.*,
-                       cf.nome_completo as nome,
-                       COUNT(b.id) as total_boletos,
-                       COUNT(CASE WHEN b.status_envio = 'enviado' THEN 1 END) as boletos_enviados
-                FROM clientes_finais cf
-                LEFT JOIN boletos b ON cf.id = b.cliente_final_id
-                WHERE cf.cliente_nexus_id = %s AND cf.ativo = true
-                GROUP BY cf.id
-                ORDER BY cf.created_at DESC
-                LIMIT %s OFFSET %s
-            """
-            return execute_query(query, (cliente_nexus_id, limit, offset), fetch=True)
+    def listar_por_cliente_nexus(cliente_nexus_id: int, limit: int = 100, offset: int = 0,
+                                 cursor: str = None) -> List[Dict]:
+        """
+        Lista clientes finais de um cliente Nexus específico (mais recentes primeiro)
+
+        Args:
+            cliente_nexus_id: ID do cliente Nexus
+            limit: Tamanho da página (None = todos)
+            offset: Deslocamento (só usado sem cursor)
+            cursor: Cursor (created_at, id) do último item da página anterior
+
+        Returns:
+            Clientes com total_boletos e boletos_enviados
+        """
+        conditions = ["cliente_nexus_id = %s", "ativo = true"]
+        params: List[Any] = [cliente_nexus_id]
+
+        chave = decodificar_cursor(cursor, 2)
+        if chave:
+            conditions.append("(created_at, id) < (%s::timestamp, %s)")
+            params.extend(chave)
+
+        paginacao = ""
+        if limit is not None:
+            paginacao = "LIMIT %s"
+            params.append(limit)
+            if not chave and offset:
+                paginacao += " OFFSET %s"
+                params.append(offset)
+
+        # Contagem de boletos só para os clientes da página
+        query = f"""
+            SELECT cf.*,
+                   cf.nome_completo as nome,
+                   b.total_boletos,
+                   b.boletos_enviados
+            FROM (
+                SELECT * FROM clientes_finais
+                WHERE {" AND ".join(conditions)}
+                ORDER BY created_at DESC, id DESC
+                {paginacao}
+            ) cf
+            LEFT JOIN LATERAL (
+                SELECT COUNT(*) as total_boletos,
+                       COUNT(*) FILTER (WHERE status_envio = 'enviado') as boletos_enviados
+                FROM boletos
+                WHERE cliente_final_id = cf.id
+            ) b ON true
+            ORDER BY cf.created_at DESC, cf.id DESC
+        """
+        return execute_query(query, tuple(params), fetch=True)
 
     @staticmethod
     def atualizar(cliente_id: int, **kwargs) -> bool:
@@ -318,37 +340,103 @@ class ClienteFinal:
             return True
         return False
 
+    # Acima disso a contagem da busca para e o total vira "1000+"
+    LIMITE_CONTAGEM_BUSCA = 1000
+
+    @staticmethod
+    def _condicao_busca(filtro: str) -> Tuple[str, List[str]]:
+        """
+        Condição SQL do filtro, escolhida para usar os índices da migração 012
+
+        - Só dígitos (e . - / ( ) espaço): prefixo de CPF, WhatsApp ou telefone
+          (também WhatsApp com 55 na frente)
+        - Texto com 3+ caracteres: trecho de nome/email sem acento (pg_trgm)
+        - Texto com 1-2 caracteres: início do nome
+        """
+        filtro = filtro.strip()
+        digitos = re.sub(r'\D', '', filtro)
+
+        if digitos and re.fullmatch(r'[\d\s.\-/()+]+', filtro):
+            return (
+                "(cpf_digitos LIKE %s OR whatsapp_digitos LIKE %s"
+                " OR telefone_digitos LIKE %s OR whatsapp_digitos LIKE %s)",
+                [f"{digitos}%", f"{digitos}%", f"{digitos}%", f"55{digitos}%"]
+            )
+
+        # Curingas digitados pelo usuário são literais
+        termo = filtro.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        if len(filtro) >= 3:
+            return "busca_texto LIKE '%%' || lower(f_unaccent(%s)) || '%%'", [termo]
+        return "busca_texto LIKE lower(f_unaccent(%s)) || '%%'", [termo]
+
     @staticmethod
-    def buscar_com_filtro(cliente_nexus_id: int, filtro: str = "") -> List[Dict]:
+    def buscar_com_filtro(cliente_nexus_id: int, filtro: str = "", limit: int = 100,
+                          offset: int = 0, cursor: str = None) -> List[Dict]:
         """
         Busca clientes com filtro por nome, CPF, email ou telefone
 
         Args:
             cliente_nexus_id: ID do cliente Nexus
             filtro: Termo de busca
+            limit: Tamanho da página
+            offset: Deslocamento (só usado sem cursor)
+            cursor: Cursor (nome_completo, id) do último item da página anterior
 
         Returns:
-            Lista de clientes que correspondem ao filtro
+            Lista de clientes que correspondem ao filtro, por nome
         """
-        query = """
+        condicao, params = ClienteFinal._condicao_busca(filtro)
+        params = [cliente_nexus_id, *params]
+
+        chave = decodificar_cursor(cursor, 2)
+        cursor_sql = ""
+        if chave:
+            cursor_sql = "AND (nome_completo, id) > (%s, %s)"
+            params.extend(chave)
+
+        params.append(limit)
+        paginacao = "LIMIT %s"
+        if not chave and offset:
+            paginacao += " OFFSET %s"
+            params.append(offset)
+
+        query = f"""
             SELECT *, nome_completo as nome FROM clientes_finais
             WHERE cliente_nexus_id = %s AND ativo = true
-            AND (
-                nome_completo ILIKE %s
-                OR cpf LIKE %s
-                OR email ILIKE %s
-                OR telefone_celular LIKE %s
-                OR whatsapp LIKE %s
-            )
-            ORDER BY nome_completo
+            AND {condicao}
+            {cursor_sql}
+            ORDER BY nome_completo, id
+            {paginacao}
+        """
+        return execute_query(query, tuple(params), fetch=True)
+
+    @staticmethod
+    def contar_com_filtro(cliente_nexus_id: int, filtro: str) -> Dict:
+        """
+        Conta os resultados da busca até LIMITE_CONTAGEM_BUSCA + 1
+
+        Returns:
+            {'total': int, 'exato': bool} - exato=False quando passou do limite
+        """
+        condicao, params = ClienteFinal._condicao_busca(filtro)
+        limite = ClienteFinal.LIMITE_CONTAGEM_BUSCA
+
+        query = f"""
+            SELECT COUNT(*) as total FROM (
+                SELECT 1 FROM clientes_finais
+                WHERE cliente_nexus_id = %s AND ativo = true
+                AND {condicao}
+                LIMIT %s
+            ) t
         """
-        filtro_like = f"%{filtro}%"
-        return execute_query(query, (cliente_nexus_id, filtro_like, filtro_like, filtro_like, filtro_like, filtro_like), fetch=True)
+        result = fetch_one(query, (cliente_nexus_id, *params, limite + 1))
+        total = result['total'] if result else 0
+        return {'total': min(total, limite), 'exato': total <= limite}
 
     @staticmethod
     def contar_por_cliente_nexus(cliente_nexus_id: int) -> int:
-        """Conta total de clientes finais de um cliente Nexus"""
-        query = "SELECT COUNT(*) as total FROM clientes_finais WHERE cliente_nexus_id = %s AND ativo = true"
+        """Conta total de clientes finais de um cliente Nexus (dashboard_counters)"""
+        query = "SELECT clientes_ativos as total FROM dashboard_counters WHERE cliente_nexus_id = %s"
         result = fetch_one(query, (cliente_nexus_id,))
         return result['total'] if result else 0
 
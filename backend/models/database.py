@@ -6,13 +6,21 @@ Usa psycopg (versão 3)
 
 import psycopg
 from psycopg.rows import dict_row
-from psycopg_pool import ConnectionPool
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
 from typing import List, Dict, Any, Optional, Tuple
 import logging
+from collections import deque
+from contextlib import asynccontextmanager
 from datetime import datetime
 import sys
 import os
 import json
+import time
+import queue
+import atexit
+import asyncio
+import threading
+import weakref
 
 # Adiciona o diretório backend ao path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -24,10 +32,116 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+class EstatisticasAquisicao:
+    """Latência de aquisição de conexões do pool (últimas N aquisições)"""
+
+    def __init__(self, janela: int = 1000):
+        self._lock = threading.Lock()
+        self._latencias = deque(maxlen=janela)
+        self.total = 0
+        self.timeouts = 0
+        self.em_uso = 0
+
+    def registrar(self, segundos: float):
+        with self._lock:
+            self._latencias.append(segundos)
+            self.total += 1
+            self.em_uso += 1
+
+    def registrar_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def registrar_devolucao(self):
+        with self._lock:
+            self.em_uso -= 1
+
+    def resumo(self) -> Dict:
+        with self._lock:
+            latencias = sorted(self._latencias)
+            total, timeouts, em_uso = self.total, self.timeouts, self.em_uso
+
+        def ms(valor):
+            return round(valor * 1000, 2)
+
+        return {
+            'aquisicoes': total,
+            'timeouts': timeouts,
+            'em_uso': em_uso,
+            'latencia_ms_media': ms(sum(latencias) / len(latencias)) if latencias else 0,
+            'latencia_ms_p95': ms(latencias[int(len(latencias) * 0.95) - 1]) if latencias else 0,
+            'latencia_ms_max': ms(latencias[-1]) if latencias else 0,
+        }
+
+
+class ConexaoPool:
+    """
+    Conexão do pool com a mesma interface de psycopg.connect()
+
+    Para código que abria uma conexão por chamada: `with conexao:` faz commit
+    (ou rollback em erro) e devolve a conexão ao pool, como o `with` do
+    psycopg fecha a conexão; close() também devolve. O resto (cursor(),
+    commit(), rollback(), execute()...) vai direto para a conexão real.
+    """
+
+    def __init__(self, conn, row_factory=None):
+        self._conn = conn
+        self._row_factory_original = conn.row_factory
+        if row_factory is not None:
+            conn.row_factory = row_factory
+
+    def __getattr__(self, nome):
+        if self._conn is None:
+            raise psycopg.OperationalError("a conexão está fechada")
+        return getattr(self._conn, nome)
+
+    @property
+    def closed(self) -> bool:
+        return self._conn is None or self._conn.closed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if not self.closed:
+                if exc_type is None:
+                    self._conn.commit()
+                else:
+                    self._conn.rollback()
+        finally:
+            self.close()
+
+    def close(self):
+        """Devolve ao pool (o que não teve commit é descartado, como no close() do psycopg)"""
+        if self._conn is None:
+            return
+
+        conn, self._conn = self._conn, None
+        try:
+            if not conn.closed:
+                conn.rollback()
+                conn.row_factory = self._row_factory_original
+        finally:
+            Database.return_connection(conn)
+
+    def __del__(self):
+        # Conexão esquecida aberta não pode ficar presa fora do pool
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
 class Database:
     """Classe para gerenciar conexões com PostgreSQL usando connection pooling"""
 
     _connection_pool = None
+    _estatisticas = EstatisticasAquisicao()
+
+    # AsyncConnectionPool fica preso ao event loop em que foi aberto: um por loop
+    _pools_async = weakref.WeakKeyDictionary()
+    ASYNC_MAX_CONEXOES = int(os.getenv('DB_POOL_ASYNC_MAX', 10))
 
     @classmethod
     def initialize_pool(cls, minconn: int = 5, maxconn: int = 50):
@@ -59,14 +173,104 @@ class Database:
         """
         if cls._connection_pool is None:
             cls.initialize_pool()
-        return cls._connection_pool.getconn(timeout=timeout)
+
+        inicio = time.perf_counter()
+        try:
+            conn = cls._connection_pool.getconn(timeout=timeout)
+        except Exception:
+            cls._estatisticas.registrar_timeout()
+            raise
+        cls._estatisticas.registrar(time.perf_counter() - inicio)
+        return conn
 
     @classmethod
     def return_connection(cls, connection):
         """Retorna uma conexão ao pool"""
         if cls._connection_pool:
+            cls._estatisticas.registrar_devolucao()
             cls._connection_pool.putconn(connection)
 
+    @classmethod
+    def conexao(cls, row_factory=None, timeout: float = 10.0) -> ConexaoPool:
+        """
+        Conexão do pool no lugar de psycopg.connect() (automação, threads)
+
+        Args:
+            row_factory: Ex.: dict_row (restaurado ao devolver ao pool)
+            timeout: Tempo máximo para aguardar uma conexão (segundos)
+        """
+        return ConexaoPool(cls.get_connection(timeout=timeout), row_factory=row_factory)
+
+    @classmethod
+    async def obter_pool_async(cls) -> AsyncConnectionPool:
+        """AsyncConnectionPool do event loop atual (aberto na primeira chamada)"""
+        loop = asyncio.get_running_loop()
+        pool = cls._pools_async.get(loop)
+        if pool is None:
+            pool = AsyncConnectionPool(
+                Config.DATABASE_URL,
+                min_size=1,
+                max_size=cls.ASYNC_MAX_CONEXOES,
+                kwargs={'row_factory': dict_row},
+                open=False,
+            )
+            await pool.open()
+            cls._pools_async[loop] = pool
+        return pool
+
+    @classmethod
+    @asynccontextmanager
+    async def conexao_async(cls, timeout: float = 10.0):
+        """
+        Conexão async (dict_row) para código no event loop (Playwright)
+
+        Commit ao sair sem erro, rollback em erro; volta ao pool do loop.
+        """
+        pool = await cls.obter_pool_async()
+
+        inicio = time.perf_counter()
+        try:
+            conn = await pool.getconn(timeout=timeout)
+        except Exception:
+            cls._estatisticas.registrar_timeout()
+            raise
+        cls._estatisticas.registrar(time.perf_counter() - inicio)
+
+        try:
+            yield conn
+            await conn.commit()
+        except BaseException:
+            await conn.rollback()
+            raise
+        finally:
+            cls._estatisticas.registrar_devolucao()
+            await pool.putconn(conn)
+
+    @classmethod
+    async def fechar_pool_async(cls):
+        """Fecha o pool async do event loop atual (chamar antes de fechar o loop)"""
+        pool = cls._pools_async.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool.close()
+
+    @classmethod
+    def estatisticas(cls) -> Dict:
+        """Estado do pool (para /health): tamanho, livres, fila de espera e latência"""
+        resumo = cls._estatisticas.resumo()
+
+        if cls._connection_pool is not None:
+            stats = cls._connection_pool.get_stats()
+            resumo.update({
+                'tamanho': stats.get('pool_size', 0),
+                'minimo': stats.get('pool_min', 0),
+                'maximo': stats.get('pool_max', 0),
+                'livres': stats.get('pool_available', 0),
+                'aguardando': stats.get('requests_waiting', 0),
+            })
+
+        resumo['pools_async'] = len(cls._pools_async)
+        return resumo
+
     @classmethod
     def close_all_connections(cls):
         """Fecha todas as conexões do pool"""
@@ -318,10 +522,151 @@ def init_schema():
         raise
 
 
+class GravadorLogs:
+    """
+    Grava logs_sistema em lote numa thread de fundo
+
+    log_sistema só enfileira; a thread junta até LOG_LOTE_MAXIMO registros
+    (ou o que chegou em LOG_INTERVALO_MS) num único INSERT multi-linhas.
+
+    Fila cheia: logs warning/error esperam um pouco por espaço, info/success
+    são descartados na hora (contados e avisados no log da aplicação).
+    """
+
+    TIPOS_PRIORITARIOS = ('warning', 'error')
+    ESPERA_PRIORITARIOS = 0.5  # Segundos de espera por espaço na fila
+
+    def __init__(self, lote_maximo: int = None, intervalo_ms: int = None, fila_maxima: int = None):
+        self.lote_maximo = lote_maximo or Config.LOG_LOTE_MAXIMO
+        self.intervalo = (intervalo_ms or Config.LOG_INTERVALO_MS) / 1000
+        self.fila = queue.Queue(maxsize=fila_maxima or Config.LOG_FILA_MAXIMA)
+        self.descartados = 0
+        self._thread = None
+        self._pid = None
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+
+    def _garantir_thread(self):
+        """Inicia a thread na primeira chamada (e de novo após fork do worker)"""
+        if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+
+            if self._pid != os.getpid():
+                # Processo filho herdou a fila do pai: começa do zero
+                self.fila = queue.Queue(maxsize=self.fila.maxsize)
+
+            self._pid = os.getpid()
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name='gravador-logs', daemon=True)
+            self._thread.start()
+
+    def enfileirar(self, registro: Tuple) -> bool:
+        """
+        Coloca um registro (tipo, categoria, mensagem, detalhes, usuario_id) na fila
+
+        Returns:
+            False se o registro foi descartado
+        """
+        self._garantir_thread()
+
+        try:
+            if registro[0] in self.TIPOS_PRIORITARIOS:
+                self.fila.put(registro, timeout=self.ESPERA_PRIORITARIOS)
+            else:
+                self.fila.put_nowait(registro)
+            return True
+        except queue.Full:
+            self.descartados += 1
+            if self.descartados == 1 or self.descartados % 1000 == 0:
+                logger.warning(f"⚠️ Fila de logs cheia - {self.descartados} log(s) descartado(s)")
+            return False
+
+    def _coletar_lote(self) -> List[Tuple]:
+        """Espera o primeiro registro e junta o que chegar até o intervalo/lote máximo"""
+        try:
+            lote = [self.fila.get(timeout=self.intervalo)]
+        except queue.Empty:
+            return []
+
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.lote_maximo:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self.fila.get(timeout=restante))
+            except queue.Empty:
+                break
+
+        return lote
+
+    def _gravar(self, lote: List[Tuple]):
+        """INSERT multi-linhas; se falhar, grava linha a linha para não perder o lote todo"""
+        valores = ', '.join(['(%s, %s, %s, %s, %s)'] * len(lote))
+        parametros = [campo for registro in lote for campo in registro]
+
+        try:
+            execute_query(
+                f"INSERT INTO logs_sistema (tipo, categoria, mensagem, detalhes, usuario_id) VALUES {valores}",
+                tuple(parametros)
+            )
+            return
+        except Exception as e:
+            logger.error(f"❌ Erro ao gravar lote de {len(lote)} logs: {e}")
+
+        for registro in lote:
+            try:
+                execute_query(
+                    "INSERT INTO logs_sistema (tipo, categoria, mensagem, detalhes, usuario_id) VALUES (%s, %s, %s, %s, %s)",
+                    registro
+                )
+            except Exception as e:
+                logger.error(f"❌ Erro ao registrar log: {e}")
+
+    def _executar(self):
+        """Loop da thread: grava lotes até pedir parada e esvaziar a fila"""
+        while not (self._parar.is_set() and self.fila.empty()):
+            lote = self._coletar_lote()
+            if lote:
+                self._gravar(lote)
+                for _ in lote:
+                    self.fila.task_done()
+
+    def flush(self, timeout: float = 5.0):
+        """Aguarda a fila esvaziar (até timeout segundos)"""
+        limite = time.monotonic() + timeout
+        while self.fila.unfinished_tasks and time.monotonic() < limite:
+            if not (self._thread and self._thread.is_alive()):
+                break
+            time.sleep(0.05)
+
+    def parar(self, timeout: float = 5.0):
+        """Grava o que estiver pendente e encerra a thread"""
+        if not (self._thread and self._thread.is_alive()):
+            return
+
+        self._parar.set()
+        self._thread.join(timeout)
+
+        if self.descartados:
+            logger.warning(f"⚠️ {self.descartados} log(s) descartado(s) por fila cheia")
+
+
+gravador_logs = GravadorLogs()
+atexit.register(gravador_logs.parar)
+
+
 def log_sistema(tipo: str, mensagem: str, categoria: str = None, detalhes: Dict = None, usuario_id: int = None):
     """
     Registra log no sistema
 
+    Com LOG_ASSINCRONO (padrão) o log é enfileirado e gravado em lote pela
+    thread do gravador_logs; senão grava na hora.
+
     Args:
         tipo: Tipo do log (info, warning, error, success)
         mensagem: Mensagem do log
@@ -330,13 +675,18 @@ def log_sistema(tipo: str, mensagem: str, categoria: str = None, detalhes: Dict
         usuario_id: ID do usuário relacionado ao log
     """
     try:
+        detalhes_json = json.dumps(detalhes) if detalhes else None
+        registro = (tipo, categoria, mensagem, detalhes_json, usuario_id)
+
+        if Config.LOG_ASSINCRONO:
+            gravador_logs.enfileirar(registro)
+            return
+
         query = """
             INSERT INTO logs_sistema (tipo, categoria, mensagem, detalhes, usuario_id)
             VALUES (%s, %s, %s, %s, %s)
         """
-
-        detalhes_json = json.dumps(detalhes) if detalhes else None
-        execute_query(query, (tipo, categoria, mensagem, detalhes_json, usuario_id))
+        execute_query(query, registro)
 
     except Exception as e:
         logger.error(f"❌ Erro ao registrar log: {e}")
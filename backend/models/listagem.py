@@ -0,0 +1,173 @@
+"""
+Listagens em streaming (projeção explícita + keyset + cursor no servidor)
+
+As listagens de boletos faziam SELECT b.* sem paginação e montavam a
+resposta inteira em memória (lista de dicts + jsonify). Aqui:
+
+- as colunas são listadas explicitamente (nada de b.* com pdf_path, descrição...)
+- a página segue a ordem (created_at DESC, id DESC) e continua a partir do
+  cursor (models.paginacao), sem OFFSET
+- as linhas vêm de um cursor nomeado do psycopg (cursor no servidor), em lotes
+- o JSON é escrito em pedaços, lote a lote, enquanto o cursor é lido
+
+A memória por requisição fica limitada a um lote, qualquer que seja o
+tamanho da tabela ou do limit pedido.
+"""
+
+import logging
+from itertools import count
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from flask import Response, current_app, stream_with_context
+from psycopg.rows import dict_row
+
+from models.database import Database
+from models.paginacao import codificar_cursor, decodificar_cursor
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_LOTE = 500
+LIMITE_MAXIMO = 5000
+
+_sequencia_cursores = count(1)
+
+# Projeções por tela (só o que o frontend usa + a chave do cursor)
+COLUNAS_BOLETOS_PORTAL = (
+    'b.id', 'b.cliente_final_id', 'b.numero_boleto', 'b.valor_original', 'b.data_vencimento',
+    'b.mes_referencia', 'b.ano_referencia', 'b.numero_parcela', 'b.status', 'b.status_envio',
+    'b.data_envio', 'b.pdf_filename', 'b.created_at',
+    'cf.nome_completo', 'cf.cpf', 'cf.numero_contrato', 'cf.whatsapp', 'cf.telefone_celular',
+)
+
+COLUNAS_BOLETOS_CONSORCIO = (
+    'b.id', 'b.cliente_final_id', 'b.numero_boleto', 'b.valor_original', 'b.data_vencimento',
+    'b.numero_parcela', 'b.status', 'b.status_envio', 'b.pdf_filename', 'b.created_at',
+    'cf.nome_completo', 'cf.cpf', 'cf.numero_contrato',
+)
+
+COLUNAS_BOLETOS_DEBUG = (
+    'b.id', 'b.cliente_nexus_id', 'b.cliente_final_id', 'b.numero_boleto', 'b.valor_original',
+    'b.data_vencimento', 'b.data_emissao', 'b.mes_referencia', 'b.ano_referencia', 'b.status',
+    'b.status_envio', 'b.pdf_filename', 'b.pdf_path', 'b.pdf_size', 'b.created_at',
+    'cf.nome_completo', 'cf.cpf', 'cf.whatsapp',
+)
+
+
+def montar_consulta(colunas: Sequence[str], origem: str, filtros: Sequence[str] = (),
+                    params: Sequence = (), cursor: Optional[str] = None,
+                    limit: Optional[int] = None,
+                    chave: Tuple[str, str] = ('b.created_at', 'b.id')) -> Tuple[str, tuple]:
+    """
+    SELECT com projeção explícita e paginação keyset
+
+    Args:
+        colunas: Expressões do SELECT (ex.: 'b.id', 'cf.nome_completo')
+        origem: FROM/JOINs
+        filtros: Condições do WHERE (unidas por AND)
+        params: Parâmetros dos filtros, na ordem
+        cursor: Cursor da página anterior (None = primeira página)
+        limit: Tamanho da página (None = até o fim, ainda em streaming)
+        chave: Colunas da ordenação (timestamp, id), ambas DESC
+
+    Returns:
+        (query, params)
+    """
+    filtros = list(filtros)
+    params = list(params)
+
+    valores_cursor = decodificar_cursor(cursor, 2)
+    if valores_cursor:
+        filtros.append(f"({chave[0]}, {chave[1]}) < (%s::timestamp, %s)")
+        params.extend(valores_cursor)
+
+    query = f"SELECT {', '.join(colunas)} FROM {origem}"
+    if filtros:
+        query += " WHERE " + " AND ".join(filtros)
+    query += f" ORDER BY {chave[0]} DESC, {chave[1]} DESC"
+
+    if limit:
+        query += " LIMIT %s"
+        params.append(limit)
+
+    return query, tuple(params)
+
+
+def limitar(limit: Optional[int], padrao: Optional[int] = None) -> Optional[int]:
+    """limit da query string dentro de 1..LIMITE_MAXIMO (None/0 = padrao)"""
+    if not limit or limit < 1:
+        return padrao
+    return min(limit, LIMITE_MAXIMO)
+
+
+def iterar_lotes(query: str, params: tuple, tamanho_lote: int = TAMANHO_LOTE) -> Iterator[List[Dict]]:
+    """
+    Executa a query num cursor nomeado (no servidor) e entrega lotes de linhas
+
+    A conexão fica com o gerador até ele terminar ou ser fechado
+    (cliente desconectou); só então volta ao pool.
+    """
+    conn = Database.get_connection()
+    try:
+        with conn.cursor(name=f'listagem_{next(_sequencia_cursores)}', row_factory=dict_row) as cur:
+            cur.itersize = tamanho_lote
+            cur.execute(query, params)
+            while True:
+                lote = cur.fetchmany(tamanho_lote)
+                if not lote:
+                    break
+                yield lote
+    finally:
+        # Só leitura: encerra a transação aberta pelo cursor nomeado
+        conn.rollback()
+        Database.return_connection(conn)
+
+
+def resposta_streaming(query: str, params: tuple, chave_itens: str = 'boletos',
+                       limit: Optional[int] = None, incluir_count: bool = False,
+                       campos_cursor: Tuple[str, str] = ('created_at', 'id'),
+                       tamanho_lote: int = TAMANHO_LOTE) -> Response:
+    """
+    Resposta JSON escrita em pedaços:
+    {"success": true, "<chave_itens>": [...], "count": n, "proximo_cursor": "..."}
+
+    O primeiro lote é lido antes de devolver a Response, para que erros da
+    query ainda virem 500 no handler da rota (depois que o corpo começa a ser
+    enviado o status já foi para o cliente).
+    """
+    lotes = iterar_lotes(query, params, tamanho_lote)
+    primeiro = next(lotes, [])
+    dumps: Callable = current_app.json.dumps
+
+    def gerar():
+        total = 0
+        ultimo: List[Dict] = []
+        yield f'{{"success": true, "{chave_itens}": ['
+
+        try:
+            lote = primeiro
+            while lote:
+                trecho = ', '.join(dumps(linha) for linha in lote)
+                yield (', ' if total else '') + trecho
+                total += len(lote)
+                ultimo = lote[-1:]
+                lote = next(lotes, [])
+        except Exception as e:
+            # O status 200 já foi enviado: o JSON fica truncado e o cliente falha ao ler
+            logger.error(f"❌ Erro no streaming de {chave_itens}: {e}")
+            raise
+        finally:
+            lotes.close()
+
+        fim = []
+        if incluir_count:
+            fim.append(f'"count": {total}')
+        cursor = None
+        if limit and total >= limit:
+            cursor = codificar_cursor(*(ultimo[0][campo] for campo in campos_cursor))
+        fim.append(f'"proximo_cursor": {dumps(cursor)}')
+        yield '], ' + ', '.join(fim) + '}'
+
+    resposta = Response(stream_with_context(gerar()), mimetype='application/json')
+    # Se o corpo nunca for lido, a conexão volta ao pool ao fechar a resposta
+    resposta.call_on_close(lotes.close)
+    return resposta
@@ -0,0 +1,58 @@
+"""
+Paginação por cursor (keyset)
+
+Com OFFSET o banco lê e descarta todas as linhas anteriores à página; com
+keyset a página N custa o mesmo que a primeira. O cursor guarda a chave de
+ordenação do último item entregue e a próxima página começa depois dele
+(WHERE (chave, id) > (%s, %s) na mesma ordem do índice).
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+
+def codificar_cursor(*valores) -> str:
+    """Cursor opaco (base64 url-safe de JSON) com a chave do último item"""
+    dados = [v.isoformat() if isinstance(v, (datetime, date)) else v for v in valores]
+    return base64.urlsafe_b64encode(json.dumps(dados, default=str).encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor: Optional[str], tamanho: int) -> Optional[List]:
+    """
+    Valores do cursor
+
+    Args:
+        cursor: Cursor recebido do cliente
+        tamanho: Quantidade de valores esperada (colunas da chave)
+
+    Returns:
+        Lista de valores ou None se ausente/inválido (volta para a primeira página)
+    """
+    if not cursor:
+        return None
+
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+
+    if not isinstance(valores, list) or len(valores) != tamanho:
+        return None
+    return valores
+
+
+def proximo_cursor(itens: List[Dict], limit: Optional[int], *campos: str) -> Optional[str]:
+    """
+    Cursor da página seguinte (None quando esta página é a última)
+
+    Args:
+        itens: Itens da página atual, na ordem da consulta
+        limit: Tamanho de página pedido
+        campos: Colunas da chave de ordenação (ex.: 'created_at', 'id')
+    """
+    if not itens or not limit or len(itens) < limit:
+        return None
+    ultimo = itens[-1]
+    return codificar_cursor(*(ultimo[campo] for campo in campos))
@@ -8,7 +8,8 @@ from werkzeug.utils import secure_filename
 from functools import wraps
 import logging
 import asyncio
-from datetime import datetime
+from collections import deque
+from datetime import datetime, timedelta
 from pathlib import Path
 import sys
 import tempfile
@@ -37,10 +38,14 @@ if str(automation_path) not in sys.path:
 
 # Importar do backend
 from models.database import Database
+from services.progresso import ERROS_MAXIMO, barramento_progresso, resposta_sse
+from services.progresso import publicar as publicar_progresso
+from services.sincronizacao_clientes import sincronizar_clientes_finais
 
 # Importar do Canopus (com tratamento de erro)
 try:
     from orquestrador import CanopusOrquestrador, DatabaseManager
+    from canopus_backends import BACKENDS_DISPONIVEIS
     CANOPUS_DISPONIVEL = True
     logger.info("✅ Automação Canopus carregada com sucesso")
 except ImportError as e:
@@ -48,16 +53,35 @@ except ImportError as e:
     CANOPUS_DISPONIVEL = False
     CanopusOrquestrador = None
     DatabaseManager = None
+    BACKENDS_DISPONIVEIS = ()
 
 # Blueprint
 automation_canopus_bp = Blueprint('automation_canopus', __name__, url_prefix='/api/automation')
 
+# Origens do /resetar-e-reimportar
+PLANILHA_REIMPORTACAO = Path(os.getenv(
+    'REIMPORTACAO_PLANILHA', r"D:\Nexus\automation\canopus\excel_files\DENER__PLANILHA_GERAL.xlsx"
+))
+PASTA_BOLETOS_REIMPORTACAO = Path(os.getenv(
+    'REIMPORTACAO_PASTA_BOLETOS', r"D:\Nexus\automation\canopus\downloads\Danner"
+))
+
 
 # ============================================================================
 # CONTROLE DE STATUS DE EXECUÇÃO
 # ============================================================================
 
-# Status global da execução de downloads
+# Status da execução de downloads deste processo; publicado no tópico
+# 'canopus' do barramento (services/progresso.py) para todos os processos
+TOPICO_PROGRESSO = 'canopus'
+
+# Progresso da importação de planilhas para clientes_finais
+TOPICO_IMPORTACAO = 'importacao_clientes'
+
+# Execução sem atualização há mais tempo que isso é considerada abandonada
+# (processo reiniciado no meio do download)
+MINUTOS_EXECUCAO_ABANDONADA = 30
+
 execution_status = {
     'ativo': False,
     'ponto_venda': None,
@@ -67,9 +91,43 @@ execution_status = {
     'porcentagem': 0,
     'inicio': None,
     'ultimo_update': None,
-    'erros': []
+    'erros': deque(maxlen=ERROS_MAXIMO)  # só os erros mais recentes
 }
 
+def _publicar_status():
+    """Envia o status atual aos espectadores (SSE) de todos os processos"""
+    try:
+        publicar_progresso(TOPICO_PROGRESSO, status_serializavel())
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível publicar o progresso: {e}")
+
+def status_serializavel() -> dict:
+    """Cópia do status com a lista de erros"""
+    status = execution_status.copy()
+    status['erros'] = list(execution_status['erros'])
+    return status
+
+def status_compartilhado() -> dict:
+    """Último status publicado por qualquer processo (ou o local)"""
+    try:
+        return barramento_progresso.estado(TOPICO_PROGRESSO) or status_serializavel()
+    except Exception:
+        return status_serializavel()
+
+def execucao_em_andamento() -> dict:
+    """Status da execução ativa em qualquer processo, ou None"""
+    if execution_status['ativo']:
+        return status_serializavel()
+
+    status = status_compartilhado()
+    if not status.get('ativo') or not status.get('ultimo_update'):
+        return None
+
+    ultimo_update = datetime.fromisoformat(status['ultimo_update'])
+    if datetime.now() - ultimo_update > timedelta(minutes=MINUTOS_EXECUCAO_ABANDONADA):
+        return None
+    return status
+
 def atualizar_status(etapa: str = None, progresso: int = None, total: int = None, erro: str = None):
     """Atualiza o status da execução"""
     global execution_status
@@ -86,7 +144,7 @@ def atualizar_status(etapa: str = None, progresso: int = None, total: int = None
     if erro:
         execution_status['erros'].append({
             'timestamp': datetime.now().isoformat(),
-            'mensagem': erro
+            'mensagem': erro[:500]
         })
 
     # Calcular porcentagem
@@ -97,6 +155,7 @@ def atualizar_status(etapa: str = None, progresso: int = None, total: int = None
 
     execution_status['ultimo_update'] = datetime.now().isoformat()
     logger.info(f"📊 Status: {execution_status['etapa_atual']} ({execution_status['porcentagem']}%)")
+    _publicar_status()
 
 def iniciar_execucao(ponto_venda: str, total_clientes: int):
     """Marca início da execução"""
@@ -110,8 +169,9 @@ def iniciar_execucao(ponto_venda: str, total_clientes: int):
         'porcentagem': 0,
         'inicio': datetime.now().isoformat(),
         'ultimo_update': datetime.now().isoformat(),
-        'erros': []
+        'erros': deque(maxlen=ERROS_MAXIMO)
     })
+    _publicar_status()
 
 def finalizar_execucao(sucesso: bool = True):
     """Marca fim da execução"""
@@ -120,6 +180,7 @@ def finalizar_execucao(sucesso: bool = True):
     execution_status['etapa_atual'] = 'Concluído!' if sucesso else 'Erro na execução'
     execution_status['porcentagem'] = 100 if sucesso else execution_status['porcentagem']
     execution_status['ultimo_update'] = datetime.now().isoformat()
+    _publicar_status()
 
 
 # ============================================================================
@@ -141,23 +202,89 @@ def handle_errors(f):
     return decorated_function
 
 
+def erro_backend_invalido(backend_tipo):
+    """Resposta 400 se o backend pedido não existe (None = padrão CANOPUS_BACKEND)"""
+    if backend_tipo is None or str(backend_tipo).lower() in BACKENDS_DISPONIVEIS:
+        return None
+    return jsonify({
+        'success': False,
+        'error': f"Backend inválido: '{backend_tipo}' (use {', '.join(BACKENDS_DISPONIVEIS)})"
+    }), 400
+
+
 def get_db_connection():
-    """Retorna conexão com banco de dados usando configuração centralizada"""
-    import psycopg
+    """
+    Retorna conexão (dict_row) do pool compartilhado
+
+    Mesmo uso de psycopg.connect(): `with get_db_connection() as conn:` ou
+    conn.close() ao final; nos dois casos a conexão volta para o pool.
+    """
     from psycopg.rows import dict_row
-    from config import Config
 
-    # Usar DATABASE_URL do Config (já configurado para Render ou local)
-    return psycopg.connect(
-        Config.DATABASE_URL,
-        row_factory=dict_row
-    )
+    return Database.conexao(row_factory=dict_row)
 
 
 # ============================================================================
 # UPLOAD E PROCESSAMENTO DE PLANILHAS
 # ============================================================================
 
+def _carregar_backup_whatsapp() -> dict:
+    """WhatsApp reais do backup (CPF só com dígitos -> número); vazio sem backup"""
+    import json
+
+    backup_path = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        'backups',
+        'whatsapp_clientes_backup.json'
+    )
+
+    if not os.path.exists(backup_path):
+        return {}
+
+    try:
+        with open(backup_path, 'r', encoding='utf-8') as f:
+            backup_data = json.load(f)
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível ler o backup de WhatsApp: {str(e)}")
+        return {}
+
+    # Só restaura se for um número REAL (não placeholder)
+    return {
+        cpf: dados['whatsapp']
+        for cpf, dados in backup_data.get('clientes', {}).items()
+        if dados.get('whatsapp') and '999999999' not in dados['whatsapp']
+    }
+
+
+def _primeiro_cliente_nexus_id(conn):
+    """Cliente Nexus dono dos clientes importados das planilhas"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT id FROM clientes_nexus ORDER BY id LIMIT 1")
+        row = cur.fetchone()
+    return row['id'] if row else None
+
+
+def _progresso_importacao(arquivo: str):
+    """Callback de sincronizar_clientes_finais que publica no tópico de importação"""
+    def publicar(etapa: str, processados: int, total: int):
+        publicar_progresso(TOPICO_IMPORTACAO, {
+            'arquivo': arquivo,
+            'etapa': etapa,
+            'processados': processados,
+            'total': total,
+            'porcentagem': round(processados / total * 100, 1) if total else 100,
+        })
+    return publicar
+
+
+def _erros_sincronizacao(resultado: dict) -> list:
+    """Mensagem de cada linha que sincronizar_clientes_finais deixou de fora"""
+    return [
+        f"Erro ao processar {rejeitado['nome_completo']} (CPF: {rejeitado['cpf']}): {rejeitado['erro']}"
+        for rejeitado in resultado['rejeitados']
+    ]
+
+
 @automation_canopus_bp.route('/upload-planilha', methods=['POST'])
 @handle_errors
 def upload_planilha():
@@ -251,112 +378,37 @@ def upload_planilha():
         # ====================================================================
         logger.info(f"💾 Importando {len(clientes)} clientes para o banco...")
 
-        importados = 0
-        atualizados = 0
-        erros = 0
-        erros_detalhes = []
-
-        with get_db_connection() as conn:
-            cur = conn.cursor()
-
-            for idx, cliente in enumerate(clientes, 1):
-                try:
-                    cpf = cliente['cpf']
-                    nome = cliente['nome']
-                    pv = cliente['ponto_venda']
-
-                    # Verificar se cliente já existe
-                    cur.execute("""
-                        SELECT id FROM clientes_finais
-                        WHERE cpf = %s AND ponto_venda = %s
-                    """, (cpf, pv))
-
-                    existing = cur.fetchone()
-
-                    if existing:
-                        # Atualizar
-                        cur.execute("""
-                            UPDATE clientes_finais
-                            SET nome_completo = %s,
-                                updated_at = CURRENT_TIMESTAMP
-                            WHERE id = %s
-                        """, (nome, existing['id']))
-                        atualizados += 1
-                    else:
-                        # Buscar cliente_nexus
-                        cur.execute("SELECT id FROM clientes_nexus ORDER BY id LIMIT 1")
-                        cliente_nexus_row = cur.fetchone()
-                        cliente_nexus_id = cliente_nexus_row['id'] if cliente_nexus_row else None
-
-                        # Inserir novo
-                        numero_contrato = f"CANOPUS-{pv}-{cpf}"
-
-                        # RESTAURAR WHATSAPP DO BACKUP (se existir)
-                        # NÃO cria WhatsApp fake - deixa NULL se não tiver backup
-                        whatsapp = None
-
-                        # Tentar carregar do backup
-                        try:
-                            import json
-                            backup_path = os.path.join(
-                                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                                'backups',
-                                'whatsapp_clientes_backup.json'
-                            )
-
-                            if os.path.exists(backup_path):
-                                with open(backup_path, 'r', encoding='utf-8') as f:
-                                    backup_data = json.load(f)
-
-                                # Buscar WhatsApp pelo CPF
-                                cpf_limpo = cpf.replace('.', '').replace('-', '')
-                                if cpf_limpo in backup_data['clientes']:
-                                    whatsapp_backup = backup_data['clientes'][cpf_limpo]['whatsapp']
-                                    # Só restaura se for um número REAL (não placeholder)
-                                    if whatsapp_backup and whatsapp_backup != '5567999999999' and '999999999' not in whatsapp_backup:
-                                        whatsapp = whatsapp_backup
-                                        logger.info(f"✅ WhatsApp restaurado do backup para {nome}: {whatsapp}")
-                        except Exception as e:
-                            logger.warning(f"⚠️ Não foi possível restaurar WhatsApp do backup para {nome}: {str(e)}")
+        # WhatsApp dos clientes novos vem do backup (se existir);
+        # NÃO cria WhatsApp fake - deixa NULL se não tiver backup
+        backup_whatsapp = _carregar_backup_whatsapp()
 
-                        # Se não restaurou do backup, deixa NULL
-                        if not whatsapp:
-                            logger.info(f"ℹ️ Cliente {nome} importado SEM WhatsApp (adicione manualmente depois)")
+        linhas = [{
+            'cpf': cliente['cpf'],
+            'nome_completo': cliente['nome'],
+            'ponto_venda': cliente['ponto_venda'],
+            'whatsapp': backup_whatsapp.get(cliente['cpf'].replace('.', '').replace('-', '')),
+        } for cliente in clientes]
+        logger.info(f"📱 {sum(1 for l in linhas if l['whatsapp'])} WhatsApp restaurados do backup")
 
-                        cur.execute("""
-                            INSERT INTO clientes_finais (
-                                cliente_nexus_id,
-                                nome_completo,
-                                cpf,
-                                whatsapp,
-                                ponto_venda,
-                                numero_contrato,
-                                ativo,
-                                created_at,
-                                updated_at
-                            ) VALUES (%s, %s, %s, %s, %s, %s, true, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-                        """, (cliente_nexus_id, nome, cpf, whatsapp, pv, numero_contrato))
-
-                        importados += 1
-
-                    # Commit a cada 100
-                    if idx % 100 == 0:
-                        conn.commit()
-                        logger.info(f"   Checkpoint: {idx}/{len(clientes)} processados")
-
-                except Exception as e:
-                    erros += 1
-                    erro_msg = f"Erro ao processar {nome} (CPF: {cpf}): {str(e)}"
-                    erros_detalhes.append(erro_msg)
-                    logger.error(erro_msg)
-                    continue
+        with get_db_connection() as conn:
+            cliente_nexus_id = _primeiro_cliente_nexus_id(conn)
+
+            resultado = sincronizar_clientes_finais(
+                conn,
+                linhas,
+                padroes={'cliente_nexus_id': cliente_nexus_id},
+                atualizar=('nome_completo',),
+                ao_progredir=_progresso_importacao(file.filename),
+            )
 
-            # Commit final
-            conn.commit()
-            cur.close()
+        importados = resultado['criados']
+        atualizados = resultado['atualizados']
+        erros_detalhes = _erros_sincronizacao(resultado)
+        erros = resultado['ignorados'] + len(erros_detalhes)
 
         logger.info(f"✅ Importação concluída!")
-        logger.info(f"   Novos: {importados}, Atualizados: {atualizados}, Erros: {erros}")
+        logger.info(f"   Novos: {importados}, Atualizados: {atualizados}, "
+                    f"Inalterados: {resultado['inalterados']}, Erros: {erros}")
 
         return jsonify({
             'success': True,
@@ -366,8 +418,9 @@ def upload_planilha():
                 'total_extraidos': len(clientes),
                 'importados': importados,
                 'atualizados': atualizados,
+                'inalterados': resultado['inalterados'],
                 'erros': erros,
-                'total_processados': importados + atualizados,
+                'total_processados': importados + atualizados + resultado['inalterados'],
                 'pontos_venda': filtro_pv,
                 'estatisticas_pv': resultado_extracao['estatisticas_pv'],
                 'erros_detalhes': erros_detalhes[:10]  # Primeiros 10 erros
@@ -701,6 +754,10 @@ def processar_downloads():
     mes = data.get('mes', 'DEZEMBRO')
     ano = data.get('ano', datetime.now().year)
     limite = data.get('limite')
+    backend_tipo = data.get('backend')  # 'playwright', 'http' ou 'http_async' (padrão: CANOPUS_BACKEND)
+    erro_backend = erro_backend_invalido(backend_tipo)
+    if erro_backend:
+        return erro_backend
 
     if not consultor:
         return jsonify({'error': 'Consultor é obrigatório'}), 400
@@ -721,10 +778,12 @@ def processar_downloads():
                 consultor_nome=consultor,
                 mes=mes,
                 ano=ano,
-                limite=limite
+                limite=limite,
+                backend=backend_tipo
             )
         )
     finally:
+        loop.run_until_complete(Database.fechar_pool_async())
         loop.close()
 
     return jsonify({
@@ -767,6 +826,10 @@ def processar_downloads_ponto_venda():
     mes = data.get('mes')  # Opcional - será extraído da página
     ano = data.get('ano', datetime.now().year)
     limite = data.get('limite')
+    backend_tipo = data.get('backend')  # 'playwright', 'http' ou 'http_async' (padrão: CANOPUS_BACKEND)
+    erro_backend = erro_backend_invalido(backend_tipo)
+    if erro_backend:
+        return erro_backend
 
     if not ponto_venda:
         return jsonify({'error': 'Ponto de venda é obrigatório'}), 400
@@ -819,10 +882,12 @@ def processar_downloads_ponto_venda():
                 consultor_nome=consultor_nome,
                 mes=mes,
                 ano=ano,
-                limite=limite
+                limite=limite,
+                backend=backend_tipo
             )
         )
     finally:
+        loop.run_until_complete(Database.fechar_pool_async())
         loop.close()
 
     return jsonify({
@@ -1137,16 +1202,29 @@ def reset_connection_pool():
 @automation_canopus_bp.route('/status-execucao', methods=['GET'])
 def status_execucao():
     """
-    Retorna status atual da execução de downloads
-    Usado para polling em tempo real no frontend
+    Retorna status atual da execução de downloads (consulta avulsa)
+    O acompanhamento em tempo real usa /status-execucao/stream
     """
-    global execution_status
     return jsonify({
         'success': True,
-        'status': execution_status.copy()
+        'status': status_compartilhado()
     })
 
 
+@automation_canopus_bp.route('/status-execucao/stream', methods=['GET'])
+def status_execucao_stream():
+    """
+    Status da execução de downloads via Server-Sent Events
+
+    Cada evento tem o mesmo formato de /status-execucao e é enviado quando o
+    status muda, venha a execução deste ou de outro processo do app.
+    """
+    return resposta_sse(
+        TOPICO_PROGRESSO,
+        lambda status: {'success': True, 'status': status or status_serializavel()}
+    )
+
+
 @automation_canopus_bp.route('/verificar-arquivos', methods=['GET'])
 def verificar_arquivos():
     """
@@ -1208,7 +1286,7 @@ def verificar_boletos_banco():
                         d.id,
                         d.cpf,
                         d.nome_arquivo,
-                        d.caminho_arquivo,
+                        d.pdf_sha256,
                         d.tamanho_bytes,
                         d.status,
                         d.data_download,
@@ -1269,6 +1347,262 @@ def verificar_boletos_banco():
 # ROTAS PARA O FRONTEND DO CLIENTE
 # ============================================================================
 
+def registrar_download_canopus(cpf: str, resultado: dict, mes, ano, rotulo: str = ''):
+    """
+    Registra um boleto baixado com sucesso em downloads_canopus e boletos
+
+    Usado tanto pelo modo sequencial quanto pelo pool paralelo de
+    /baixar-boletos-ponto-venda, garantindo os mesmos registros nos dois modos.
+
+    Args:
+        cpf: CPF do cliente
+        resultado: Retorno de CanopusAutomation.processar_cliente_completo
+        mes: Mês solicitado
+        ano: Ano solicitado
+        rotulo: Texto de progresso exibido no status (ex: '3/120')
+    """
+    try:
+        logger.info("🔍 DEBUG: Iniciando processo de registro no banco...")
+        sys.stdout.flush()
+
+        arquivo_caminho = resultado.get('dados_boleto', {}).get('arquivo_caminho')
+        arquivo_nome = resultado.get('dados_boleto', {}).get('arquivo_nome')
+        arquivo_tamanho = resultado.get('dados_boleto', {}).get('arquivo_tamanho', 0)
+
+        logger.info(f"🔍 DEBUG: arquivo_caminho={arquivo_caminho}")
+        logger.info(f"🔍 DEBUG: arquivo_nome={arquivo_nome}")
+        logger.info(f"🔍 DEBUG: arquivo_tamanho={arquivo_tamanho}")
+        sys.stdout.flush()
+
+        if not arquivo_caminho:
+            logger.error("❌ DEBUG: arquivo_caminho está None!")
+            sys.stdout.flush()
+        elif not Path(arquivo_caminho).exists():
+            logger.error(f"❌ DEBUG: Arquivo não existe: {arquivo_caminho}")
+            sys.stdout.flush()
+        else:
+            logger.info(f"✅ DEBUG: Arquivo existe: {arquivo_caminho}")
+            sys.stdout.flush()
+
+            atualizar_status(etapa=f'Registrando download no banco... ({rotulo})')
+
+            logger.info("🔍 DEBUG: Conectando ao banco...")
+            sys.stdout.flush()
+
+            with get_db_connection() as conn_import:
+                with conn_import.cursor() as cur_import:
+                    logger.info(f"🔍 DEBUG: Buscando consultor_id para CPF {cpf}...")
+                    sys.stdout.flush()
+
+                    # Buscar consultor_id pelo CPF do cliente
+                    cur_import.execute("""
+                        SELECT consultor_id FROM clientes_finais
+                        WHERE cpf = %s AND ativo = TRUE
+                        LIMIT 1
+                    """, (cpf,))
+
+                    consultor_row = cur_import.fetchone()
+                    consultor_id = consultor_row['consultor_id'] if consultor_row else None
+
+                    logger.info(f"🔍 DEBUG: consultor_id encontrado: {consultor_id}")
+                    sys.stdout.flush()
+
+                    # Verificar se download já existe
+                    logger.info(f"🔍 DEBUG: Verificando se download já existe...")
+                    sys.stdout.flush()
+
+                    cur_import.execute("""
+                        SELECT id FROM downloads_canopus
+                        WHERE cpf = %s AND nome_arquivo = %s
+                    """, (cpf, arquivo_nome))
+
+                    existe = cur_import.fetchone()
+                    logger.info(f"🔍 DEBUG: Download existe? {existe is not None}")
+                    sys.stdout.flush()
+
+                    if not existe:
+                        # Guardar PDF em pdf_blobs (deduplicado por SHA-256)
+                        from services.pdf_blob_store import salvar_pdf_blob
+                        from services.pdf_extracao_store import extrair_e_salvar
+
+                        pdf_sha256, arquivo_tamanho = salvar_pdf_blob(cur_import, arquivo_caminho)
+
+                        # Extrair os dados do PDF uma única vez (pdf_extracoes, pelo hash)
+                        dados_pdf = extrair_e_salvar(cur_import, pdf_sha256, arquivo_caminho)
+
+                        logger.info(f"🔍 DEBUG: Inserindo registro no banco...")
+                        logger.info(f"   CPF: {cpf}")
+                        logger.info(f"   Consultor ID: {consultor_id}")
+                        logger.info(f"   Nome arquivo: {arquivo_nome}")
+                        logger.info(f"   SHA-256: {pdf_sha256}")
+                        logger.info(f"   Tamanho bytes: {arquivo_tamanho}")
+                        sys.stdout.flush()
+
+                        # Inserir registro de download apontando para o blob
+                        cur_import.execute("""
+                            INSERT INTO downloads_canopus (
+                                consultor_id,
+                                cpf,
+                                nome_arquivo,
+                                pdf_sha256,
+                                tamanho_bytes,
+                                status,
+                                data_download,
+                                created_at
+                            ) VALUES (
+                                %s, %s, %s, %s, %s, 'sucesso', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+                            )
+                        """, (
+                            consultor_id,
+                            cpf,
+                            arquivo_nome,
+                            pdf_sha256,
+                            arquivo_tamanho
+                        ))
+
+                        logger.info("🔍 DEBUG: Fazendo commit...")
+                        sys.stdout.flush()
+
+                        conn_import.commit()
+
+                        logger.info(f"💾 ✅ Download registrado no banco: {arquivo_nome}")
+                        sys.stdout.flush()
+
+                        # Catálogo de PDFs (buscas do CRM e importação do orquestrador)
+                        try:
+                            from services.catalogo_pdfs import registrar_pdf
+                            registrar_pdf(arquivo_caminho, cpf=cpf)
+                        except Exception as e:
+                            logger.warning(f"⚠️ PDF não incluído no catálogo: {e}")
+
+                        # EXTRAIR DADOS DO PDF E SALVAR NA TABELA BOLETOS
+                        try:
+                            logger.info("📄 Extraindo dados do PDF para tabela boletos...")
+                            sys.stdout.flush()
+
+                            if dados_pdf.get('sucesso'):
+                                logger.info(f"✅ Dados extraídos: venc={dados_pdf.get('vencimento_str')}, valor=R$ {dados_pdf.get('valor', 0):.2f}")
+                                sys.stdout.flush()
+
+                                # Buscar cliente_final_id pelo CPF
+                                cur_import.execute("""
+                                    SELECT id, consultor_id FROM clientes_finais
+                                    WHERE cpf = %s AND ativo = TRUE
+                                    LIMIT 1
+                                """, (cpf,))
+
+                                cliente_row = cur_import.fetchone()
+
+                                if cliente_row:
+                                    cliente_final_id = cliente_row['id']
+                                    consultor_id_boleto = cliente_row['consultor_id']
+
+                                    # Buscar cliente_nexus_id do consultor
+                                    cur_import.execute("""
+                                        SELECT cliente_nexus_id FROM consultores
+                                        WHERE id = %s
+                                        LIMIT 1
+                                    """, (consultor_id_boleto,))
+
+                                    consultor_nexus = cur_import.fetchone()
+                                    cliente_nexus_id = consultor_nexus['cliente_nexus_id'] if consultor_nexus else 1
+
+                                    # Verificar se boleto já existe
+                                    numero_boleto = dados_pdf.get('nosso_numero') or dados_pdf.get('grupo_cota') or f"CANOPUS-{cpf}"
+
+                                    cur_import.execute("""
+                                        SELECT id FROM boletos
+                                        WHERE cliente_final_id = %s
+                                        AND data_vencimento = %s
+                                        AND valor_original = %s
+                                        LIMIT 1
+                                    """, (
+                                        cliente_final_id,
+                                        dados_pdf.get('vencimento'),
+                                        dados_pdf.get('valor', 0)
+                                    ))
+
+                                    boleto_existe = cur_import.fetchone()
+
+                                    if not boleto_existe:
+                                        # Extrair mês e ano do vencimento
+                                        vencimento = dados_pdf.get('vencimento')
+                                        mes_ref = vencimento.month if vencimento else mes
+                                        ano_ref = vencimento.year if vencimento else (int(ano) if ano else 2025)
+
+                                        # Inserir boleto
+                                        cur_import.execute("""
+                                            INSERT INTO boletos (
+                                                cliente_final_id,
+                                                cliente_nexus_id,
+                                                numero_boleto,
+                                                valor_original,
+                                                data_vencimento,
+                                                data_emissao,
+                                                mes_referencia,
+                                                ano_referencia,
+                                                numero_parcela,
+                                                descricao,
+                                                status,
+                                                status_envio,
+                                                pdf_filename,
+                                                pdf_path,
+                                                pdf_size,
+                                                pdf_sha256,
+                                                gerado_por,
+                                                created_at,
+                                                updated_at
+                                            ) VALUES (
+                                                %s, %s, %s, %s, %s, CURRENT_DATE, %s, %s,
+                                                1, %s, 'pendente', 'nao_enviado',
+                                                %s, %s, %s, %s, 'automacao_canopus',
+                                                NOW(), NOW()
+                                            ) RETURNING id
+                                        """, (
+                                            cliente_final_id,
+                                            cliente_nexus_id,
+                                            numero_boleto,
+                                            dados_pdf.get('valor', 0),
+                                            dados_pdf.get('vencimento'),
+                                            mes_ref,
+                                            ano_ref,
+                                            f"Boleto {dados_pdf.get('grupo_cota', '')}",
+                                            arquivo_nome,
+                                            arquivo_caminho,
+                                            arquivo_tamanho,
+                                            pdf_sha256
+                                        ))
+
+                                        boleto_id = cur_import.fetchone()['id']
+                                        conn_import.commit()
+
+                                        logger.info(f"💾 ✅ Boleto #{boleto_id} salvo na tabela boletos!")
+                                        sys.stdout.flush()
+                                    else:
+                                        logger.info(f"⏭️ Boleto já existe na tabela boletos")
+                                        sys.stdout.flush()
+                                else:
+                                    logger.warning(f"⚠️ Cliente não encontrado para CPF {cpf}")
+                                    sys.stdout.flush()
+                            else:
+                                logger.warning(f"⚠️ Falha ao extrair dados do PDF")
+                                sys.stdout.flush()
+
+                        except Exception as e_boleto:
+                            logger.error(f"❌ Erro ao salvar boleto na tabela boletos: {e_boleto}")
+                            logger.exception("Traceback:")
+                            sys.stdout.flush()
+
+                    else:
+                        logger.info(f"⏭️ Download já registrado: {arquivo_nome}")
+                        sys.stdout.flush()
+
+    except Exception as e_import:
+        logger.error(f"❌ Erro ao registrar download no banco: {e_import}")
+        logger.exception("Traceback:")
+        sys.stdout.flush()
+
+
 @automation_canopus_bp.route('/baixar-boletos-ponto-venda', methods=['POST'])
 @handle_errors
 def baixar_boletos_ponto_venda():
@@ -1287,22 +1621,36 @@ def baixar_boletos_ponto_venda():
             'error': 'Automação Canopus não disponível. Execute: instalar_canopus.bat'
         }), 503
 
-    # Verificar se já há execução ativa
-    global execution_status
-    if execution_status['ativo']:
+    # Verificar se já há execução ativa (neste ou em outro processo)
+    execucao_ativa = execucao_em_andamento()
+    if execucao_ativa:
         logger.warning("⚠️ Já existe uma execução em andamento")
         return jsonify({
             'success': False,
             'error': 'Já existe uma execução em andamento. Aguarde a conclusão.',
-            'status_atual': execution_status.copy()
+            'status_atual': execucao_ativa
         }), 409  # 409 Conflict
 
     data = request.get_json() or {}
     ponto_venda = data.get('ponto_venda', '24627')
     mes = data.get('mes')
     ano = data.get('ano')
-
-    logger.info(f"🚀 Iniciando download de boletos - PV: {ponto_venda}, Mês: {mes}, Ano: {ano}")
+    # Número de contextos Playwright em paralelo (1 = sequencial, padrão)
+    try:
+        concorrencia = max(1, int(data.get('concorrencia') or os.getenv('CANOPUS_CONCORRENCIA', '1')))
+    except (TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'error': f"Concorrência inválida: '{data.get('concorrencia')}' (use um número inteiro)"
+        }), 400
+    # Backend de download: 'playwright' (navegador), 'http' (postbacks diretas com fallback)
+    # ou 'http_async' (aiohttp, uma sessão por contexto)
+    backend_tipo = (data.get('backend') or os.getenv('CANOPUS_BACKEND', 'playwright')).lower()
+    erro_backend = erro_backend_invalido(backend_tipo)
+    if erro_backend:
+        return erro_backend
+
+    logger.info(f"🚀 Iniciando download de boletos - PV: {ponto_venda}, Mês: {mes}, Ano: {ano}, Concorrência: {concorrencia}, Backend: {backend_tipo}")
     logger.info(f"📋 Dados recebidos: {data}")
 
     # Criar orquestrador
@@ -1426,8 +1774,35 @@ def baixar_boletos_ponto_venda():
         # Pegar apenas os CPFs a partir do índice de início (continuar sequencialmente)
         cpfs = cpfs_todos[indice_inicio:]
 
+        if concorrencia > 1:
+            # No modo paralelo os CPFs terminam fora de ordem, então retomar pelo
+            # último índice poderia pular CPFs que estavam em andamento.
+            # Em vez disso, processar todos os CPFs ainda não baixados no mês.
+            try:
+                with get_db_connection() as conn_check:
+                    with conn_check.cursor() as cur_check:
+                        cur_check.execute("""
+                            SELECT DISTINCT cpf
+                            FROM downloads_canopus
+                            WHERE status = 'sucesso'
+                            AND EXTRACT(MONTH FROM data_download) = %s
+                            AND EXTRACT(YEAR FROM data_download) = %s
+                            AND cpf = ANY(%s)
+                        """, (mes, ano if ano else 2025, cpfs_todos))
+                        cpfs_baixados = {row['cpf'] for row in cur_check.fetchall()}
+
+                cpfs = [c for c in cpfs_todos if c not in cpfs_baixados]
+                indice_inicio = 0
+                total_ja_baixados = len(cpfs_todos) - len(cpfs)
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao verificar CPFs já baixados: {e}")
+                sys.stdout.flush()
+
         logger.info("=" * 80)
-        logger.info(f"🎯 INICIANDO DOWNLOADS SEQUENCIAIS")
+        if concorrencia > 1:
+            logger.info(f"🎯 INICIANDO DOWNLOADS PARALELOS ({concorrencia} contextos)")
+        else:
+            logger.info(f"🎯 INICIANDO DOWNLOADS SEQUENCIAIS")
         logger.info(f"   Índice de início: {indice_inicio + 1}/{len(cpfs_todos)}")
         logger.info(f"   CPFs a processar: {len(cpfs)}")
         if len(cpfs) > 0:
@@ -1493,7 +1868,7 @@ def baixar_boletos_ponto_venda():
                     logger.info(f"📂 Path adicionado ao sys.path: {root_path}")
 
                 # Agora sim importar
-                from automation.canopus.canopus_automation import CanopusAutomation
+                from canopus_backends import criar_backend
 
                 atualizar_status(etapa='Configurando diretórios...')
 
@@ -1560,8 +1935,84 @@ def baixar_boletos_ponto_venda():
 
                 atualizar_status(etapa='Abrindo navegador Chromium...')
 
-                async with CanopusAutomation(headless=headless_mode) as bot:
-                    logger.info("✅ Chromium aberto!")
+                if concorrencia > 1:
+                    # ============================================================
+                    # MODO POOL: N contextos isolados consumindo a mesma fila
+                    # ============================================================
+                    from canopus_pool import CanopusPool
+                    from automation.canopus.canopus_config import CanopusConfig
+
+                    async def ao_concluir(posicao, cpf, resultado, concluidos):
+                        status_cpf = resultado.get('status')
+                        stats['processados'] += 1
+
+                        if status_cpf == CanopusConfig.Status.SUCESSO:
+                            stats['sucessos'] += 1
+                            logger.info(f"✅ SUCESSO! Boleto {posicao}/{len(cpfs)} baixado: {cpf}")
+                            # Registro no banco é síncrono: roda fora do event loop
+                            await asyncio.to_thread(
+                                registrar_download_canopus, cpf, resultado, mes, ano,
+                                f'{concluidos}/{len(cpfs)}'
+                            )
+                        elif status_cpf == CanopusConfig.Status.CPF_NAO_ENCONTRADO:
+                            stats['cpf_nao_encontrado'] += 1
+                            logger.warning(f"⚠️ CPF {posicao}/{len(cpfs)} NÃO ENCONTRADO: {cpf}")
+                        elif status_cpf == CanopusConfig.Status.SEM_BOLETO:
+                            stats['sem_boleto'] += 1
+                            logger.warning(f"📄 SEM BOLETO: {cpf} - {resultado.get('mensagem')}")
+                        else:
+                            stats['erros'] += 1
+                            logger.error(f"❌ ERRO no CPF {cpf}: {resultado.get('mensagem')}")
+                            atualizar_status(erro=f"CPF {cpf}: {resultado.get('mensagem')}")
+
+                        atualizar_status(
+                            etapa=f'Processados {concluidos}/{len(cpfs)} clientes',
+                            progresso=concluidos
+                        )
+                        sys.stdout.flush()
+
+                    atualizar_status(etapa=f'Fazendo login em {concorrencia} contextos (PV: {usuario_login})...')
+
+                    pool = CanopusPool(
+                        usuario=usuario_login,
+                        senha=senha,
+                        codigo_empresa=codigo_empresa,
+                        ponto_venda=ponto_venda,
+                        headless=headless_mode,
+                        backend=backend_tipo,
+                        concorrencia=concorrencia
+                    )
+
+                    try:
+                        resumo_pool = await pool.processar(
+                            cpfs=cpfs,
+                            mes=mes,
+                            ano=int(ano) if ano else 2025,
+                            destino=pasta_destino,
+                            ao_concluir=ao_concluir
+                        )
+                    except Exception as e_pool:
+                        logger.error(f"❌ Erro no pool de downloads: {e_pool}")
+                        logger.exception("Traceback completo:")
+                        atualizar_status(etapa=f'Erro no pool: {str(e_pool)}', erro=str(e_pool))
+                        finalizar_execucao(sucesso=False)
+                        return
+
+                    logger.info("=" * 80)
+                    logger.info(f"🎉 DOWNLOADS CONCLUÍDOS ({resumo_pool['workers']} contextos)")
+                    logger.info(f"✅ Sucessos: {stats['sucessos']}")
+                    logger.info(f"❌ Erros: {stats['erros']}")
+                    logger.info(f"⚠️ CPF não encontrado: {stats['cpf_nao_encontrado']}")
+                    logger.info(f"📄 Sem boleto: {stats['sem_boleto']}")
+                    logger.info(f"📊 Total processados: {stats['processados']}/{stats['total']}")
+                    logger.info("=" * 80)
+                    sys.stdout.flush()
+
+                    finalizar_execucao(sucesso=True)
+                    return
+
+                async with criar_backend(backend_tipo, headless=headless_mode) as bot:
+                    logger.info(f"✅ Backend '{backend_tipo}' iniciado!")
                     sys.stdout.flush()
 
                     # Fazer login
@@ -1683,248 +2134,7 @@ def baixar_boletos_ponto_venda():
                                 sys.stdout.flush()
 
                                 # REGISTRAR DOWNLOAD NA TABELA downloads_canopus
-                                try:
-                                    logger.info("🔍 DEBUG: Iniciando processo de registro no banco...")
-                                    sys.stdout.flush()
-
-                                    arquivo_caminho = resultado.get('dados_boleto', {}).get('arquivo_caminho')
-                                    arquivo_nome = resultado.get('dados_boleto', {}).get('arquivo_nome')
-                                    arquivo_tamanho = resultado.get('dados_boleto', {}).get('arquivo_tamanho', 0)
-
-                                    logger.info(f"🔍 DEBUG: arquivo_caminho={arquivo_caminho}")
-                                    logger.info(f"🔍 DEBUG: arquivo_nome={arquivo_nome}")
-                                    logger.info(f"🔍 DEBUG: arquivo_tamanho={arquivo_tamanho}")
-                                    sys.stdout.flush()
-
-                                    if not arquivo_caminho:
-                                        logger.error("❌ DEBUG: arquivo_caminho está None!")
-                                        sys.stdout.flush()
-                                    elif not Path(arquivo_caminho).exists():
-                                        logger.error(f"❌ DEBUG: Arquivo não existe: {arquivo_caminho}")
-                                        sys.stdout.flush()
-                                    else:
-                                        logger.info(f"✅ DEBUG: Arquivo existe: {arquivo_caminho}")
-                                        sys.stdout.flush()
-
-                                        atualizar_status(etapa=f'Convertendo PDF para base64... ({idx}/{len(cpfs)})')
-
-                                        # CONVERTER PDF PARA BASE64
-                                        import base64
-                                        try:
-                                            with open(arquivo_caminho, 'rb') as pdf_file:
-                                                pdf_bytes = pdf_file.read()
-                                                pdf_base64 = base64.b64encode(pdf_bytes).decode('utf-8')
-
-                                            logger.info(f"✅ PDF convertido para base64: {len(pdf_base64)} caracteres")
-                                            sys.stdout.flush()
-                                        except Exception as e_base64:
-                                            logger.error(f"❌ Erro ao converter PDF para base64: {e_base64}")
-                                            sys.stdout.flush()
-                                            continue
-
-                                        atualizar_status(etapa=f'Registrando download no banco... ({idx}/{len(cpfs)})')
-
-                                        logger.info("🔍 DEBUG: Conectando ao banco...")
-                                        sys.stdout.flush()
-
-                                        with get_db_connection() as conn_import:
-                                            with conn_import.cursor() as cur_import:
-                                                logger.info(f"🔍 DEBUG: Buscando consultor_id para CPF {cpf}...")
-                                                sys.stdout.flush()
-
-                                                # Buscar consultor_id pelo CPF do cliente
-                                                cur_import.execute("""
-                                                    SELECT consultor_id FROM clientes_finais
-                                                    WHERE cpf = %s AND ativo = TRUE
-                                                    LIMIT 1
-                                                """, (cpf,))
-
-                                                consultor_row = cur_import.fetchone()
-                                                consultor_id = consultor_row['consultor_id'] if consultor_row else None
-
-                                                logger.info(f"🔍 DEBUG: consultor_id encontrado: {consultor_id}")
-                                                sys.stdout.flush()
-
-                                                # Verificar se download já existe
-                                                logger.info(f"🔍 DEBUG: Verificando se download já existe...")
-                                                sys.stdout.flush()
-
-                                                cur_import.execute("""
-                                                    SELECT id FROM downloads_canopus
-                                                    WHERE cpf = %s AND nome_arquivo = %s
-                                                """, (cpf, arquivo_nome))
-
-                                                existe = cur_import.fetchone()
-                                                logger.info(f"🔍 DEBUG: Download existe? {existe is not None}")
-                                                sys.stdout.flush()
-
-                                                if not existe:
-                                                    logger.info(f"🔍 DEBUG: Inserindo registro no banco...")
-                                                    logger.info(f"   CPF: {cpf}")
-                                                    logger.info(f"   Consultor ID: {consultor_id}")
-                                                    logger.info(f"   Nome arquivo: {arquivo_nome}")
-                                                    logger.info(f"   Tamanho base64: {len(pdf_base64)} caracteres")
-                                                    logger.info(f"   Tamanho bytes: {arquivo_tamanho}")
-                                                    sys.stdout.flush()
-
-                                                    # Inserir registro de download COM BASE64
-                                                    cur_import.execute("""
-                                                        INSERT INTO downloads_canopus (
-                                                            consultor_id,
-                                                            cpf,
-                                                            nome_arquivo,
-                                                            caminho_arquivo,
-                                                            tamanho_bytes,
-                                                            status,
-                                                            data_download,
-                                                            created_at
-                                                        ) VALUES (
-                                                            %s, %s, %s, %s, %s, 'sucesso', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
-                                                        )
-                                                    """, (
-                                                        consultor_id,
-                                                        cpf,
-                                                        arquivo_nome,
-                                                        pdf_base64,  # SALVANDO BASE64 ao invés do caminho
-                                                        arquivo_tamanho
-                                                    ))
-
-                                                    logger.info("🔍 DEBUG: Fazendo commit...")
-                                                    sys.stdout.flush()
-
-                                                    conn_import.commit()
-
-                                                    logger.info(f"💾 ✅ Download registrado no banco: {arquivo_nome}")
-                                                    sys.stdout.flush()
-
-                                                    # EXTRAIR DADOS DO PDF E SALVAR NA TABELA BOLETOS
-                                                    try:
-                                                        logger.info("📄 Extraindo dados do PDF para tabela boletos...")
-                                                        sys.stdout.flush()
-
-                                                        from services.pdf_extractor import extrair_dados_boleto
-
-                                                        dados_pdf = extrair_dados_boleto(arquivo_caminho)
-
-                                                        if dados_pdf.get('sucesso'):
-                                                            logger.info(f"✅ Dados extraídos: venc={dados_pdf.get('vencimento_str')}, valor=R$ {dados_pdf.get('valor', 0):.2f}")
-                                                            sys.stdout.flush()
-
-                                                            # Buscar cliente_final_id pelo CPF
-                                                            cur_import.execute("""
-                                                                SELECT id, consultor_id FROM clientes_finais
-                                                                WHERE cpf = %s AND ativo = TRUE
-                                                                LIMIT 1
-                                                            """, (cpf,))
-
-                                                            cliente_row = cur_import.fetchone()
-
-                                                            if cliente_row:
-                                                                cliente_final_id = cliente_row['id']
-                                                                consultor_id_boleto = cliente_row['consultor_id']
-
-                                                                # Buscar cliente_nexus_id do consultor
-                                                                cur_import.execute("""
-                                                                    SELECT cliente_nexus_id FROM consultores
-                                                                    WHERE id = %s
-                                                                    LIMIT 1
-                                                                """, (consultor_id_boleto,))
-
-                                                                consultor_nexus = cur_import.fetchone()
-                                                                cliente_nexus_id = consultor_nexus['cliente_nexus_id'] if consultor_nexus else 1
-
-                                                                # Verificar se boleto já existe
-                                                                numero_boleto = dados_pdf.get('nosso_numero') or dados_pdf.get('grupo_cota') or f"CANOPUS-{cpf}"
-
-                                                                cur_import.execute("""
-                                                                    SELECT id FROM boletos
-                                                                    WHERE cliente_final_id = %s
-                                                                    AND data_vencimento = %s
-                                                                    AND valor_original = %s
-                                                                    LIMIT 1
-                                                                """, (
-                                                                    cliente_final_id,
-                                                                    dados_pdf.get('vencimento'),
-                                                                    dados_pdf.get('valor', 0)
-                                                                ))
-
-                                                                boleto_existe = cur_import.fetchone()
-
-                                                                if not boleto_existe:
-                                                                    # Extrair mês e ano do vencimento
-                                                                    vencimento = dados_pdf.get('vencimento')
-                                                                    mes_ref = vencimento.month if vencimento else mes
-                                                                    ano_ref = vencimento.year if vencimento else (int(ano) if ano else 2025)
-
-                                                                    # Inserir boleto
-                                                                    cur_import.execute("""
-                                                                        INSERT INTO boletos (
-                                                                            cliente_final_id,
-                                                                            cliente_nexus_id,
-                                                                            numero_boleto,
-                                                                            valor_original,
-                                                                            data_vencimento,
-                                                                            data_emissao,
-                                                                            mes_referencia,
-                                                                            ano_referencia,
-                                                                            numero_parcela,
-                                                                            descricao,
-                                                                            status,
-                                                                            status_envio,
-                                                                            pdf_filename,
-                                                                            pdf_path,
-                                                                            pdf_size,
-                                                                            gerado_por,
-                                                                            created_at,
-                                                                            updated_at
-                                                                        ) VALUES (
-                                                                            %s, %s, %s, %s, %s, CURRENT_DATE, %s, %s,
-                                                                            1, %s, 'pendente', 'nao_enviado',
-                                                                            %s, %s, %s, 'automacao_canopus',
-                                                                            NOW(), NOW()
-                                                                        ) RETURNING id
-                                                                    """, (
-                                                                        cliente_final_id,
-                                                                        cliente_nexus_id,
-                                                                        numero_boleto,
-                                                                        dados_pdf.get('valor', 0),
-                                                                        dados_pdf.get('vencimento'),
-                                                                        mes_ref,
-                                                                        ano_ref,
-                                                                        f"Boleto {dados_pdf.get('grupo_cota', '')}",
-                                                                        arquivo_nome,
-                                                                        arquivo_caminho,
-                                                                        arquivo_tamanho
-                                                                    ))
-
-                                                                    boleto_id = cur_import.fetchone()['id']
-                                                                    conn_import.commit()
-
-                                                                    logger.info(f"💾 ✅ Boleto #{boleto_id} salvo na tabela boletos!")
-                                                                    sys.stdout.flush()
-                                                                else:
-                                                                    logger.info(f"⏭️ Boleto já existe na tabela boletos")
-                                                                    sys.stdout.flush()
-                                                            else:
-                                                                logger.warning(f"⚠️ Cliente não encontrado para CPF {cpf}")
-                                                                sys.stdout.flush()
-                                                        else:
-                                                            logger.warning(f"⚠️ Falha ao extrair dados do PDF")
-                                                            sys.stdout.flush()
-
-                                                    except Exception as e_boleto:
-                                                        logger.error(f"❌ Erro ao salvar boleto na tabela boletos: {e_boleto}")
-                                                        logger.exception("Traceback:")
-                                                        sys.stdout.flush()
-
-                                                else:
-                                                    logger.info(f"⏭️ Download já registrado: {arquivo_nome}")
-                                                    sys.stdout.flush()
-
-                                except Exception as e_import:
-                                    logger.error(f"❌ Erro ao registrar download no banco: {e_import}")
-                                    logger.exception("Traceback:")
-                                    sys.stdout.flush()
+                                registrar_download_canopus(cpf, resultado, mes, ano, rotulo=f'{idx}/{len(cpfs)}')
 
                                 # Atualizar status com sucesso
                                 atualizar_status(
@@ -1932,26 +2142,19 @@ def baixar_boletos_ponto_venda():
                                     progresso=idx
                                 )
 
-                                # Aguardar 3 segundos antes do próximo (para você ver o sucesso)
-                                await asyncio.sleep(3)
-
                             elif resultado.get('status') == CanopusConfig.Status.CPF_NAO_ENCONTRADO:
                                 stats['cpf_nao_encontrado'] += 1
                                 stats['processados'] += 1
                                 logger.warning("=" * 80)
                                 logger.warning(f"⚠️ CPF {idx}/{len(cpfs)} NÃO ENCONTRADO: {cpf}")
-                                logger.warning("Aguardando 5 segundos antes de continuar...")
                                 logger.warning("=" * 80)
-                                await asyncio.sleep(5)
 
                             elif resultado.get('status') == CanopusConfig.Status.SEM_BOLETO:
                                 stats['sem_boleto'] += 1
                                 stats['processados'] += 1
                                 logger.warning("=" * 80)
                                 logger.warning(f"📄 SEM BOLETO: {cpf} - {resultado.get('mensagem')}")
-                                logger.warning("Aguardando 5 segundos antes de continuar...")
                                 logger.warning("=" * 80)
-                                await asyncio.sleep(5)
 
                             else:
                                 stats['erros'] += 1
@@ -1959,9 +2162,9 @@ def baixar_boletos_ponto_venda():
                                 logger.error("=" * 80)
                                 logger.error(f"❌ ERRO no CPF {idx}/{len(cpfs)}: {cpf}")
                                 logger.error(f"Mensagem: {resultado.get('mensagem')}")
-                                logger.error("Aguardando 5 segundos antes de continuar...")
                                 logger.error("=" * 80)
-                                await asyncio.sleep(5)
+                                # Só falha de verdade dá um respiro ao Canopus antes do próximo
+                                await asyncio.sleep(bot.config.DELAYS['entre_tentativas'])
 
                         except Exception as e:
                             stats['erros'] += 1
@@ -1969,9 +2172,8 @@ def baixar_boletos_ponto_venda():
                             logger.error("=" * 80)
                             logger.error(f"❌ EXCEÇÃO no CPF {idx}/{len(cpfs)}: {cpf}")
                             logger.error(f"Erro: {str(e)}")
-                            logger.error("Aguardando 5 segundos antes de continuar...")
                             logger.error("=" * 80)
-                            await asyncio.sleep(5)
+                            await asyncio.sleep(bot.config.DELAYS['entre_tentativas'])
 
                     # Monitoramento final de memória
                     mem_final = process.memory_info().rss / 1024 / 1024
@@ -2007,6 +2209,7 @@ def baixar_boletos_ponto_venda():
                 finalizar_execucao(sucesso=False)
                 atualizar_status(erro=str(e))
             finally:
+                loop.run_until_complete(Database.fechar_pool_async())
                 loop.close()
 
         # Iniciar thread em background
@@ -2032,6 +2235,8 @@ def baixar_boletos_ponto_venda():
                 'ja_baixados': total_ja_baixados,
                 'a_processar': len(cpfs),
                 'indice_inicio': indice_inicio + 1,
+                'concorrencia': concorrencia,
+                'backend': backend_tipo,
                 'status': 'iniciado',
                 'info': 'Acompanhe o progresso em tempo real no monitoramento'
             }
@@ -2128,138 +2333,50 @@ def importar_planilha_dener():
         # ====================================================================
         logger.info(f"💾 ETAPA 2: Importando {len(clientes)} clientes para o banco...")
 
-        importados = 0
-        atualizados = 0
-        erros = 0
-        erros_detalhes = []
-
-        for idx, cliente in enumerate(clientes, 1):
-            conn = None
-            try:
-                cpf = cliente['cpf']
-                cpf_formatado = cliente['cpf_formatado']
-                nome = cliente['nome']
-                ponto_venda = cliente['ponto_venda']
-
-                logger.debug(f"[{idx}/{len(clientes)}] Processando: {nome} (CPF: {cpf_formatado}, PV: {ponto_venda})")
-
-                conn = get_db_connection()
-                with conn.cursor() as cur:
-                    # Verificar se cliente já existe (buscar por CPF + PV)
-                    cur.execute("""
-                        SELECT id, nome_completo FROM clientes_finais
-                        WHERE cpf = %s AND ponto_venda = %s
-                    """, (cpf, ponto_venda))
-
-                    existing = cur.fetchone()
-
-                    # Gerar número de contrato único
-                    numero_contrato = f"CANOPUS-{ponto_venda}-{cpf}"
+        linhas = [{
+            'cpf': cliente['cpf'],
+            'nome_completo': cliente['nome'],
+            'ponto_venda': cliente['ponto_venda'],
+            'origem': f"PLANILHA_DENER_PV{cliente['ponto_venda']}",
+        } for cliente in clientes]
 
-                    # Buscar ID do consultor (Dener/Danner)
-                    cur.execute("""
-                        SELECT id FROM consultores
-                        WHERE nome ILIKE '%dener%' OR nome ILIKE '%danner%' OR nome ILIKE '%den%'
-                        LIMIT 1
-                    """)
-                    consultor_row = cur.fetchone()
-                    consultor_id = consultor_row['id'] if consultor_row else None
-
-                    # Buscar primeiro cliente_nexus disponível
-                    cur.execute("SELECT id FROM clientes_nexus ORDER BY id LIMIT 1")
-                    cliente_nexus_row = cur.fetchone()
-                    cliente_nexus_id = cliente_nexus_row['id'] if cliente_nexus_row else None
-
-                    if existing:
-                        # ========== ATUALIZAR CLIENTE EXISTENTE ==========
-                        cliente_id = existing['id']
-                        logger.info(f"   🔄 Atualizando cliente existente (ID: {cliente_id}): {nome}")
-
-                        cur.execute("""
-                            UPDATE clientes_finais
-                            SET nome_completo = %s,
-                                ponto_venda = %s,
-                                numero_contrato = %s,
-                                consultor_id = %s,
-                                updated_at = CURRENT_TIMESTAMP
-                            WHERE id = %s
-                        """, (nome, ponto_venda, numero_contrato, consultor_id, cliente_id))
-
-                        atualizados += 1
-                        logger.debug(f"   ✅ Cliente atualizado!")
-
-                    else:
-                        # ========== INSERIR NOVO CLIENTE ==========
-                        logger.info(f"   ➕ Criando novo cliente: {nome} (CPF: {cpf_formatado}, PV: {ponto_venda})")
-
-                        # Dados básicos obrigatórios
-                        whatsapp = '5567999999999'  # Placeholder
-                        telefone_celular = whatsapp
-
-                        cur.execute("""
-                            INSERT INTO clientes_finais (
-                                cliente_nexus_id,
-                                nome_completo,
-                                cpf,
-                                telefone_celular,
-                                whatsapp,
-                                numero_contrato,
-                                grupo_consorcio,
-                                cota_consorcio,
-                                valor_credito,
-                                valor_parcela,
-                                prazo_meses,
-                                data_adesao,
-                                status_contrato,
-                                origem,
-                                ativo,
-                                created_at,
-                                updated_at,
-                                consultor_id,
-                                ponto_venda
-                            ) VALUES (
-                                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                                %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, %s, %s
-                            )
-                        """, (
-                            cliente_nexus_id,  # 1. cliente_nexus_id
-                            nome,  # 2. nome_completo
-                            cpf,  # 3. cpf
-                            telefone_celular,  # 4. telefone_celular
-                            whatsapp,  # 5. whatsapp
-                            numero_contrato,  # 6. numero_contrato
-                            '0000',  # 7. grupo_consorcio (padrão)
-                            '001',  # 8. cota_consorcio (padrão)
-                            0.00,  # 9. valor_credito
-                            0.00,  # 10. valor_parcela
-                            80,  # 11. prazo_meses (padrão)
-                            datetime.now().date(),  # 12. data_adesao
-                            'ATIVO',  # 13. status_contrato
-                            f'PLANILHA_DENER_PV{ponto_venda}',  # 14. origem
-                            True,  # 15. ativo
-                            consultor_id,  # 16. consultor_id
-                            ponto_venda  # 17. ponto_venda
-                        ))
-
-                        importados += 1
-                        logger.debug(f"   ✅ Cliente criado!")
-
-                    conn.commit()
-
-                conn.close()
-
-            except Exception as e:
-                erros += 1
-                erro_msg = f"CPF {cliente.get('cpf_formatado', '?')}: {str(e)}"
-                erros_detalhes.append(erro_msg)
-                logger.error(f"   ❌ ERRO: {erro_msg}")
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                # Consultor (Dener/Danner) e cliente_nexus: uma vez para a planilha toda
+                cur.execute("""
+                    SELECT id FROM consultores
+                    WHERE nome ILIKE '%dener%' OR nome ILIKE '%danner%' OR nome ILIKE '%den%'
+                    LIMIT 1
+                """)
+                consultor_row = cur.fetchone()
+                consultor_id = consultor_row['id'] if consultor_row else None
+
+            cliente_nexus_id = _primeiro_cliente_nexus_id(conn)
+
+            # Clientes novos recebem os dados básicos obrigatórios de placeholder
+            resultado = sincronizar_clientes_finais(
+                conn,
+                [dict(linha, consultor_id=consultor_id) for linha in linhas],
+                padroes={
+                    'cliente_nexus_id': cliente_nexus_id,
+                    'whatsapp': '5567999999999',  # Placeholder
+                    'telefone_celular': '5567999999999',
+                    'grupo_consorcio': '0000',
+                    'cota_consorcio': '001',
+                    'valor_credito': 0,
+                    'valor_parcela': 0,
+                    'prazo_meses': 80,
+                    'data_adesao': datetime.now().date(),
+                    'status_contrato': 'ATIVO',
+                },
+                atualizar=('nome_completo', 'ponto_venda', 'numero_contrato', 'consultor_id'),
+                ao_progredir=_progresso_importacao(planilha_path.name),
+            )
 
-                if conn:
-                    try:
-                        conn.rollback()
-                        conn.close()
-                    except:
-                        pass
+        importados = resultado['criados']
+        atualizados = resultado['atualizados']
+        erros_detalhes = _erros_sincronizacao(resultado)
+        erros = resultado['ignorados'] + len(erros_detalhes)
 
         # ====================================================================
         # RESULTADO FINAL
@@ -2269,6 +2386,7 @@ def importar_planilha_dener():
         logger.info(f"   Total processado: {len(clientes)}")
         logger.info(f"   ➕ Novos clientes: {importados}")
         logger.info(f"   🔄 Atualizados: {atualizados}")
+        logger.info(f"   ⏸️ Inalterados: {resultado['inalterados']}")
         logger.info(f"   ❌ Erros: {erros}")
         logger.info(f"{'='*70}\n")
 
@@ -2279,6 +2397,7 @@ def importar_planilha_dener():
                 'total_processados': len(clientes),
                 'importados': importados,
                 'atualizados': atualizados,
+                'inalterados': resultado['inalterados'],
                 'erros': erros,
                 'erros_detalhes': erros_detalhes[:5],  # Primeiros 5 erros
                 'distribuicao_pv': resultado_extracao['estatisticas_pv']
@@ -2300,19 +2419,16 @@ def importar_planilha_dener():
 def importar_boletos():
     """
     Importa todos os PDFs da tabela downloads_canopus para o banco de dados
-    Lê cada PDF (base64), extrai dados e cria clientes + boletos
+    Usa as extrações de pdf_extracoes (extraindo em paralelo o que faltar)
+    e cria clientes + boletos em lote
     """
-    import base64
-    import tempfile
-    import os
-    from datetime import datetime
     from psycopg.rows import dict_row
 
     logger.info("📥 Iniciando importação de boletos da tabela downloads_canopus...")
 
     # Importar a função de extração de PDF
     sys.path.insert(0, str(backend_path))
-    from services.pdf_extractor import extrair_dados_boleto
+    from services.importador_boletos import ImportadorBoletosCanopus
 
     # Buscar cliente_nexus_id do usuário logado (não mais hardcoded)
     try:
@@ -2352,7 +2468,8 @@ def importar_boletos():
                         dc.id,
                         dc.cpf,
                         dc.nome_arquivo,
-                        dc.caminho_arquivo,
+                        dc.pdf_sha256,
+                        CASE WHEN dc.pdf_sha256 IS NULL THEN dc.caminho_arquivo END AS caminho_arquivo,
                         dc.tamanho_bytes
                     FROM downloads_canopus dc
                     WHERE dc.status = 'sucesso'
@@ -2389,231 +2506,16 @@ def importar_boletos():
 
     logger.info(f"📄 Encontrados {len(pdfs_db)} PDFs para processar")
 
-    stats = {
-        'total_pdfs': len(pdfs_db),
-        'clientes_criados': 0,
-        'clientes_existentes': 0,
-        'boletos_criados': 0,
-        'erros': 0,
-        'pdfs_sem_dados': 0
-    }
-
-    # Processar cada PDF
-    for idx, pdf_row in enumerate(pdfs_db, 1):
-        pdf_filename = pdf_row['nome_arquivo']
-        pdf_base64 = pdf_row['caminho_arquivo']
-        cpf_original = pdf_row['cpf']
-        conn = None
-        temp_pdf_path = None
-
-        logger.info(f"[{idx}/{len(pdfs_db)}] Processando: {pdf_filename[:50]}")
-
-        try:
-            # Decodificar PDF base64 e salvar em arquivo temporário
-            try:
-                pdf_bytes = base64.b64decode(pdf_base64)
-
-                # Criar arquivo temporário
-                temp_fd, temp_pdf_path = tempfile.mkstemp(suffix='.pdf')
-                os.close(temp_fd)  # Fechar file descriptor
-
-                with open(temp_pdf_path, 'wb') as f:
-                    f.write(pdf_bytes)
-
-                logger.info(f"   📄 PDF decodificado e salvo temporariamente")
-            except Exception as e:
-                logger.error(f"   ❌ Erro ao decodificar PDF base64: {e}")
-                stats['erros'] += 1
-                continue
-
-            # Extrair dados do PDF
-            dados_pdf = extrair_dados_boleto(temp_pdf_path)
-
-            if not dados_pdf.get('sucesso'):
-                logger.warning(f"   ⚠️  Não foi possível extrair dados do PDF")
-                stats['pdfs_sem_dados'] += 1
-                continue
-
-            # Dados extraídos
-            nome = dados_pdf.get('nome_pagador')
-            cpf = dados_pdf.get('cpf', '').replace('.', '').replace('-', '').strip()
-            vencimento = dados_pdf.get('vencimento')
-            valor = dados_pdf.get('valor', 0)
-            contrato = dados_pdf.get('contrato')
-
-            # ====== VALIDAÇÕES RIGOROSAS PARA GARANTIR 100% DE EXATIDÃO ======
-
-            # 1. Validar Nome
-            if not nome or len(nome.strip()) < 3:
-                logger.error(f"   ❌ VALIDAÇÃO FALHOU: Nome inválido ou muito curto: '{nome}'")
-                stats['erros'] += 1
-                continue
-
-            # 2. Validar CPF
-            if not cpf or len(cpf) != 11 or not cpf.isdigit():
-                logger.error(f"   ❌ VALIDAÇÃO FALHOU: CPF inválido: '{cpf}' (tamanho: {len(cpf)})")
-                stats['erros'] += 1
-                continue
-
-            # 3. Validar Vencimento
-            if not vencimento:
-                logger.error(f"   ❌ VALIDAÇÃO FALHOU: Vencimento não encontrado no PDF")
-                stats['erros'] += 1
-                continue
-
-            # 4. Validar Valor
-            if not valor or valor <= 0:
-                logger.error(f"   ❌ VALIDAÇÃO FALHOU: Valor inválido: R$ {valor}")
-                stats['erros'] += 1
-                continue
-
-            # 5. Validar Grupo/Cota
-            grupo_cota_completo = dados_pdf.get('grupo_cota', '')
-            if not grupo_cota_completo or grupo_cota_completo == 'N/A':
-                logger.warning(f"   ⚠️  Grupo/Cota não encontrado - usando valores padrão")
-
-            logger.info(f"   ✅ VALIDAÇÕES OK: Nome: {nome}, CPF: {cpf}, Valor: R$ {valor:.2f}, Venc: {vencimento.strftime('%d/%m/%Y') if vencimento else 'N/A'}")
-
-            conn = get_db_connection()
-            with conn.cursor() as cur:
-                # Verificar se cliente já existe (por CPF)
-                cur.execute("""
-                    SELECT id, nome_completo, whatsapp
-                    FROM clientes_finais
-                    WHERE cpf = %s AND cliente_nexus_id = %s
-                """, (cpf, cliente_nexus_id))
-
-                cliente_existente = cur.fetchone()
-
-                if cliente_existente:
-                    cliente_id = cliente_existente['id']
-                    logger.info(f"   ℹ️  Cliente já existe (ID: {cliente_id})")
-                    stats['clientes_existentes'] += 1
-                else:
-                    # Criar novo cliente
-                    logger.info(f"   ➕ Criando novo cliente...")
-
-                    whatsapp = '55679999999999'  # Placeholder
-                    telefone_celular = whatsapp
-                    numero_contrato = f"TEMP-{cpf}"
-
-                    # Separar grupo e cota do PDF
-                    grupo_cota_completo = dados_pdf.get('grupo_cota', '')
-                    if grupo_cota_completo and '-' in grupo_cota_completo:
-                        partes = grupo_cota_completo.split('-')
-                        grupo_consorcio = partes[0] if len(partes) > 0 else 'N/A'
-                        cota_consorcio = partes[1] if len(partes) > 1 else 'N/A'
-                    else:
-                        grupo_consorcio = 'N/A'
-                        cota_consorcio = 'N/A'
-
-                    valor_parcela = valor
-                    prazo_meses = 60
-                    data_adesao = datetime.now().date()
-
-                    cur.execute("""
-                        INSERT INTO clientes_finais
-                        (cliente_nexus_id, nome_completo, cpf, whatsapp, telefone_celular, numero_contrato,
-                         grupo_consorcio, cota_consorcio, valor_credito, valor_parcela, prazo_meses,
-                         data_adesao, ativo)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        RETURNING id
-                    """, (cliente_nexus_id, nome, cpf, whatsapp, telefone_celular, numero_contrato,
-                          grupo_consorcio, cota_consorcio, 0.0, valor_parcela, prazo_meses,
-                          data_adesao, True))
-
-                    novo_cliente = cur.fetchone()
-                    cliente_id = novo_cliente['id']
-                    logger.info(f"   ✅ Cliente criado (ID: {cliente_id})")
-                    stats['clientes_criados'] += 1
-
-                # Verificar se boleto já existe para este cliente e mês
-                mes_ref = vencimento.month if vencimento else datetime.now().month
-                ano_ref = vencimento.year if vencimento else datetime.now().year
-
-                boleto_existente = cur.execute("""
-                    SELECT id FROM boletos
-                    WHERE cliente_final_id = %s
-                    AND mes_referencia = %s
-                    AND ano_referencia = %s
-                """, (cliente_id, mes_ref, ano_ref))
-
-                if cur.fetchone():
-                    logger.info(f"   ℹ️  Boleto já existe para este cliente/mês - pulando")
-                    stats['boletos_ja_existentes'] = stats.get('boletos_ja_existentes', 0) + 1
-                    continue
-
-                # Criar boleto
-                logger.info(f"   ➕ Criando boleto...")
-
-                numero_boleto = contrato or f"CANOPUS-{cpf}-{mes_ref:02d}{ano_ref}"
-
-                # Usar base64 ou temp path (preferir não salvar path temporário)
-                pdf_path_salvar = None  # Não salvar path temporário, usar base64 de downloads_canopus
-
-                cur.execute("""
-                    INSERT INTO boletos
-                    (cliente_nexus_id, cliente_final_id, numero_boleto, valor_original,
-                     data_vencimento, data_emissao, mes_referencia, ano_referencia,
-                     numero_parcela, pdf_path, pdf_filename, pdf_size, status, status_envio, gerado_por)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id
-                """, (
-                    cliente_nexus_id,
-                    cliente_id,
-                    numero_boleto,
-                    valor,
-                    vencimento,
-                    datetime.now().date(),
-                    mes_ref,
-                    ano_ref,
-                    1,
-                    pdf_path_salvar,
-                    pdf_filename,
-                    pdf_row['tamanho_bytes'],
-                    'pendente',
-                    'nao_enviado',
-                    'importacao_canopus'
-                ))
-
-                novo_boleto = cur.fetchone()
-                boleto_id = novo_boleto['id']
-                logger.info(f"   ✅ Boleto criado (ID: {boleto_id})")
-                stats['boletos_criados'] += 1
-
-                # Commit apenas se tudo deu certo
-                conn.commit()
-                logger.info(f"   💾 Transação confirmada com sucesso!")
-
-        except Exception as e:
-            # Rollback em caso de erro
-            if conn:
-                try:
-                    conn.rollback()
-                    logger.error(f"   ↩️  Rollback realizado devido ao erro")
-                except:
-                    pass
-
-            logger.error(f"   ❌ ERRO ao processar PDF: {str(e)}")
-            import traceback
-            logger.error(f"   📋 Stack trace: {traceback.format_exc()}")
-            stats['erros'] += 1
-
-        finally:
-            # Limpar arquivo temporário
-            if temp_pdf_path and os.path.exists(temp_pdf_path):
-                try:
-                    os.remove(temp_pdf_path)
-                    logger.debug(f"   🗑️  Arquivo temporário removido")
-                except:
-                    pass
-
-            # Garantir fechamento da conexão
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
+    # Extração em pool de processos + gravação em lote (services/importador_boletos.py)
+    try:
+        stats = ImportadorBoletosCanopus(cliente_nexus_id).importar(pdfs_db)
+    except Exception as e:
+        logger.error(f"❌ Erro na importação em lote: {e}")
+        logger.exception("Traceback:")
+        return jsonify({
+            'success': False,
+            'error': f'Erro ao importar boletos: {str(e)}'
+        }), 500
 
     logger.info(f"✅ Importação concluída: {stats['boletos_criados']} boletos criados")
 
@@ -2625,7 +2527,7 @@ def importar_boletos():
             'importados': stats['boletos_criados'],
             'clientes_criados': stats['clientes_criados'],
             'clientes_existentes': stats['clientes_existentes'],
-            'ja_existentes': 0,  # Compatibilidade com frontend
+            'ja_existentes': stats['boletos_ja_existentes'],
             'sem_cliente': 0,  # Não se aplica - criamos clientes automaticamente
             'erros': stats['erros'],
             'pdfs_sem_dados': stats['pdfs_sem_dados']
@@ -2659,7 +2561,7 @@ def listar_boletos_baixados():
                         dc.id,
                         dc.cpf,
                         dc.nome_arquivo,
-                        dc.caminho_arquivo,
+                        dc.pdf_sha256,
                         dc.tamanho_bytes,
                         dc.status,
                         dc.data_download,
@@ -2702,7 +2604,7 @@ def listar_boletos_baixados():
 
                         boleto_info = {
                             'arquivo_nome': row.get('nome_arquivo', 'N/A'),
-                            'caminho': row.get('caminho_arquivo', 'N/A'),
+                            'caminho': row.get('pdf_sha256') or 'N/A',
                             'cliente_nome': row.get('cliente_nome', 'N/A'),
                             'cpf': row.get('cpf', 'N/A'),
                             'valor': valor_original,
@@ -2752,13 +2654,12 @@ def listar_boletos_baixados():
 @handle_errors
 def download_boleto():
     """
-    Faz download de um boleto específico DO BANCO DE DADOS (base64)
-    Compatível com Render - não depende de filesystem
+    Faz download de um boleto específico DO BANCO DE DADOS (pdf_blobs)
+    Compatível com Render - o arquivo local é só cache, refeito do banco se sumir
     """
-    import base64
-    from io import BytesIO
     from flask import send_file
     from psycopg.rows import dict_row
+    from services.pdf_blob_store import caminho_pdf_download
 
     nome_arquivo = request.args.get('nome')
 
@@ -2774,7 +2675,8 @@ def download_boleto():
                 cur.execute("""
                     SELECT
                         nome_arquivo,
-                        caminho_arquivo,
+                        pdf_sha256,
+                        CASE WHEN pdf_sha256 IS NULL THEN caminho_arquivo END AS caminho_arquivo,
                         tamanho_bytes
                     FROM downloads_canopus
                     WHERE nome_arquivo = %s
@@ -2787,28 +2689,21 @@ def download_boleto():
                     logger.error(f"❌ PDF não encontrado no banco: {nome_arquivo}")
                     return jsonify({'error': f'Arquivo não encontrado: {nome_arquivo}'}), 404
 
-                # Decodificar base64
-                pdf_base64 = row['caminho_arquivo']
-
-                try:
-                    pdf_bytes = base64.b64decode(pdf_base64)
-                    logger.info(f"✅ PDF decodificado: {len(pdf_bytes)} bytes")
-                except Exception as e:
-                    logger.error(f"❌ Erro ao decodificar base64: {e}")
-                    return jsonify({'error': 'Erro ao decodificar PDF'}), 500
+                pdf_path = caminho_pdf_download(row, conn)
 
-                # Criar BytesIO para enviar
-                pdf_io = BytesIO(pdf_bytes)
-                pdf_io.seek(0)
+                if not pdf_path:
+                    logger.error(f"❌ Registro sem PDF: {nome_arquivo}")
+                    return jsonify({'error': 'Erro ao ler PDF'}), 500
 
-                logger.info(f"📤 Enviando PDF: {nome_arquivo}")
+        logger.info(f"📤 Enviando PDF: {nome_arquivo}")
 
-                return send_file(
-                    pdf_io,
-                    as_attachment=True,
-                    download_name=nome_arquivo,
-                    mimetype='application/pdf'
-                )
+        # send_file transmite o arquivo do cache em blocos
+        return send_file(
+            str(pdf_path),
+            as_attachment=True,
+            download_name=nome_arquivo,
+            mimetype='application/pdf'
+        )
 
     except Exception as e:
         logger.error(f"❌ Erro ao buscar PDF: {e}")
@@ -2820,7 +2715,7 @@ def download_boleto():
 def limpar_downloads_antigos():
     """
     Remove downloads com caminho de arquivo (formato antigo)
-    Mantém apenas downloads com base64 (formato novo)
+    Mantém downloads com PDF armazenado (pdf_blobs ou base64 ainda não migrado)
     """
     try:
         with get_db_connection() as conn:
@@ -2828,7 +2723,8 @@ def limpar_downloads_antigos():
                 # Contar quantos registros serão removidos
                 cur.execute("""
                     SELECT COUNT(*) as total FROM downloads_canopus
-                    WHERE caminho_arquivo NOT LIKE 'JVBERi0%'
+                    WHERE pdf_sha256 IS NULL
+                    AND caminho_arquivo NOT LIKE 'JVBERi0%'
                     AND caminho_arquivo NOT LIKE 'JVBER%'
                 """)
                 total_antigos = cur.fetchone()['total']
@@ -2839,7 +2735,8 @@ def limpar_downloads_antigos():
                 # Base64 de PDF sempre começa com "JVBERi0" (%PDF em base64)
                 cur.execute("""
                     DELETE FROM downloads_canopus
-                    WHERE caminho_arquivo NOT LIKE 'JVBERi0%'
+                    WHERE pdf_sha256 IS NULL
+                    AND caminho_arquivo NOT LIKE 'JVBERi0%'
                     AND caminho_arquivo NOT LIKE 'JVBER%'
                 """)
 
@@ -3038,246 +2935,241 @@ def resetar_e_reimportar():
     - Limpa tabelas clientes_finais e boletos
     - Importa clientes do Excel (DENER__PLANILHA_GERAL.xlsx)
     - Importa boletos da pasta D:/Nexus/automation/canopus/downloads/Danner
+
+    Limpeza e reimportação rodam numa única transação: se a reimportação
+    falhar, os dados antigos voltam (rollback) em vez de ficarem apagados.
     """
-    import pandas as pd
-    from pathlib import Path
+    from services.excel_extractor import ler_blocos_planilha, limpar_cpfs, formatar_cpfs
 
     logger.info("🔄 Iniciando reset e reimportação completa...")
 
-    try:
-        db = Database()
-        conn = db.get_connection()
-        cur = conn.cursor()
-
-        # ==================================================
-        # 1. LIMPAR DADOS ANTIGOS
-        # ==================================================
-        logger.info("🗑️ Limpando dados antigos...")
+    # Conferir as origens ANTES de apagar qualquer coisa
+    excel_path = PLANILHA_REIMPORTACAO
+    downloads_dir = PASTA_BOLETOS_REIMPORTACAO
 
-        cur.execute("DELETE FROM boletos")
-        boletos_deletados = cur.rowcount
-        logger.info(f"   ✓ {boletos_deletados} boletos deletados")
-
-        cur.execute("DELETE FROM clientes_finais")
-        clientes_deletados = cur.rowcount
-        logger.info(f"   ✓ {clientes_deletados} clientes deletados")
-
-        conn.commit()
-
-        # ==================================================
-        # 2. IMPORTAR CLIENTES DO EXCEL
-        # ==================================================
-        logger.info("📊 Importando clientes do Excel...")
+    if not excel_path.exists():
+        return jsonify({
+            'success': False,
+            'error': f'Arquivo Excel não encontrado: {excel_path}'
+        }), 404
 
-        excel_path = Path(r"D:\Nexus\automation\canopus\excel_files\DENER__PLANILHA_GERAL.xlsx")
+    if not downloads_dir.exists():
+        return jsonify({
+            'success': False,
+            'error': f'Pasta de boletos não encontrada: {downloads_dir}'
+        }), 404
 
-        if not excel_path.exists():
-            return jsonify({
-                'success': False,
-                'error': f'Arquivo Excel não encontrado: {excel_path}'
-            }), 404
+    try:
+        # Commit só no fim do with; qualquer exceção desfaz tudo
+        with Database.conexao() as conn:
+            cur = conn.cursor()
 
-        # Ler Excel (header=11 conforme código existente)
-        df = pd.read_excel(excel_path, sheet_name=0, header=11)
+            # ==================================================
+            # 1. LIMPAR DADOS ANTIGOS
+            # ==================================================
+            logger.info("🗑️ Limpando dados antigos...")
 
-        # IMPORTANTE: Pular a primeira linha, que contém os cabeçalhos duplicados
-        df = df[1:].reset_index(drop=True)
+            cur.execute("DELETE FROM boletos")
+            boletos_deletados = cur.rowcount
+            logger.info(f"   ✓ {boletos_deletados} boletos deletados")
 
-        # Filtrar apenas linhas válidas (tem CPF e Nome)
-        # Unnamed: 0 = CPF, Unnamed: 5 = Nome do Cliente
-        df = df[df['Unnamed: 0'].notna() & df['Unnamed: 5'].notna()]
+            cur.execute("DELETE FROM clientes_finais")
+            clientes_deletados = cur.rowcount
+            logger.info(f"   ✓ {clientes_deletados} clientes deletados")
 
-        clientes_importados = 0
-        clientes_erros = 0
+            # ==================================================
+            # 2. IMPORTAR CLIENTES DO EXCEL
+            # ==================================================
+            logger.info("📊 Importando clientes do Excel...")
 
-        # Buscar cliente_nexus_id do Danner
-        cur.execute("SELECT id FROM consultores WHERE nome = 'Danner' LIMIT 1")
-        consultor = cur.fetchone()
-        consultor_id = consultor[0] if consultor else None
+            clientes_importados = 0
+            clientes_erros = 0
 
-        for index, row in df.iterrows():
-            try:
-                # Extrair dados (CORRIGIDO: Unnamed: 0 = CPF, Unnamed: 5 = Nome)
-                cpf_raw = str(row['Unnamed: 0']).strip()
-                nome_raw = str(row['Unnamed: 5']).strip()
+            # Buscar cliente_nexus_id do Danner
+            cur.execute("SELECT id FROM consultores WHERE nome = 'Danner' LIMIT 1")
+            consultor = cur.fetchone()
+            consultor_id = consultor[0] if consultor else None
+
+            # Buscar primeiro cliente_nexus disponível (para evitar FK error)
+            # NOTA: Idealmente deveria vir da sessão do usuário, mas como é automação,
+            # usa o primeiro cliente_nexus disponível
+            cur.execute("SELECT id FROM clientes_nexus ORDER BY id LIMIT 1")
+            cliente_nexus_row = cur.fetchone()
+            cliente_nexus_id_import = cliente_nexus_row[0] if cliente_nexus_row else None
+
+            # Ler Excel em streaming (header=11 conforme código existente), só as
+            # colunas usadas: 0 = CPF, 5 = Nome do Cliente.
+            # IMPORTANTE: Pular a primeira linha, que contém os cabeçalhos duplicados
+            # CPF repetido na planilha: vale a última ocorrência
+            clientes_por_cpf = {}
+            exemplos_invalidos = []
+
+            for bloco in ler_blocos_planilha(excel_path, 11, [0, 5], pular_linhas=1):
+                cpf_raw = bloco[0].astype('string').str.strip()
+                nome_raw = bloco[5].astype('string').str.strip()
 
                 # Pular linhas vazias ou inválidas
-                if cpf_raw.lower() in ['nan', 'none', ''] or nome_raw.lower() in ['nan', 'none', '']:
-                    continue
-
-                # Limpar nome (remover sufixos como "- 70%", "70%", etc)
-                import re
-                nome = re.sub(r'\s*-?\s*\d+%?', '', nome_raw).strip()
-
-                # Limpar CPF (remover pontos, hífens, espaços)
-                cpf = ''.join(filter(str.isdigit, cpf_raw))
-
-                # Validar CPF (deve ter exatamente 11 dígitos)
-                if not cpf or len(cpf) != 11 or not cpf.isdigit():
-                    logger.warning(f"   ⚠️ CPF inválido: {cpf_raw} (linha {index + 13})")
-                    clientes_erros += 1
-                    continue
-
-                # Formatar CPF para XXX.XXX.XXX-XX
-                cpf_formatado = f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
-
-                # Gerar número de contrato único baseado no CPF
-                numero_contrato = f"CANOPUS-{cpf}"
-
-                # Buscar primeiro cliente_nexus disponível (para evitar FK error)
-                # NOTA: Idealmente deveria vir da sessão do usuário, mas como é automação,
-                # usa o primeiro cliente_nexus disponível
-                cur.execute("SELECT id FROM clientes_nexus ORDER BY id LIMIT 1")
-                cliente_nexus_row = cur.fetchone()
-                cliente_nexus_id_import = cliente_nexus_row[0] if cliente_nexus_row else None
-
-                # Inserir cliente
-                cur.execute("""
-                    INSERT INTO clientes_finais (
-                        nome_completo, cpf, telefone_celular, whatsapp,
-                        numero_contrato, grupo_consorcio, cota_consorcio,
-                        valor_credito, valor_parcela, prazo_meses, data_adesao,
-                        consultor_id, cliente_nexus_id, ativo,
-                        created_at, updated_at
-                    ) VALUES (
-                        %s, %s, '', '',
-                        %s, 'N/A', 'N/A',
-                        0.0, 0.0, 0, NOW(),
-                        %s, %s, TRUE,
-                        NOW(), NOW()
+                vazias = (cpf_raw.fillna('').str.lower().isin(['nan', 'none', '']) |
+                          nome_raw.fillna('').str.lower().isin(['nan', 'none', '']))
+
+                # Limpar e validar CPF (deve ter exatamente 11 dígitos)
+                cpfs = limpar_cpfs(bloco[0], rejeitar_repetidos=False)
+                invalidos = ~vazias & cpfs.isna()
+                clientes_erros += int(invalidos.sum())
+                if len(exemplos_invalidos) < 10:
+                    exemplos_invalidos.extend(
+                        f"{cpf} (linha {pos + 13})"
+                        for cpf, pos in zip(cpf_raw[invalidos], bloco.loc[invalidos, 'posicao'])
                     )
-                    ON CONFLICT (cpf) DO UPDATE SET
-                        nome_completo = EXCLUDED.nome_completo,
-                        consultor_id = EXCLUDED.consultor_id,
-                        updated_at = NOW()
-                    RETURNING id
-                """, (nome, cpf_formatado, numero_contrato, consultor_id, cliente_nexus_id_import))
 
-                cliente_id = cur.fetchone()[0]
-                clientes_importados += 1
+                validos = ~vazias & cpfs.notna()
 
-            except Exception as e:
-                logger.error(f"   ❌ Erro ao importar cliente linha {index + 12}: {e}")
-                clientes_erros += 1
-                continue
+                # Limpar nome (remover sufixos como "- 70%", "70%", etc)
+                nomes = nome_raw[validos].str.replace(r'\s*-?\s*\d+%?', '', regex=True).str.strip()
 
-        conn.commit()
-        logger.info(f"   ✓ {clientes_importados} clientes importados, {clientes_erros} erros")
+                clientes_por_cpf.update(zip(formatar_cpfs(cpfs[validos]), nomes))
 
-        # ==================================================
-        # 3. IMPORTAR BOLETOS DA PASTA
-        # ==================================================
-        logger.info("📄 Importando boletos da pasta...")
+            if clientes_erros:
+                logger.warning(f"   ⚠️ {clientes_erros} CPFs inválidos (ex.: {', '.join(exemplos_invalidos[:10])})")
 
-        downloads_dir = Path(r"D:\Nexus\automation\canopus\downloads\Danner")
+            # Inserir clientes em lotes (um INSERT por lote, não por linha); lote
+            # com erro volta só até o seu savepoint
+            cpfs_formatados = list(clientes_por_cpf)
+            for inicio in range(0, len(cpfs_formatados), 1000):
+                lote = cpfs_formatados[inicio:inicio + 1000]
+                try:
+                    with conn.transaction():
+                        cur.execute("""
+                            INSERT INTO clientes_finais (
+                                nome_completo, cpf, telefone_celular, whatsapp,
+                                numero_contrato, grupo_consorcio, cota_consorcio,
+                                valor_credito, valor_parcela, prazo_meses, data_adesao,
+                                consultor_id, cliente_nexus_id, ativo,
+                                created_at, updated_at
+                            )
+                            SELECT
+                                t.nome, t.cpf, '', '',
+                                'CANOPUS-' || regexp_replace(t.cpf, '[^0-9]', '', 'g'), 'N/A', 'N/A',
+                                0.0, 0.0, 0, NOW(),
+                                %s, %s, TRUE,
+                                NOW(), NOW()
+                            FROM unnest(%s::text[], %s::text[]) AS t(nome, cpf)
+                            ON CONFLICT (cpf) DO UPDATE SET
+                                nome_completo = EXCLUDED.nome_completo,
+                                consultor_id = EXCLUDED.consultor_id,
+                                updated_at = NOW()
+                            RETURNING id
+                        """, (consultor_id, cliente_nexus_id_import,
+                              [clientes_por_cpf[cpf] for cpf in lote], lote))
+
+                        clientes_importados += len(cur.fetchall())
+                except Exception as e:
+                    logger.error(f"   ❌ Erro ao importar lote de clientes ({inicio + 1}-{inicio + len(lote)}): {e}")
+                    clientes_erros += len(lote)
 
-        if not downloads_dir.exists():
-            return jsonify({
-                'success': False,
-                'error': f'Pasta de boletos não encontrada: {downloads_dir}'
-            }), 404
+            logger.info(f"   ✓ {clientes_importados} clientes importados, {clientes_erros} erros")
 
-        pdfs = list(downloads_dir.glob("*.pdf"))
+            # ==================================================
+            # 3. IMPORTAR BOLETOS DA PASTA
+            # ==================================================
+            logger.info("📄 Importando boletos da pasta...")
 
-        meses = {
-            'JANEIRO': 1, 'FEVEREIRO': 2, 'MARÇO': 3, 'MARCO': 3,
-            'ABRIL': 4, 'MAIO': 5, 'JUNHO': 6,
-            'JULHO': 7, 'AGOSTO': 8, 'SETEMBRO': 9,
-            'OUTUBRO': 10, 'NOVEMBRO': 11, 'DEZEMBRO': 12
-        }
+            pdfs = list(downloads_dir.glob("*.pdf"))
 
-        boletos_importados = 0
-        boletos_sem_cliente = 0
-        boletos_erros = 0
+            meses = {
+                'JANEIRO': 1, 'FEVEREIRO': 2, 'MARÇO': 3, 'MARCO': 3,
+                'ABRIL': 4, 'MAIO': 5, 'JUNHO': 6,
+                'JULHO': 7, 'AGOSTO': 8, 'SETEMBRO': 9,
+                'OUTUBRO': 10, 'NOVEMBRO': 11, 'DEZEMBRO': 12
+            }
 
-        for pdf_file in pdfs:
-            try:
-                # Extrair informações do nome: NOME_CLIENTE_MES.pdf
-                nome_arquivo = pdf_file.stem
-                partes = nome_arquivo.split('_')
+            boletos_importados = 0
+            boletos_sem_cliente = 0
+            boletos_erros = 0
 
-                if len(partes) < 2:
-                    logger.warning(f"   ⚠️ Nome de arquivo inválido: {pdf_file.name}")
-                    boletos_erros += 1
-                    continue
+            for pdf_file in pdfs:
+                try:
+                    # Extrair informações do nome: NOME_CLIENTE_MES.pdf
+                    nome_arquivo = pdf_file.stem
+                    partes = nome_arquivo.split('_')
 
-                mes_str = partes[-1].upper()
-                nome_cliente = '_'.join(partes[:-1])
-                nome_cliente_formatado = nome_cliente.replace('_', ' ').title()
+                    if len(partes) < 2:
+                        logger.warning(f"   ⚠️ Nome de arquivo inválido: {pdf_file.name}")
+                        boletos_erros += 1
+                        continue
 
-                mes_num = meses.get(mes_str, datetime.now().month)
-                ano = datetime.now().year
+                    mes_str = partes[-1].upper()
+                    nome_cliente = '_'.join(partes[:-1])
+                    nome_cliente_formatado = nome_cliente.replace('_', ' ').title()
 
-                # Buscar cliente no banco
-                cur.execute("""
-                    SELECT id, cpf, nome_completo
-                    FROM clientes_finais
-                    WHERE UPPER(REPLACE(nome_completo, ' ', '')) = UPPER(REPLACE(%s, ' ', ''))
-                    LIMIT 1
-                """, (nome_cliente_formatado,))
+                    mes_num = meses.get(mes_str, datetime.now().month)
+                    ano = datetime.now().year
 
-                cliente = cur.fetchone()
+                    # Savepoint por boleto: um arquivo com erro não aborta a transação
+                    with conn.transaction():
+                        # Buscar cliente no banco
+                        cur.execute("""
+                            SELECT id, cpf, nome_completo
+                            FROM clientes_finais
+                            WHERE UPPER(REPLACE(nome_completo, ' ', '')) = UPPER(REPLACE(%s, ' ', ''))
+                            LIMIT 1
+                        """, (nome_cliente_formatado,))
 
-                if not cliente:
-                    logger.warning(f"   ⚠️ Cliente não encontrado: {nome_cliente_formatado}")
-                    boletos_sem_cliente += 1
-                    continue
+                        cliente = cur.fetchone()
 
-                cliente_id = cliente[0]
+                        if not cliente:
+                            logger.warning(f"   ⚠️ Cliente não encontrado: {nome_cliente_formatado}")
+                            boletos_sem_cliente += 1
+                            continue
 
-                # Verificar se boleto já existe para este cliente e mês
-                boleto_existente = cur.execute("""
-                    SELECT id FROM boletos
-                    WHERE cliente_final_id = %s
-                    AND mes_referencia = %s
-                    AND ano_referencia = %s
-                """, (cliente_id, mes_num, ano))
+                        cliente_id = cliente[0]
 
-                if cur.fetchone():
-                    logger.info(f"   ℹ️  Boleto já existe para {pdf_file.name} - pulando")
-                    boletos_duplicados = boletos_duplicados + 1 if 'boletos_duplicados' in locals() else 1
-                    continue
+                        # Verificar se boleto já existe para este cliente e mês
+                        cur.execute("""
+                            SELECT id FROM boletos
+                            WHERE cliente_final_id = %s
+                            AND mes_referencia = %s
+                            AND ano_referencia = %s
+                        """, (cliente_id, mes_num, ano))
 
-                # Dados do boleto
-                data_vencimento = datetime(ano, mes_num, 10).date()  # Dia 10 do mês
-                numero_boleto = f"BOL-{cliente_id}-{mes_num:02d}{ano}"
+                        if cur.fetchone():
+                            logger.info(f"   ℹ️  Boleto já existe para {pdf_file.name} - pulando")
+                            continue
 
-                # Inserir boleto
-                cur.execute("""
-                    INSERT INTO boletos (
-                        cliente_final_id, cliente_nexus_id, numero_boleto, valor_original,
-                        data_vencimento, data_emissao, mes_referencia, ano_referencia,
-                        numero_parcela, descricao, status, status_envio,
-                        pdf_filename, pdf_path, pdf_size, gerado_por,
-                        created_at, updated_at
-                    ) VALUES (
-                        %s, 1, %s, 0.0, %s, %s, %s, %s,
-                        1, %s, 'pendente', 'nao_enviado',
-                        %s, %s, %s, 'automacao_canopus',
-                        NOW(), NOW()
-                    )
-                    RETURNING id
-                """, (
-                    cliente_id, numero_boleto, data_vencimento, datetime.now().date(),
-                    mes_num, ano, f"Boleto {mes_str}/{ano}",
-                    pdf_file.name, str(pdf_file), pdf_file.stat().st_size
-                ))
+                        # Dados do boleto
+                        data_vencimento = datetime(ano, mes_num, 10).date()  # Dia 10 do mês
+                        numero_boleto = f"BOL-{cliente_id}-{mes_num:02d}{ano}"
 
-                boleto_id = cur.fetchone()[0]
-                boletos_importados += 1
+                        # Inserir boleto
+                        cur.execute("""
+                            INSERT INTO boletos (
+                                cliente_final_id, cliente_nexus_id, numero_boleto, valor_original,
+                                data_vencimento, data_emissao, mes_referencia, ano_referencia,
+                                numero_parcela, descricao, status, status_envio,
+                                pdf_filename, pdf_path, pdf_size, gerado_por,
+                                created_at, updated_at
+                            ) VALUES (
+                                %s, 1, %s, 0.0, %s, %s, %s, %s,
+                                1, %s, 'pendente', 'nao_enviado',
+                                %s, %s, %s, 'automacao_canopus',
+                                NOW(), NOW()
+                            )
+                        """, (
+                            cliente_id, numero_boleto, data_vencimento, datetime.now().date(),
+                            mes_num, ano, f"Boleto {mes_str}/{ano}",
+                            pdf_file.name, str(pdf_file), pdf_file.stat().st_size
+                        ))
 
-            except Exception as e:
-                logger.error(f"   ❌ Erro ao importar boleto {pdf_file.name}: {e}")
-                boletos_erros += 1
-                continue
+                    boletos_importados += 1
 
-        conn.commit()
-        logger.info(f"   ✓ {boletos_importados} boletos importados")
-        logger.info(f"   ⚠️ {boletos_sem_cliente} boletos sem cliente correspondente")
-        logger.info(f"   ❌ {boletos_erros} erros")
+                except Exception as e:
+                    logger.error(f"   ❌ Erro ao importar boleto {pdf_file.name}: {e}")
+                    boletos_erros += 1
+                    continue
 
-        cur.close()
-        conn.close()
+            logger.info(f"   ✓ {boletos_importados} boletos importados")
+            logger.info(f"   ⚠️ {boletos_sem_cliente} boletos sem cliente correspondente")
+            logger.info(f"   ❌ {boletos_erros} erros")
 
         # ==================================================
         # 4. RETORNAR RESULTADO
@@ -3301,7 +3193,7 @@ def resetar_e_reimportar():
     except Exception as e:
         import traceback
         traceback.print_exc()
-        logger.error(f"❌ Erro na reimportação: {e}")
+        logger.error(f"❌ Erro na reimportação (nada foi apagado): {e}")
         return jsonify({
             'success': False,
             'error': str(e)
@@ -3400,6 +3292,16 @@ def configurar_planilha_consultor(consultor_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+SQL_REGISTRAR_PLANILHA_BAIXADA = """
+    UPDATE consultores
+    SET ultima_atualizacao_planilha = CURRENT_TIMESTAMP,
+        planilha_etag = %(etag)s,
+        planilha_last_modified = %(last_modified)s,
+        planilha_hash = COALESCE(%(hash)s, planilha_hash)
+    WHERE id = %(consultor_id)s
+"""
+
+
 @automation_canopus_bp.route('/consultor/<int:consultor_id>/atualizar-planilha', methods=['POST'])
 @handle_errors
 def atualizar_planilha_consultor(consultor_id):
@@ -3409,26 +3311,25 @@ def atualizar_planilha_consultor(consultor_id):
         sys.path.insert(0, str(backend_path))
         from services.drive_downloader import baixar_planilha_consultor
 
-        # Buscar dados do consultor
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT id, nome, link_planilha_drive
-                FROM consultores
-                WHERE id = %s
-            """, (consultor_id,))
+        # Buscar dados do consultor (a conexão não fica presa durante o download)
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT id, nome, link_planilha_drive,
+                           planilha_etag, planilha_last_modified, planilha_hash
+                    FROM consultores
+                    WHERE id = %s
+                """, (consultor_id,))
 
-            consultor = cur.fetchone()
+                consultor = cur.fetchone()
 
         if not consultor:
-            conn.close()
             return jsonify({
                 'success': False,
                 'error': 'Consultor não encontrado'
             }), 404
 
         if not consultor['link_planilha_drive']:
-            conn.close()
             return jsonify({
                 'success': False,
                 'error': f'Consultor {consultor["nome"]} não tem link do Google Drive configurado'
@@ -3436,11 +3337,14 @@ def atualizar_planilha_consultor(consultor_id):
 
         logger.info(f"📥 Iniciando atualização da planilha: {consultor['nome']}")
 
-        # Fazer download da planilha
+        # Download condicional: arquivo igual ao anterior não é regravado
         resultado = baixar_planilha_consultor(
             link_drive=consultor['link_planilha_drive'],
             nome_consultor=consultor['nome'],
-            substituir=True  # Sempre substituir a planilha existente
+            substituir=True,  # Sempre substituir a planilha existente
+            etag=consultor['planilha_etag'],
+            last_modified=consultor['planilha_last_modified'],
+            hash_anterior=consultor['planilha_hash']
         )
 
         if not resultado['sucesso']:
@@ -3449,27 +3353,22 @@ def atualizar_planilha_consultor(consultor_id):
                 'error': resultado.get('erro', 'Erro desconhecido ao baixar planilha')
             }), 500
 
-        # Atualizar data da última atualização
-        with conn.cursor() as cur:
-            cur.execute("""
-                UPDATE consultores
-                SET ultima_atualizacao_planilha = CURRENT_TIMESTAMP
-                WHERE id = %s
-            """, (consultor_id,))
-            conn.commit()
-
-        conn.close()
+        # Atualizar data da última atualização e os metadados da versão baixada
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(SQL_REGISTRAR_PLANILHA_BAIXADA, {**resultado, 'consultor_id': consultor_id})
 
-        logger.info(f"✅ Planilha atualizada com sucesso: {consultor['nome']}")
+        logger.info(f"✅ Planilha {'atualizada' if resultado['alterado'] else 'sem alterações'}: {consultor['nome']}")
 
         return jsonify({
             'success': True,
-            'message': 'Planilha atualizada com sucesso!',
+            'message': 'Planilha atualizada com sucesso!' if resultado['alterado'] else 'Planilha sem alterações',
             'data': {
                 'consultor': consultor['nome'],
                 'arquivo': resultado['arquivo_nome'],
                 'tamanho': resultado['tamanho'],
-                'caminho': resultado['arquivo_path']
+                'caminho': resultado['arquivo_path'],
+                'alterada': resultado['alterado']
             }
         })
 
@@ -3486,28 +3385,40 @@ def atualizar_planilha_consultor(consultor_id):
 @automation_canopus_bp.route('/atualizar-todas-planilhas', methods=['POST'])
 @handle_errors
 def atualizar_todas_planilhas():
-    """Atualiza as planilhas de todos os consultores que têm link configurado"""
+    """
+    Atualiza as planilhas de todos os consultores que têm link configurado
+
+    Downloads em paralelo e condicionais (ETag/Last-Modified e MD5): planilha
+    sem alteração não é regravada.
+
+    Body JSON (opcional):
+    {
+        "importar": true  // reimporta para o staging só as planilhas que mudaram
+    }
+    """
     try:
         # Importar serviço de download
         sys.path.insert(0, str(backend_path))
-        from services.drive_downloader import baixar_planilha_consultor
+        from services.drive_downloader import atualizar_planilhas_consultores
+
+        data = request.get_json(silent=True) or {}
 
         # Buscar todos os consultores com link configurado
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT id, nome, link_planilha_drive
-                FROM consultores
-                WHERE link_planilha_drive IS NOT NULL
-                  AND link_planilha_drive != ''
-                  AND ativo = TRUE
-                ORDER BY nome
-            """)
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT id, nome, link_planilha_drive,
+                           planilha_etag, planilha_last_modified, planilha_hash
+                    FROM consultores
+                    WHERE link_planilha_drive IS NOT NULL
+                      AND link_planilha_drive != ''
+                      AND ativo = TRUE
+                    ORDER BY nome
+                """)
 
-            consultores = cur.fetchall()
+                consultores = cur.fetchall()
 
         if not consultores:
-            conn.close()
             return jsonify({
                 'success': False,
                 'error': 'Nenhum consultor com planilha configurada'
@@ -3515,59 +3426,53 @@ def atualizar_todas_planilhas():
 
         logger.info(f"📥 Atualizando planilhas de {len(consultores)} consultor(es)...")
 
+        downloads = atualizar_planilhas_consultores(consultores)
+
         sucessos = 0
         falhas = 0
         resultados = []
+        alteradas = []
 
-        for consultor in consultores:
-            try:
-                logger.info(f"   Processando: {consultor['nome']}")
-
-                # Fazer download
-                resultado = baixar_planilha_consultor(
-                    link_drive=consultor['link_planilha_drive'],
-                    nome_consultor=consultor['nome'],
-                    substituir=True
-                )
-
-                if resultado['sucesso']:
-                    # Atualizar data
-                    with conn.cursor() as cur:
-                        cur.execute("""
-                            UPDATE consultores
-                            SET ultima_atualizacao_planilha = CURRENT_TIMESTAMP
-                            WHERE id = %s
-                        """, (consultor['id'],))
-                        conn.commit()
-
-                    sucessos += 1
-                    resultados.append({
-                        'consultor': consultor['nome'],
-                        'status': 'sucesso',
-                        'arquivo': resultado['arquivo_nome']
-                    })
-                    logger.info(f"   ✅ {consultor['nome']}: OK")
-                else:
-                    falhas += 1
-                    resultados.append({
-                        'consultor': consultor['nome'],
-                        'status': 'erro',
-                        'erro': resultado.get('erro', 'Erro desconhecido')
-                    })
-                    logger.error(f"   ❌ {consultor['nome']}: ERRO")
-
-            except Exception as e:
+        for resultado in downloads:
+            if resultado['sucesso']:
+                sucessos += 1
+                resultados.append({
+                    'consultor': resultado['consultor'],
+                    'status': 'sucesso',
+                    'arquivo': resultado['arquivo_nome'],
+                    'alterada': resultado['alterado']
+                })
+                if resultado['alterado']:
+                    alteradas.append(resultado['arquivo_path'])
+                logger.info(f"   ✅ {resultado['consultor']}: {'ATUALIZADA' if resultado['alterado'] else 'sem alterações'}")
+            else:
                 falhas += 1
                 resultados.append({
-                    'consultor': consultor['nome'],
+                    'consultor': resultado['consultor'],
                     'status': 'erro',
-                    'erro': str(e)
+                    'erro': resultado.get('erro', 'Erro desconhecido')
                 })
-                logger.error(f"   ❌ {consultor['nome']}: EXCEÇÃO - {e}")
-
-        conn.close()
+                logger.error(f"   ❌ {resultado['consultor']}: ERRO - {resultado.get('erro')}")
 
-        logger.info(f"✅ Atualização concluída: {sucessos} sucessos, {falhas} falhas")
+        # Atualizar datas e metadados numa única transação
+        baixados = [r for r in downloads if r['sucesso']]
+        if baixados:
+            with get_db_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.executemany(SQL_REGISTRAR_PLANILHA_BAIXADA, baixados)
+
+        logger.info(f"✅ Atualização concluída: {sucessos} sucessos ({len(alteradas)} alteradas), {falhas} falhas")
+
+        # Só as planilhas que mudaram voltam para o staging
+        importacao = None
+        if data.get('importar') and alteradas and CANOPUS_DISPONIVEL:
+            stats = CanopusOrquestrador().importar_planilhas(arquivos=[Path(p) for p in alteradas])
+            importacao = {
+                'total_planilhas': stats['total_planilhas'],
+                'total_clientes': stats['total_clientes'],
+                'clientes_salvos': stats['clientes_salvos'],
+                'erros': stats['erros']
+            }
 
         return jsonify({
             'success': True,
@@ -3576,7 +3481,10 @@ def atualizar_todas_planilhas():
                 'total': len(consultores),
                 'sucessos': sucessos,
                 'falhas': falhas,
-                'resultados': resultados
+                'alteradas': len(alteradas),
+                'inalteradas': sucessos - len(alteradas),
+                'resultados': resultados,
+                'importacao': importacao
             }
         })
 
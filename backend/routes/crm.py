@@ -6,113 +6,97 @@ from flask import Blueprint, request, jsonify, session, send_file
 import sys
 import os
 from pathlib import Path
-import re
 import json
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from models import ClienteNexus, ClienteFinal, Boleto, Configuracao, validar_cpf, validar_cnpj, log_sistema
 from models.database import db
+from models.listagem import (COLUNAS_BOLETOS_DEBUG, COLUNAS_BOLETOS_PORTAL, limitar,
+                             montar_consulta, resposta_streaming)
+from models.paginacao import proximo_cursor
 from routes.auth import login_required
+from services.catalogo_pdfs import PASTA_DOWNLOADS_CANOPUS, buscar_pdfs_por_nome
+from services.contadores_dashboard import buscar_contadores, resumo_disparos
+
+# Boletos do portal aguardando envio (/boletos-portal/pendentes-envio)
+SQL_BOLETOS_PENDENTES_ENVIO = """
+    SELECT b.*, cf.nome_completo, cf.cpf, cf.numero_contrato,
+           cf.whatsapp, cf.telefone_celular
+    FROM boletos b
+    JOIN clientes_finais cf ON b.cliente_final_id = cf.id
+    WHERE b.cliente_nexus_id = %s
+    AND b.status_envio = 'nao_enviado'
+    AND b.status = 'pendente'
+    ORDER BY b.data_vencimento ASC
+"""
 
-crm_bp = Blueprint('crm', __name__, url_prefix='/api/crm')
 
+# Cliente do último envio do disparo em andamento (/scheduler/status-disparo-atual)
+SQL_DISPARO_ATUAL = """
+    SELECT
+        cf.nome_completo as nome,
+        cf.whatsapp,
+        cf.cpf,
+        b.id as boleto_id
+    FROM disparos d
+    INNER JOIN boletos b ON d.boleto_id = b.id
+    INNER JOIN clientes_finais cf ON b.cliente_final_id = cf.id
+    WHERE d.cliente_nexus_id = %s
+    AND d.data_disparo IS NOT NULL
+    AND d.data_disparo > NOW() - INTERVAL '1 minute'
+    ORDER BY d.data_disparo DESC
+    LIMIT 1
+"""
 
-# ============================================================================
-# FUNÇÕES AUXILIARES PARA BUSCAR PDFS REAIS DA PASTA
-# ============================================================================
 
-def limpar_nome_para_busca(nome):
-    """Remove caracteres especiais e normaliza nome para busca"""
-    if not nome:
-        return ""
-
-    # Remover acentos
-    replacements = {
-        'Á': 'A', 'À': 'A', 'Ã': 'A', 'Â': 'A', 'Ä': 'A',
-        'É': 'E', 'È': 'E', 'Ê': 'E', 'Ë': 'E',
-        'Í': 'I', 'Ì': 'I', 'Î': 'I', 'Ï': 'I',
-        'Ó': 'O', 'Ò': 'O', 'Õ': 'O', 'Ô': 'O', 'Ö': 'O',
-        'Ú': 'U', 'Ù': 'U', 'Û': 'U', 'Ü': 'U',
-        'Ç': 'C',
-        'á': 'a', 'à': 'a', 'ã': 'a', 'â': 'a', 'ä': 'a',
-        'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e',
-        'í': 'i', 'ì': 'i', 'î': 'i', 'ï': 'i',
-        'ó': 'o', 'ò': 'o', 'õ': 'o', 'ô': 'o', 'ö': 'o',
-        'ú': 'u', 'ù': 'u', 'û': 'u', 'ü': 'u',
-        'ç': 'c'
-    }
-
-    nome_limpo = nome.upper()
-    for old, new in replacements.items():
-        nome_limpo = nome_limpo.replace(old, new)
-
-    # Remover caracteres especiais, manter apenas letras, números e espaços
-    nome_limpo = re.sub(r'[^A-Z0-9\s]', '', nome_limpo)
-
-    return nome_limpo.strip()
+# Disparo em andamento do cliente Nexus (/scheduler/pausar-disparo); sem
+# janela de tempo: a fila mantém disparos grandes em andamento por horas
+SQL_DISPARO_EM_ANDAMENTO = """
+    SELECT id
+    FROM historico_disparos
+    WHERE cliente_nexus_id = %s
+    AND status = 'em_andamento'
+    ORDER BY horario_execucao DESC
+    LIMIT 1
+"""
 
 
-def buscar_pdfs_cliente(nome_cliente):
-    """Busca PDFs do cliente na pasta de downloads do Canopus"""
+# Disparos por mês dos últimos 6 meses (/graficos)
+SQL_DISPAROS_POR_MES = """
+    SELECT
+        TO_CHAR(data_disparo, 'YYYY-MM') as mes,
+        TO_CHAR(data_disparo, 'Mon/YY') as mes_label,
+        COUNT(*) as total
+    FROM disparos
+    WHERE cliente_nexus_id = %s
+    AND data_disparo >= CURRENT_DATE - INTERVAL '6 months'
+    GROUP BY TO_CHAR(data_disparo, 'YYYY-MM'), TO_CHAR(data_disparo, 'Mon/YY')
+    ORDER BY mes ASC
+"""
 
-    # Caminho da pasta onde ficam os PDFs
-    pasta_downloads = Path(r"D:\Nexus\automation\canopus\downloads\Danner")
 
-    if not pasta_downloads.exists():
-        print(f"[AVISO] Pasta não encontrada: {pasta_downloads}")
-        return []
+crm_bp = Blueprint('crm', __name__, url_prefix='/api/crm')
 
-    # Normalizar nome do cliente para busca
-    nome_normalizado = limpar_nome_para_busca(nome_cliente)
 
-    if not nome_normalizado:
-        return []
+# ============================================================================
+# FUNÇÕES AUXILIARES PARA BUSCAR PDFS REAIS DA PASTA
+# ============================================================================
 
-    # Dividir nome em palavras
-    palavras_cliente = nome_normalizado.split()
+def buscar_pdfs_cliente(nome_cliente):
+    """Busca PDFs do cliente na pasta de downloads do Canopus (catálogo indexado)"""
 
-    # Buscar todos os PDFs
-    pdfs_encontrados = []
+    if not PASTA_DOWNLOADS_CANOPUS.exists():
+        print(f"[AVISO] Pasta não encontrada: {PASTA_DOWNLOADS_CANOPUS}")
+        return []
 
     try:
-        for arquivo in pasta_downloads.glob("*.pdf"):
-            nome_arquivo = arquivo.stem  # Nome sem extensão
-            nome_arquivo_normalizado = limpar_nome_para_busca(nome_arquivo)
-
-            # Verificar se o nome do arquivo contém palavras significativas do nome do cliente
-            # Ignora palavras muito curtas (como "DA", "DE", "DOS")
-            palavras_significativas = [p for p in palavras_cliente if len(p) > 2]
-
-            if not palavras_significativas:
-                continue
-
-            # Match se pelo menos 60% das palavras significativas estão no nome do arquivo
-            matches = sum(1 for palavra in palavras_significativas if palavra in nome_arquivo_normalizado)
-            percentual_match = matches / len(palavras_significativas)
-
-            if percentual_match >= 0.6:  # 60% de match
-                # Extrair mês/ano do nome do arquivo (geralmente última parte antes da extensão)
-                partes = nome_arquivo.split('_')
-                mes_ref = partes[-1] if partes else "Desconhecido"
-
-                pdfs_encontrados.append({
-                    'arquivo': arquivo.name,
-                    'caminho_completo': str(arquivo),
-                    'mes_referencia': mes_ref,
-                    'tamanho': arquivo.stat().st_size,
-                    'data_modificacao': arquivo.stat().st_mtime
-                })
-
+        # Mais recente primeiro (data de modificação)
+        return buscar_pdfs_por_nome(nome_cliente, PASTA_DOWNLOADS_CANOPUS)
     except Exception as e:
         print(f"[ERRO] Erro ao buscar PDFs: {e}")
         return []
 
-    # Ordenar por data de modificação (mais recente primeiro)
-    pdfs_encontrados.sort(key=lambda x: x['data_modificacao'], reverse=True)
-
-    return pdfs_encontrados
-
 
 @crm_bp.route('/dashboard', methods=['GET'])
 @login_required
@@ -124,56 +108,20 @@ def get_dashboard():
         if not cliente_nexus_id:
             return jsonify({'erro': 'Cliente não encontrado'}), 404
 
-        # Buscar estatísticas das tabelas do Portal Consórcio
-        dashboard_data = db.execute_query("""
-            SELECT
-                %s as cliente_nexus_id,
-                -- Clientes finais
-                (SELECT COUNT(*) FROM clientes_finais
-                 WHERE cliente_nexus_id = %s AND ativo = true) as total_clientes_finais,
-
-                -- Boletos
-                (SELECT COUNT(*) FROM boletos
-                 WHERE cliente_nexus_id = %s) as total_boletos,
-
-                (SELECT COUNT(*) FROM boletos
-                 WHERE cliente_nexus_id = %s AND status_envio = 'enviado') as boletos_enviados,
-
-                (SELECT COUNT(*) FROM boletos
-                 WHERE cliente_nexus_id = %s AND status_envio = 'nao_enviado') as boletos_pendentes,
-
-                (SELECT COUNT(*) FROM boletos
-                 WHERE cliente_nexus_id = %s AND status = 'pago') as boletos_pagos,
-
-                (SELECT COUNT(*) FROM boletos
-                 WHERE cliente_nexus_id = %s AND status = 'pendente'
-                 AND data_vencimento < CURRENT_DATE) as boletos_vencidos,
-
-                -- Valores
-                (SELECT COALESCE(SUM(valor_credito), 0) FROM clientes_finais
-                 WHERE cliente_nexus_id = %s AND ativo = true) as valor_total_credito,
-
-                (SELECT COALESCE(SUM(valor_original), 0) FROM boletos
-                 WHERE cliente_nexus_id = %s AND status = 'pendente') as valor_total_pendente
-        """, (cliente_nexus_id, cliente_nexus_id, cliente_nexus_id,
-              cliente_nexus_id, cliente_nexus_id, cliente_nexus_id,
-              cliente_nexus_id, cliente_nexus_id, cliente_nexus_id))
-
-        if dashboard_data:
-            dashboard_info = dashboard_data[0]
-        else:
-            # Dados vazios se não houver registros
-            dashboard_info = {
-                'cliente_nexus_id': cliente_nexus_id,
-                'total_clientes_finais': 0,
-                'total_boletos': 0,
-                'boletos_enviados': 0,
-                'boletos_pendentes': 0,
-                'boletos_pagos': 0,
-                'boletos_vencidos': 0,
-                'valor_total_credito': 0,
-                'valor_total_pendente': 0
-            }
+        # Contadores mantidos por trigger (dashboard_counters): uma leitura por chave
+        contadores = buscar_contadores(cliente_nexus_id)
+
+        dashboard_info = {
+            'cliente_nexus_id': cliente_nexus_id,
+            'total_clientes_finais': contadores['clientes_ativos'],
+            'total_boletos': contadores['boletos_total'],
+            'boletos_enviados': contadores['boletos_enviados'],
+            'boletos_pendentes': contadores['boletos_nao_enviados'],
+            'boletos_pagos': contadores['boletos_pagos'],
+            'boletos_vencidos': contadores['boletos_vencidos'],
+            'valor_total_credito': contadores['valor_credito_ativo'],
+            'valor_total_pendente': contadores['valor_pendente']
+        }
 
         return jsonify({
             'success': True,
@@ -196,21 +144,27 @@ def listar_clientes():
         if not cliente_nexus_id:
             return jsonify({'erro': 'Cliente não encontrado'}), 404
 
-        # Parâmetros de paginação
+        # Parâmetros de paginação (cursor = keyset; offset só sem cursor)
         limit = request.args.get('limit', 100, type=int)
         offset = request.args.get('offset', 0, type=int)
-        filtro = request.args.get('filtro', '')
+        cursor = request.args.get('cursor')
+        filtro = request.args.get('filtro', '').strip()
 
         if filtro:
-            clientes = ClienteFinal.buscar_com_filtro(cliente_nexus_id, filtro)
+            clientes = ClienteFinal.buscar_com_filtro(cliente_nexus_id, filtro, limit, offset, cursor)
+            contagem = ClienteFinal.contar_com_filtro(cliente_nexus_id, filtro)
+            total, total_exato = contagem['total'], contagem['exato']
+            cursor_seguinte = proximo_cursor(clientes, limit, 'nome_completo', 'id')
         else:
-            clientes = ClienteFinal.listar_por_cliente_nexus(cliente_nexus_id, limit, offset)
-
-        total = ClienteFinal.contar_por_cliente_nexus(cliente_nexus_id)
+            clientes = ClienteFinal.listar_por_cliente_nexus(cliente_nexus_id, limit, offset, cursor)
+            total, total_exato = ClienteFinal.contar_por_cliente_nexus(cliente_nexus_id), True
+            cursor_seguinte = proximo_cursor(clientes, limit, 'created_at', 'id')
 
         return jsonify({
             'clientes': clientes,
             'total': total,
+            'total_exato': total_exato,
+            'proximo_cursor': cursor_seguinte,
             'limit': limit,
             'offset': offset
         }), 200
@@ -507,28 +461,19 @@ def listar_boletos_portal():
         if not cliente_nexus_id:
             return jsonify({'erro': 'Cliente não encontrado'}), 404
 
-        # Parâmetro limit opcional
-        limit = request.args.get('limit', type=int)
-
-        # Buscar boletos da tabela boletos (Portal)
-        query = """
-            SELECT b.*, cf.nome_completo, cf.cpf, cf.numero_contrato,
-                   cf.whatsapp, cf.telefone_celular
-            FROM boletos b
-            JOIN clientes_finais cf ON b.cliente_final_id = cf.id
-            WHERE b.cliente_nexus_id = %s
-            ORDER BY b.created_at DESC, b.data_vencimento DESC
-        """
-
-        if limit:
-            query += f" LIMIT {limit}"
+        # limit opcional (sem limit: todos, em streaming); cursor = página seguinte
+        limit = limitar(request.args.get('limit', type=int))
 
-        boletos = db.execute_query(query, (cliente_nexus_id,))
+        query, params = montar_consulta(
+            COLUNAS_BOLETOS_PORTAL,
+            "boletos b JOIN clientes_finais cf ON b.cliente_final_id = cf.id",
+            filtros=["b.cliente_nexus_id = %s"],
+            params=(cliente_nexus_id,),
+            cursor=request.args.get('cursor'),
+            limit=limit,
+        )
 
-        return jsonify({
-            'success': True,
-            'boletos': boletos or []
-        }), 200
+        return resposta_streaming(query, params, 'boletos', limit=limit)
 
     except Exception as e:
         import traceback
@@ -546,16 +491,7 @@ def listar_boletos_portal_pendentes():
         if not cliente_nexus_id:
             return jsonify({'erro': 'Cliente não encontrado'}), 404
 
-        boletos = db.execute_query("""
-            SELECT b.*, cf.nome_completo, cf.cpf, cf.numero_contrato,
-                   cf.whatsapp, cf.telefone_celular
-            FROM boletos b
-            JOIN clientes_finais cf ON b.cliente_final_id = cf.id
-            WHERE b.cliente_nexus_id = %s
-            AND b.status_envio = 'nao_enviado'
-            AND b.status = 'pendente'
-            ORDER BY b.data_vencimento ASC
-        """, (cliente_nexus_id,))
+        boletos = db.execute_query(SQL_BOLETOS_PENDENTES_ENVIO, (cliente_nexus_id,))
 
         return jsonify({
             'success': True,
@@ -650,10 +586,20 @@ def enviar_boleto_whatsapp_crm(boleto_id):
         )
         nome_empresa = cliente_nexus_data[0]['nome_empresa'] if cliente_nexus_data else 'Cred MS'
 
+        # Valor/vencimento do PDF já extraídos no download (pdf_extracoes, sem reabrir o arquivo)
+        dados_boleto = dict(boleto)
+        if boleto.get('pdf_sha256'):
+            from services.pdf_extracao_store import buscar_extracao
+
+            dados_pdf = buscar_extracao(boleto['pdf_sha256'])
+            if dados_pdf and dados_pdf.get('sucesso'):
+                dados_boleto['valor_original'] = dados_pdf['valor']
+                dados_boleto['data_vencimento'] = dados_pdf['vencimento']
+
         # Gerar mensagem personalizada aleatória (usa uma das 10 mensagens)
         mensagem = mensagens_service.gerar_mensagem_boleto(
             dados_cliente={'nome_completo': boleto['nome_completo'], 'numero_contrato': boleto['numero_contrato']},
-            dados_boleto=boleto,
+            dados_boleto=dados_boleto,
             nome_empresa=nome_empresa
         )
 
@@ -1162,32 +1108,8 @@ def atualizar_configuracoes_automacao():
 def get_dashboard_stats():
     """Retorna estatísticas do dashboard com dados reais de boletos"""
     try:
-        # Total de clientes finais (TODOS, não filtrar por cliente_nexus_id)
-        total_clientes = db.execute_query("""
-            SELECT COUNT(*) as total
-            FROM clientes_finais
-            WHERE ativo = TRUE
-        """)
-
-        # Total de boletos (TODOS)
-        total_boletos = db.execute_query("""
-            SELECT COUNT(*) as total
-            FROM boletos b
-        """)
-
-        # Boletos enviados (status_envio = 'enviado')
-        boletos_enviados = db.execute_query("""
-            SELECT COUNT(*) as total
-            FROM boletos b
-            WHERE b.status_envio = 'enviado'
-        """)
-
-        # Boletos pendentes (status_envio = 'nao_enviado' ou NULL)
-        boletos_pendentes = db.execute_query("""
-            SELECT COUNT(*) as total
-            FROM boletos b
-            WHERE (b.status_envio = 'nao_enviado' OR b.status_envio IS NULL OR b.status_envio = 'pendente')
-        """)
+        # Totais de TODOS os clientes (soma de dashboard_counters, não filtrar por cliente_nexus_id)
+        contadores = buscar_contadores()
 
         # Últimos 10 boletos (TODOS, não filtrar)
         ultimos_boletos = db.execute_query("""
@@ -1231,10 +1153,10 @@ def get_dashboard_stats():
         return jsonify({
             'success': True,
             'stats': {
-                'total_clientes': total_clientes[0]['total'] if total_clientes else 0,
-                'total_boletos': total_boletos[0]['total'] if total_boletos else 0,
-                'boletos_enviados': boletos_enviados[0]['total'] if boletos_enviados else 0,
-                'boletos_pendentes': boletos_pendentes[0]['total'] if boletos_pendentes else 0
+                'total_clientes': contadores['clientes_ativos'],
+                'total_boletos': contadores['boletos_total'],
+                'boletos_enviados': contadores['boletos_enviados'],
+                'boletos_pendentes': contadores['boletos_envio_pendente']
             },
             'ultimos_boletos': ultimos_boletos_serializado
         }), 200
@@ -1266,19 +1188,21 @@ def get_scheduler_status():
 @crm_bp.route('/scheduler/ativar-disparo-completo', methods=['POST'])
 @login_required
 def ativar_disparo_completo():
-    """Ativa disparo COMPLETO com mensagens personalizadas e fluxo sequencial"""
+    """
+    Ativa disparo COMPLETO com mensagens personalizadas e fluxo sequencial
+
+    Só enfileira um job por boleto em fila_disparos e retorna; os envios e os
+    intervalos anti-bloqueio rodam no worker (services/fila_disparos.py).
+    """
     try:
         cliente_nexus_id = session.get('cliente_nexus_id')
 
         # LIMPAR DISPAROS TRAVADOS (mais de 10 minutos em andamento = erro)
-        db.execute_update("""
-            UPDATE historico_disparos
-            SET status = 'erro',
-                detalhes = '{"mensagem": "Disparo finalizado automaticamente (travado por mais de 10 minutos)"}'::jsonb
-            WHERE cliente_nexus_id = %s
-            AND status = 'em_andamento'
-            AND horario_execucao < NOW() - INTERVAL '10 minutes'
-        """, (cliente_nexus_id,))
+        from services.fila_disparos import finalizar_disparos_travados
+        finalizar_disparos_travados(
+            cliente_nexus_id,
+            'Disparo finalizado automaticamente (travado por mais de 10 minutos)'
+        )
 
         # VERIFICAR SE JÁ TEM DISPARO RODANDO (evita duplicação)
         disparo_em_andamento = db.execute_query("""
@@ -1286,7 +1210,6 @@ def ativar_disparo_completo():
             FROM historico_disparos
             WHERE cliente_nexus_id = %s
             AND status = 'em_andamento'
-            AND horario_execucao > NOW() - INTERVAL '10 minutes'
         """, (cliente_nexus_id,))
 
         if disparo_em_andamento and disparo_em_andamento[0]['count'] > 0:
@@ -1296,28 +1219,10 @@ def ativar_disparo_completo():
                 'message': 'Já existe um disparo em andamento. Aguarde a conclusão ou cancele o disparo anterior.'
             }), 409  # Conflict
 
-        # REGISTRAR INÍCIO DO DISPARO
-        db.execute_update("""
-            INSERT INTO historico_disparos
-            (cliente_nexus_id, tipo_disparo, horario_execucao, executado_por, status)
-            VALUES (%s, %s, NOW(), %s, %s)
-        """, (cliente_nexus_id, 'manual_completo', 'usuario_web', 'em_andamento'))
-
         # Buscar boletos REAIS do banco (importados do Canopus)
         # FILTRA PLACEHOLDERS: só envia para números REAIS (não 55679999999999)
         boletos_reais = db.execute_query("""
-            SELECT
-                b.id as boleto_id,
-                b.pdf_path,
-                b.numero_boleto,
-                b.data_vencimento,
-                b.valor_original,
-                b.cliente_final_id,
-                cf.nome_completo as cliente_final_nome,
-                cf.cpf as cliente_final_cpf,
-                cf.whatsapp,
-                cf.nome_completo,
-                cf.numero_contrato
+            SELECT b.id as boleto_id
             FROM boletos b
             JOIN clientes_finais cf ON b.cliente_final_id = cf.id
             WHERE b.cliente_nexus_id = %s
@@ -1338,22 +1243,44 @@ def ativar_disparo_completo():
                 'message': 'Nenhum boleto pendente com WhatsApp encontrado'
             }), 400
 
-        # Buscar configurações
-        config = db.execute_query("""
-            SELECT intervalo_min_segundos, intervalo_max_segundos
-            FROM configuracoes_automacao
-            WHERE cliente_nexus_id = %s
-        """, (cliente_nexus_id,))
+        # REGISTRAR INÍCIO DO DISPARO
+        historico = db.execute_query("""
+            INSERT INTO historico_disparos
+            (cliente_nexus_id, tipo_disparo, horario_execucao, executado_por, status, total_envios)
+            VALUES (%s, %s, NOW(), %s, %s, %s)
+            RETURNING id
+        """, (cliente_nexus_id, 'manual_completo', 'usuario_web', 'em_andamento', len(boletos_reais)))
+        historico_disparo_id = historico[0]['id']
 
-        intervalo_min = config[0].get('intervalo_min_segundos', 3) if config else 3
-        intervalo_max = config[0].get('intervalo_max_segundos', 7) if config else 7
+        # ENFILEIRAR UM JOB POR BOLETO (o worker da fila faz os envios e os intervalos)
+        from services.fila_disparos import enfileirar_disparo, publicar_progresso_disparo
 
-        # Buscar nome da empresa
-        cliente_nexus = db.execute_query(
-            "SELECT nome_empresa FROM clientes_nexus WHERE id = %s",
-            (cliente_nexus_id,)
+        enfileirados = enfileirar_disparo(
+            historico_disparo_id,
+            cliente_nexus_id,
+            [boleto['boleto_id'] for boleto in boletos_reais]
         )
-        nome_empresa = cliente_nexus[0]['nome_empresa'] if cliente_nexus else 'Nexus'
+
+        log_sistema('info', f"📥 Disparo {historico_disparo_id}: {enfileirados} boleto(s) enfileirado(s)", 'disparo')
+
+        if enfileirados == 0:
+            # Todos os boletos já têm job ativo: nenhum job vai fechar este disparo
+            db.execute_update("""
+                UPDATE historico_disparos
+                SET status = 'concluido',
+                    total_envios = 0,
+                    detalhes = '{"mensagem": "Nenhum boleto enfileirado (todos já estão na fila)"}'::jsonb
+                WHERE id = %s
+            """, (historico_disparo_id,))
+            publicar_progresso_disparo(historico_disparo_id)
+
+            return jsonify({
+                'success': False,
+                'message': 'Todos os boletos pendentes já estão na fila de disparos',
+                'disparo_id': historico_disparo_id
+            }), 409
+
+        publicar_progresso_disparo(historico_disparo_id)
 
         # Enviar notificação de INÍCIO para Nexus
         from services.whatsapp_evolution import whatsapp_service
@@ -1362,7 +1289,7 @@ def ativar_disparo_completo():
 
         mensagem_inicio = f"""🚀 DISPARO COMPLETO INICIADO!
 
-📊 Total de boletos: {len(boletos_reais)}
+📊 Total de boletos: {enfileirados}
 ⏰ Iniciando envio automático com mensagens personalizadas...
 
 Sistema Nexus - Aqui seu tempo vale ouro"""
@@ -1377,308 +1304,14 @@ Sistema Nexus - Aqui seu tempo vale ouro"""
             except Exception as e:
                 log_sistema('warning', f'Erro ao enviar notificação inicial para {numero}: {str(e)}', 'disparo')
 
-        # Disparar cada boleto com mensagem personalizada
-        import random
-        import time
-        from datetime import datetime
-        from pathlib import Path
-        from services.mensagens_personalizadas import mensagens_service
-
-        stats = {
-            'total': len(boletos_reais),
-            'enviados': 0,
-            'erros': 0,
-            'inicio': time.time()
-        }
-
-        for idx, boleto in enumerate(boletos_reais):
-            try:
-                whatsapp = boleto['whatsapp']
-                nome_cliente = boleto['nome_completo']
-                cpf_cliente = boleto['cliente_final_cpf']
-
-                log_sistema('info', f"[{idx+1}/{len(boletos_reais)}] Processando cliente: {nome_cliente}", 'disparo')
-
-                # Obter caminho do PDF do banco de dados
-                pdf_path = boleto.get('pdf_path')
-                pdf_temp_criado = False  # Flag para deletar depois
-
-                # Se não tiver pdf_path válido, buscar de downloads_canopus
-                if not pdf_path or not Path(pdf_path).exists():
-                    log_sistema('info', f"PDF não encontrado em pdf_path, buscando em downloads_canopus para {nome_cliente}", 'disparo')
-
-                    # Buscar PDF mais recente deste CPF em downloads_canopus
-                    pdf_canopus = db.execute_query("""
-                        SELECT caminho_arquivo, nome_arquivo
-                        FROM downloads_canopus
-                        WHERE cpf = %s
-                        AND status = 'sucesso'
-                        AND caminho_arquivo IS NOT NULL
-                        AND caminho_arquivo != ''
-                        ORDER BY created_at DESC
-                        LIMIT 1
-                    """, (cpf_cliente,))
-
-                    if not pdf_canopus or not pdf_canopus[0].get('caminho_arquivo'):
-                        log_sistema('warning', f"PDF não encontrado em downloads_canopus para {nome_cliente} (CPF: {cpf_cliente})", 'disparo')
-                        stats['erros'] += 1
-                        continue
-
-                    # Decodificar base64 e criar arquivo temporário
-                    import base64
-                    import tempfile
-                    import os
-
-                    try:
-                        pdf_base64 = pdf_canopus[0]['caminho_arquivo']
-                        pdf_bytes = base64.b64decode(pdf_base64)
-
-                        # Criar arquivo temporário
-                        temp_fd, pdf_path = tempfile.mkstemp(suffix='.pdf', prefix='boleto_')
-                        os.write(temp_fd, pdf_bytes)
-                        os.close(temp_fd)
-
-                        pdf_temp_criado = True
-                        log_sistema('success', f"✅ PDF temporário criado para {nome_cliente}: {pdf_path}", 'disparo')
-                    except Exception as e:
-                        log_sistema('error', f"Erro ao decodificar PDF de downloads_canopus para {nome_cliente}: {str(e)}", 'disparo')
-                        stats['erros'] += 1
-                        continue
-
-                # EXTRAIR DADOS REAIS DO PDF usando nosso extrator
-                from services.pdf_extractor import extrair_dados_boleto
-
-                log_sistema('info', f"Extraindo dados do PDF: {pdf_path}", 'disparo')
-                dados_pdf = extrair_dados_boleto(pdf_path)
-
-                if not dados_pdf.get('sucesso'):
-                    log_sistema('warning', f"Não foi possível extrair dados do PDF para {nome_cliente}", 'disparo')
-                    # Continua com dados do banco como fallback
-                    dados_pdf = {}
-                else:
-                    # Log dos dados extraídos com sucesso
-                    log_sistema('success', f"✅ Dados extraídos do PDF - Venc: {dados_pdf.get('vencimento_str')}, Valor: R$ {dados_pdf.get('valor', 0):.2f}", 'disparo')
-
-                # 1. GERAR MENSAGEM PERSONALIZADA COM DADOS DO PDF
-                log_sistema('info', f"📝 Gerando mensagem personalizada para {nome_cliente}", 'disparo')
-
-                mensagem_personalizada = mensagens_service.gerar_mensagem_boleto(
-                    dados_cliente={
-                        'nome_completo': nome_cliente,
-                        'numero_contrato': boleto.get('numero_contrato', 'N/A')
-                    },
-                    dados_boleto={
-                        'valor_original': dados_pdf.get('valor') if dados_pdf.get('sucesso') else boleto['valor_original'],
-                        'data_vencimento': dados_pdf.get('vencimento_str') if dados_pdf.get('sucesso') else boleto['data_vencimento'].strftime('%d/%m/%Y')
-                    },
-                    nome_empresa='Cred MS Consorcios'
-                )
-
-                log_sistema('success', f"✅ Mensagem gerada. Tamanho: {len(mensagem_personalizada)} caracteres", 'disparo')
-                log_sistema('info', f"📱 Enviando mensagem de texto para {whatsapp}", 'disparo')
-
-                # 2. ENVIAR MENSAGEM PERSONALIZADA
-                resultado_msg = whatsapp_service.enviar_mensagem(
-                    whatsapp,
-                    mensagem_personalizada,
-                    cliente_nexus_id
-                )
-
-                log_sistema('info', f"📋 Resultado envio mensagem: {resultado_msg}", 'disparo')
-
-                if not resultado_msg.get('sucesso'):
-                    log_sistema('error', f"❌ FALHA ao enviar mensagem para {nome_cliente}: {resultado_msg.get('error', 'Erro desconhecido')}", 'disparo')
-                    stats['erros'] += 1
-                    continue
-
-                log_sistema('success', f"✅ Mensagem de texto enviada com sucesso!", 'disparo')
-
-                # 3. AGUARDAR VARIÁVEL ANTES DE ENVIAR O BOLETO (simulando comportamento humano)
-                intervalo_msg_pdf = random.uniform(8, 15)  # Entre 8-15s (mais natural)
-                log_sistema('info', f"⏳ Aguardando {intervalo_msg_pdf:.1f}s antes de enviar PDF (simulando digitação humana)...", 'disparo')
-                time.sleep(intervalo_msg_pdf)
-
-                # 4. ENVIAR PDF DO BOLETO COM DADOS REAIS DO PDF
-                log_sistema('info', f"🔄 INICIANDO ENVIO DE PDF para {nome_cliente}", 'disparo')
-
-                vencimento_str = dados_pdf.get('vencimento_str') if dados_pdf.get('sucesso') else boleto['data_vencimento'].strftime('%d/%m/%Y')
-                valor_str = f"R$ {dados_pdf.get('valor', 0):.2f}" if dados_pdf.get('sucesso') else f"R$ {boleto['valor_original']:.2f}"
-
-                # Remover "Nexus Brasil" do nome da empresa se existir
-                nome_empresa_limpo = nome_empresa.replace(' - Nexus Brasil', '').replace('- Nexus Brasil', '').strip()
-
-                legenda = f"📄 *Boleto {nome_empresa_limpo}*\nVencimento: {vencimento_str}\nValor: {valor_str}\n\n💚 Seu parceiro de confiança!"
-
-                log_sistema('info', f"📄 Preparando envio de PDF:", 'disparo')
-                log_sistema('info', f"  ├─ Cliente: {nome_cliente}", 'disparo')
-                log_sistema('info', f"  ├─ WhatsApp: {whatsapp}", 'disparo')
-                log_sistema('info', f"  ├─ Arquivo: {pdf_path}", 'disparo')
-                log_sistema('info', f"  ├─ Temporário: {pdf_temp_criado}", 'disparo')
-                log_sistema('info', f"  └─ Legenda: {legenda[:50]}...", 'disparo')
-
-                # Verificar se arquivo existe antes de tentar enviar
-                import os
-                if not os.path.exists(pdf_path):
-                    log_sistema('error', f"❌ ARQUIVO PDF NÃO EXISTE: {pdf_path}", 'disparo')
-                    stats['erros'] += 1
-                    continue
-
-                tamanho_pdf = os.path.getsize(pdf_path)
-                log_sistema('info', f"✅ Arquivo PDF existe. Tamanho: {tamanho_pdf} bytes", 'disparo')
-
-                log_sistema('info', f"📤 Chamando whatsapp_service.enviar_pdf()...", 'disparo')
-
-                resultado_pdf = whatsapp_service.enviar_pdf(
-                    whatsapp,
-                    pdf_path,
-                    legenda,
-                    cliente_nexus_id
-                )
-
-                log_sistema('info', f"📋 Resultado PDF recebido: {resultado_pdf}", 'disparo')
-
-                # Verificar tanto 'sucesso' quanto 'success' (compatibilidade)
-                pdf_enviado = resultado_pdf.get('sucesso') or resultado_pdf.get('success')
-
-                if pdf_enviado:
-                    # 5. ATUALIZAR STATUS DO BOLETO
-                    db.execute_update("""
-                        UPDATE boletos
-                        SET status_envio = 'enviado', data_envio = CURRENT_TIMESTAMP
-                        WHERE id = %s
-                    """, (boleto['boleto_id'],))
-
-                    stats['enviados'] += 1
-                    log_sistema('success', f"✅ Boleto enviado com sucesso para {nome_cliente}", 'disparo')
-
-                    # 6. REGISTRAR DISPARO NA TABELA disparos (para status em tempo real)
-                    db.execute_update("""
-                        INSERT INTO disparos
-                        (cliente_nexus_id, boleto_id, whatsapp_numero, status_disparo, data_disparo)
-                        VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
-                    """, (cliente_nexus_id, boleto['boleto_id'], whatsapp, 'enviado'))
-                else:
-                    erro_msg = resultado_pdf.get('error') or resultado_pdf.get('mensagem') or 'Erro desconhecido'
-                    log_sistema('error', f"❌ Erro ao enviar PDF para {nome_cliente}: {erro_msg}", 'disparo')
-                    log_sistema('error', f"📋 Detalhes do erro: {resultado_pdf}", 'disparo')
-                    stats['erros'] += 1
-
-                    # REGISTRAR ERRO NA TABELA disparos
-                    db.execute_update("""
-                        INSERT INTO disparos
-                        (cliente_nexus_id, boleto_id, whatsapp_numero, status_disparo, data_disparo)
-                        VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
-                    """, (cliente_nexus_id, boleto['boleto_id'], whatsapp, 'erro'))
-
-                # 7. ATUALIZAR PROGRESSO EM TEMPO REAL no historico_disparos
-                db.execute_update("""
-                    UPDATE historico_disparos
-                    SET total_envios = %s,
-                        envios_sucesso = %s,
-                        envios_erro = %s
-                    WHERE id = (
-                        SELECT id
-                        FROM historico_disparos
-                        WHERE cliente_nexus_id = %s
-                        AND tipo_disparo = 'manual_completo'
-                        AND status = 'em_andamento'
-                        ORDER BY horario_execucao DESC
-                        LIMIT 1
-                    )
-                """, (stats['total'], stats['enviados'], stats['erros'], cliente_nexus_id))
-
-                # 8. INTERVALO ENTRE CLIENTES (segurança anti-bloqueio HUMANIZADO)
-                if idx < len(boletos_reais) - 1:
-                    # Aumenta intervalo progressivamente a cada 10 disparos
-                    # A cada 10 mensagens, pausa maior (simula descanso humano)
-                    if (idx + 1) % 10 == 0:
-                        pausa_longa = random.uniform(45, 90)  # Pausa de 45-90s a cada 10 disparos
-                        log_sistema('info', f"⏸️ Pausa estratégica após 10 disparos: {pausa_longa:.1f}s (simula comportamento humano)", 'disparo')
-                        time.sleep(pausa_longa)
-                    else:
-                        # Intervalo normal entre disparos (mais longo para evitar bloqueio)
-                        intervalo = random.uniform(15, 30)  # 15-30s entre cada cliente
-                        log_sistema('info', f"⏳ Aguardando {intervalo:.1f}s antes do próximo disparo (anti-bloqueio)...", 'disparo')
-                        time.sleep(intervalo)
-
-            except Exception as e:
-                log_sistema('error', f"Erro ao processar {nome_cliente}: {str(e)}", 'disparo')
-                stats['erros'] += 1
-            finally:
-                # Limpar arquivo temporário se foi criado
-                if pdf_temp_criado and pdf_path and os.path.exists(pdf_path):
-                    try:
-                        os.remove(pdf_path)
-                        log_sistema('info', f"Arquivo temporário removido: {pdf_path}", 'disparo')
-                    except Exception as e:
-                        log_sistema('warning', f"Erro ao remover arquivo temporário {pdf_path}: {str(e)}", 'disparo')
-
-        # Calcular tempo total
-        tempo_total = time.time() - stats['inicio']
-        tempo_minutos = tempo_total / 60
-        taxa_sucesso = (stats['enviados'] / stats['total']) * 100 if stats['total'] > 0 else 0
-
-        # Enviar notificação de FIM
-        try:
-            from datetime import timedelta
-            proxima_data = (datetime.now() + timedelta(days=30)).strftime("%d/%m/%Y")
-
-            mensagem_final = f"""✅ *DISPARO COMPLETO FINALIZADO!*
-
-🕐 *Finalizado em:* {datetime.now().strftime("%d/%m/%Y às %H:%M:%S")}
-⏱️ *Tempo total:* {tempo_minutos:.1f} minutos
-
-📊 *Estatísticas do Disparo:*
-• Total processado: {stats['total']} clientes
-• Boletos enviados: {stats['enviados']}
-• Taxa de sucesso: {taxa_sucesso:.1f}%
-• Erros: {stats['erros']}
-
-📅 *Próximo disparo automático:*
-• Data: {proxima_data}
-
-✨ *Nexus - Aqui seu tempo vale ouro!*
-Obrigado por confiar em nossos serviços."""
-
-            for numero in numeros_notificacao:
-                try:
-                    whatsapp_service.enviar_mensagem(
-                        numero,
-                        mensagem_final,
-                        cliente_nexus_id
-                    )
-                except Exception as e:
-                    log_sistema('warning', f'Erro ao enviar notificação final para {numero}: {str(e)}', 'disparo')
-        except:
-            pass
-
-        # ATUALIZAR STATUS DO DISPARO PARA CONCLUÍDO
-        db.execute_update("""
-            UPDATE historico_disparos
-            SET status = 'concluido',
-                total_envios = %s,
-                envios_sucesso = %s,
-                envios_erro = %s,
-                detalhes = %s::jsonb
-            WHERE id = (
-                SELECT id
-                FROM historico_disparos
-                WHERE cliente_nexus_id = %s
-                AND tipo_disparo = 'manual_completo'
-                AND status = 'em_andamento'
-                ORDER BY horario_execucao DESC
-                LIMIT 1
-            )
-        """, (stats['total'], stats['enviados'], stats['erros'],
-              json.dumps({'tempo_minutos': tempo_minutos, 'taxa_sucesso': taxa_sucesso}),
-              cliente_nexus_id))
-
         return jsonify({
             'success': True,
-            'message': f'Disparo completo finalizado: {stats["enviados"]} enviados, {stats["erros"]} erros',
-            'stats': stats,
-            'tempo_execucao': tempo_total
-        }), 200
+            'message': f'Disparo completo iniciado: {enfileirados} boleto(s) na fila',
+            'disparo_id': historico_disparo_id,
+            'stats': {
+                'total': enfileirados
+            }
+        }), 202
 
     except Exception as e:
         import traceback
@@ -1714,15 +1347,7 @@ def pausar_disparo():
         cliente_nexus_id = session.get('cliente_nexus_id')
 
         # VERIFICAR SE HÁ DISPARO EM ANDAMENTO
-        disparo_em_andamento = db.execute_query("""
-            SELECT id
-            FROM historico_disparos
-            WHERE cliente_nexus_id = %s
-            AND status = 'em_andamento'
-            AND horario_execucao > NOW() - INTERVAL '2 hours'
-            ORDER BY horario_execucao DESC
-            LIMIT 1
-        """, (cliente_nexus_id,))
+        disparo_em_andamento = db.execute_query(SQL_DISPARO_EM_ANDAMENTO, (cliente_nexus_id,))
 
         if not disparo_em_andamento:
             return jsonify({
@@ -1744,6 +1369,11 @@ def pausar_disparo():
             WHERE id = %s
         """, (disparo_id,))
 
+        # Jobs ainda não iniciados saem da fila (o job em envio termina normalmente)
+        from services.fila_disparos import cancelar_jobs_pendentes, publicar_progresso_disparo
+        cancelar_jobs_pendentes(disparo_id)
+        publicar_progresso_disparo(disparo_id)
+
         log_sistema('warning', '⏸️ Disparo pausado/cancelado pelo usuário', 'disparo', {
             'disparo_id': disparo_id,
             'cliente_nexus_id': cliente_nexus_id
@@ -1771,14 +1401,11 @@ def status_disparo_atual():
         cliente_nexus_id = session.get('cliente_nexus_id')
 
         # LIMPAR DISPAROS TRAVADOS primeiro
-        db.execute_update("""
-            UPDATE historico_disparos
-            SET status = 'erro',
-                detalhes = '{"mensagem": "Disparo finalizado automaticamente (travado por mais de 10 minutos)"}'::jsonb
-            WHERE cliente_nexus_id = %s
-            AND status = 'em_andamento'
-            AND horario_execucao < NOW() - INTERVAL '10 minutes'
-        """, (cliente_nexus_id,))
+        from services.fila_disparos import finalizar_disparos_travados
+        finalizar_disparos_travados(
+            cliente_nexus_id,
+            'Disparo finalizado automaticamente (travado por mais de 10 minutos)'
+        )
 
         # BUSCAR DISPARO EM ANDAMENTO (apenas dos últimos 10 minutos)
         disparo = db.execute_query("""
@@ -1793,7 +1420,6 @@ def status_disparo_atual():
             FROM historico_disparos
             WHERE cliente_nexus_id = %s
             AND status = 'em_andamento'
-            AND horario_execucao > NOW() - INTERVAL '10 minutes'
             ORDER BY horario_execucao DESC
             LIMIT 1
         """, (cliente_nexus_id,))
@@ -1813,21 +1439,7 @@ def status_disparo_atual():
             detalhes = json.loads(detalhes) if detalhes else {}
 
         # Buscar cliente atual sendo processado (último boleto em processamento)
-        cliente_atual = db.execute_query("""
-            SELECT
-                cf.nome_completo as nome,
-                cf.whatsapp,
-                cf.cpf,
-                b.id as boleto_id
-            FROM disparos d
-            INNER JOIN boletos b ON d.boleto_id = b.id
-            INNER JOIN clientes_finais cf ON b.cliente_final_id = cf.id
-            WHERE d.cliente_nexus_id = %s
-            AND d.data_disparo IS NOT NULL
-            AND d.data_disparo > NOW() - INTERVAL '1 minute'
-            ORDER BY d.data_disparo DESC
-            LIMIT 1
-        """, (cliente_nexus_id,))
+        cliente_atual = db.execute_query(SQL_DISPARO_ATUAL, (cliente_nexus_id,))
 
         total = disparo_data.get('total_envios') or 0
         enviados = disparo_data.get('envios_sucesso') or 0
@@ -1865,6 +1477,25 @@ def status_disparo_atual():
         }), 500
 
 
+@crm_bp.route('/scheduler/status-disparo-atual/stream', methods=['GET'])
+@login_required
+def status_disparo_atual_stream():
+    """
+    Progresso do disparo via Server-Sent Events
+
+    Eventos no formato de /scheduler/status-disparo-atual, enviados quando o
+    worker da fila publica um avanço (services/fila_disparos.py).
+    """
+    from services.progresso import resposta_sse
+
+    def formatar(disparo):
+        if not disparo:
+            return {'success': False, 'message': 'Nenhum disparo em andamento'}
+        return {'success': True, 'disparo': disparo}
+
+    return resposta_sse(f"disparo:{session.get('cliente_nexus_id')}", formatar)
+
+
 @crm_bp.route('/scheduler/limpar-disparos-travados', methods=['POST'])
 @login_required
 def limpar_disparos_travados():
@@ -1872,27 +1503,12 @@ def limpar_disparos_travados():
     try:
         cliente_nexus_id = session.get('cliente_nexus_id')
 
-        # Atualizar disparos travados para erro
-        result = db.execute_update("""
-            UPDATE historico_disparos
-            SET status = 'erro',
-                detalhes = '{"mensagem": "Disparo cancelado - estava travado por mais de 10 minutos"}'::jsonb
-            WHERE cliente_nexus_id = %s
-            AND status = 'em_andamento'
-            AND horario_execucao < NOW() - INTERVAL '10 minutes'
-        """, (cliente_nexus_id,))
-
-        # Contar quantos foram atualizados
-        verificar = db.execute_query("""
-            SELECT COUNT(*) as count
-            FROM historico_disparos
-            WHERE cliente_nexus_id = %s
-            AND status = 'erro'
-            AND detalhes->>'mensagem' LIKE '%travado%'
-            AND horario_execucao > NOW() - INTERVAL '1 hour'
-        """, (cliente_nexus_id,))
-
-        count = verificar[0]['count'] if verificar else 0
+        # Atualizar disparos travados para erro (e publicar o estado final)
+        from services.fila_disparos import finalizar_disparos_travados
+        count = finalizar_disparos_travados(
+            cliente_nexus_id,
+            'Disparo cancelado - estava travado por mais de 10 minutos'
+        )
 
         return jsonify({
             'success': True,
@@ -2216,7 +1832,7 @@ def download_pdf_canopus():
             return jsonify({'erro': 'Nome do arquivo não fornecido'}), 400
 
         # Caminho da pasta
-        pasta_downloads = Path(r"D:\Nexus\automation\canopus\downloads\Danner")
+        pasta_downloads = PASTA_DOWNLOADS_CANOPUS
         caminho_arquivo = pasta_downloads / nome_arquivo
 
         # Segurança: verificar se o arquivo está realmente na pasta permitida
@@ -2250,33 +1866,11 @@ def get_monitoramento():
         if not cliente_nexus_id:
             return jsonify({'erro': 'Cliente não encontrado'}), 404
 
-        # 1. DISPAROS HOJE
-        disparos_hoje_result = db.execute_query("""
-            SELECT COUNT(*) as total
-            FROM disparos
-            WHERE cliente_nexus_id = %s
-            AND DATE(data_disparo) = CURRENT_DATE
-            AND status = 'enviado'
-        """, (cliente_nexus_id,))
-
-        disparos_hoje = disparos_hoje_result[0]['total'] if disparos_hoje_result else 0
-
-        # 2. TAXA DE SUCESSO (últimos 30 dias)
-        taxa_sucesso_result = db.execute_query("""
-            SELECT
-                COUNT(*) FILTER (WHERE status = 'enviado') as enviados,
-                COUNT(*) as total
-            FROM disparos
-            WHERE cliente_nexus_id = %s
-            AND data_disparo >= CURRENT_DATE - INTERVAL '30 days'
-        """, (cliente_nexus_id,))
-
-        if taxa_sucesso_result and taxa_sucesso_result[0]['total'] > 0:
-            enviados = taxa_sucesso_result[0]['enviados']
-            total = taxa_sucesso_result[0]['total']
-            taxa_sucesso = round((enviados / total) * 100, 1)
-        else:
-            taxa_sucesso = 0
+        # 1-2. DISPAROS HOJE, TAXA DE SUCESSO (últimos 30 dias) e gráficos de 7 dias,
+        # a partir de dashboard_disparos_dia (uma linha por dia, mantida por trigger)
+        resumo = resumo_disparos(cliente_nexus_id)
+        disparos_hoje = resumo['disparos_hoje']
+        taxa_sucesso = resumo['taxa_sucesso']
 
         # 3. STATUS WHATSAPP
         whatsapp_status = db.execute_query("""
@@ -2291,60 +1885,9 @@ def get_monitoramento():
         if whatsapp_status and whatsapp_status[0]['status'] == 'connected':
             whatsapp_conectado = True
 
-        # 4. GRÁFICO DE DISPAROS (últimos 7 dias)
-        chart_disparos_result = db.execute_query("""
-            SELECT
-                DATE(data_disparo) as dia,
-                COUNT(*) as total
-            FROM disparos
-            WHERE cliente_nexus_id = %s
-            AND data_disparo >= CURRENT_DATE - INTERVAL '6 days'
-            AND status = 'enviado'
-            GROUP BY DATE(data_disparo)
-            ORDER BY dia ASC
-        """, (cliente_nexus_id,))
-
-        # Preencher array com 7 dias (pode ter dias sem disparos)
-        chart_disparos = []
-        for i in range(6, -1, -1):
-            from datetime import datetime, timedelta
-            dia_atual = (datetime.now() - timedelta(days=i)).date()
-
-            # Buscar valor do dia
-            valor_dia = 0
-            for row in chart_disparos_result:
-                if row['dia'] == dia_atual:
-                    valor_dia = row['total']
-                    break
-
-            chart_disparos.append(valor_dia)
-
-        # 5. GRÁFICO DE TAXA DE SUCESSO (últimos 7 dias)
-        chart_sucesso_result = db.execute_query("""
-            SELECT
-                DATE(data_disparo) as dia,
-                COUNT(*) FILTER (WHERE status = 'enviado') as enviados,
-                COUNT(*) as total
-            FROM disparos
-            WHERE cliente_nexus_id = %s
-            AND data_disparo >= CURRENT_DATE - INTERVAL '6 days'
-            GROUP BY DATE(data_disparo)
-            ORDER BY dia ASC
-        """, (cliente_nexus_id,))
-
-        chart_sucesso = []
-        for i in range(6, -1, -1):
-            from datetime import datetime, timedelta
-            dia_atual = (datetime.now() - timedelta(days=i)).date()
-
-            # Buscar taxa do dia
-            taxa_dia = 0
-            for row in chart_sucesso_result:
-                if row['dia'] == dia_atual and row['total'] > 0:
-                    taxa_dia = round((row['enviados'] / row['total']) * 100, 1)
-                    break
-
-            chart_sucesso.append(taxa_dia)
+        # 4-5. GRÁFICOS DE DISPAROS E DE TAXA DE SUCESSO (últimos 7 dias)
+        chart_disparos = resumo['chart_disparos']
+        chart_sucesso = resumo['chart_sucesso']
 
         # 6. ATIVIDADES RECENTES (últimas 10)
         atividades_result = db.execute_query("""
@@ -2476,17 +2019,7 @@ def get_graficos():
             return jsonify({'erro': 'Cliente não encontrado'}), 404
 
         # 1. DISPAROS POR MÊS (últimos 6 meses)
-        disparos_mes_result = db.execute_query("""
-            SELECT
-                TO_CHAR(data_disparo, 'YYYY-MM') as mes,
-                TO_CHAR(data_disparo, 'Mon/YY') as mes_label,
-                COUNT(*) as total
-            FROM disparos
-            WHERE cliente_nexus_id = %s
-            AND data_disparo >= CURRENT_DATE - INTERVAL '6 months'
-            GROUP BY TO_CHAR(data_disparo, 'YYYY-MM'), TO_CHAR(data_disparo, 'Mon/YY')
-            ORDER BY mes ASC
-        """, (cliente_nexus_id,))
+        disparos_mes_result = db.execute_query(SQL_DISPAROS_POR_MES, (cliente_nexus_id,))
 
         disparos_mes_labels = [row['mes_label'] for row in disparos_mes_result]
         disparos_mes_data = [row['total'] for row in disparos_mes_result]
@@ -2651,41 +2184,16 @@ def get_graficos():
 def listar_todos_boletos_debug():
     """Lista TODOS os boletos (sem filtrar por cliente) - Para debug"""
     try:
-        limit = request.args.get('limit', 50, type=int)
+        limit = limitar(request.args.get('limit', type=int), padrao=50)
 
-        query = """
-            SELECT
-                b.id,
-                b.cliente_nexus_id,
-                b.cliente_final_id,
-                b.numero_boleto,
-                b.valor_original,
-                b.data_vencimento,
-                b.data_emissao,
-                b.mes_referencia,
-                b.ano_referencia,
-                b.status,
-                b.status_envio,
-                b.pdf_filename,
-                b.pdf_path,
-                b.pdf_size,
-                b.created_at,
-                cf.nome_completo,
-                cf.cpf,
-                cf.whatsapp
-            FROM boletos b
-            LEFT JOIN clientes_finais cf ON b.cliente_final_id = cf.id
-            ORDER BY b.created_at DESC
-            LIMIT %s
-        """
-
-        boletos = db.execute_query(query, (limit,))
+        query, params = montar_consulta(
+            COLUNAS_BOLETOS_DEBUG,
+            "boletos b LEFT JOIN clientes_finais cf ON b.cliente_final_id = cf.id",
+            cursor=request.args.get('cursor'),
+            limit=limit,
+        )
 
-        return jsonify({
-            'success': True,
-            'count': len(boletos) if boletos else 0,
-            'boletos': boletos or []
-        }), 200
+        return resposta_streaming(query, params, 'boletos', limit=limit, incluir_count=True)
 
     except Exception as e:
         import traceback
@@ -5,14 +5,18 @@ Sistema Nexus CRM - Gestão de Consórcios
 
 from flask import Blueprint, request, jsonify, session, render_template, send_file
 from functools import wraps
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
 import bcrypt
 import logging
 import os
 
-from models.database import db
+from psycopg.rows import dict_row
+
+from models.database import Database, db
+from models.listagem import COLUNAS_BOLETOS_CONSORCIO, limitar, montar_consulta, resposta_streaming
 from services.boleto_generator import boleto_generator
+from services.contadores_dashboard import buscar_contadores
 
 logger = logging.getLogger(__name__)
 
@@ -123,32 +127,8 @@ def dashboard_page():
 def dashboard_stats():
     """Estatísticas do Dashboard"""
     try:
-        # Total de clientes
-        total_clientes = db.execute_query(
-            "SELECT COUNT(*) as total FROM clientes_finais WHERE ativo = true"
-        )[0]['total']
-
-        # Total de contratos ativos
-        contratos_ativos = db.execute_query(
-            "SELECT COUNT(*) as total FROM clientes_finais WHERE status_contrato = 'ativo' AND ativo = true"
-        )[0]['total']
-
-        # Total de boletos pendentes
-        boletos_pendentes = db.execute_query(
-            "SELECT COUNT(*) as total FROM boletos WHERE status = 'pendente'"
-        )[0]['total']
-
-        # Boletos vencendo nos próximos 7 dias
-        data_limite = date.today() + timedelta(days=7)
-        boletos_vencendo = db.execute_query(
-            "SELECT COUNT(*) as total FROM boletos WHERE status = 'pendente' AND data_vencimento <= %s AND data_vencimento >= %s",
-            (data_limite, date.today())
-        )[0]['total']
-
-        # Valor total em crédito
-        valor_total_credito = db.execute_query(
-            "SELECT COALESCE(SUM(valor_credito), 0) as total FROM clientes_finais WHERE status_contrato = 'ativo' AND ativo = true"
-        )[0]['total']
+        # Totais de todos os clientes Nexus (soma de dashboard_counters, mantido por trigger)
+        contadores = buscar_contadores()
 
         # Últimos clientes cadastrados
         ultimos_clientes = db.execute_query("""
@@ -173,11 +153,11 @@ def dashboard_stats():
         return jsonify({
             'success': True,
             'stats': {
-                'total_clientes': total_clientes,
-                'contratos_ativos': contratos_ativos,
-                'boletos_pendentes': boletos_pendentes,
-                'boletos_vencendo': boletos_vencendo,
-                'valor_total_credito': float(valor_total_credito)
+                'total_clientes': contadores['clientes_ativos'],
+                'contratos_ativos': contadores['contratos_ativos'],
+                'boletos_pendentes': contadores['boletos_pendentes'],
+                'boletos_vencendo': contadores['boletos_vencendo_7_dias'],
+                'valor_total_credito': contadores['valor_credito_contratos_ativos']
             },
             'ultimos_clientes': ultimos_clientes,
             'proximos_boletos': proximos_boletos
@@ -442,17 +422,16 @@ def boletos_modelo_page():
 def listar_boletos():
     """Listar todos os boletos"""
     try:
-        boletos = db.execute_query("""
-            SELECT b.*, cf.nome_completo, cf.cpf, cf.numero_contrato
-            FROM boletos b
-            JOIN clientes_finais cf ON b.cliente_final_id = cf.id
-            ORDER BY b.data_vencimento DESC
-        """)
+        limit = limitar(request.args.get('limit', type=int))
 
-        return jsonify({
-            'success': True,
-            'boletos': boletos
-        })
+        query, params = montar_consulta(
+            COLUNAS_BOLETOS_CONSORCIO,
+            "boletos b JOIN clientes_finais cf ON b.cliente_final_id = cf.id",
+            cursor=request.args.get('cursor'),
+            limit=limit,
+        )
+
+        return resposta_streaming(query, params, 'boletos', limit=limit)
 
     except Exception as e:
         logger.error(f"[PORTAL] Erro ao listar boletos: {str(e)}")
@@ -554,102 +533,152 @@ def gerar_boleto():
 @portal_bp.route('/api/boletos/gerar-lote', methods=['POST'])
 @login_required_portal
 def gerar_boletos_lote():
-    """Gerar boletos em lote para um cliente"""
+    """
+    Gerar boletos em lote para um ou vários clientes
+
+    Body JSON:
+    {
+        "cliente_final_id": 1,          // ou "cliente_final_ids": [1, 2, ...]
+        "quantidade_parcelas": 12,
+        "data_primeira_parcela": "2025-01-10",
+        "parcela_inicial": 1
+    }
+
+    Os PDFs são renderizados em paralelo (boleto_generator.gerar_boletos_pdf_em_lote)
+    e gravados com uma consulta de parcelas existentes e um único executemany.
+    """
     try:
         data = request.get_json()
 
         cliente_final_id = data.get('cliente_final_id')
+        cliente_final_ids = data.get('cliente_final_ids') or ([cliente_final_id] if cliente_final_id else [])
         quantidade_parcelas = data.get('quantidade_parcelas', 12)
         data_primeira_parcela_str = data.get('data_primeira_parcela')
         parcela_inicial = data.get('parcela_inicial', 1)
 
         # Validações
-        if not all([cliente_final_id, data_primeira_parcela_str]):
+        if not all([cliente_final_ids, data_primeira_parcela_str]):
             return jsonify({'error': 'Dados incompletos'}), 400
 
-        # Buscar cliente
-        cliente = db.execute_query(
-            "SELECT * FROM clientes_finais WHERE id = %s AND ativo = true",
-            (cliente_final_id,)
+        try:
+            quantidade_parcelas = int(quantidade_parcelas)
+            parcela_inicial = int(parcela_inicial)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'quantidade_parcelas e parcela_inicial devem ser números inteiros'}), 400
+
+        if quantidade_parcelas < 1:
+            return jsonify({'error': 'quantidade_parcelas deve ser pelo menos 1'}), 400
+
+        # Buscar clientes
+        clientes = db.execute_query(
+            "SELECT * FROM clientes_finais WHERE id = ANY(%s) AND ativo = true ORDER BY id",
+            (list(cliente_final_ids),)
         )
 
-        if not cliente:
+        if not clientes:
             return jsonify({'error': 'Cliente não encontrado'}), 404
 
-        cliente = cliente[0]
-        valor_parcela = float(cliente['valor_parcela'])
-
         # Converter data
-        data_vencimento = datetime.strptime(data_primeira_parcela_str, '%Y-%m-%d').date()
-
-        boletos_gerados = []
+        data_primeira_parcela = datetime.strptime(data_primeira_parcela_str, '%Y-%m-%d').date()
+        parcelas = range(parcela_inicial, parcela_inicial + quantidade_parcelas)
+
+        # Parcelas que já existem (uma consulta para o lote inteiro)
+        existentes = db.execute_query("""
+            SELECT cliente_final_id, numero_parcela
+            FROM boletos
+            WHERE cliente_final_id = ANY(%s)
+            AND numero_parcela BETWEEN %s AND %s
+        """, ([cliente['id'] for cliente in clientes], parcelas[0], parcelas[-1]))
+        existentes = {(linha['cliente_final_id'], linha['numero_parcela']) for linha in existentes}
+
+        varios_clientes = len(clientes) > 1
         erros = []
-
-        # Gerar boletos
-        for i in range(quantidade_parcelas):
-            numero_parcela = parcela_inicial + i
-
-            # Verificar se parcela já existe
-            boleto_existente = db.execute_query(
-                "SELECT id FROM boletos WHERE cliente_final_id = %s AND numero_parcela = %s",
-                (cliente_final_id, numero_parcela)
-            )
-
-            if boleto_existente:
-                erros.append(f"Parcela {numero_parcela} já existe")
-                continue
-
-            # Gerar PDF
-            resultado_pdf = boleto_generator.gerar_boleto_pdf(
-                cliente_final=cliente,
-                valor=valor_parcela,
-                data_vencimento=data_vencimento,
-                numero_parcela=numero_parcela
-            )
+        itens = []
+
+        for cliente in clientes:
+            prefixo = f"Cliente {cliente['id']}: " if varios_clientes else ''
+
+            for i, numero_parcela in enumerate(parcelas):
+                if (cliente['id'], numero_parcela) in existentes:
+                    erros.append(f"{prefixo}Parcela {numero_parcela} já existe")
+                    continue
+
+                itens.append({
+                    'cliente_final': cliente,
+                    'valor': float(cliente['valor_parcela']),
+                    # Vencimento mensal a partir da primeira parcela
+                    'data_vencimento': data_primeira_parcela + relativedelta(months=i),
+                    'numero_parcela': numero_parcela
+                })
+
+        # Gerar PDFs
+        resultados_pdf = boleto_generator.gerar_boletos_pdf_em_lote(itens)
+
+        linhas = []
+        gerados = []
+        for item, resultado_pdf in zip(itens, resultados_pdf):
+            cliente = item['cliente_final']
+            numero_parcela = item['numero_parcela']
+            data_vencimento = item['data_vencimento']
 
             if not resultado_pdf['success']:
-                erros.append(f"Erro ao gerar PDF parcela {numero_parcela}")
+                prefixo = f"Cliente {cliente['id']}: " if varios_clientes else ''
+                erros.append(f"{prefixo}Erro ao gerar PDF parcela {numero_parcela}")
                 continue
 
-            # Inserir no banco
-            mes_ref = data_vencimento.month
-            ano_ref = data_vencimento.year
-
-            resultado_db = db.execute_query("""
-                INSERT INTO boletos (
-                    cliente_nexus_id, cliente_final_id, numero_boleto,
-                    linha_digitavel, codigo_barras, nosso_numero,
-                    valor_original, valor_atualizado, data_vencimento, data_emissao,
-                    mes_referencia, ano_referencia, numero_parcela,
-                    descricao, status, status_envio,
-                    pdf_filename, pdf_path, pdf_size, gerado_por
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                ) RETURNING id
-            """, (
-                cliente['cliente_nexus_id'], cliente_final_id,
+            linhas.append((
+                cliente['cliente_nexus_id'], cliente['id'],
                 resultado_pdf['nosso_numero'],
                 resultado_pdf['linha_digitavel'], resultado_pdf['codigo_barras'],
                 resultado_pdf['nosso_numero'],
-                valor_parcela, valor_parcela, data_vencimento, date.today(),
-                mes_ref, ano_ref, numero_parcela,
+                item['valor'], item['valor'], data_vencimento, date.today(),
+                data_vencimento.month, data_vencimento.year, numero_parcela,
                 f"Parcela {numero_parcela}/{cliente['prazo_meses']}",
                 'pendente', 'nao_enviado',
                 resultado_pdf['filename'], resultado_pdf['filepath'],
                 resultado_pdf['file_size'], 'portal'
             ))
+            gerados.append((item, resultado_pdf))
+
+        # Inserir no banco (um executemany, ids na ordem das linhas)
+        ids = []
+        if linhas:
+            with Database.conexao(row_factory=dict_row) as conn:
+                with conn.cursor() as cur:
+                    cur.executemany("""
+                        INSERT INTO boletos (
+                            cliente_nexus_id, cliente_final_id, numero_boleto,
+                            linha_digitavel, codigo_barras, nosso_numero,
+                            valor_original, valor_atualizado, data_vencimento, data_emissao,
+                            mes_referencia, ano_referencia, numero_parcela,
+                            descricao, status, status_envio,
+                            pdf_filename, pdf_path, pdf_size, gerado_por
+                        ) VALUES (
+                            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                        ) RETURNING id
+                    """, linhas, returning=True)
+
+                    while True:
+                        ids.append(cur.fetchone()['id'])
+                        if not cur.nextset():
+                            break
 
-            boletos_gerados.append({
-                'boleto_id': resultado_db[0]['id'],
-                'numero_parcela': numero_parcela,
-                'data_vencimento': data_vencimento.strftime('%d/%m/%Y'),
+        boletos_gerados = []
+        for boleto_id, (item, resultado_pdf) in zip(ids, gerados):
+            boleto = {
+                'boleto_id': boleto_id,
+                'numero_parcela': item['numero_parcela'],
+                'data_vencimento': item['data_vencimento'].strftime('%d/%m/%Y'),
                 'filename': resultado_pdf['filename']
-            })
-
-            # Próximo vencimento (1 mês depois)
-            data_vencimento = data_vencimento + relativedelta(months=1)
-
-        logger.info(f"[PORTAL] Lote gerado: {len(boletos_gerados)} boletos - Cliente {cliente['nome_completo']}")
+            }
+            if varios_clientes:
+                boleto['cliente_final_id'] = item['cliente_final']['id']
+            boletos_gerados.append(boleto)
+
+        if varios_clientes:
+            logger.info(f"[PORTAL] Lote gerado: {len(boletos_gerados)} boletos - {len(clientes)} clientes")
+        else:
+            logger.info(f"[PORTAL] Lote gerado: {len(boletos_gerados)} boletos - Cliente {clientes[0]['nome_completo']}")
 
         return jsonify({
             'success': True,
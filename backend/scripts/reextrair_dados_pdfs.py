@@ -0,0 +1,149 @@
+"""
+Reextrai em lote os dados dos PDFs de boleto (pdf_extracoes)
+
+Processa, num pool de processos (pdfplumber é CPU-bound):
+- PDFs de pdf_blobs / downloads_canopus / boletos sem extração gravada
+- extrações feitas por versão antiga do extrator (VERSAO_EXTRATOR)
+- boletos com pdf_path local e sem pdf_sha256 (o hash é calculado e gravado)
+
+Uso:
+    python scripts/reextrair_dados_pdfs.py              # só pendentes/desatualizados
+    python scripts/reextrair_dados_pdfs.py --todos      # reextrai tudo
+    python scripts/reextrair_dados_pdfs.py --workers 8 --lote 200
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+# Fix encoding para Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+# Adiciona o diretório backend ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def vincular_boletos_locais(db) -> int:
+    """Calcula o hash dos boletos com PDF local que ainda não têm pdf_sha256"""
+    from services.pdf_blob_store import calcular_sha256_arquivo
+
+    boletos = db.execute_query("""
+        SELECT id, pdf_path FROM boletos
+        WHERE pdf_sha256 IS NULL
+        AND pdf_path IS NOT NULL AND pdf_path != ''
+    """) or []
+
+    vinculados = 0
+    for boleto in boletos:
+        if not os.path.exists(boleto['pdf_path']):
+            continue
+        sha256 = calcular_sha256_arquivo(boleto['pdf_path'])
+        db.execute_update("UPDATE boletos SET pdf_sha256 = %s WHERE id = %s", (sha256, boleto['id']))
+        vinculados += 1
+
+    return vinculados
+
+
+def listar_pendentes(db, todos: bool):
+    """Hashes a (re)extrair com um caminho local conhecido, se houver"""
+    from services.pdf_extracao_store import VERSAO_EXTRATOR
+
+    return db.execute_query("""
+        WITH hashes AS (
+            SELECT sha256, NULL::text AS pdf_path FROM pdf_blobs
+            UNION ALL
+            SELECT pdf_sha256, pdf_path FROM boletos WHERE pdf_sha256 IS NOT NULL
+        )
+        SELECT h.sha256, MAX(h.pdf_path) AS pdf_path
+        FROM hashes h
+        LEFT JOIN pdf_extracoes e ON e.sha256 = h.sha256
+        WHERE %s OR e.sha256 IS NULL OR e.versao_extrator < %s
+        GROUP BY h.sha256
+    """, (todos, VERSAO_EXTRATOR)) or []
+
+
+def gravar_lote(resultados) -> None:
+    """Grava um lote de extrações numa única transação"""
+    from models.database import Database
+    from services.pdf_extracao_store import salvar_extracoes
+
+    conn = Database.get_connection()
+    try:
+        with conn.cursor() as cur:
+            salvar_extracoes(cur, resultados)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        Database.return_connection(conn)
+
+
+def reextrair(todos: bool = False, workers: int = None, lote: int = 100):
+    from models.database import db
+    from services.pdf_blob_store import caminho_pdf_blob
+    from services.pdf_extracao_store import extrair_em_lote
+
+    print("=" * 70)
+    print("REEXTRAÇÃO DE DADOS DOS PDFs DE BOLETO")
+    print("=" * 70)
+
+    vinculados = vincular_boletos_locais(db)
+    print(f"\n🔗 Boletos vinculados ao hash do PDF local: {vinculados}")
+
+    pendentes = listar_pendentes(db, todos)
+    print(f"📄 PDFs para extrair: {len(pendentes)}")
+    if not pendentes:
+        return
+
+    # Materializa os blobs no cache local antes de mandar para o pool
+    tarefas = []
+    for row in pendentes:
+        caminho = row['pdf_path'] if row['pdf_path'] and os.path.exists(row['pdf_path']) else None
+        if not caminho:
+            caminho_blob = caminho_pdf_blob(row['sha256'])
+            caminho = str(caminho_blob) if caminho_blob else None
+        if caminho:
+            tarefas.append((row['sha256'], caminho))
+        else:
+            print(f"   ⚠️  PDF indisponível para {row['sha256'][:12]}...")
+
+    inicio = time.time()
+    stats = {'extraidos': 0, 'sem_dados': 0, 'erros': 0}
+    buffer = []
+
+    for idx, (sha256, dados, erro) in enumerate(extrair_em_lote(tarefas, workers), 1):
+        if erro:
+            stats['erros'] += 1
+            print(f"   ❌ {sha256[:12]}...: {erro}")
+            continue
+
+        stats['extraidos' if dados.get('sucesso') else 'sem_dados'] += 1
+        buffer.append((sha256, dados))
+
+        if len(buffer) >= lote:
+            gravar_lote(buffer)
+            buffer = []
+            print(f"   💾 {idx}/{len(tarefas)} gravados")
+
+    if buffer:
+        gravar_lote(buffer)
+
+    print(f"\n✅ Concluído em {time.time() - inicio:.1f}s")
+    print(f"   Extraídos: {stats['extraidos']}")
+    print(f"   Sem dados (vencimento/valor): {stats['sem_dados']}")
+    print(f"   Erros: {stats['erros']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Reextrai dados dos PDFs de boleto em paralelo')
+    parser.add_argument('--todos', action='store_true', help='Reextrai também os já extraídos na versão atual')
+    parser.add_argument('--workers', type=int, default=None, help='Processos (padrão: núcleos da CPU)')
+    parser.add_argument('--lote', type=int, default=100, help='Extrações gravadas por transação')
+    args = parser.parse_args()
+
+    reextrair(todos=args.todos, workers=args.workers, lote=args.lote)
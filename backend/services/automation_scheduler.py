@@ -1,29 +1,158 @@
 """
 Serviço de Agendamento de Automação
 Executa disparos automáticos mensais conforme configuração do cliente
+
+O scheduler sobe em todo processo do app (create_app), mas só o líder
+executa os jobs: quem segura o advisory lock de sessão CHAVE_LOCK_SCHEDULER
+numa conexão dedicada. Se o líder cai, a conexão fecha, o lock é liberado e
+outro processo assume na próxima verificação.
+
+Os clientes do dia são reivindicados de uma vez em execucoes_automacao_mensal
+(migração 019) e executados em paralelo num pool limitado, para um cliente
+lento não atrasar os outros.
 """
 
 import os
 import sys
 import json
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, time
 from typing import Dict, List
+import psycopg
 import pytz
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from config import Config
 from models.database import db, log_sistema
 from services.automation_service import automation_service
 
 
+# Primeiro argumento do pg_try_advisory_lock(int, int) - "namespace" do scheduler
+# (a fila de disparos usa 73010)
+CHAVE_LOCK_SCHEDULER = 73020
+
+# Clientes Nexus executando a automação mensal ao mesmo tempo
+MAX_AUTOMACOES_PARALELAS = int(os.getenv('AUTOMACAO_CLIENTES_PARALELOS', 4))
+
+# Reivindicação em andamento há mais que isso é considerada abandonada
+# (processo morreu no meio) e pode ser reivindicada de novo
+HORAS_EXECUCAO_ABANDONADA = int(os.getenv('AUTOMACAO_HORAS_ABANDONADA', 6))
+
+
+# Reivindica de uma vez os clientes do dia: só entra quem ainda não tem linha
+# hoje (ou tem uma abandonada) e não executou por outro caminho
+SQL_REIVINDICAR_AUTOMACOES = """
+    WITH reivindicados AS (
+        INSERT INTO execucoes_automacao_mensal AS e
+            (cliente_nexus_id, data_referencia, executado_por)
+        SELECT ca.cliente_nexus_id, %(hoje)s, %(executor)s
+        FROM configuracoes_automacao ca
+        JOIN clientes_nexus cn ON ca.cliente_nexus_id = cn.id
+        WHERE ca.disparo_automatico_habilitado = true
+        AND ca.dia_do_mes = %(dia)s
+        AND cn.ativo = true
+        AND NOT EXISTS (
+            SELECT 1
+            FROM historico_disparos h
+            WHERE h.cliente_nexus_id = ca.cliente_nexus_id
+            AND h.tipo_disparo = 'automatico_mensal'
+            AND h.horario_execucao >= CURRENT_DATE
+            AND h.horario_execucao < CURRENT_DATE + 1
+        )
+        ON CONFLICT (cliente_nexus_id, data_referencia) DO UPDATE SET
+            status = 'em_andamento',
+            executado_por = EXCLUDED.executado_por,
+            iniciado_em = CURRENT_TIMESTAMP,
+            concluido_em = NULL
+        WHERE e.status = 'em_andamento'
+        AND e.iniciado_em < CURRENT_TIMESTAMP - make_interval(hours => %(horas)s)
+        RETURNING e.cliente_nexus_id, e.data_referencia
+    )
+    SELECT
+        ca.cliente_nexus_id,
+        r.data_referencia,
+        ca.dia_do_mes,
+        ca.mensagem_antibloqueio,
+        ca.intervalo_min_segundos,
+        ca.intervalo_max_segundos,
+        cn.nome_empresa,
+        cn.whatsapp_numero
+    FROM reivindicados r
+    JOIN configuracoes_automacao ca ON ca.cliente_nexus_id = r.cliente_nexus_id
+    JOIN clientes_nexus cn ON ca.cliente_nexus_id = cn.id
+"""
+
+
 class AutomationScheduler:
     """Gerencia o agendamento de disparos automáticos mensais"""
 
     def __init__(self):
         self.scheduler = BackgroundScheduler(timezone='America/Campo_Grande')  # Timezone de MS
         self.running = False
+        self.executor = ThreadPoolExecutor(max_workers=MAX_AUTOMACOES_PARALELAS,
+                                           thread_name_prefix='automacao-mensal')
+        self.identificador = f"{socket.gethostname()}:{os.getpid()}"
+
+        # Conexão que segura o advisory lock enquanto este processo é o líder
+        self._conexao_lider = None
+        self._lock_lider = threading.Lock()
+
+    # ========================================================================
+    # LIDERANÇA
+    # ========================================================================
+
+    def eh_lider(self) -> bool:
+        """
+        Tenta assumir (ou confirma) a liderança do scheduler
+
+        Conexão dedicada fora do pool: o lock de sessão vale enquanto ela
+        estiver aberta.
+        """
+        with self._lock_lider:
+            if self._conexao_lider is not None:
+                try:
+                    self._conexao_lider.execute("SELECT 1")
+                    return True
+                except Exception as e:
+                    log_sistema('warning',
+                               f'Conexão de liderança do scheduler perdida: {str(e)}',
+                               'scheduler')
+                    self._fechar_conexao_lider()
+
+            try:
+                conn = psycopg.connect(Config.DATABASE_URL, autocommit=True, connect_timeout=10)
+                lider = conn.execute(
+                    "SELECT pg_try_advisory_lock(%s, 0)", (CHAVE_LOCK_SCHEDULER,)
+                ).fetchone()[0]
+            except Exception as e:
+                log_sistema('error',
+                           f'Erro ao disputar a liderança do scheduler: {str(e)}',
+                           'scheduler')
+                return False
+
+            if not lider:
+                conn.close()
+                return False
+
+            self._conexao_lider = conn
+            log_sistema('info',
+                       f'Processo {self.identificador} assumiu a liderança do scheduler',
+                       'scheduler')
+            return True
+
+    def _fechar_conexao_lider(self):
+        """Fecha a conexão de liderança (libera o advisory lock)"""
+        if self._conexao_lider is not None:
+            try:
+                self._conexao_lider.close()
+            except Exception:
+                pass
+            self._conexao_lider = None
 
     def verificar_e_executar_automacoes(self):
         """
@@ -45,60 +174,34 @@ class AutomationScheduler:
                            'scheduler')
                 return
 
+            if not self.eh_lider():
+                return
+
             log_sistema('info',
                        f'Verificando automações agendadas para dia {dia_atual}',
                        'scheduler')
 
-            # Busca clientes com automação habilitada para hoje
-            clientes_para_processar = db.execute_query("""
-                SELECT
-                    ca.cliente_nexus_id,
-                    ca.dia_do_mes,
-                    ca.mensagem_antibloqueio,
-                    ca.intervalo_min_segundos,
-                    ca.intervalo_max_segundos,
-                    cn.nome_empresa,
-                    cn.whatsapp_numero
-                FROM configuracoes_automacao ca
-                JOIN clientes_nexus cn ON ca.cliente_nexus_id = cn.id
-                WHERE ca.disparo_automatico_habilitado = true
-                AND ca.dia_do_mes = %s
-                AND cn.ativo = true
-            """, (dia_atual,))
+            clientes_para_processar = db.execute_query(SQL_REIVINDICAR_AUTOMACOES, {
+                'hoje': agora.date(),
+                'executor': self.identificador,
+                'dia': dia_atual,
+                'horas': HORAS_EXECUCAO_ABANDONADA,
+            })
 
             if not clientes_para_processar:
                 log_sistema('info',
-                           f'Nenhum cliente com automação agendada para dia {dia_atual}',
+                           f'Nenhum cliente pendente com automação agendada para dia {dia_atual}',
                            'scheduler')
                 return
 
             log_sistema('info',
-                       f'Encontrados {len(clientes_para_processar)} clientes para processamento',
+                       f'Reivindicados {len(clientes_para_processar)} clientes para processamento',
                        'scheduler',
                        {'clientes': [c['cliente_nexus_id'] for c in clientes_para_processar]})
 
-            # Verifica se já foi executado hoje para cada cliente
+            # Cada cliente no pool: um cliente lento não segura os demais
             for cliente_config in clientes_para_processar:
-                cliente_nexus_id = cliente_config['cliente_nexus_id']
-
-                # Verifica se já executou hoje
-                ja_executado = db.execute_query("""
-                    SELECT COUNT(*) as count
-                    FROM historico_disparos
-                    WHERE cliente_nexus_id = %s
-                    AND tipo_disparo = 'automatico_mensal'
-                    AND DATE(horario_execucao) = CURRENT_DATE
-                """, (cliente_nexus_id,))
-
-                if ja_executado and ja_executado[0]['count'] > 0:
-                    log_sistema('info',
-                               f'Automação já executada hoje para cliente {cliente_nexus_id}',
-                               'scheduler',
-                               {'cliente_nexus_id': cliente_nexus_id})
-                    continue
-
-                # Executa a automação
-                self._executar_automacao_cliente(cliente_config)
+                self.executor.submit(self._executar_automacao_cliente, cliente_config)
 
         except Exception as e:
             log_sistema('error',
@@ -135,6 +238,7 @@ class AutomationScheduler:
                 'concluido',
                 json.dumps(stats)
             ))
+            self._finalizar_execucao(cliente_config, 'concluido')
 
             log_sistema('success',
                        f'Automação mensal concluída para {nome_empresa}',
@@ -163,6 +267,49 @@ class AutomationScheduler:
                 'erro',
                 json.dumps({'erro': str(e)})
             ))
+            self._finalizar_execucao(cliente_config, 'erro')
+
+    def _finalizar_execucao(self, cliente_config: Dict, status: str):
+        """Fecha a reivindicação do dia (execuções via executar_agora não têm)"""
+        if not cliente_config.get('data_referencia'):
+            return
+
+        try:
+            db.execute_update("""
+                UPDATE execucoes_automacao_mensal
+                SET status = %s, concluido_em = CURRENT_TIMESTAMP
+                WHERE cliente_nexus_id = %s AND data_referencia = %s
+            """, (status, cliente_config['cliente_nexus_id'], cliente_config['data_referencia']))
+        except Exception as e:
+            log_sistema('error',
+                       f'Erro ao finalizar execução do cliente {cliente_config["cliente_nexus_id"]}: {str(e)}',
+                       'scheduler')
+
+    def reconciliar_contadores_dashboard(self):
+        """Recalcula dashboard_counters a partir das tabelas"""
+        if not self.eh_lider():
+            return
+
+        try:
+            from services.contadores_dashboard import reconciliar
+            reconciliar()
+        except Exception as e:
+            log_sistema('error',
+                       f'Erro ao reconciliar contadores do dashboard: {str(e)}',
+                       'scheduler')
+
+    def limpar_sessoes_expiradas(self):
+        """Apaga as sessões HTTP vencidas (SESSION_BACKEND=postgres)"""
+        if Config.SESSION_BACKEND != 'postgres' or not self.eh_lider():
+            return
+
+        try:
+            from sessoes import limpar_sessoes_expiradas
+            limpar_sessoes_expiradas()
+        except Exception as e:
+            log_sistema('error',
+                       f'Erro ao limpar sessões expiradas: {str(e)}',
+                       'scheduler')
 
     def iniciar(self):
         """Inicia o scheduler"""
@@ -181,6 +328,25 @@ class AutomationScheduler:
             replace_existing=True
         )
 
+        # Reconciliação noturna dos contadores do dashboard (corrige desvios
+        # dos triggers, p.ex. após restore ou edição manual com triggers desligados)
+        self.scheduler.add_job(
+            self.reconciliar_contadores_dashboard,
+            CronTrigger(hour='3', minute='30'),
+            id='reconciliar_contadores_dashboard',
+            name='Reconciliar Contadores do Dashboard',
+            replace_existing=True
+        )
+
+        # Sessões HTTP vencidas (tabela sessoes_http)
+        self.scheduler.add_job(
+            self.limpar_sessoes_expiradas,
+            CronTrigger(minute='*/15'),
+            id='limpar_sessoes_expiradas',
+            name='Limpar Sessões Expiradas',
+            replace_existing=True
+        )
+
         self.scheduler.start()
         self.running = True
 
@@ -197,8 +363,14 @@ class AutomationScheduler:
             return
 
         self.scheduler.shutdown()
+        # Automações em andamento terminam sozinhas; as que ficaram na fila
+        # voltam a ser reivindicadas depois de HORAS_EXECUCAO_ABANDONADA
+        self.executor.shutdown(wait=False, cancel_futures=True)
         self.running = False
 
+        with self._lock_lider:
+            self._fechar_conexao_lider()
+
         log_sistema('info', 'Scheduler de automação parado', 'scheduler')
         print("[INFO] Scheduler de automação parado")
 
@@ -250,6 +422,9 @@ class AutomationScheduler:
 
         return {
             'running': self.running,
+            'lider': self._conexao_lider is not None,
+            'processo': self.identificador,
+            'automacoes_paralelas': MAX_AUTOMACOES_PARALELAS,
             'jobs': jobs,
             'timezone': 'America/Campo_Grande'
         }
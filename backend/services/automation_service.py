@@ -6,7 +6,7 @@ Etapas 21-33 do manual
 import os
 import time
 from datetime import datetime, date, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional
 import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -18,11 +18,36 @@ from models import (
 )
 from services.pdf_generator import BoletoGenerator
 from services.whatsapp_service import whatsapp_service
+from services.despacho_whatsapp import DespachanteWhatsApp
 from services.webscraping import campus_scraper
-from services.pdf_extractor import extrair_dados_boleto
+from services.pdf_extracao_store import obter_dados_boleto
 from services.mensagens_personalizadas import gerar_mensagem_boleto
 
 
+# Boletos pendentes com WhatsApp válido do cliente Nexus (índice da migração 015)
+SQL_BOLETOS_PARA_DISPARO = """
+    SELECT
+        b.id as boleto_id,
+        b.numero_boleto,
+        b.valor_original as valor,
+        b.data_vencimento as vencimento,
+        b.pdf_path,
+        b.pdf_filename,
+        b.pdf_sha256,
+        b.mes_referencia,
+        cf.id as cliente_final_id,
+        cf.nome_completo as cliente_final_nome,
+        cf.whatsapp
+    FROM boletos b
+    INNER JOIN clientes_finais cf ON b.cliente_final_id = cf.id
+    WHERE b.cliente_nexus_id = %s
+        AND b.status_envio IN ('nao_enviado', 'pendente')
+        AND cf.whatsapp IS NOT NULL
+        AND LENGTH(cf.whatsapp) >= 10
+    ORDER BY b.data_vencimento, cf.nome_completo
+"""
+
+
 class AutomationService:
     """Serviço principal de automação do sistema"""
 
@@ -108,26 +133,7 @@ class AutomationService:
             self._enviar_notificacao_inicial(cliente_nexus, len(clientes))
 
             # BUSCAR BOLETOS PENDENTES EXISTENTES (não gera novos!)
-            boletos_para_enviar = db.execute_query("""
-                SELECT
-                    b.id as boleto_id,
-                    b.numero_boleto,
-                    b.valor_original as valor,
-                    b.data_vencimento as vencimento,
-                    b.pdf_path,
-                    b.pdf_filename,
-                    b.mes_referencia,
-                    cf.id as cliente_final_id,
-                    cf.nome_completo as cliente_final_nome,
-                    cf.whatsapp
-                FROM boletos b
-                INNER JOIN clientes_finais cf ON b.cliente_final_id = cf.id
-                WHERE b.cliente_nexus_id = %s
-                    AND b.status_envio IN ('nao_enviado', 'pendente')
-                    AND cf.whatsapp IS NOT NULL
-                    AND LENGTH(cf.whatsapp) >= 10
-                ORDER BY b.data_vencimento, cf.nome_completo
-            """, (cliente_nexus_id,))
+            boletos_para_enviar = db.execute_query(SQL_BOLETOS_PARA_DISPARO, (cliente_nexus_id,))
 
             stats['clientes_processados'] = len(clientes)
             stats['boletos_gerados'] = len(boletos_para_enviar)
@@ -278,9 +284,29 @@ class AutomationService:
             log_sistema('success', f'{total} boletos registrados no banco', 'automacao',
                        {'cliente_nexus_id': cliente_nexus_id})
 
+    def _obter_pdf(self, boleto: Dict) -> Optional[str]:
+        """Caminho do PDF: pdf_path no disco ou blob do boleto (importados só têm o hash)"""
+        pdf_path = boleto.get('pdf_path')
+        if pdf_path and os.path.exists(pdf_path):
+            return pdf_path
+
+        if boleto.get('pdf_sha256'):
+            from services.pdf_blob_store import caminho_pdf_blob
+
+            caminho = caminho_pdf_blob(boleto['pdf_sha256'])
+            if caminho:
+                return str(caminho)
+
+        return None
+
     def _executar_disparos_automaticos(self, cliente_nexus_id: int, boletos: List[Dict],
                                        mensagem_antibloqueio: str, intervalo: int) -> Dict:
-        """Etapas 29-30: Disparo automático com anti-bloqueio"""
+        """
+        Etapas 29-30: Disparo automático com anti-bloqueio
+
+        `intervalo` é a espera entre o texto e o PDF de um mesmo cliente;
+        o espaçamento entre mensagens do remetente fica com o DespachanteWhatsApp.
+        """
 
         stats = {
             'total': len(boletos),
@@ -293,154 +319,178 @@ class AutomationService:
         log_sistema('info', f'🚀 Iniciando disparos para {len(boletos)} clientes COM WhatsApp', 'automacao',
                    {'cliente_nexus_id': cliente_nexus_id, 'total_boletos': len(boletos)})
 
-        for idx, boleto in enumerate(boletos, 1):
-            try:
-                whatsapp = boleto.get('whatsapp')
+        total = len(boletos)
+        posicoes = {id(boleto): idx for idx, boleto in enumerate(boletos, 1)}
 
-                log_sistema('info', f'📱 [{idx}/{len(boletos)}] Processando: {boleto["cliente_final_nome"]} → {whatsapp}',
-                           'automacao', {
-                               'boleto_id': boleto.get('cliente_final_id'),
-                               'cliente': boleto['cliente_final_nome'],
-                               'whatsapp': whatsapp,
-                               'pdf_path': boleto.get('pdf_path')
-                           })
+        def preparar(boleto: Dict) -> Optional[Dict]:
+            idx = posicoes[id(boleto)]
+            whatsapp = boleto.get('whatsapp')
 
-                # Validação adicional (segurança)
-                if not whatsapp or len(str(whatsapp).strip()) < 10:
-                    log_sistema('error', f"❌ WhatsApp inválido para {boleto['cliente_final_nome']}: '{whatsapp}'",
-                               'automacao', {'cliente_final_id': boleto['cliente_final_id']})
-                    stats['erros'] += 1
-                    continue
+            log_sistema('info', f'📱 [{idx}/{total}] Processando: {boleto["cliente_final_nome"]} → {whatsapp}',
+                       'automacao', {
+                           'boleto_id': boleto.get('cliente_final_id'),
+                           'cliente': boleto['cliente_final_nome'],
+                           'whatsapp': whatsapp,
+                           'pdf_path': boleto.get('pdf_path')
+                       })
 
-                # Usar boleto_id que já vem da query
-                boleto_id = boleto.get('boleto_id')
+            # Validação adicional (segurança)
+            if not whatsapp or len(str(whatsapp).strip()) < 10:
+                log_sistema('error', f"❌ WhatsApp inválido para {boleto['cliente_final_nome']}: '{whatsapp}'",
+                           'automacao', {'cliente_final_id': boleto['cliente_final_id']})
+                return None
 
-                # Registra o disparo como pendente
-                if boleto_id:
-                    disparo_id = db.execute_query("""
-                        INSERT INTO disparos
-                        (boleto_id, cliente_nexus_id, telefone_destino, status, mensagem_enviada)
-                        VALUES (%s, %s, %s, %s, %s)
-                        RETURNING id
-                    """, (boleto_id, cliente_nexus_id, whatsapp, 'pendente', mensagem_antibloqueio))
-
-                    disparo_id = disparo_id[0]['id'] if disparo_id else None
-                else:
-                    disparo_id = None
+            # Usar boleto_id que já vem da query
+            boleto_id = boleto.get('boleto_id')
+
+            # Registra o disparo como pendente
+            if boleto_id:
+                disparo_id = db.execute_query("""
+                    INSERT INTO disparos
+                    (boleto_id, cliente_nexus_id, telefone_destino, status, mensagem_enviada)
+                    VALUES (%s, %s, %s, %s, %s)
+                    RETURNING id
+                """, (boleto_id, cliente_nexus_id, whatsapp, 'pendente', mensagem_antibloqueio))
 
-                # Etapa 30: Extração de dados do PDF e envio com anti-bloqueio
-                pdf_path = boleto.get('pdf_path')
+                disparo_id = disparo_id[0]['id'] if disparo_id else None
+            else:
+                disparo_id = None
 
-                # Extrair dados do PDF para mensagem personalizada
-                dados_pdf = {}
-                if pdf_path and os.path.exists(pdf_path):
-                    log_sistema('info', f'📄 Extraindo dados do PDF: {os.path.basename(pdf_path)}',
-                               'automacao', {'pdf_path': pdf_path})
-                    dados_pdf = extrair_dados_boleto(pdf_path)
+            # Etapa 30: Extração de dados do PDF e envio com anti-bloqueio
+            pdf_path = self._obter_pdf(boleto)
 
-                    if dados_pdf.get('sucesso'):
-                        log_sistema('success', f'✅ Dados extraídos do PDF: venc={dados_pdf.get("vencimento_str")}, valor=R$ {dados_pdf.get("valor", 0):.2f}',
-                                   'automacao', {'dados_pdf': dados_pdf})
-                    else:
-                        log_sistema('warning', f'⚠️ Não foi possível extrair todos os dados do PDF',
-                                   'automacao', {'pdf_path': pdf_path})
+            # Sem o PDF o envio falha (só o texto não é boleto enviado)
+            if not pdf_path:
+                erro_msg = 'PDF não encontrado'
+                if disparo_id:
+                    db.execute_update("""
+                        UPDATE disparos
+                        SET status = 'erro', erro = %s, data_disparo = CURRENT_TIMESTAMP
+                        WHERE id = %s
+                    """, (erro_msg, disparo_id))
+                raise Exception(f"{erro_msg} (boleto {boleto_id}, pdf_path={boleto.get('pdf_path')}, "
+                                f"pdf_sha256={boleto.get('pdf_sha256')})")
+
+            # Dados do PDF para mensagem personalizada (extraídos uma vez, por hash)
+            dados_pdf = obter_dados_boleto(pdf_path, boleto.get('pdf_sha256'))
+
+            if dados_pdf.get('sucesso'):
+                log_sistema('success', f'✅ Dados extraídos do PDF: venc={dados_pdf.get("vencimento_str")}, valor=R$ {dados_pdf.get("valor", 0):.2f}',
+                           'automacao', {'dados_pdf': dados_pdf})
+            else:
+                log_sistema('warning', f'⚠️ Não foi possível extrair todos os dados do PDF',
+                           'automacao', {'pdf_path': pdf_path})
+
+            # Gerar mensagem personalizada com dados do PDF
+            mensagem_personalizada = gerar_mensagem_boleto(
+                nome_cliente=boleto['cliente_final_nome'],
+                vencimento=boleto.get('vencimento'),  # Fallback do banco
+                valor=boleto.get('valor'),            # Fallback do banco
+                contrato=None,
+                empresa="Cred MS Consorcios",
+                dados_pdf=dados_pdf  # Dados do PDF têm prioridade
+            )
 
-                # Gerar mensagem personalizada com dados do PDF
-                mensagem_personalizada = gerar_mensagem_boleto(
-                    nome_cliente=boleto['cliente_final_nome'],
-                    vencimento=boleto.get('vencimento'),  # Fallback do banco
-                    valor=boleto.get('valor'),            # Fallback do banco
-                    contrato=None,
-                    empresa="Cred MS Consorcios",
-                    dados_pdf=dados_pdf  # Dados do PDF têm prioridade
-                )
+            log_sistema('info', f'📤 [{idx}/{total}] Enviando boleto para {boleto["cliente_final_nome"]} ({whatsapp})',
+                       'automacao', {
+                           'boleto_id': boleto_id,
+                           'disparo_id': disparo_id,
+                           'pdf_path': pdf_path,
+                           'whatsapp': whatsapp,
+                           'mensagem_preview': mensagem_personalizada[:80] + '...',
+                           'intervalo': intervalo,
+                           'dados_extraidos': {
+                               'vencimento': dados_pdf.get('vencimento_str'),
+                               'valor': dados_pdf.get('valor')
+                           }
+                       })
+
+            return {
+                'numero': whatsapp,
+                'mensagem': mensagem_personalizada,  # Usa mensagem personalizada com dados do PDF
+                'pdf_path': pdf_path,
+                'intervalo_pdf': intervalo,
+                'cliente_nexus_id': cliente_nexus_id,
+                'boleto_id': boleto_id,
+                'disparo_id': disparo_id
+            }
+
+        def ao_concluir(boleto: Dict, envio: Optional[Dict], resultado: Dict):
+            idx = posicoes[id(boleto)]
+            if envio is None:
+                # WhatsApp inválido ou exceção na preparação (já logado)
+                if resultado.get('erro') != 'Item ignorado na preparação':
+                    log_sistema('error', f'❌ Exceção no disparo para {boleto.get("cliente_final_nome", "cliente")}: {resultado.get("erro")}',
+                               'automacao', {
+                                   'cliente': boleto.get('cliente_final_nome'),
+                                   'whatsapp': boleto.get('whatsapp'),
+                                   'exception': resultado.get('erro')
+                               })
+                return
+
+            whatsapp = envio['numero']
+            boleto_id = envio['boleto_id']
+            disparo_id = envio['disparo_id']
+
+            log_sistema('info', f'📊 Resultado do envio para {boleto["cliente_final_nome"]}: {resultado.get("sucesso_total")}',
+                       'automacao', {
+                           'cliente': boleto['cliente_final_nome'],
+                           'whatsapp': whatsapp,
+                           'sucesso': resultado.get('sucesso_total'),
+                           'erro': resultado.get('erro'),
+                           'resultado_completo': resultado
+                       })
 
-                log_sistema('info', f'📤 [{idx}/{len(boletos)}] Enviando boleto para {boleto["cliente_final_nome"]} ({whatsapp})',
+            if resultado['sucesso_total']:
+                # Atualiza status do disparo para enviado
+                if disparo_id:
+                    db.execute_update("""
+                        UPDATE disparos
+                        SET status = 'enviado', data_disparo = CURRENT_TIMESTAMP
+                        WHERE id = %s
+                    """, (disparo_id,))
+
+                # Atualiza status do boleto
+                if boleto_id:
+                    db.execute_update("""
+                        UPDATE boletos
+                        SET status_envio = 'enviado', data_envio = CURRENT_TIMESTAMP
+                        WHERE id = %s
+                    """, (boleto_id,))
+
+                log_sistema('success', f'✅ [{idx}/{total}] Boleto enviado com sucesso para {boleto["cliente_final_nome"]}!',
                            'automacao', {
                                'boleto_id': boleto_id,
                                'disparo_id': disparo_id,
-                               'pdf_path': pdf_path,
                                'whatsapp': whatsapp,
-                               'mensagem_preview': mensagem_personalizada[:80] + '...',
-                               'intervalo': intervalo,
-                               'dados_extraidos': {
-                                   'vencimento': dados_pdf.get('vencimento_str'),
-                                   'valor': dados_pdf.get('valor')
-                               }
+                               'cliente': boleto["cliente_final_nome"]
                            })
+            else:
+                # Marca disparo como erro
+                erro_msg = resultado.get('erro', 'Erro desconhecido')
+                if disparo_id:
+                    db.execute_update("""
+                        UPDATE disparos
+                        SET status = 'erro', erro = %s, data_disparo = CURRENT_TIMESTAMP
+                        WHERE id = %s
+                    """, (erro_msg, disparo_id))
 
-                resultado = whatsapp_service.enviar_com_antibloqueio(
-                    whatsapp,
-                    pdf_path,
-                    mensagem_personalizada,  # Usa mensagem personalizada com dados do PDF
-                    intervalo,
-                    cliente_nexus_id
-                )
-
-                log_sistema('info', f'📊 Resultado do envio para {boleto["cliente_final_nome"]}: {resultado.get("sucesso_total")}',
+                log_sistema('error', f'❌ [{idx}/{total}] ERRO ao enviar boleto para {boleto["cliente_final_nome"]}: {erro_msg}',
                            'automacao', {
-                               'cliente': boleto['cliente_final_nome'],
+                               'boleto_id': boleto_id,
+                               'disparo_id': disparo_id,
                                'whatsapp': whatsapp,
-                               'sucesso': resultado.get('sucesso_total'),
-                               'erro': resultado.get('erro'),
+                               'erro': erro_msg,
                                'resultado_completo': resultado
                            })
 
-                if resultado['sucesso_total']:
-                    stats['sucessos'] += 1
-
-                    # Atualiza status do disparo para enviado
-                    if disparo_id:
-                        db.execute_update("""
-                            UPDATE disparos
-                            SET status = 'enviado', data_disparo = CURRENT_TIMESTAMP
-                            WHERE id = %s
-                        """, (disparo_id,))
-
-                    # Atualiza status do boleto
-                    if boleto_id:
-                        db.execute_update("""
-                            UPDATE boletos
-                            SET status_envio = 'enviado', data_envio = CURRENT_TIMESTAMP
-                            WHERE id = %s
-                        """, (boleto_id,))
-
-                    log_sistema('success', f'✅ [{idx}/{len(boletos)}] Boleto enviado com sucesso para {boleto["cliente_final_nome"]}!',
-                               'automacao', {
-                                   'boleto_id': boleto_id,
-                                   'disparo_id': disparo_id,
-                                   'whatsapp': whatsapp,
-                                   'cliente': boleto["cliente_final_nome"]
-                               })
-                else:
-                    stats['erros'] += 1
-
-                    # Marca disparo como erro
-                    erro_msg = resultado.get('erro', 'Erro desconhecido')
-                    if disparo_id:
-                        db.execute_update("""
-                            UPDATE disparos
-                            SET status = 'erro', erro = %s, data_disparo = CURRENT_TIMESTAMP
-                            WHERE id = %s
-                        """, (erro_msg, disparo_id))
-
-                    log_sistema('error', f'❌ [{idx}/{len(boletos)}] ERRO ao enviar boleto para {boleto["cliente_final_nome"]}: {erro_msg}',
-                               'automacao', {
-                                   'boleto_id': boleto_id,
-                                   'disparo_id': disparo_id,
-                                   'whatsapp': whatsapp,
-                                   'erro': erro_msg,
-                                   'resultado_completo': resultado
-                               })
+        # Vários destinatários em andamento; ritmo por número remetente
+        # vem de intervalo_min/max_segundos (configuracoes_automacao)
+        despachante = DespachanteWhatsApp.para_cliente(whatsapp_service, cliente_nexus_id)
+        resultado_despacho = despachante.despachar(boletos, preparar, ao_concluir)
 
-            except Exception as e:
-                log_sistema('error', f'❌ Exceção no disparo para {boleto.get("cliente_final_nome", "cliente")}: {str(e)}',
-                           'automacao', {
-                               'cliente': boleto.get('cliente_final_nome'),
-                               'whatsapp': boleto.get('whatsapp'),
-                               'exception': str(e)
-                           })
-                stats['erros'] += 1
+        stats['sucessos'] = resultado_despacho['sucessos']
+        stats['erros'] = resultado_despacho['erros']
 
         # Log de resumo final
         log_sistema('info', f'🏁 Disparos finalizados: {stats["sucessos"]} sucessos, {stats["erros"]} erros de {stats["total"]} total',
@@ -644,6 +694,7 @@ def enviar_boletos_apenas_disparo(cliente_nexus_id: int, cliente_final_id: int)
                 b.data_vencimento,
                 b.pdf_path,
                 b.pdf_filename,
+                b.pdf_sha256,
                 cf.id as cliente_final_id,
                 cf.nome_completo as cliente_final_nome,
                 cf.whatsapp
@@ -678,16 +729,10 @@ def enviar_boletos_apenas_disparo(cliente_nexus_id: int, cliente_final_id: int)
                 pdf_path = boleto['pdf_path']
                 boleto_id = boleto['boleto_id']
 
-                # Extrair dados do PDF para mensagem personalizada
+                # Dados do PDF para mensagem personalizada (extraídos uma vez, por hash)
                 dados_pdf = {}
-                if pdf_path and os.path.exists(pdf_path):
-                    log_sistema(
-                        'info',
-                        f'📄 Extraindo dados do PDF: {os.path.basename(pdf_path)}',
-                        'disparo_individual',
-                        {'pdf_path': pdf_path}
-                    )
-                    dados_pdf = extrair_dados_boleto(pdf_path)
+                if boleto.get('pdf_sha256') or (pdf_path and os.path.exists(pdf_path)):
+                    dados_pdf = obter_dados_boleto(pdf_path, boleto.get('pdf_sha256'))
 
                     if dados_pdf.get('sucesso'):
                         log_sistema(
@@ -1,24 +1,121 @@
 """
 Gerador de Boletos Bancários em PDF
 Sistema Nexus CRM - Portal Consórcio
+
+O layout fixo da página (cabeçalho, beneficiário, títulos, rótulos,
+instruções e rodapé) é montado uma vez por processo (LayoutGravado) e
+repetido como form XObject em cada documento; o código de barras é desenhado
+em vetor (Code128 do ReportLab), sem gerar imagem. Lotes são renderizados em
+paralelo num pool de processos (gerar_boletos_pdf_em_lote), iniciados por
+forkserver/spawn: nada do processo do Flask (conexões, threads, locks) é
+herdado pelos workers.
 """
 
+import multiprocessing
 import os
 import random
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from reportlab.graphics.barcode.code128 import Code128
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import mm
-from reportlab.lib.utils import ImageReader
-import barcode
-from barcode.writer import ImageWriter
 from io import BytesIO
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
 
+COR_DESTAQUE = colors.HexColor("#39FF14")
+
+# Nome do form XObject com a parte fixa da página
+FORM_LAYOUT = 'layout_boleto'
+
+# Área do código de barras (mesma da imagem antiga)
+LARGURA_CODIGO_BARRAS = 450
+ALTURA_CODIGO_BARRAS = 45
+
+# Lotes menores que isso não compensam o envio para o pool de processos
+MINIMO_LOTE_PARALELO = 8
+
+MAX_PROCESSOS_PDF = int(os.getenv('PDF_PROCESSOS', os.cpu_count() or 2))
+
+_pool_processos = None
+_pool_lock = threading.Lock()
+
+# Layout fixo do boleto deste processo (montado uma vez, ver layout_processo)
+_layout_processo = None
+
+
+class LayoutGravado:
+    """
+    Parte fixa de uma página, montada uma vez e repetida em cada canvas
+
+    Recebe as mesmas chamadas de um canvas do ReportLab (setFont, drawString,
+    line, rect...) e as guarda, com as coordenadas já calculadas;
+    reproduzir() as aplica num canvas novo dentro de um form XObject.
+    """
+
+    def __init__(self, nome_form: str):
+        self.nome_form = nome_form
+        self.chamadas = []
+
+    def __getattr__(self, metodo: str):
+        def gravar(*args, **kwargs):
+            self.chamadas.append((metodo, args, kwargs))
+        return gravar
+
+    def reproduzir(self, c: canvas.Canvas):
+        """Registra o layout no documento como form XObject (use c.doForm para desenhar)"""
+        c.beginForm(self.nome_form)
+        for metodo, args, kwargs in self.chamadas:
+            getattr(c, metodo)(*args, **kwargs)
+        c.endForm()
+
+
+def layout_processo() -> LayoutGravado:
+    """Layout fixo do boleto, montado na primeira chamada de cada processo"""
+    global _layout_processo
+    if _layout_processo is None:
+        layout = LayoutGravado(FORM_LAYOUT)
+        boleto_generator._desenhar_layout(layout)
+        _layout_processo = layout
+    return _layout_processo
+
+
+def _iniciar_processo_pdf():
+    """Inicializador dos workers: o layout fica pronto antes do primeiro boleto"""
+    layout_processo()
+
+
+def _contexto_processos():
+    """forkserver onde existe (Linux); spawn nos demais (Windows, macOS)"""
+    metodo = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(metodo)
+
+
+def obter_pool_pdf() -> ProcessPoolExecutor:
+    """Pool de processos da geração de PDFs (criado no primeiro lote grande)"""
+    global _pool_processos
+    with _pool_lock:
+        if _pool_processos is None:
+            # fork copiaria o processo do Flask com as threads no meio do
+            # trabalho (pool do banco, scheduler) e seus locks travados
+            _pool_processos = ProcessPoolExecutor(
+                max_workers=MAX_PROCESSOS_PDF,
+                mp_context=_contexto_processos(),
+                initializer=_iniciar_processo_pdf,
+            )
+        return _pool_processos
+
+
+def _renderizar_boleto(dados: dict) -> dict:
+    """Renderiza um boleto já preparado (roda nos processos do pool)"""
+    return boleto_generator.renderizar_boleto(dados)
+
+
 class BoletoGenerator:
     """Gerador de boletos bancários em PDF"""
 
@@ -39,8 +136,11 @@ class BoletoGenerator:
         return f"{random.randint(10000000, 99999999)}-{random.randint(0, 9)}"
 
     def gerar_codigo_barras_imagem(self, numero):
-        """Gera imagem do código de barras"""
+        """Gera imagem PNG do código de barras (o PDF desenha em vetor, ver _desenhar_codigo_barras)"""
         try:
+            import barcode
+            from barcode.writer import ImageWriter
+
             # Limitar a 44 caracteres para Code128
             numero_str = str(numero)[:44]
             code = barcode.get('code128', numero_str, writer=ImageWriter())
@@ -54,175 +154,86 @@ class BoletoGenerator:
 
     def gerar_boleto_pdf(self, cliente_final, valor, data_vencimento, numero_parcela):
         """Gera PDF do boleto completo"""
+        return self.renderizar_boleto(
+            self.preparar_boleto(cliente_final, valor, data_vencimento, numero_parcela)
+        )
+
+    def gerar_boletos_pdf_em_lote(self, itens: list) -> list:
+        """
+        Gera vários boletos, em paralelo num pool de processos
+
+        Args:
+            itens: Dicionários com cliente_final, valor, data_vencimento e
+                numero_parcela (os argumentos de gerar_boleto_pdf)
+
+        Returns:
+            Resultados de gerar_boleto_pdf, na mesma ordem dos itens
+        """
+        # Números aleatórios gerados aqui, num único processo: workers
+        # sorteando por conta própria poderiam repetir linha digitável/nosso número
+        preparados = [
+            self.preparar_boleto(item['cliente_final'], item['valor'],
+                                 item['data_vencimento'], item['numero_parcela'])
+            for item in itens
+        ]
+
+        if len(preparados) < MINIMO_LOTE_PARALELO or MAX_PROCESSOS_PDF < 2:
+            return [self.renderizar_boleto(dados) for dados in preparados]
+
+        pool = obter_pool_pdf()
+        tamanho_bloco = max(1, len(preparados) // (MAX_PROCESSOS_PDF * 4))
+        return list(pool.map(_renderizar_boleto, preparados, chunksize=tamanho_bloco))
+
+    def preparar_boleto(self, cliente_final, valor, data_vencimento, numero_parcela) -> dict:
+        """Dados do boleto (números, nome do arquivo) prontos para renderizar"""
+        # Nome do arquivo
+        cpf_limpo = cliente_final['cpf'].replace('.', '').replace('-', '')
+        emissao = datetime.now()
+        filename = f"boleto_{cpf_limpo}_parcela{numero_parcela:02d}_{emissao.strftime('%Y%m%d%H%M%S')}.pdf"
+
+        # Gerar dados do boleto
+        linha_digitavel = self.gerar_linha_digitavel()
+
+        return {
+            'cliente_final': dict(cliente_final),
+            'valor': valor,
+            'data_vencimento': data_vencimento,
+            'numero_parcela': numero_parcela,
+            'filename': filename,
+            'filepath': os.path.join(self.boletos_dir, filename),
+            'linha_digitavel': linha_digitavel,
+            'nosso_numero': self.gerar_nosso_numero(),
+            'codigo_barras': linha_digitavel.replace('.', '').replace(' ', ''),
+            'documento': random.randint(100000, 999999),
+            'emissao': emissao,
+        }
+
+    def renderizar_boleto(self, dados: dict) -> dict:
+        """Desenha o PDF de um boleto preparado por preparar_boleto"""
         try:
-            # Nome do arquivo
-            cpf_limpo = cliente_final['cpf'].replace('.', '').replace('-', '')
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-            filename = f"boleto_{cpf_limpo}_parcela{numero_parcela:02d}_{timestamp}.pdf"
-            filepath = os.path.join(self.boletos_dir, filename)
-
-            # Gerar dados do boleto
-            linha_digitavel = self.gerar_linha_digitavel()
-            nosso_numero = self.gerar_nosso_numero()
-            codigo_barras = linha_digitavel.replace('.', '').replace(' ', '')
+            filepath = dados['filepath']
 
             # Criar PDF
             c = canvas.Canvas(filepath, pagesize=A4)
-            width, height = A4
-
-            # ========== CABEÇALHO ==========
-            c.setFont("Helvetica-Bold", 18)
-            c.drawString(50, height - 50, "BANCO CONSORCIO NACIONAL")
-
-            c.setFont("Helvetica", 10)
-            c.drawString(50, height - 70, "001-9  |  Banco Consórcio S/A")
-
-            # Linha divisória verde neon
-            c.setStrokeColor(colors.HexColor("#39FF14"))
-            c.setLineWidth(2)
-            c.line(50, height - 80, width - 50, height - 80)
-
-            # ========== DADOS DO BENEFICIÁRIO ==========
-            y = height - 110
-            c.setFont("Helvetica-Bold", 11)
-            c.setFillColor(colors.HexColor("#39FF14"))
-            c.drawString(50, y, "BENEFICIARIO")
-
-            c.setFillColor(colors.black)
-            c.setFont("Helvetica", 9)
-            c.drawString(50, y - 18, "CONSORCIO NACIONAL S/A")
-            c.drawString(50, y - 33, "CNPJ: 12.345.678/0001-90")
-            c.drawString(50, y - 48, "Rua das Financas, 1000 - Centro - Sao Paulo/SP")
-
-            # ========== DADOS DO PAGADOR ==========
-            y = y - 90
-            c.setFont("Helvetica-Bold", 11)
-            c.setFillColor(colors.HexColor("#39FF14"))
-            c.drawString(50, y, "PAGADOR")
-
-            c.setFillColor(colors.black)
-            c.setFont("Helvetica", 9)
-            c.drawString(50, y - 18, cliente_final['nome_completo'].upper())
-            c.drawString(50, y - 33, f"CPF: {cliente_final['cpf']}")
-            c.drawString(50, y - 48, f"Contrato: {cliente_final['numero_contrato']}")
-            c.drawString(50, y - 63, f"Grupo: {cliente_final['grupo_consorcio']}  |  Cota: {cliente_final['cota_consorcio']}")
-
-            if cliente_final.get('logradouro'):
-                endereco = f"{cliente_final.get('logradouro', '')}, {cliente_final.get('numero', '')}"
-                if cliente_final.get('complemento'):
-                    endereco += f" - {cliente_final['complemento']}"
-                c.drawString(50, y - 78, endereco)
-                c.drawString(50, y - 93, f"{cliente_final.get('cidade', '')} - {cliente_final.get('estado', '')} - CEP: {cliente_final.get('cep', '')}")
-
-            # ========== INFORMAÇÕES DO BOLETO ==========
-            y = y - 130
-            c.setStrokeColor(colors.HexColor("#39FF14"))
-            c.setLineWidth(1)
-            c.line(50, y, width - 50, y)
-
-            y = y - 25
-            c.setFont("Helvetica-Bold", 11)
-            c.setFillColor(colors.HexColor("#39FF14"))
-            c.drawString(50, y, "INFORMACOES DO BOLETO")
-
-            c.setFillColor(colors.black)
-            c.setFont("Helvetica", 9)
-            c.drawString(50, y - 20, "Nosso Numero:")
-            c.setFont("Helvetica-Bold", 9)
-            c.drawString(150, y - 20, nosso_numero)
-
-            c.setFont("Helvetica", 9)
-            c.drawString(50, y - 35, "Parcela:")
-            c.setFont("Helvetica-Bold", 9)
-            c.drawString(150, y - 35, f"{numero_parcela}/{cliente_final['prazo_meses']}")
-
-            c.setFont("Helvetica", 9)
-            c.drawString(50, y - 50, "Vencimento:")
-            c.setFont("Helvetica-Bold", 11)
-            c.setFillColor(colors.HexColor("#39FF14"))
-            c.drawString(150, y - 50, data_vencimento.strftime('%d/%m/%Y'))
-
-            c.setFillColor(colors.black)
-            c.setFont("Helvetica", 9)
-            c.drawString(50, y - 65, "Valor:")
-            c.setFont("Helvetica-Bold", 14)
-            c.drawString(150, y - 65, f"R$ {valor:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'))
-
-            c.setFont("Helvetica", 8)
-            c.drawString(50, y - 85, f"Documento: {random.randint(100000, 999999)}")
-            c.drawString(50, y - 100, f"Data Emissao: {datetime.now().strftime('%d/%m/%Y')}")
-
-            # ========== LINHA DIGITÁVEL ==========
-            y = y - 130
-            c.setStrokeColor(colors.HexColor("#39FF14"))
-            c.setLineWidth(1)
-            c.rect(45, y - 35, width - 90, 40, stroke=1, fill=0)
-
-            c.setFont("Helvetica-Bold", 9)
-            c.setFillColor(colors.HexColor("#39FF14"))
-            c.drawString(50, y - 10, "LINHA DIGITAVEL")
-
-            c.setFont("Courier-Bold", 12)
-            c.setFillColor(colors.black)
-            c.drawString(50, y - 28, linha_digitavel)
-
-            # ========== CÓDIGO DE BARRAS ==========
-            y = y - 85
-            barcode_img = self.gerar_codigo_barras_imagem(codigo_barras[:44])
-
-            if barcode_img:
-                # Usar ImageReader para ler BytesIO
-                img_reader = ImageReader(barcode_img)
-                c.drawImage(img_reader, 50, y - 50, width=450, height=45,
-                           preserveAspectRatio=True, mask='auto')
-
-            # ========== INSTRUÇÕES ==========
-            y = y - 110
-            c.setFont("Helvetica-Bold", 10)
-            c.setFillColor(colors.HexColor("#39FF14"))
-            c.drawString(50, y, "INSTRUCOES")
-
-            c.setFillColor(colors.black)
-            c.setFont("Helvetica", 8)
-            instrucoes = [
-                "• Pagamento via PIX, boleto bancario ou debito automatico",
-                "• Multa de 2% apos o vencimento",
-                "• Juros de mora de 1% ao mes",
-                "• Apos o vencimento, pagar somente nas agencias do Banco Consorcio",
-                "• Nao receber apos 30 dias do vencimento"
-            ]
-
-            y_inst = y - 18
-            for inst in instrucoes:
-                c.drawString(50, y_inst, inst)
-                y_inst -= 15
-
-            # ========== RODAPÉ ==========
-            c.setStrokeColor(colors.HexColor("#39FF14"))
-            c.setLineWidth(1)
-            c.line(50, 80, width - 50, 80)
-
-            c.setFont("Helvetica", 7)
-            c.setFillColor(colors.gray)
-            c.drawString(50, 60, f"Documento gerado automaticamente pelo Sistema Nexus CRM em {datetime.now().strftime('%d/%m/%Y as %H:%M')}")
-            c.drawString(50, 48, "Este boleto e valido apenas para pagamento do consorcio especificado. Autenticacao mecanica.")
-            c.drawString(50, 36, "Em caso de duvidas, entre em contato com a Central de Atendimento: 0800 123 4567")
+            layout_processo().reproduzir(c)
+            c.doForm(FORM_LAYOUT)
+            self._desenhar_dados(c, dados)
 
             # Finalizar PDF
             c.save()
 
             file_size = os.path.getsize(filepath)
 
-            logger.info(f"[OK] Boleto gerado: {filename} ({file_size} bytes)")
+            logger.info(f"[OK] Boleto gerado: {dados['filename']} ({file_size} bytes)")
 
             return {
                 'success': True,
-                'filename': filename,
+                'filename': dados['filename'],
                 'filepath': filepath,
                 'file_size': file_size,
-                'linha_digitavel': linha_digitavel,
-                'codigo_barras': codigo_barras,
-                'nosso_numero': nosso_numero
+                'linha_digitavel': dados['linha_digitavel'],
+                'codigo_barras': dados['codigo_barras'],
+                'nosso_numero': dados['nosso_numero']
             }
 
         except Exception as e:
@@ -234,6 +245,167 @@ class BoletoGenerator:
                 'error': str(e)
             }
 
+    def _desenhar_layout(self, c):
+        """Desenha a parte fixa da página (gravada uma vez por processo em LayoutGravado)"""
+        width, height = A4
+
+        # ========== CABEÇALHO ==========
+        c.setFont("Helvetica-Bold", 18)
+        c.drawString(50, height - 50, "BANCO CONSORCIO NACIONAL")
+
+        c.setFont("Helvetica", 10)
+        c.drawString(50, height - 70, "001-9  |  Banco Consórcio S/A")
+
+        # Linha divisória verde neon
+        c.setStrokeColor(COR_DESTAQUE)
+        c.setLineWidth(2)
+        c.line(50, height - 80, width - 50, height - 80)
+
+        # ========== DADOS DO BENEFICIÁRIO ==========
+        y = height - 110
+        c.setFont("Helvetica-Bold", 11)
+        c.setFillColor(COR_DESTAQUE)
+        c.drawString(50, y, "BENEFICIARIO")
+
+        c.setFillColor(colors.black)
+        c.setFont("Helvetica", 9)
+        c.drawString(50, y - 18, "CONSORCIO NACIONAL S/A")
+        c.drawString(50, y - 33, "CNPJ: 12.345.678/0001-90")
+        c.drawString(50, y - 48, "Rua das Financas, 1000 - Centro - Sao Paulo/SP")
+
+        # ========== DADOS DO PAGADOR (título) ==========
+        y = y - 90
+        c.setFont("Helvetica-Bold", 11)
+        c.setFillColor(COR_DESTAQUE)
+        c.drawString(50, y, "PAGADOR")
+
+        # ========== INFORMAÇÕES DO BOLETO (rótulos) ==========
+        y = y - 130
+        c.setStrokeColor(COR_DESTAQUE)
+        c.setLineWidth(1)
+        c.line(50, y, width - 50, y)
+
+        y = y - 25
+        c.setFont("Helvetica-Bold", 11)
+        c.setFillColor(COR_DESTAQUE)
+        c.drawString(50, y, "INFORMACOES DO BOLETO")
+
+        c.setFillColor(colors.black)
+        c.setFont("Helvetica", 9)
+        c.drawString(50, y - 20, "Nosso Numero:")
+        c.drawString(50, y - 35, "Parcela:")
+        c.drawString(50, y - 50, "Vencimento:")
+        c.drawString(50, y - 65, "Valor:")
+
+        # ========== LINHA DIGITÁVEL (moldura) ==========
+        y = y - 130
+        c.setStrokeColor(COR_DESTAQUE)
+        c.setLineWidth(1)
+        c.rect(45, y - 35, width - 90, 40, stroke=1, fill=0)
+
+        c.setFont("Helvetica-Bold", 9)
+        c.setFillColor(COR_DESTAQUE)
+        c.drawString(50, y - 10, "LINHA DIGITAVEL")
+
+        # ========== INSTRUÇÕES ==========
+        y = y - 85 - 110
+        c.setFont("Helvetica-Bold", 10)
+        c.setFillColor(COR_DESTAQUE)
+        c.drawString(50, y, "INSTRUCOES")
+
+        c.setFillColor(colors.black)
+        c.setFont("Helvetica", 8)
+        instrucoes = [
+            "• Pagamento via PIX, boleto bancario ou debito automatico",
+            "• Multa de 2% apos o vencimento",
+            "• Juros de mora de 1% ao mes",
+            "• Apos o vencimento, pagar somente nas agencias do Banco Consorcio",
+            "• Nao receber apos 30 dias do vencimento"
+        ]
+
+        y_inst = y - 18
+        for inst in instrucoes:
+            c.drawString(50, y_inst, inst)
+            y_inst -= 15
+
+        # ========== RODAPÉ ==========
+        c.setStrokeColor(COR_DESTAQUE)
+        c.setLineWidth(1)
+        c.line(50, 80, width - 50, 80)
+
+        c.setFont("Helvetica", 7)
+        c.setFillColor(colors.gray)
+        c.drawString(50, 48, "Este boleto e valido apenas para pagamento do consorcio especificado. Autenticacao mecanica.")
+        c.drawString(50, 36, "Em caso de duvidas, entre em contato com a Central de Atendimento: 0800 123 4567")
+
+    def _desenhar_dados(self, c: canvas.Canvas, dados: dict):
+        """Desenha a parte variável do boleto sobre o layout fixo"""
+        width, height = A4
+        cliente_final = dados['cliente_final']
+        numero_parcela = dados['numero_parcela']
+        emissao = dados['emissao']
+
+        # ========== DADOS DO PAGADOR ==========
+        y = height - 200
+        c.setFillColor(colors.black)
+        c.setFont("Helvetica", 9)
+        c.drawString(50, y - 18, cliente_final['nome_completo'].upper())
+        c.drawString(50, y - 33, f"CPF: {cliente_final['cpf']}")
+        c.drawString(50, y - 48, f"Contrato: {cliente_final['numero_contrato']}")
+        c.drawString(50, y - 63, f"Grupo: {cliente_final['grupo_consorcio']}  |  Cota: {cliente_final['cota_consorcio']}")
+
+        if cliente_final.get('logradouro'):
+            endereco = f"{cliente_final.get('logradouro', '')}, {cliente_final.get('numero', '')}"
+            if cliente_final.get('complemento'):
+                endereco += f" - {cliente_final['complemento']}"
+            c.drawString(50, y - 78, endereco)
+            c.drawString(50, y - 93, f"{cliente_final.get('cidade', '')} - {cliente_final.get('estado', '')} - CEP: {cliente_final.get('cep', '')}")
+
+        # ========== INFORMAÇÕES DO BOLETO ==========
+        y = y - 155
+        c.setFont("Helvetica-Bold", 9)
+        c.drawString(150, y - 20, dados['nosso_numero'])
+        c.drawString(150, y - 35, f"{numero_parcela}/{cliente_final['prazo_meses']}")
+
+        c.setFont("Helvetica-Bold", 11)
+        c.setFillColor(COR_DESTAQUE)
+        c.drawString(150, y - 50, dados['data_vencimento'].strftime('%d/%m/%Y'))
+
+        c.setFillColor(colors.black)
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(150, y - 65, f"R$ {dados['valor']:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'))
+
+        c.setFont("Helvetica", 8)
+        c.drawString(50, y - 85, f"Documento: {dados['documento']}")
+        c.drawString(50, y - 100, f"Data Emissao: {emissao.strftime('%d/%m/%Y')}")
+
+        # ========== LINHA DIGITÁVEL ==========
+        y = y - 130
+        c.setFont("Courier-Bold", 12)
+        c.drawString(50, y - 28, dados['linha_digitavel'])
+
+        # ========== CÓDIGO DE BARRAS ==========
+        y = y - 85
+        self._desenhar_codigo_barras(c, dados['codigo_barras'][:44], 50, y - 50)
+
+        # ========== RODAPÉ ==========
+        c.setFont("Helvetica", 7)
+        c.setFillColor(colors.gray)
+        c.drawString(50, 60, f"Documento gerado automaticamente pelo Sistema Nexus CRM em {emissao.strftime('%d/%m/%Y as %H:%M')}")
+
+    def _desenhar_codigo_barras(self, c: canvas.Canvas, numero: str, x: float, y: float):
+        """Code128 em vetor, na largura máxima da área reservada"""
+        try:
+            medida = Code128(numero, barWidth=1, barHeight=ALTURA_CODIGO_BARRAS, humanReadable=False, quiet=False)
+            largura_barra = LARGURA_CODIGO_BARRAS / medida.width
+
+            codigo = Code128(numero, barWidth=largura_barra, barHeight=ALTURA_CODIGO_BARRAS,
+                             humanReadable=False, quiet=False)
+            c.setFillColor(colors.black)
+            codigo.drawOn(c, x, y)
+        except Exception as e:
+            logger.error(f"Erro ao gerar código de barras: {e}")
+
 
 # Instância global
 boleto_generator = BoletoGenerator()
@@ -0,0 +1,366 @@
+"""
+Catálogo dos PDFs baixados do Canopus
+
+crm.buscar_pdfs_cliente varria a pasta de downloads a cada chamada (glob de
+todos os PDFs, normalização do nome de cada arquivo, match de 60% das
+palavras e dois stat() por acerto) e orquestrador.importar_boletos_para_crm
+interpretava os mesmos nomes de novo.
+
+Cada PDF agora é uma linha em catalogo_pdfs (migração 014) com o nome já
+normalizado (índice de trigramas, migração 021), as palavras, CPF, mês e
+ano; as buscas viram consultas indexadas. O catálogo é atualizado de forma incremental:
+
+- registrar_pdf(): quando um download é registrado
+- MonitorCatalogoPdfs: watchdog na pasta (criação, alteração, remoção, renomeação)
+- sincronizar_pasta(): scandir comparando tamanho/mtime com o catálogo
+  (na inicialização do monitor e antes da importação do orquestrador)
+"""
+
+import logging
+import os
+import re
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from models.database import db, execute_query
+
+logger = logging.getLogger(__name__)
+
+
+# Pasta onde a automação grava os PDFs
+PASTA_DOWNLOADS_CANOPUS = Path(r"D:\Nexus\automation\canopus\downloads\Danner")
+
+MESES = {
+    'JANEIRO': 1, 'FEVEREIRO': 2, 'MARÇO': 3, 'MARCO': 3,
+    'ABRIL': 4, 'MAIO': 5, 'JUNHO': 6,
+    'JULHO': 7, 'AGOSTO': 8, 'SETEMBRO': 9,
+    'OUTUBRO': 10, 'NOVEMBRO': 11, 'DEZEMBRO': 12
+}
+
+# Percentual das palavras significativas do nome (3+ letras) que o arquivo precisa conter
+PERCENTUAL_MATCH = 60
+
+TAMANHO_LOTE = 1000
+
+
+# ============================================================================
+# NOMES DE ARQUIVO
+# ============================================================================
+
+def limpar_nome_para_busca(nome: str) -> str:
+    """Maiúsculas, sem acentos, só letras, números e espaços"""
+    if not nome:
+        return ""
+
+    nome_limpo = unicodedata.normalize('NFKD', nome.upper())
+    nome_limpo = ''.join(c for c in nome_limpo if not unicodedata.combining(c))
+
+    # Remover caracteres especiais, manter apenas letras, números e espaços
+    nome_limpo = re.sub(r'[^A-Z0-9\s]', '', nome_limpo)
+
+    return nome_limpo.strip()
+
+
+def interpretar_nome_arquivo(nome_arquivo: str) -> Dict:
+    """
+    Interpreta NOME_CLIENTE_MES.pdf / NOME_CLIENTE_MES_ANO.pdf
+
+    Returns:
+        Dict com nome_cliente (None se o nome não tem o formato), mes_referencia
+        (última parte, como exibida no CRM), mes e ano (None quando ausentes)
+    """
+    partes = Path(nome_arquivo).stem.split('_')
+
+    if len(partes) < 2:
+        return {'nome_cliente': None, 'mes_referencia': partes[-1], 'mes': None, 'ano': None}
+
+    # Última parte é mês (ou ano se tiver 4 dígitos)
+    mes_str = partes[-1].upper()
+    ano = None
+    nome_partes = partes[:-1]
+
+    if mes_str.isdigit() and len(mes_str) == 4:
+        ano = int(mes_str)
+        if len(partes) > 2:
+            mes_str = partes[-2].upper()
+            nome_partes = partes[:-2]
+        else:
+            mes_str = 'NOVEMBRO'
+
+    return {
+        'nome_cliente': ' '.join(nome_partes).title(),
+        'mes_referencia': partes[-1],
+        'mes': MESES.get(mes_str),
+        'ano': ano,
+    }
+
+
+def _linha_catalogo(caminho: Path, stat: os.stat_result, cpf: Optional[str] = None) -> Dict:
+    """Linha de catalogo_pdfs para um arquivo"""
+    return {
+        'caminho': str(caminho),
+        'pasta': str(caminho.parent),
+        'arquivo': caminho.name,
+        'nome_normalizado': limpar_nome_para_busca(caminho.stem),
+        'palavras': ' '.join(limpar_nome_para_busca(caminho.stem.replace('_', ' ')).split()),
+        'cpf': cpf,
+        'tamanho': stat.st_size,
+        'data_modificacao': stat.st_mtime,
+        **interpretar_nome_arquivo(caminho.name),
+    }
+
+
+def _eh_pdf(caminho: str) -> bool:
+    return caminho.lower().endswith('.pdf')
+
+
+# ============================================================================
+# ESCRITA
+# ============================================================================
+
+def _gravar(linhas: List[Dict]):
+    """Upsert em lote; sem CPF informado, usa o do registro do download"""
+    for inicio in range(0, len(linhas), TAMANHO_LOTE):
+        lote = linhas[inicio:inicio + TAMANHO_LOTE]
+        execute_query("""
+            INSERT INTO catalogo_pdfs (
+                caminho, pasta, arquivo, nome_normalizado, palavras, nome_cliente,
+                mes_referencia, mes, ano, cpf, tamanho, data_modificacao
+            )
+            SELECT
+                t.caminho, t.pasta, t.arquivo, t.nome_normalizado,
+                string_to_array(t.palavras, ' '), t.nome_cliente,
+                t.mes_referencia, t.mes, t.ano,
+                COALESCE(t.cpf, (SELECT d.cpf FROM downloads_canopus d
+                                 WHERE d.nome_arquivo = t.arquivo
+                                 ORDER BY d.id DESC LIMIT 1)),
+                t.tamanho, t.data_modificacao
+            FROM unnest(
+                %s::text[], %s::text[], %s::text[], %s::text[], %s::text[], %s::text[],
+                %s::text[], %s::int[], %s::int[], %s::text[], %s::bigint[], %s::float8[]
+            ) AS t(caminho, pasta, arquivo, nome_normalizado, palavras, nome_cliente,
+                   mes_referencia, mes, ano, cpf, tamanho, data_modificacao)
+            ON CONFLICT (caminho) DO UPDATE SET
+                nome_normalizado = EXCLUDED.nome_normalizado,
+                palavras = EXCLUDED.palavras,
+                nome_cliente = EXCLUDED.nome_cliente,
+                mes_referencia = EXCLUDED.mes_referencia,
+                mes = EXCLUDED.mes,
+                ano = EXCLUDED.ano,
+                cpf = COALESCE(EXCLUDED.cpf, catalogo_pdfs.cpf),
+                tamanho = EXCLUDED.tamanho,
+                data_modificacao = EXCLUDED.data_modificacao,
+                atualizado_em = CURRENT_TIMESTAMP
+        """, tuple(
+            [linha[campo] for linha in lote]
+            for campo in ('caminho', 'pasta', 'arquivo', 'nome_normalizado', 'palavras',
+                          'nome_cliente', 'mes_referencia', 'mes', 'ano', 'cpf',
+                          'tamanho', 'data_modificacao')
+        ))
+
+
+def registrar_pdf(caminho, cpf: Optional[str] = None) -> bool:
+    """
+    Inclui/atualiza um PDF no catálogo
+
+    Args:
+        caminho: Caminho do arquivo
+        cpf: CPF do cliente, quando conhecido (ex.: download recém-registrado)
+
+    Returns:
+        False se o arquivo não existe mais
+    """
+    caminho = Path(caminho)
+    try:
+        stat = caminho.stat()
+    except FileNotFoundError:
+        remover_pdf(caminho)
+        return False
+
+    _gravar([_linha_catalogo(caminho, stat, cpf)])
+    return True
+
+
+def remover_pdf(caminho):
+    """Remove um PDF do catálogo"""
+    execute_query("DELETE FROM catalogo_pdfs WHERE caminho = %s", (str(caminho),))
+
+
+def sincronizar_pasta(pasta: Path = PASTA_DOWNLOADS_CANOPUS) -> Dict[str, int]:
+    """
+    Acerta o catálogo com a pasta: grava arquivos novos ou com tamanho/mtime
+    diferente e remove os que sumiram (os demais não são reinterpretados)
+
+    Returns:
+        {'total', 'gravados', 'removidos'}
+    """
+    pasta = Path(pasta)
+    stats = {'total': 0, 'gravados': 0, 'removidos': 0}
+
+    if not pasta.exists():
+        logger.warning(f"⚠️ Pasta de PDFs não encontrada: {pasta}")
+        return stats
+
+    catalogados = {
+        row['arquivo']: (row['tamanho'], row['data_modificacao'])
+        for row in db.execute_query(
+            "SELECT arquivo, tamanho, data_modificacao FROM catalogo_pdfs WHERE pasta = %s",
+            (str(pasta),)
+        ) or []
+    }
+
+    gravar = []
+    presentes = set()
+    with os.scandir(pasta) as entradas:
+        for entrada in entradas:
+            if not _eh_pdf(entrada.name) or not entrada.is_file():
+                continue
+
+            stat = entrada.stat()
+            presentes.add(entrada.name)
+            if catalogados.get(entrada.name) != (stat.st_size, stat.st_mtime):
+                gravar.append(_linha_catalogo(Path(entrada.path), stat))
+
+    removidos = [arquivo for arquivo in catalogados if arquivo not in presentes]
+
+    _gravar(gravar)
+    if removidos:
+        execute_query(
+            "DELETE FROM catalogo_pdfs WHERE pasta = %s AND arquivo = ANY(%s)",
+            (str(pasta), removidos)
+        )
+
+    stats.update(total=len(presentes), gravados=len(gravar), removidos=len(removidos))
+    logger.info(f"📚 Catálogo de PDFs sincronizado ({pasta.name}): {stats}")
+    return stats
+
+
+# ============================================================================
+# CONSULTA
+# ============================================================================
+
+def buscar_pdfs_por_nome(nome_cliente: str, pasta: Path = PASTA_DOWNLOADS_CANOPUS) -> List[Dict]:
+    """
+    PDFs cujo nome contém pelo menos 60% das palavras significativas (3+
+    letras) do nome do cliente, do mais recente para o mais antigo
+
+    Mesma regra da varredura antiga: a palavra vale se for trecho do nome
+    normalizado (JOSE acha JOSEFINA). Os candidatos saem do índice de
+    trigramas (algum trecho em comum) e o percentual é conferido depois.
+
+    Returns:
+        Lista de dicts com arquivo, caminho_completo, mes_referencia, tamanho
+        e data_modificacao
+    """
+    palavras = [p for p in limpar_nome_para_busca(nome_cliente).split() if len(p) > 2]
+    if not palavras:
+        return []
+
+    # Arredondado para cima, em inteiros
+    minimo = -(-len(palavras) * PERCENTUAL_MATCH // 100)
+
+    # Um LIKE por palavra (OR vira BitmapOr no índice de trigramas); as
+    # palavras só têm letras e números, nada a escapar no padrão
+    algum_trecho = ' OR '.join(['nome_normalizado LIKE %s'] * len(palavras))
+
+    return db.execute_query(f"""
+        SELECT arquivo, caminho AS caminho_completo, mes_referencia, tamanho, data_modificacao
+        FROM catalogo_pdfs
+        WHERE pasta = %s
+        AND ({algum_trecho})
+        AND (SELECT count(*) FROM unnest(%s::text[]) AS p(palavra)
+             WHERE strpos(nome_normalizado, p.palavra) > 0) >= %s
+        ORDER BY data_modificacao DESC
+    """, (str(pasta), *[f'%{p}%' for p in palavras], palavras, minimo)) or []
+
+
+def listar_pdfs_pasta(pasta: Path = PASTA_DOWNLOADS_CANOPUS) -> List[Dict]:
+    """Todos os PDFs catalogados da pasta, já interpretados"""
+    return db.execute_query("""
+        SELECT caminho, arquivo, nome_cliente, mes_referencia, mes, ano, cpf, tamanho
+        FROM catalogo_pdfs
+        WHERE pasta = %s
+        ORDER BY arquivo
+    """, (str(pasta),)) or []
+
+
+# ============================================================================
+# MONITOR DA PASTA
+# ============================================================================
+
+class MonitorCatalogoPdfs:
+    """Mantém o catálogo em dia com eventos do sistema de arquivos (watchdog)"""
+
+    def __init__(self, pasta: Path = PASTA_DOWNLOADS_CANOPUS):
+        self.pasta = Path(pasta)
+        self.observer = None
+
+    def _evento(self, acao, caminho: str):
+        if not _eh_pdf(caminho):
+            return
+        try:
+            acao(caminho)
+        except Exception as e:
+            logger.error(f"❌ Erro ao atualizar catálogo de PDFs ({Path(caminho).name}): {e}")
+
+    def iniciar(self):
+        """Inicia o monitor e sincroniza a pasta em segundo plano"""
+        if not self.pasta.exists():
+            logger.warning(f"⚠️ Monitor de PDFs não iniciado, pasta não encontrada: {self.pasta}")
+            return
+
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            logger.warning("⚠️ watchdog não instalado: catálogo de PDFs atualizado só por downloads e sincronização")
+            Observer = None
+
+        if Observer is not None:
+            monitor = self
+
+            class Handler(FileSystemEventHandler):
+                def on_created(self, event):
+                    if not event.is_directory:
+                        monitor._evento(registrar_pdf, event.src_path)
+
+                def on_modified(self, event):
+                    if not event.is_directory:
+                        monitor._evento(registrar_pdf, event.src_path)
+
+                def on_deleted(self, event):
+                    if not event.is_directory:
+                        monitor._evento(remover_pdf, event.src_path)
+
+                def on_moved(self, event):
+                    if not event.is_directory:
+                        monitor._evento(remover_pdf, event.src_path)
+                        monitor._evento(registrar_pdf, event.dest_path)
+
+            # Observer antes da sincronização: nada que chegue durante a varredura se perde
+            self.observer = Observer()
+            self.observer.schedule(Handler(), str(self.pasta), recursive=False)
+            self.observer.daemon = True
+            self.observer.start()
+            logger.info(f"👀 Monitor do catálogo de PDFs iniciado: {self.pasta}")
+
+        threading.Thread(target=self._sincronizar_inicial, name='catalogo-pdfs-sync', daemon=True).start()
+
+    def _sincronizar_inicial(self):
+        try:
+            sincronizar_pasta(self.pasta)
+        except Exception as e:
+            logger.error(f"❌ Erro ao sincronizar catálogo de PDFs: {e}")
+
+    def parar(self):
+        """Para o monitor"""
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+            logger.info("🛑 Monitor do catálogo de PDFs parado")
+
+
+monitor_catalogo_pdfs = MonitorCatalogoPdfs()
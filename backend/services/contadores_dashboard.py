@@ -0,0 +1,155 @@
+"""
+Contadores do dashboard por cliente Nexus
+
+Os dashboards (CRM, Portal Consórcio, monitoramento) faziam vários
+COUNT(*)/SUM sobre boletos, clientes_finais e disparos a cada carregamento.
+Os totais agora ficam em dashboard_counters (uma linha por cliente_nexus_id),
+mantidos por triggers por comando na migração 011, e são lidos aqui pela
+chave primária.
+
+- dashboard_vencimentos: boletos pendentes por data de vencimento
+  ("vencidos" e "vencendo" dependem do dia da consulta)
+- dashboard_disparos_dia: disparos por dia (hoje, últimos 7/30 dias)
+- reconciliar(): recalcula tudo a partir das tabelas e corrige desvios
+  (job noturno do automation_scheduler)
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import db, log_sistema
+
+
+CAMPOS_CONTADORES = (
+    'clientes_ativos', 'contratos_ativos', 'valor_credito_ativo', 'valor_credito_contratos_ativos',
+    'boletos_total', 'boletos_enviados', 'boletos_nao_enviados', 'boletos_envio_pendente',
+    'boletos_pagos', 'boletos_pendentes', 'valor_pendente',
+)
+
+CAMPOS_VALOR = ('valor_credito_ativo', 'valor_credito_contratos_ativos', 'valor_pendente')
+
+
+def _contadores_vazios() -> Dict:
+    contadores = {campo: 0 for campo in CAMPOS_CONTADORES}
+    contadores.update({'boletos_vencidos': 0, 'boletos_vencendo_7_dias': 0})
+    return contadores
+
+
+def buscar_contadores(cliente_nexus_id: int = None) -> Dict:
+    """
+    Contadores do dashboard
+
+    Args:
+        cliente_nexus_id: Cliente Nexus (None = soma de todos os clientes)
+
+    Returns:
+        Dict com CAMPOS_CONTADORES + boletos_vencidos (pendentes vencidos antes
+        de hoje) e boletos_vencendo_7_dias (pendentes entre hoje e hoje + 7)
+    """
+    if cliente_nexus_id is not None:
+        resultado = db.execute_query("""
+            SELECT
+                d.*,
+                (SELECT COALESCE(SUM(v.boletos_pendentes), 0) FROM dashboard_vencimentos v
+                 WHERE v.cliente_nexus_id = d.cliente_nexus_id
+                 AND v.data_vencimento < CURRENT_DATE) AS boletos_vencidos,
+                (SELECT COALESCE(SUM(v.boletos_pendentes), 0) FROM dashboard_vencimentos v
+                 WHERE v.cliente_nexus_id = d.cliente_nexus_id
+                 AND v.data_vencimento BETWEEN CURRENT_DATE AND CURRENT_DATE + 7) AS boletos_vencendo_7_dias
+            FROM dashboard_counters d
+            WHERE d.cliente_nexus_id = %s
+        """, (cliente_nexus_id,))
+    else:
+        resultado = db.execute_query(f"""
+            SELECT
+                {', '.join(f'COALESCE(SUM({campo}), 0) AS {campo}' for campo in CAMPOS_CONTADORES)},
+                (SELECT COALESCE(SUM(boletos_pendentes), 0) FROM dashboard_vencimentos
+                 WHERE data_vencimento < CURRENT_DATE) AS boletos_vencidos,
+                (SELECT COALESCE(SUM(boletos_pendentes), 0) FROM dashboard_vencimentos
+                 WHERE data_vencimento BETWEEN CURRENT_DATE AND CURRENT_DATE + 7) AS boletos_vencendo_7_dias
+            FROM dashboard_counters
+        """)
+
+    contadores = _contadores_vazios()
+    if resultado:
+        for campo in contadores:
+            contadores[campo] = resultado[0].get(campo) or 0
+
+    for campo in CAMPOS_VALOR:
+        contadores[campo] = float(contadores[campo])
+    for campo in contadores:
+        if campo not in CAMPOS_VALOR:
+            contadores[campo] = int(contadores[campo])
+
+    return contadores
+
+
+def buscar_disparos_por_dia(cliente_nexus_id: int, dias: int = 31) -> Dict[date, Dict]:
+    """
+    Disparos por dia de data_disparo, de hoje - (dias - 1) até hoje
+
+    Returns:
+        {dia: {'total': int, 'enviados': int}} (dias sem disparo ficam de fora)
+    """
+    resultado = db.execute_query("""
+        SELECT dia, total, enviados
+        FROM dashboard_disparos_dia
+        WHERE cliente_nexus_id = %s
+        AND dia >= CURRENT_DATE - %s::int
+    """, (cliente_nexus_id, dias - 1)) or []
+
+    return {
+        row['dia']: {'total': int(row['total']), 'enviados': int(row['enviados'])}
+        for row in resultado
+    }
+
+
+def resumo_disparos(cliente_nexus_id: int) -> Dict:
+    """
+    Números do monitoramento a partir de dashboard_disparos_dia
+
+    Returns:
+        {'disparos_hoje', 'taxa_sucesso' (últimos 30 dias),
+         'chart_disparos', 'chart_sucesso' (7 dias, do mais antigo para hoje)}
+    """
+    por_dia = buscar_disparos_por_dia(cliente_nexus_id, dias=31)
+    hoje = date.today()
+
+    enviados_30 = sum(d['enviados'] for d in por_dia.values())
+    total_30 = sum(d['total'] for d in por_dia.values())
+
+    chart_disparos: List[int] = []
+    chart_sucesso: List[float] = []
+    for i in range(6, -1, -1):
+        dia = por_dia.get(hoje - timedelta(days=i), {'total': 0, 'enviados': 0})
+        chart_disparos.append(dia['enviados'])
+        chart_sucesso.append(round((dia['enviados'] / dia['total']) * 100, 1) if dia['total'] > 0 else 0)
+
+    return {
+        'disparos_hoje': por_dia.get(hoje, {}).get('enviados', 0),
+        'taxa_sucesso': round((enviados_30 / total_30) * 100, 1) if total_30 > 0 else 0,
+        'chart_disparos': chart_disparos,
+        'chart_sucesso': chart_sucesso,
+    }
+
+
+def reconciliar() -> int:
+    """
+    Recalcula os contadores a partir das tabelas (dashboard_reconciliar())
+
+    Bloqueia escritas em clientes_finais/boletos/disparos durante o recálculo.
+
+    Returns:
+        Quantidade de clientes cujos contadores estavam com desvio
+    """
+    resultado = db.execute_query("SELECT dashboard_reconciliar() AS corrigidos")
+    corrigidos = resultado[0]['corrigidos'] if resultado else 0
+
+    log_sistema('warning' if corrigidos else 'info',
+               f'Contadores do dashboard reconciliados: {corrigidos} cliente(s) corrigido(s)',
+               'dashboard', {'corrigidos': corrigidos})
+    return corrigidos
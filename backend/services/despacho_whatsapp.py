@@ -0,0 +1,287 @@
+"""
+Despacho concorrente de mensagens WhatsApp
+
+Substitui os loops seriais (texto → sleep → PDF → sleep → próximo) por um
+pipeline: vários destinatários ficam em andamento ao mesmo tempo sobre a
+mesma sessão conectada, e o ritmo anti-bloqueio é garantido por um balde
+de tokens por número remetente.
+
+- Cada mensagem enviada (texto ou PDF) consome um token do remetente.
+- Os tokens são repostos em intervalos aleatórios entre
+  configuracoes_automacao.intervalo_min_segundos e intervalo_max_segundos.
+- O intervalo entre o texto e o PDF do MESMO destinatário continua
+  existindo, mas enquanto um destinatário espera o outro já envia.
+
+Funciona com qualquer provedor que tenha enviar_mensagem/enviar_pdf
+(whatsapp_evolution, wppconnect_service, whatsapp_baileys, whatsapp_service).
+"""
+
+import inspect
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import log_sistema
+
+
+INTERVALO_MIN_PADRAO = 3
+INTERVALO_MAX_PADRAO = 7
+
+# Destinatários em andamento ao mesmo tempo (threads passam a maior parte
+# do tempo esperando token ou o intervalo texto → PDF)
+CONCORRENCIA_PADRAO = int(os.getenv('WHATSAPP_DESPACHO_CONCORRENCIA', '4'))
+
+
+# ============================================================================
+# BALDE DE TOKENS POR REMETENTE
+# ============================================================================
+
+class BaldeTokens:
+    """
+    Balde de tokens de capacidade 1 com reposição em intervalo aleatório
+
+    Thread-safe: cada chamada a aguardar() reserva o próximo horário livre
+    do remetente e dorme até ele, fora do lock.
+    """
+
+    def __init__(self, intervalo_min: float, intervalo_max: float):
+        self._lock = threading.Lock()
+        self._proximo_token = 0.0
+        self.configurar(intervalo_min, intervalo_max)
+
+    def configurar(self, intervalo_min: float, intervalo_max: float):
+        """Atualiza o intervalo (a configuração do cliente pode mudar entre disparos)"""
+        intervalo_min = max(0.0, float(intervalo_min))
+        intervalo_max = max(intervalo_min, float(intervalo_max))
+        with self._lock:
+            self.intervalo_min = intervalo_min
+            self.intervalo_max = intervalo_max
+
+    def aguardar(self) -> float:
+        """
+        Bloqueia até haver token disponível e o consome
+
+        Returns:
+            Segundos aguardados
+        """
+        with self._lock:
+            agora = time.monotonic()
+            horario = max(agora, self._proximo_token)
+            self._proximo_token = horario + random.uniform(self.intervalo_min, self.intervalo_max)
+
+        espera = horario - time.monotonic()
+        if espera > 0:
+            time.sleep(espera)
+        return max(espera, 0.0)
+
+
+_baldes: Dict[str, BaldeTokens] = {}
+_baldes_lock = threading.Lock()
+
+
+def obter_balde(remetente: str, intervalo_min: float, intervalo_max: float) -> BaldeTokens:
+    """
+    Balde compartilhado do remetente
+
+    Dois despachos simultâneos do mesmo número dividem o mesmo ritmo.
+    """
+    with _baldes_lock:
+        balde = _baldes.get(remetente)
+        if balde is None:
+            balde = BaldeTokens(intervalo_min, intervalo_max)
+            _baldes[remetente] = balde
+        else:
+            balde.configurar(intervalo_min, intervalo_max)
+        return balde
+
+
+def carregar_intervalos(cliente_nexus_id: int) -> Tuple[int, int]:
+    """Lê intervalo_min/max_segundos de configuracoes_automacao (com padrão 3-7s)"""
+    from models.database import db
+
+    config = db.execute_query("""
+        SELECT intervalo_min_segundos, intervalo_max_segundos
+        FROM configuracoes_automacao
+        WHERE cliente_nexus_id = %s
+    """, (cliente_nexus_id,))
+
+    intervalo_min = (config[0].get('intervalo_min_segundos') if config else None) or INTERVALO_MIN_PADRAO
+    intervalo_max = (config[0].get('intervalo_max_segundos') if config else None) or INTERVALO_MAX_PADRAO
+    return intervalo_min, max(intervalo_min, intervalo_max)
+
+
+# ============================================================================
+# ADAPTADOR DE PROVEDOR
+# ============================================================================
+
+class AdaptadorProvedor:
+    """
+    Normaliza enviar_mensagem/enviar_pdf dos provedores
+
+    Os provedores diferem no nome dos parâmetros, em aceitar ou não
+    cliente_nexus_id e em responder 'success' ou 'sucesso'.
+    """
+
+    def __init__(self, servico):
+        self.servico = servico
+        self._texto_com_cliente = self._aceita_cliente(servico.enviar_mensagem)
+        self._pdf_com_cliente = self._aceita_cliente(servico.enviar_pdf)
+
+    @staticmethod
+    def _aceita_cliente(metodo) -> bool:
+        try:
+            return 'cliente_nexus_id' in inspect.signature(metodo).parameters
+        except (TypeError, ValueError):
+            return False
+
+    @staticmethod
+    def _normalizar(resultado) -> Dict:
+        resultado = dict(resultado or {})
+        ok = bool(resultado.get('success') or resultado.get('sucesso'))
+        resultado['success'] = ok
+        resultado['sucesso'] = ok
+        if not ok:
+            resultado.setdefault('erro', resultado.get('error') or 'Erro desconhecido')
+        return resultado
+
+    def enviar_texto(self, numero: str, mensagem: str, cliente_nexus_id: int = None) -> Dict:
+        extras = {'cliente_nexus_id': cliente_nexus_id} if self._texto_com_cliente else {}
+        return self._normalizar(self.servico.enviar_mensagem(numero, mensagem, **extras))
+
+    def enviar_pdf(self, numero: str, pdf_path: str, legenda: str,
+                   cliente_nexus_id: int = None) -> Dict:
+        extras = {'cliente_nexus_id': cliente_nexus_id} if self._pdf_com_cliente else {}
+        return self._normalizar(self.servico.enviar_pdf(numero, pdf_path, legenda, **extras))
+
+
+# ============================================================================
+# DESPACHANTE
+# ============================================================================
+
+class DespachanteWhatsApp:
+    """Envia para vários destinatários em paralelo respeitando o ritmo do remetente"""
+
+    def __init__(self, servico, remetente: str, intervalo_min: float = INTERVALO_MIN_PADRAO,
+                 intervalo_max: float = INTERVALO_MAX_PADRAO, concorrencia: int = None):
+        """
+        Args:
+            servico: Provedor WhatsApp (evolution, wppconnect, baileys...)
+            remetente: Chave do número remetente (um balde por chave)
+            intervalo_min: Intervalo mínimo entre mensagens do remetente (s)
+            intervalo_max: Intervalo máximo entre mensagens do remetente (s)
+            concorrencia: Destinatários em andamento ao mesmo tempo
+        """
+        self.provedor = AdaptadorProvedor(servico)
+        self.remetente = remetente
+        self.balde = obter_balde(remetente, intervalo_min, intervalo_max)
+        self.concorrencia = max(1, concorrencia or CONCORRENCIA_PADRAO)
+
+    @classmethod
+    def para_cliente(cls, servico, cliente_nexus_id: int, concorrencia: int = None):
+        """Despachante com o intervalo configurado em configuracoes_automacao"""
+        intervalo_min, intervalo_max = carregar_intervalos(cliente_nexus_id)
+        return cls(servico, f'cliente_nexus:{cliente_nexus_id}',
+                   intervalo_min, intervalo_max, concorrencia)
+
+    def _enviar(self, envio: Dict) -> Dict:
+        """
+        Envia texto e/ou PDF de um destinatário
+
+        Chaves de envio: numero, mensagem (opcional), pdf_path (opcional),
+        legenda, intervalo_pdf (espera entre texto e PDF), cliente_nexus_id.
+        """
+        resultado = {'mensagem': None, 'pdf': None, 'sucesso_total': False}
+        numero = envio['numero']
+        cliente_nexus_id = envio.get('cliente_nexus_id')
+
+        if envio.get('mensagem'):
+            self.balde.aguardar()
+            resultado['mensagem'] = self.provedor.enviar_texto(numero, envio['mensagem'], cliente_nexus_id)
+            if not resultado['mensagem']['success']:
+                resultado['erro'] = resultado['mensagem']['erro']
+                return resultado
+
+            if envio.get('pdf_path'):
+                time.sleep(envio.get('intervalo_pdf') or 0)
+
+        if envio.get('pdf_path'):
+            self.balde.aguardar()
+            resultado['pdf'] = self.provedor.enviar_pdf(
+                numero, envio['pdf_path'],
+                envio.get('legenda') or 'Segue seu boleto em anexo',
+                cliente_nexus_id
+            )
+            if not resultado['pdf']['success']:
+                resultado['erro'] = resultado['pdf']['erro']
+                return resultado
+
+        resultado['sucesso_total'] = bool(resultado['mensagem'] or resultado['pdf'])
+        if not resultado['sucesso_total']:
+            resultado['erro'] = 'Nada para enviar (sem mensagem e sem PDF)'
+        return resultado
+
+    def despachar(self, itens: List, preparar: Optional[Callable] = None,
+                  ao_concluir: Optional[Callable] = None) -> Dict:
+        """
+        Processa todos os itens com até `concorrencia` destinatários em andamento
+
+        Args:
+            itens: Itens de entrada (já no formato de envio, ou brutos + preparar)
+            preparar: fn(item) -> envio ou None (pular); roda na thread do item,
+                      então extração de PDF/INSERT também entram no pipeline
+            ao_concluir: fn(item, envio, resultado) chamada ao terminar cada item
+
+        Returns:
+            {'total', 'sucessos', 'erros', 'detalhes'} - detalhes na ordem de itens
+        """
+        stats = {'total': len(itens), 'sucessos': 0, 'erros': 0, 'detalhes': [None] * len(itens)}
+        stats_lock = threading.Lock()
+
+        def processar(idx: int, item):
+            envio = None
+            try:
+                envio = preparar(item) if preparar else item
+                if envio is None:
+                    resultado = {'sucesso_total': False, 'erro': 'Item ignorado na preparação'}
+                else:
+                    resultado = self._enviar(envio)
+            except Exception as e:
+                resultado = {'sucesso_total': False, 'erro': str(e)}
+
+            if ao_concluir:
+                try:
+                    ao_concluir(item, envio, resultado)
+                except Exception as e:
+                    log_sistema('error', f'Erro ao registrar resultado do envio: {str(e)}',
+                               'whatsapp', {'remetente': self.remetente})
+
+            with stats_lock:
+                if resultado.get('sucesso_total'):
+                    stats['sucessos'] += 1
+                else:
+                    stats['erros'] += 1
+                stats['detalhes'][idx] = {
+                    'numero': (envio or {}).get('numero') if isinstance(envio, dict) else None,
+                    'resultado': resultado
+                }
+
+        if not itens:
+            return stats
+
+        log_sistema('info', f'Despacho concorrente: {len(itens)} destinatários, '
+                            f'{self.concorrencia} em paralelo, '
+                            f'{self.balde.intervalo_min}-{self.balde.intervalo_max}s entre mensagens',
+                   'whatsapp', {'remetente': self.remetente, 'total': len(itens)})
+
+        with ThreadPoolExecutor(max_workers=min(self.concorrencia, len(itens)),
+                                thread_name_prefix='despacho-whatsapp') as executor:
+            for idx, item in enumerate(itens):
+                executor.submit(processar, idx, item)
+
+        return stats
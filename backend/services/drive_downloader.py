@@ -5,17 +5,41 @@ Suporta:
 - Links públicos do Google Drive
 - Download direto de planilhas Excel
 - Substituição de arquivos existentes
+- Download condicional: ETag/Last-Modified (304 sem corpo) e MD5 do conteúdo;
+  arquivo igual ao anterior não é regravado
+- Atualização de várias planilhas em paralelo (atualizar_planilhas_consultores)
 """
 
 import requests
+import hashlib
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# Downloads simultâneos em atualizar_planilhas_consultores
+MAX_DOWNLOADS_PARALELOS = int(os.getenv('DRIVE_DOWNLOADS_PARALELOS', 8))
+
+# (conexão, leitura) em segundos
+TIMEOUT_DOWNLOAD = (10, 120)
+
+
+def hash_arquivo(caminho: Path) -> str:
+    """MD5 do arquivo (mesmo valor de ExcelImporter.gerar_hash_planilha)"""
+    hash_md5 = hashlib.md5()
+
+    with open(caminho, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            hash_md5.update(chunk)
+
+    return hash_md5.hexdigest()
+
+
 def extrair_file_id_drive(url: str) -> Optional[str]:
     """
     Extrai o ID do arquivo de uma URL do Google Drive ou Google Sheets
@@ -96,23 +120,39 @@ def baixar_arquivo_drive(
     url_drive: str,
     caminho_destino: Path,
     nome_arquivo: Optional[str] = None,
-    substituir: bool = True
+    substituir: bool = True,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    hash_anterior: Optional[str] = None
 ) -> Dict:
     """
     Baixa um arquivo do Google Drive
 
+    Com substituir=True o download é condicional: etag/last_modified da
+    versão anterior vão como If-None-Match/If-Modified-Since, e o conteúdo
+    vai para um arquivo temporário com MD5 calculado durante o download; se
+    o hash bater com o anterior (ou com o do arquivo existente), o arquivo
+    existente fica intacto.
+
     Args:
         url_drive: URL do Google Drive ou ID do arquivo
         caminho_destino: Pasta de destino
         nome_arquivo: Nome do arquivo (opcional, usa o do Drive se None)
         substituir: Se True, substitui arquivo existente
+        etag: ETag da versão anterior (opcional)
+        last_modified: Last-Modified da versão anterior (opcional)
+        hash_anterior: MD5 da versão anterior (opcional)
 
     Returns:
         Dicionário com resultado:
         {
             'sucesso': bool,
+            'alterado': bool (False = arquivo existente mantido),
             'arquivo_path': str,
             'tamanho': int,
+            'hash': str,
+            'etag': str,
+            'last_modified': str,
             'mensagem': str,
             'erro': str (se sucesso=False)
         }
@@ -142,17 +182,45 @@ def baixar_arquivo_drive(
         logger.info(f"   🌐 Fazendo requisição para o {'Google Sheets' if tipo == 'sheets' else 'Drive'}...")
         session = requests.Session()
 
-        response = session.get(url_download, stream=True, allow_redirects=True)
+        # Requisição condicional só quando o arquivo anterior ainda está no lugar
+        cabecalhos = {}
+        arquivo_anterior = Path(caminho_destino) / nome_arquivo if nome_arquivo else None
+        condicional = substituir and arquivo_anterior is not None and arquivo_anterior.exists()
+        if condicional:
+            if etag:
+                cabecalhos['If-None-Match'] = etag
+            if last_modified:
+                cabecalhos['If-Modified-Since'] = last_modified
+
+        response = session.get(url_download, stream=True, allow_redirects=True,
+                               headers=cabecalhos, timeout=TIMEOUT_DOWNLOAD)
 
         # Google Sheets retorna direto, mas Drive pode ter confirmação para arquivos grandes
-        if tipo == 'drive' and 'content-disposition' not in response.headers:
+        if tipo == 'drive' and response.status_code != 304 and 'content-disposition' not in response.headers:
             # Procurar por link de confirmação (apenas para Drive)
             for key, value in response.cookies.items():
                 if key.startswith('download_warning'):
                     url_download = f"{url_download}&confirm={value}"
-                    response = session.get(url_download, stream=True, allow_redirects=True)
+                    response.close()
+                    response = session.get(url_download, stream=True, allow_redirects=True,
+                                           headers=cabecalhos, timeout=TIMEOUT_DOWNLOAD)
                     break
 
+        if response.status_code == 304:
+            response.close()
+            logger.info(f"   ⏭️  Sem alterações no Drive (304): {arquivo_anterior.name}")
+            return {
+                'sucesso': True,
+                'alterado': False,
+                'arquivo_path': str(arquivo_anterior),
+                'arquivo_nome': nome_arquivo,
+                'tamanho': arquivo_anterior.stat().st_size,
+                'hash': hash_anterior,
+                'etag': etag,
+                'last_modified': last_modified,
+                'mensagem': f'Arquivo sem alterações: {nome_arquivo}'
+            }
+
         # Verificar se download foi bem-sucedido
         if response.status_code != 200:
             logger.error(f"   ❌ Erro HTTP {response.status_code}")
@@ -186,40 +254,67 @@ def baixar_arquivo_drive(
         arquivo_path = caminho_destino / nome_arquivo
 
         # Verificar se arquivo já existe
-        if arquivo_path.exists():
-            if substituir:
-                logger.info(f"   ⚠️  Arquivo existente será substituído: {arquivo_path}")
-                arquivo_path.unlink()  # Remove o arquivo antigo
-            else:
-                # Gerar nome único
-                contador = 1
-                while arquivo_path.exists():
-                    nome_base = arquivo_path.stem
-                    nome_arquivo = f"{nome_base}_{contador}.xlsx"
-                    arquivo_path = caminho_destino / nome_arquivo
-                    contador += 1
-                logger.info(f"   ℹ️  Salvando com nome alternativo: {arquivo_path}")
-
-        # Baixar arquivo
+        if arquivo_path.exists() and not substituir:
+            # Gerar nome único
+            contador = 1
+            while arquivo_path.exists():
+                nome_base = arquivo_path.stem
+                nome_arquivo = f"{nome_base}_{contador}.xlsx"
+                arquivo_path = caminho_destino / nome_arquivo
+                contador += 1
+            logger.info(f"   ℹ️  Salvando com nome alternativo: {arquivo_path}")
+
+        # Baixar direto para um temporário na mesma pasta, calculando o MD5
         logger.info(f"   💾 Salvando arquivo em: {arquivo_path}")
+        arquivo_temp = arquivo_path.with_name(arquivo_path.name + '.part')
 
         tamanho_total = 0
-        with open(arquivo_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-                    tamanho_total += len(chunk)
-
-        logger.info(f"   ✅ Download concluído! Tamanho: {tamanho_total / 1024:.2f} KB")
-
-        return {
+        hash_md5 = hashlib.md5()
+        try:
+            with open(arquivo_temp, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=65536):
+                    if chunk:
+                        f.write(chunk)
+                        hash_md5.update(chunk)
+                        tamanho_total += len(chunk)
+        except BaseException:
+            arquivo_temp.unlink(missing_ok=True)
+            raise
+        finally:
+            response.close()
+
+        hash_novo = hash_md5.hexdigest()
+        resultado = {
             'sucesso': True,
+            'alterado': True,
             'arquivo_path': str(arquivo_path),
             'arquivo_nome': nome_arquivo,
             'tamanho': tamanho_total,
-            'mensagem': f'Arquivo baixado com sucesso: {nome_arquivo}'
+            'hash': hash_novo,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
         }
 
+        # Conteúdo igual ao do arquivo existente: mantém o arquivo (e o mtime)
+        if arquivo_path.exists():
+            if (hash_anterior or hash_arquivo(arquivo_path)) == hash_novo:
+                arquivo_temp.unlink()
+                logger.info(f"   ⏭️  Conteúdo igual ao arquivo existente (MD5 {hash_novo[:8]})")
+                resultado.update({
+                    'alterado': False,
+                    'mensagem': f'Arquivo sem alterações: {nome_arquivo}'
+                })
+                return resultado
+
+            logger.info(f"   ⚠️  Arquivo existente será substituído: {arquivo_path}")
+
+        os.replace(arquivo_temp, arquivo_path)
+
+        logger.info(f"   ✅ Download concluído! Tamanho: {tamanho_total / 1024:.2f} KB")
+
+        resultado['mensagem'] = f'Arquivo baixado com sucesso: {nome_arquivo}'
+        return resultado
+
     except requests.exceptions.RequestException as e:
         logger.error(f"   ❌ Erro de rede ao baixar arquivo: {e}")
         return {
@@ -240,7 +335,10 @@ def baixar_arquivo_drive(
 def baixar_planilha_consultor(
     link_drive: str,
     nome_consultor: str,
-    substituir: bool = True
+    substituir: bool = True,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    hash_anterior: Optional[str] = None
 ) -> Dict:
     """
     Baixa planilha de um consultor específico do Google Drive
@@ -249,6 +347,8 @@ def baixar_planilha_consultor(
         link_drive: URL do Google Drive
         nome_consultor: Nome do consultor (usado no nome do arquivo)
         substituir: Se True, substitui arquivo existente
+        etag, last_modified, hash_anterior: Metadados da versão anterior
+            (consultores.planilha_*) para o download condicional
 
     Returns:
         Dicionário com resultado do download
@@ -268,10 +368,55 @@ def baixar_planilha_consultor(
         url_drive=link_drive,
         caminho_destino=pasta_destino,
         nome_arquivo=nome_arquivo,
-        substituir=substituir
+        substituir=substituir,
+        etag=etag,
+        last_modified=last_modified,
+        hash_anterior=hash_anterior
     )
 
 
+def atualizar_planilhas_consultores(
+    consultores: List[Dict],
+    max_paralelos: int = MAX_DOWNLOADS_PARALELOS
+) -> List[Dict]:
+    """
+    Baixa as planilhas de vários consultores em paralelo (download condicional)
+
+    O tempo total fica próximo do download mais lento, não da soma.
+
+    Args:
+        consultores: Linhas de consultores com id, nome, link_planilha_drive e,
+            se houver, planilha_etag, planilha_last_modified, planilha_hash
+        max_paralelos: Downloads simultâneos
+
+    Returns:
+        Um resultado de baixar_planilha_consultor por consultor (mesma ordem),
+        com 'consultor_id' e 'consultor'
+    """
+    def baixar(consultor: Dict) -> Dict:
+        try:
+            resultado = baixar_planilha_consultor(
+                link_drive=consultor['link_planilha_drive'],
+                nome_consultor=consultor['nome'],
+                substituir=True,
+                etag=consultor.get('planilha_etag'),
+                last_modified=consultor.get('planilha_last_modified'),
+                hash_anterior=consultor.get('planilha_hash')
+            )
+        except Exception as e:
+            resultado = {'sucesso': False, 'erro': str(e)}
+
+        resultado.update({'consultor_id': consultor['id'], 'consultor': consultor['nome']})
+        return resultado
+
+    if not consultores:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_paralelos, len(consultores))),
+                            thread_name_prefix='drive-download') as executor:
+        return list(executor.map(baixar, consultores))
+
+
 # Função auxiliar para testar
 if __name__ == "__main__":
     # Teste
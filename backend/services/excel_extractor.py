@@ -6,12 +6,137 @@ Processa dados de clientes com validações completas e distribuição por Ponto
 import pandas as pd
 import re
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 import logging
 
+from openpyxl import load_workbook
+
 logger = logging.getLogger(__name__)
 
 
+# Linhas por bloco na leitura em streaming (memória constante)
+TAMANHO_BLOCO = 10_000
+
+
+# ============================================================================
+# LEITURA EM STREAMING E LIMPEZA VETORIZADA
+# ============================================================================
+
+def _iterar_linhas(arquivo: Path, linha_inicial: int, linha_final: int = None,
+                   sheet=0) -> Iterator[tuple]:
+    """
+    Itera os valores das linhas da planilha (1-based, como no Excel)
+
+    .xlsx/.xlsm: openpyxl read-only (não carrega a planilha inteira).
+    .xls: openpyxl não lê, cai no pandas.
+    """
+    if arquivo.suffix.lower() in ('.xlsx', '.xlsm'):
+        wb = load_workbook(arquivo, read_only=True, data_only=True)
+        try:
+            ws = wb[sheet] if isinstance(sheet, str) else wb.worksheets[sheet]
+            yield from ws.iter_rows(min_row=linha_inicial, max_row=linha_final, values_only=True)
+        finally:
+            wb.close()
+    else:
+        nrows = linha_final - linha_inicial + 1 if linha_final else None
+        df = pd.read_excel(arquivo, sheet_name=sheet, header=None,
+                           skiprows=linha_inicial - 1, nrows=nrows)
+        for linha in df.itertuples(index=False, name=None):
+            yield tuple(None if pd.isna(v) else v for v in linha)
+
+
+def ler_cabecalho_planilha(arquivo, cabecalho: int, sheet=0) -> List[str]:
+    """
+    Nomes das colunas da linha de cabeçalho
+
+    Args:
+        cabecalho: Índice 0-based da linha (mesmo significado do header= do pandas)
+    """
+    for linha in _iterar_linhas(Path(arquivo), cabecalho + 1, cabecalho + 1, sheet):
+        return ['' if v is None else str(v) for v in linha]
+    return []
+
+
+def ler_blocos_planilha(arquivo, cabecalho: int, colunas: List[int], pular_linhas: int = 0,
+                        tamanho_bloco: int = TAMANHO_BLOCO, sheet=0) -> Iterator[pd.DataFrame]:
+    """
+    Lê só as colunas pedidas, em blocos de DataFrame
+
+    Linhas totalmente vazias são ignoradas (como no pd.read_excel).
+
+    Args:
+        cabecalho: Índice 0-based da linha de cabeçalho
+        colunas: Índices das colunas a manter (viram os nomes das colunas)
+        pular_linhas: Linhas de dados a descartar logo após o cabeçalho
+
+    Yields:
+        DataFrame com as colunas pedidas + 'posicao' (0-based, após pular_linhas)
+    """
+    buffer = []
+    posicao = -pular_linhas
+
+    def montar_bloco():
+        bloco = pd.DataFrame(buffer, columns=colunas + ['posicao'], dtype=object)
+        bloco['posicao'] = bloco['posicao'].astype(int)
+        return bloco
+
+    for linha in _iterar_linhas(Path(arquivo), cabecalho + 2, sheet=sheet):
+        if all(v is None for v in linha):
+            continue
+
+        if posicao >= 0:
+            tamanho = len(linha)
+            buffer.append([linha[i] if i < tamanho else None for i in colunas] + [posicao])
+        posicao += 1
+
+        if len(buffer) >= tamanho_bloco:
+            yield montar_bloco()
+            buffer = []
+
+    if buffer:
+        yield montar_bloco()
+
+
+def _como_texto(valores: pd.Series) -> pd.Series:
+    """Texto sem espaços nas pontas; números inteiros lidos como float sem o '.0'"""
+    texto = valores.astype('string').str.strip()
+    return texto.str.replace(r'^(\d+)\.0$', r'\1', regex=True)
+
+
+def limpar_cpfs(valores: pd.Series, rejeitar_repetidos: bool = True) -> pd.Series:
+    """
+    Versão vetorizada de validar_cpf
+
+    Returns:
+        Série com o CPF só com dígitos, <NA> onde inválido
+        (tamanho != 11 ou, se rejeitar_repetidos, sequência repetida)
+    """
+    cpfs = _como_texto(valores).str.replace(r'\D', '', regex=True)
+    validos = cpfs.str.len().eq(11)
+    if rejeitar_repetidos:
+        validos &= ~cpfs.str.fullmatch(r'(\d)\1{10}')
+    return cpfs.where(validos.fillna(False).astype(bool))
+
+
+def formatar_cpfs(cpfs: pd.Series) -> pd.Series:
+    """00000000000 → 000.000.000-00 (vetorizado)"""
+    return cpfs.str.replace(r'^(\d{3})(\d{3})(\d{3})(\d{2})$', r'\1.\2.\3-\4', regex=True)
+
+
+def normalizar_nomes(valores: pd.Series) -> pd.Series:
+    """
+    Versão vetorizada de normalizar_nome
+
+    Returns:
+        Série em maiúsculas sem sufixos "- 70%", <NA> onde inválido
+    """
+    nomes = valores.astype('string').str.strip()
+    nomes = nomes.mask(nomes.str.lower().isin(['nan', 'none', '']))
+    nomes = nomes.str.replace(r'\s*-?\s*\d+%?', '', regex=True).str.strip()
+    nomes = nomes.str.replace(r'\s+', ' ', regex=True)
+    return nomes.where(nomes.str.len().ge(3).fillna(False).astype(bool)).str.upper()
+
+
 class ExcelExtractor:
     """
     Extrator de dados da planilha Excel do Dener
@@ -24,6 +149,12 @@ class ExcelExtractor:
     - Suporta múltiplos pontos de venda na mesma planilha
     """
 
+    # Linha de cabeçalho (0-based, como header= do pandas) e colunas fixas
+    LINHA_CABECALHO = 11
+    COL_CPF = 0
+    COL_NOME = 5
+    COL_PV = 6
+
     def __init__(self, arquivo_excel: str):
         """
         Inicializa o extrator
@@ -117,6 +248,25 @@ class ExcelExtractor:
         return nome_str.upper()
 
 
+    def _pontos_venda(self, bloco: pd.DataFrame, colunas_pv: Dict[str, int]) -> pd.Series:
+        """
+        PV de cada linha do bloco (vetorizado), <NA> se não identificado
+
+        Coluna 6 (17308 tem prioridade sobre 24627, valor exato ou contido);
+        senão, a primeira coluna de PV detectada pelo nome que estiver preenchida.
+        """
+        pv_raw = _como_texto(bloco[self.COL_PV]).fillna('')
+
+        pontos_venda = pd.Series(pd.NA, index=bloco.index, dtype='string')
+        pontos_venda = pontos_venda.mask(pv_raw.str.contains('24627', regex=False), '24627')
+        pontos_venda = pontos_venda.mask(pv_raw.str.contains('17308', regex=False), '17308')
+
+        for pv, col_idx in colunas_pv.items():
+            preenchido = bloco[col_idx].astype('string').str.strip().fillna('').ne('')
+            pontos_venda = pontos_venda.mask(pontos_venda.isna() & preenchido, pv)
+
+        return pontos_venda
+
     def extrair_dados(self, pontos_venda_filtro: List[str] = None) -> Dict:
         """
         Extrai todos os dados da planilha
@@ -139,27 +289,25 @@ class ExcelExtractor:
         logger.info(f"📊 Iniciando extração de dados: {self.arquivo_excel.name}")
 
         erros = []
-        clientes_validos = []
+        blocos_validos = []
+        cpfs_vistos = set()
         total_processado = 0
         total_invalido = 0
+        total_duplicado = 0
+        total_pv_padrao = 0
 
         try:
-            # Ler Excel (header=11 conforme código existente)
-            logger.info("   Lendo arquivo Excel...")
-            self.df_raw = pd.read_excel(self.arquivo_excel, sheet_name=0, header=11)
-
-            # Pular primeira linha (cabeçalhos duplicados)
-            self.df_raw = self.df_raw[1:].reset_index(drop=True)
-
-            logger.info(f"   Total de linhas no Excel: {len(self.df_raw)}")
-            logger.info(f"   Colunas encontradas: {len(self.df_raw.columns)}")
-
-            # Analisar estrutura da planilha
-            # Tipicamente: Coluna 0 = CPF, Coluna 5 = Nome
-            # Mas vamos detectar automaticamente as colunas de PV
-
+            # Cabeçalho na linha 12 (header=11); a linha seguinte repete os
+            # cabeçalhos e é pulada. Leitura em streaming (openpyxl read-only),
+            # só das colunas usadas, em blocos: memória constante
+            logger.info("   Lendo arquivo Excel (streaming)...")
+            cabecalho = ler_cabecalho_planilha(self.arquivo_excel, self.LINHA_CABECALHO)
+            logger.info(f"   Colunas encontradas: {len(cabecalho)}")
+
+            # Estrutura: Coluna 0 = CPF, Coluna 5 = Nome, Coluna 6 = PV
+            # Colunas de PV detectadas pelo nome servem de fallback
             colunas_pv = {}
-            for idx, col in enumerate(self.df_raw.columns):
+            for idx, col in enumerate(cabecalho):
                 pv = self.detectar_ponto_venda(col)
                 if pv:
                     colunas_pv[pv] = idx
@@ -170,88 +318,63 @@ class ExcelExtractor:
             if not colunas_pv and pontos_venda_filtro:
                 logger.info(f"   ℹ️ Nenhuma coluna de PV detectada, assumindo PV único: {pontos_venda_filtro}")
 
-            # Processar cada linha
-            for index, row in self.df_raw.iterrows():
-                total_processado += 1
-
-                try:
-                    # Extrair CPF (coluna 0)
-                    cpf_raw = row.iloc[0] if len(row) > 0 else None
-                    cpf = self.validar_cpf(cpf_raw)
-
-                    if not cpf:
-                        total_invalido += 1
-                        continue
-
-                    # Extrair Nome (coluna 5)
-                    nome_raw = row.iloc[5] if len(row) > 5 else None
-                    nome = self.normalizar_nome(nome_raw)
-
-                    if not nome:
-                        total_invalido += 1
-                        erros.append(f"Linha {index + 13}: CPF {cpf_raw} sem nome válido")
-                        continue
-
-                    # Determinar ponto de venda da COLUNA 6
-                    ponto_venda = None
-
-                    # Ler PV da coluna 6 (baseado na estrutura da planilha)
-                    pv_raw = row.iloc[6] if len(row) > 6 else None
-
-                    if pd.notna(pv_raw):
-                        # Pode vir como int (17308) ou string ("17308")
-                        pv_str = str(int(pv_raw)) if isinstance(pv_raw, (int, float)) else str(pv_raw).strip()
-
-                        # Verificar se é 17308 ou 24627
-                        if pv_str == '17308':
-                            ponto_venda = '17308'
-                        elif pv_str == '24627':
-                            ponto_venda = '24627'
-                        elif '17308' in pv_str:
-                            ponto_venda = '17308'
-                        elif '24627' in pv_str:
-                            ponto_venda = '24627'
-
-                    # Se não encontrou PV na coluna 6, tentar detectar por colunas (fallback)
-                    if not ponto_venda and colunas_pv:
-                        for pv, col_idx in colunas_pv.items():
-                            valor_pv = row.iloc[col_idx] if len(row) > col_idx else None
-                            if pd.notna(valor_pv) and str(valor_pv).strip():
-                                ponto_venda = pv
-                                break
-
-                    # Se ainda não tem PV, usar 24627 como padrão
-                    if not ponto_venda:
-                        logger.warning(f"   ⚠️ PV não identificado na linha {index + 13} (coluna 6: {repr(pv_raw)}), usando 24627 como padrão")
-                        ponto_venda = '24627'
-
-                    # Verificar se o PV está no filtro (se houver)
-                    if pontos_venda_filtro and ponto_venda not in pontos_venda_filtro:
-                        continue
-
-                    # Formatar CPF para XXX.XXX.XXX-XX
-                    cpf_formatado = f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
-
-                    # Criar registro do cliente
-                    cliente = {
-                        'cpf': cpf,
-                        'cpf_formatado': cpf_formatado,
-                        'nome': nome,
-                        'ponto_venda': ponto_venda,
-                        'linha_origem': index + 13,  # +13 porque header=11 e +1 linha pulada
-                    }
-
-                    # Verificar duplicatas
-                    if any(c['cpf'] == cpf for c in clientes_validos):
-                        logger.warning(f"   ⚠️ CPF duplicado ignorado: {cpf_formatado} - {nome}")
-                        continue
-
-                    clientes_validos.append(cliente)
-
-                except Exception as e:
-                    total_invalido += 1
-                    erros.append(f"Linha {index + 13}: {str(e)}")
-                    logger.error(f"   ❌ Erro na linha {index + 13}: {e}")
+            colunas = sorted({self.COL_CPF, self.COL_NOME, self.COL_PV, *colunas_pv.values()})
+
+            for bloco in ler_blocos_planilha(self.arquivo_excel, self.LINHA_CABECALHO, colunas,
+                                             pular_linhas=1):
+                total_processado += len(bloco)
+                linhas = bloco['posicao'] + 13  # +13 porque header=11 e +1 linha pulada
+
+                cpfs = limpar_cpfs(bloco[self.COL_CPF])
+                nomes = normalizar_nomes(bloco[self.COL_NOME])
+
+                sem_cpf = cpfs.isna()
+                sem_nome = ~sem_cpf & nomes.isna()
+                total_invalido += int(sem_cpf.sum()) + int(sem_nome.sum())
+
+                if len(erros) < 10:
+                    for linha, cpf_raw in zip(linhas[sem_nome], bloco.loc[sem_nome, self.COL_CPF]):
+                        erros.append(f"Linha {linha}: CPF {cpf_raw} sem nome válido")
+                        if len(erros) >= 10:
+                            break
+
+                validos = ~(sem_cpf | sem_nome)
+                pontos_venda = self._pontos_venda(bloco[validos], colunas_pv)
+
+                sem_pv = pontos_venda.isna()
+                if sem_pv.any():
+                    total_pv_padrao += int(sem_pv.sum())
+                    pontos_venda = pontos_venda.fillna('24627')
+
+                registros = pd.DataFrame({
+                    'cpf': cpfs[validos],
+                    'cpf_formatado': formatar_cpfs(cpfs[validos]),
+                    'nome': nomes[validos],
+                    'ponto_venda': pontos_venda,
+                    'linha_origem': linhas[validos],
+                })
+
+                # Verificar se o PV está no filtro (se houver)
+                if pontos_venda_filtro:
+                    registros = registros[registros['ponto_venda'].isin(pontos_venda_filtro)]
+
+                # Duplicatas: dentro do bloco e contra os blocos anteriores
+                duplicados = registros['cpf'].duplicated() | registros['cpf'].isin(cpfs_vistos)
+                if duplicados.any():
+                    total_duplicado += int(duplicados.sum())
+                    registros = registros[~duplicados]
+
+                cpfs_vistos.update(registros['cpf'])
+                blocos_validos.append(registros)
+
+            if total_pv_padrao:
+                logger.warning(f"   ⚠️ PV não identificado em {total_pv_padrao} linha(s) (coluna 6), usando 24627 como padrão")
+            if total_duplicado:
+                logger.warning(f"   ⚠️ CPFs duplicados ignorados: {total_duplicado}")
+
+            clientes_validos = []
+            for registros in blocos_validos:
+                clientes_validos.extend(registros.to_dict('records'))
 
             # Estatísticas por PV
             estatisticas_pv = {}
@@ -0,0 +1,595 @@
+"""
+Fila de Disparos (PostgreSQL)
+O disparo completo vira um job por boleto na tabela fila_disparos; o worker
+consome os jobs fora da requisição HTTP.
+
+- Reivindicação com FOR UPDATE SKIP LOCKED (vários workers sem conflito)
+- Um job por vez por cliente Nexus (advisory lock + proximo_permitido_em),
+  mantendo os intervalos anti-bloqueio do fluxo original
+- Job travado (worker morreu) volta para a fila após o lease
+- Etapas já feitas (texto/PDF enviados, boleto marcado como enviado) são
+  puladas ao retomar, para não enviar duas vezes
+"""
+
+import os
+import sys
+import json
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psycopg.rows import dict_row
+
+from models.database import Database, db, log_sistema
+
+
+# Job em 'processando' há mais que isso é considerado abandonado
+LEASE_MINUTOS = int(os.getenv('FILA_DISPAROS_LEASE_MINUTOS', 15))
+MAX_TENTATIVAS = int(os.getenv('FILA_DISPAROS_MAX_TENTATIVAS', 3))
+
+# Primeiro argumento do pg_try_advisory_xact_lock(int, int) - "namespace" da fila
+CHAVE_LOCK_FILA = 73010
+
+
+# Último PDF baixado do Canopus para o CPF (fallback de _obter_pdf)
+SQL_ULTIMO_DOWNLOAD_PDF = """
+    SELECT
+        pdf_sha256,
+        CASE WHEN pdf_sha256 IS NULL THEN caminho_arquivo END AS caminho_arquivo,
+        nome_arquivo
+    FROM downloads_canopus
+    WHERE cpf = %s
+    AND status = 'sucesso'
+    AND (pdf_sha256 IS NOT NULL OR (caminho_arquivo IS NOT NULL AND caminho_arquivo != ''))
+    ORDER BY created_at DESC
+    LIMIT 1
+"""
+
+
+# ============================================================================
+# ENFILEIRAMENTO
+# ============================================================================
+
+def enfileirar_disparo(historico_disparo_id: int, cliente_nexus_id: int, boleto_ids: List[int]) -> int:
+    """
+    Cria um job por boleto para o disparo informado
+
+    Boletos que já têm job ativo (pendente/processando) são ignorados.
+
+    Returns:
+        Quantidade de jobs criados
+    """
+    if not boleto_ids:
+        return 0
+
+    return db.execute_update("""
+        INSERT INTO fila_disparos (historico_disparo_id, cliente_nexus_id, boleto_id)
+        SELECT %s, %s, boleto_id
+        FROM unnest(%s::int[]) WITH ORDINALITY AS t(boleto_id, ordem)
+        ORDER BY ordem
+        ON CONFLICT DO NOTHING
+    """, (historico_disparo_id, cliente_nexus_id, boleto_ids))
+
+
+def publicar_progresso_disparo(historico_disparo_id: int, cliente_atual: Dict = None):
+    """
+    Publica o progresso do disparo no tópico 'disparo:<cliente_nexus_id>'
+
+    Uma leitura do historico_disparos por atualização; os espectadores (SSE de
+    /scheduler/status-disparo-atual/stream) recebem pelo barramento.
+    """
+    from services.progresso import publicar
+
+    try:
+        historico = db.execute_query("""
+            SELECT id, cliente_nexus_id, status, total_envios, envios_sucesso, envios_erro
+            FROM historico_disparos
+            WHERE id = %s
+        """, (historico_disparo_id,))
+        if not historico:
+            return
+
+        historico = historico[0]
+        enviados = historico['envios_sucesso'] or 0
+        erros = historico['envios_erro'] or 0
+
+        publicar(f"disparo:{historico['cliente_nexus_id']}", {
+            'id': historico['id'],
+            'status': historico['status'],
+            'total': historico['total_envios'] or 0,
+            'atual': enviados + erros,
+            'enviados': enviados,
+            'erros': erros,
+            'cliente_atual': cliente_atual
+        })
+    except Exception as e:
+        log_sistema('warning', f'Erro ao publicar progresso do disparo {historico_disparo_id}: {str(e)}', 'disparo')
+
+
+def finalizar_disparos_travados(cliente_nexus_id: int, mensagem: str) -> int:
+    """
+    Marca como erro os disparos em andamento há mais de 10 minutos sem job ativo
+
+    Publica o estado final de cada um: quem acompanha pelo SSE deixa de ver o
+    disparo "em andamento".
+
+    Returns:
+        Quantidade de disparos finalizados
+    """
+    finalizados = db.execute_query("""
+        UPDATE historico_disparos
+        SET status = 'erro',
+            detalhes = jsonb_build_object('mensagem', %s::text)
+        WHERE cliente_nexus_id = %s
+        AND status = 'em_andamento'
+        AND horario_execucao < NOW() - INTERVAL '10 minutes'
+        AND NOT EXISTS (
+            SELECT 1 FROM fila_disparos f
+            WHERE f.historico_disparo_id = historico_disparos.id
+            AND f.status IN ('pendente', 'processando')
+        )
+        RETURNING id
+    """, (mensagem, cliente_nexus_id))
+
+    for disparo in finalizados:
+        publicar_progresso_disparo(disparo['id'])
+
+    return len(finalizados)
+
+
+def cancelar_jobs_pendentes(historico_disparo_id: int) -> int:
+    """Cancela os jobs ainda não iniciados de um disparo"""
+    return db.execute_update("""
+        UPDATE fila_disparos
+        SET status = 'cancelado', updated_at = NOW()
+        WHERE historico_disparo_id = %s
+        AND status = 'pendente'
+    """, (historico_disparo_id,))
+
+
+# ============================================================================
+# WORKER
+# ============================================================================
+
+class WorkerFilaDisparos:
+    """Consome fila_disparos e envia mensagem + PDF de cada boleto"""
+
+    def __init__(self, nome: str = None, intervalo_ocioso: float = 2.0):
+        """
+        Args:
+            nome: Identificação do worker em locked_by (padrão: host:pid)
+            intervalo_ocioso: Espera entre consultas quando não há job pronto
+        """
+        self.nome = nome or f'{socket.gethostname()}:{os.getpid()}'
+        self.intervalo_ocioso = intervalo_ocioso
+        self._parar = threading.Event()
+        self._thread = None
+
+    # ------------------------------------------------------------------------
+    # Reivindicação
+    # ------------------------------------------------------------------------
+
+    def reivindicar_job(self) -> Optional[Dict]:
+        """
+        Reivindica o próximo job pronto (pendente ou abandonado)
+
+        Returns:
+            Job com dados do boleto/cliente ou None se não houver
+        """
+        conn = Database.get_connection()
+        try:
+            with conn.cursor(row_factory=dict_row) as cur:
+                # Jobs abandonados que já estouraram as tentativas viram erro
+                cur.execute("""
+                    UPDATE fila_disparos
+                    SET status = 'erro',
+                        erro = 'Worker interrompido - limite de tentativas atingido',
+                        updated_at = NOW()
+                    WHERE status = 'processando'
+                    AND locked_at < NOW() - make_interval(mins => %s)
+                    AND tentativas >= %s
+                """, (LEASE_MINUTOS, MAX_TENTATIVAS))
+
+                cur.execute("""
+                    SELECT f.id, f.cliente_nexus_id
+                    FROM fila_disparos f
+                    JOIN historico_disparos h ON h.id = f.historico_disparo_id
+                    WHERE h.status = 'em_andamento'
+                    AND f.executar_apos <= NOW()
+                    AND (
+                        f.status = 'pendente'
+                        OR (f.status = 'processando' AND f.locked_at < NOW() - make_interval(mins => %s))
+                    )
+                    ORDER BY f.id
+                    LIMIT 20
+                    FOR UPDATE OF f SKIP LOCKED
+                """, (LEASE_MINUTOS,))
+                candidatos = cur.fetchall()
+
+                for candidato in candidatos:
+                    # Um job por vez por cliente Nexus (mesmo com vários workers)
+                    cur.execute(
+                        "SELECT pg_try_advisory_xact_lock(%s, %s) AS ok",
+                        (CHAVE_LOCK_FILA, candidato['cliente_nexus_id'])
+                    )
+                    if not cur.fetchone()['ok']:
+                        continue
+
+                    # Checagem refeita após o lock (snapshot novo)
+                    cur.execute("""
+                        SELECT NOT EXISTS (
+                            SELECT 1 FROM fila_disparos p
+                            WHERE p.cliente_nexus_id = %s
+                            AND p.id <> %s
+                            AND (
+                                (p.status = 'processando' AND p.locked_at >= NOW() - make_interval(mins => %s))
+                                OR p.proximo_permitido_em > NOW()
+                            )
+                        ) AS livre
+                    """, (candidato['cliente_nexus_id'], candidato['id'], LEASE_MINUTOS))
+                    if not cur.fetchone()['livre']:
+                        continue
+
+                    cur.execute("""
+                        UPDATE fila_disparos
+                        SET status = 'processando',
+                            locked_at = NOW(),
+                            locked_by = %s,
+                            tentativas = tentativas + 1,
+                            updated_at = NOW()
+                        WHERE id = %s
+                        RETURNING *
+                    """, (self.nome, candidato['id']))
+                    job = cur.fetchone()
+                    conn.commit()
+                    return dict(job)
+
+            conn.commit()
+            return None
+
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            Database.return_connection(conn)
+
+    # ------------------------------------------------------------------------
+    # Processamento
+    # ------------------------------------------------------------------------
+
+    def _finalizar_job(self, job: Dict, status: str, erro: str = None):
+        """Fecha o job e agenda o próximo envio do cliente (intervalo anti-bloqueio)"""
+        finalizados = db.execute_query("""
+            SELECT COUNT(*) AS total
+            FROM fila_disparos
+            WHERE historico_disparo_id = %s
+            AND status IN ('enviado', 'erro')
+        """, (job['historico_disparo_id'],))
+        ordem = (finalizados[0]['total'] if finalizados else 0) + 1
+
+        # A cada 10 disparos, pausa maior (simula descanso humano)
+        if ordem % 10 == 0:
+            intervalo = random.uniform(45, 90)
+            log_sistema('info', f"⏸️ Pausa estratégica após 10 disparos: {intervalo:.1f}s (simula comportamento humano)", 'disparo')
+        else:
+            intervalo = random.uniform(15, 30)
+
+        db.execute_update("""
+            UPDATE fila_disparos
+            SET status = %s,
+                erro = %s,
+                proximo_permitido_em = NOW() + make_interval(secs => %s),
+                updated_at = NOW()
+            WHERE id = %s
+        """, (status, erro, intervalo, job['id']))
+
+    def _atualizar_progresso(self, historico_disparo_id: int):
+        """Recalcula os contadores do historico_disparos a partir da fila"""
+        db.execute_update("""
+            UPDATE historico_disparos h
+            SET total_envios = f.total,
+                envios_sucesso = f.enviados,
+                envios_erro = f.erros
+            FROM (
+                SELECT
+                    COUNT(*) FILTER (WHERE status <> 'cancelado') AS total,
+                    COUNT(*) FILTER (WHERE status = 'enviado') AS enviados,
+                    COUNT(*) FILTER (WHERE status = 'erro') AS erros
+                FROM fila_disparos
+                WHERE historico_disparo_id = %s
+            ) f
+            WHERE h.id = %s
+        """, (historico_disparo_id, historico_disparo_id))
+
+    def _obter_pdf(self, boleto: Dict) -> Optional[str]:
+        """Caminho do PDF: pdf_path, blob do boleto ou último download do Canopus"""
+        pdf_path = boleto.get('pdf_path')
+        if pdf_path and Path(pdf_path).exists():
+            return pdf_path
+
+        if boleto.get('pdf_sha256'):
+            from services.pdf_blob_store import caminho_pdf_blob
+
+            caminho = caminho_pdf_blob(boleto['pdf_sha256'])
+            if caminho:
+                return str(caminho)
+
+        nome_cliente = boleto['nome_completo']
+        log_sistema('info', f"PDF não encontrado em pdf_path, buscando em downloads_canopus para {nome_cliente}", 'disparo')
+
+        pdf_canopus = db.execute_query(SQL_ULTIMO_DOWNLOAD_PDF, (boleto['cliente_final_cpf'],))
+
+        if not pdf_canopus:
+            return None
+
+        from services.pdf_blob_store import caminho_pdf_download
+
+        caminho = caminho_pdf_download(pdf_canopus[0])
+        return str(caminho) if caminho else None
+
+    def processar_job(self, job: Dict):
+        """Envia mensagem personalizada + PDF de um boleto, pulando etapas já feitas"""
+        from services.whatsapp_evolution import whatsapp_service
+        from services.mensagens_personalizadas import mensagens_service
+        from services.pdf_extracao_store import obter_dados_boleto
+
+        cliente_nexus_id = job['cliente_nexus_id']
+
+        boletos = db.execute_query("""
+            SELECT
+                b.id as boleto_id,
+                b.pdf_path,
+                b.pdf_sha256,
+                b.status_envio,
+                b.data_vencimento,
+                b.valor_original,
+                cf.cpf as cliente_final_cpf,
+                cf.whatsapp,
+                cf.nome_completo,
+                cf.numero_contrato,
+                cn.nome_empresa
+            FROM boletos b
+            JOIN clientes_finais cf ON b.cliente_final_id = cf.id
+            JOIN clientes_nexus cn ON cn.id = b.cliente_nexus_id
+            WHERE b.id = %s
+        """, (job['boleto_id'],))
+
+        if not boletos:
+            self._finalizar_job(job, 'erro', 'Boleto não encontrado')
+            return
+
+        boleto = boletos[0]
+        whatsapp = boleto['whatsapp']
+        nome_cliente = boleto['nome_completo']
+
+        job['cliente_atual'] = {'nome': nome_cliente, 'whatsapp': whatsapp, 'cpf': boleto['cliente_final_cpf']}
+        publicar_progresso_disparo(job['historico_disparo_id'], job['cliente_atual'])
+
+        # Já enviado (ex: worker caiu depois de marcar o boleto): não reenviar
+        if boleto['status_envio'] == 'enviado' or job.get('pdf_enviado_em'):
+            log_sistema('info', f"ℹ️ Boleto de {nome_cliente} já enviado - job retomado sem reenvio", 'disparo')
+            db.execute_update("""
+                UPDATE fila_disparos SET status = 'enviado', updated_at = NOW() WHERE id = %s
+            """, (job['id'],))
+            return
+
+        log_sistema('info', f"[job {job['id']}] Processando cliente: {nome_cliente}", 'disparo')
+
+        pdf_path = self._obter_pdf(boleto)
+        if not pdf_path or not os.path.exists(pdf_path):
+            log_sistema('warning', f"PDF não encontrado para {nome_cliente} (CPF: {boleto['cliente_final_cpf']})", 'disparo')
+            self._finalizar_job(job, 'erro', 'PDF não encontrado')
+            return
+
+        # DADOS REAIS DO PDF (extraídos uma vez e lidos pelo hash)
+        dados_pdf = obter_dados_boleto(pdf_path, boleto.get('pdf_sha256'))
+        if not dados_pdf.get('sucesso'):
+            log_sistema('warning', f"Não foi possível extrair dados do PDF para {nome_cliente}", 'disparo')
+            dados_pdf = {}
+
+        vencimento_str = dados_pdf.get('vencimento_str') if dados_pdf.get('sucesso') else boleto['data_vencimento'].strftime('%d/%m/%Y')
+
+        # 1. MENSAGEM PERSONALIZADA (só se ainda não foi enviada)
+        if not job.get('texto_enviado_em'):
+            mensagem_personalizada = mensagens_service.gerar_mensagem_boleto(
+                dados_cliente={
+                    'nome_completo': nome_cliente,
+                    'numero_contrato': boleto.get('numero_contrato', 'N/A')
+                },
+                dados_boleto={
+                    'valor_original': dados_pdf.get('valor') if dados_pdf.get('sucesso') else boleto['valor_original'],
+                    'data_vencimento': vencimento_str
+                },
+                nome_empresa='Cred MS Consorcios'
+            )
+
+            log_sistema('info', f"📱 Enviando mensagem de texto para {whatsapp}", 'disparo')
+            resultado_msg = whatsapp_service.enviar_mensagem(whatsapp, mensagem_personalizada, cliente_nexus_id)
+
+            if not resultado_msg.get('sucesso'):
+                erro_msg = resultado_msg.get('error', 'Erro desconhecido')
+                log_sistema('error', f"❌ FALHA ao enviar mensagem para {nome_cliente}: {erro_msg}", 'disparo')
+                self._finalizar_job(job, 'erro', f'Mensagem: {erro_msg}')
+                return
+
+            # Registrar na hora: se o worker cair agora, a retomada não reenvia o texto
+            db.execute_update("""
+                UPDATE fila_disparos SET texto_enviado_em = NOW(), updated_at = NOW() WHERE id = %s
+            """, (job['id'],))
+            log_sistema('success', "✅ Mensagem de texto enviada com sucesso!", 'disparo')
+
+            # AGUARDAR ANTES DE ENVIAR O BOLETO (simulando comportamento humano)
+            intervalo_msg_pdf = random.uniform(8, 15)
+            log_sistema('info', f"⏳ Aguardando {intervalo_msg_pdf:.1f}s antes de enviar PDF (simulando digitação humana)...", 'disparo')
+            time.sleep(intervalo_msg_pdf)
+
+        # 2. PDF DO BOLETO
+        valor_str = f"R$ {dados_pdf.get('valor', 0):.2f}" if dados_pdf.get('sucesso') else f"R$ {boleto['valor_original']:.2f}"
+        nome_empresa_limpo = (boleto['nome_empresa'] or 'Nexus').replace(' - Nexus Brasil', '').replace('- Nexus Brasil', '').strip()
+        legenda = f"📄 *Boleto {nome_empresa_limpo}*\nVencimento: {vencimento_str}\nValor: {valor_str}\n\n💚 Seu parceiro de confiança!"
+
+        log_sistema('info', f"📤 Enviando PDF para {nome_cliente} ({os.path.getsize(pdf_path)} bytes)", 'disparo')
+        resultado_pdf = whatsapp_service.enviar_pdf(whatsapp, pdf_path, legenda, cliente_nexus_id)
+
+        # Verificar tanto 'sucesso' quanto 'success' (compatibilidade)
+        if resultado_pdf.get('sucesso') or resultado_pdf.get('success'):
+            db.execute_update("""
+                UPDATE fila_disparos SET pdf_enviado_em = NOW(), updated_at = NOW() WHERE id = %s
+            """, (job['id'],))
+            db.execute_update("""
+                UPDATE boletos
+                SET status_envio = 'enviado', data_envio = CURRENT_TIMESTAMP
+                WHERE id = %s
+            """, (job['boleto_id'],))
+            db.execute_update("""
+                INSERT INTO disparos
+                (cliente_nexus_id, boleto_id, whatsapp_numero, status_disparo, data_disparo)
+                VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+            """, (cliente_nexus_id, job['boleto_id'], whatsapp, 'enviado'))
+
+            log_sistema('success', f"✅ Boleto enviado com sucesso para {nome_cliente}", 'disparo')
+            self._finalizar_job(job, 'enviado')
+        else:
+            erro_msg = resultado_pdf.get('error') or resultado_pdf.get('mensagem') or 'Erro desconhecido'
+            log_sistema('error', f"❌ Erro ao enviar PDF para {nome_cliente}: {erro_msg}", 'disparo')
+            db.execute_update("""
+                INSERT INTO disparos
+                (cliente_nexus_id, boleto_id, whatsapp_numero, status_disparo, data_disparo)
+                VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+            """, (cliente_nexus_id, job['boleto_id'], whatsapp, 'erro'))
+            self._finalizar_job(job, 'erro', f'PDF: {erro_msg}')
+
+    def finalizar_disparo_se_concluido(self, historico_disparo_id: int):
+        """Marca o disparo como concluído quando não restam jobs e envia a notificação final"""
+        concluido = db.execute_query("""
+            UPDATE historico_disparos h
+            SET status = 'concluido'
+            WHERE h.id = %s
+            AND h.status = 'em_andamento'
+            AND NOT EXISTS (
+                SELECT 1 FROM fila_disparos f
+                WHERE f.historico_disparo_id = h.id
+                AND f.status IN ('pendente', 'processando')
+            )
+            RETURNING h.id, h.cliente_nexus_id, h.horario_execucao,
+                      h.total_envios, h.envios_sucesso, h.envios_erro
+        """, (historico_disparo_id,))
+
+        if not concluido:
+            return
+
+        historico = concluido[0]
+        total = historico['total_envios'] or 0
+        enviados = historico['envios_sucesso'] or 0
+        erros = historico['envios_erro'] or 0
+        tempo_minutos = (datetime.now() - historico['horario_execucao']).total_seconds() / 60
+        taxa_sucesso = (enviados / total) * 100 if total > 0 else 0
+
+        db.execute_update("""
+            UPDATE historico_disparos SET detalhes = %s::jsonb WHERE id = %s
+        """, (json.dumps({'tempo_minutos': tempo_minutos, 'taxa_sucesso': taxa_sucesso}), historico_disparo_id))
+
+        try:
+            from services.whatsapp_evolution import whatsapp_service
+            from routes.crm_disparo_individual import buscar_numeros_notificacao
+
+            proxima_data = (datetime.now() + timedelta(days=30)).strftime("%d/%m/%Y")
+
+            mensagem_final = f"""✅ *DISPARO COMPLETO FINALIZADO!*
+
+🕐 *Finalizado em:* {datetime.now().strftime("%d/%m/%Y às %H:%M:%S")}
+⏱️ *Tempo total:* {tempo_minutos:.1f} minutos
+
+📊 *Estatísticas do Disparo:*
+• Total processado: {total} clientes
+• Boletos enviados: {enviados}
+• Taxa de sucesso: {taxa_sucesso:.1f}%
+• Erros: {erros}
+
+📅 *Próximo disparo automático:*
+• Data: {proxima_data}
+
+✨ *Nexus - Aqui seu tempo vale ouro!*
+Obrigado por confiar em nossos serviços."""
+
+            for numero in buscar_numeros_notificacao(historico['cliente_nexus_id']):
+                try:
+                    whatsapp_service.enviar_mensagem(numero, mensagem_final, historico['cliente_nexus_id'])
+                except Exception as e:
+                    log_sistema('warning', f'Erro ao enviar notificação final para {numero}: {str(e)}', 'disparo')
+        except Exception as e:
+            log_sistema('warning', f'Erro ao enviar notificações finais: {str(e)}', 'disparo')
+
+    # ------------------------------------------------------------------------
+    # Loop
+    # ------------------------------------------------------------------------
+
+    def executar_uma_vez(self) -> bool:
+        """
+        Processa um job, se houver
+
+        Returns:
+            True se um job foi processado
+        """
+        job = self.reivindicar_job()
+        if not job:
+            return False
+
+        try:
+            self.processar_job(job)
+        except Exception as e:
+            log_sistema('error', f"Erro ao processar job {job['id']}: {str(e)}", 'disparo')
+            try:
+                self._finalizar_job(job, 'erro', str(e))
+            except Exception:
+                pass
+
+        self._atualizar_progresso(job['historico_disparo_id'])
+        self.finalizar_disparo_se_concluido(job['historico_disparo_id'])
+        publicar_progresso_disparo(job['historico_disparo_id'], job.get('cliente_atual'))
+        return True
+
+    def executar(self):
+        """Loop principal até parar() ser chamado"""
+        log_sistema('info', f'Worker da fila de disparos iniciado ({self.nome})', 'disparo')
+
+        while not self._parar.is_set():
+            try:
+                if not self.executar_uma_vez():
+                    self._parar.wait(self.intervalo_ocioso)
+            except Exception as e:
+                log_sistema('error', f'Erro no worker da fila de disparos: {str(e)}', 'disparo')
+                self._parar.wait(self.intervalo_ocioso * 5)
+
+    def iniciar_em_thread(self):
+        """Roda o worker numa thread daemon dentro do processo web"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self.executar, name='worker-fila-disparos', daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        """Pede para o loop encerrar após o job atual"""
+        self._parar.set()
+
+
+# Instância global
+worker_fila_disparos = WorkerFilaDisparos()
+
+
+if __name__ == '__main__':
+    # Worker dedicado: python backend/services/fila_disparos.py
+    import signal
+
+    signal.signal(signal.SIGTERM, lambda *_: worker_fila_disparos.parar())
+    try:
+        worker_fila_disparos.executar()
+    except KeyboardInterrupt:
+        worker_fila_disparos.parar()
@@ -0,0 +1,340 @@
+"""
+Importação em lote dos PDFs de downloads_canopus (/importar-boletos)
+
+Antes cada registro era processado em série: PDF materializado, pdfplumber,
+conexão nova e vários SELECT/INSERT de uma linha. Agora:
+
+1. Extrações já gravadas (pdf_extracoes) vêm numa única consulta;
+   só os PDFs sem extração vão para o pool de processos.
+2. CPF → cliente_final resolvido com uma consulta (cpf = ANY).
+3. clientes_finais e boletos gravados em lotes (INSERT ... SELECT unnest
+   ... ON CONFLICT DO NOTHING) numa única transação.
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from psycopg.rows import dict_row
+
+from models.database import Database
+from services.pdf_blob_store import caminho_pdf_download, calcular_sha256_arquivo
+from services.pdf_extracao_store import buscar_extracoes, extrair_em_lote, salvar_extracoes
+
+logger = logging.getLogger(__name__)
+
+
+# Registros gravados por transação
+TAMANHO_LOTE = 500
+
+WHATSAPP_PLACEHOLDER = '55679999999999'
+
+
+def _lotes(itens: List, tamanho: int = TAMANHO_LOTE):
+    for inicio in range(0, len(itens), tamanho):
+        yield itens[inicio:inicio + tamanho]
+
+
+def _separar_grupo_cota(grupo_cota: Optional[str]):
+    """'006660-3344-00' → ('006660', '3344')"""
+    if grupo_cota and '-' in grupo_cota:
+        partes = grupo_cota.split('-')
+        return partes[0] or 'N/A', (partes[1] if len(partes) > 1 else 'N/A') or 'N/A'
+    return 'N/A', 'N/A'
+
+
+def _validar(dados: Dict, pdf_filename: str) -> Optional[Dict]:
+    """
+    Mesmas validações da importação anterior
+
+    Returns:
+        Registro normalizado ou None (motivo já logado)
+    """
+    nome = dados.get('nome_pagador')
+    cpf = (dados.get('cpf') or '').replace('.', '').replace('-', '').strip()
+    vencimento = dados.get('vencimento')
+    valor = dados.get('valor', 0)
+
+    if not nome or len(nome.strip()) < 3:
+        logger.error(f"   ❌ {pdf_filename[:50]}: Nome inválido ou muito curto: '{nome}'")
+        return None
+
+    if not cpf or len(cpf) != 11 or not cpf.isdigit():
+        logger.error(f"   ❌ {pdf_filename[:50]}: CPF inválido: '{cpf}'")
+        return None
+
+    if not vencimento:
+        logger.error(f"   ❌ {pdf_filename[:50]}: Vencimento não encontrado no PDF")
+        return None
+
+    if not valor or valor <= 0:
+        logger.error(f"   ❌ {pdf_filename[:50]}: Valor inválido: R$ {valor}")
+        return None
+
+    grupo, cota = _separar_grupo_cota(dados.get('grupo_cota'))
+
+    return {
+        'nome': nome.strip(),
+        'cpf': cpf,
+        'vencimento': vencimento.date() if isinstance(vencimento, datetime) else vencimento,
+        'mes_ref': vencimento.month,
+        'ano_ref': vencimento.year,
+        'valor': valor,
+        'contrato': dados.get('contrato'),
+        'grupo': grupo,
+        'cota': cota,
+        'pdf_sha256': dados.get('pdf_sha256'),
+    }
+
+
+class ImportadorBoletosCanopus:
+    """Importa downloads_canopus → clientes_finais + boletos de um cliente Nexus"""
+
+    def __init__(self, cliente_nexus_id: int, workers: int = None):
+        self.cliente_nexus_id = cliente_nexus_id
+        self.workers = workers
+        self.stats = {
+            'total_pdfs': 0,
+            'clientes_criados': 0,
+            'clientes_existentes': 0,
+            'boletos_criados': 0,
+            'boletos_ja_existentes': 0,
+            'erros': 0,
+            'pdfs_sem_dados': 0
+        }
+
+    # ------------------------------------------------------------------
+    # Etapa 1: dados dos PDFs
+    # ------------------------------------------------------------------
+
+    def _extrair_dados(self, downloads: List[Dict]) -> Dict[int, Dict]:
+        """Dados de cada download ({download_id: dados}), extraindo só o que falta"""
+        gravados = buscar_extracoes([d['pdf_sha256'] for d in downloads if d['pdf_sha256']])
+
+        dados_por_download = {}
+        faltando = []
+        for download in downloads:
+            extracao = gravados.get(download['pdf_sha256']) if download['pdf_sha256'] else None
+            if extracao is not None:
+                dados_por_download[download['id']] = extracao
+            else:
+                faltando.append(download)
+
+        logger.info(f"📄 {len(dados_por_download)} PDFs já extraídos, {len(faltando)} para extrair")
+        if not faltando:
+            return dados_por_download
+
+        hash_por_download = {}
+
+        def tarefas():
+            # Gerador: materializar o próximo PDF sobrepõe a extração dos anteriores
+            for download in faltando:
+                try:
+                    caminho = caminho_pdf_download(download)
+                    if not caminho:
+                        raise ValueError('registro sem PDF')
+                except Exception as e:
+                    logger.error(f"   ❌ Erro ao obter PDF {download['nome_arquivo'][:50]}: {e}")
+                    self.stats['erros'] += 1
+                    continue
+
+                hash_por_download[download['id']] = download['pdf_sha256'] or calcular_sha256_arquivo(caminho)
+                yield download['id'], str(caminho)
+
+        novas_extracoes = []
+        for download_id, dados, erro in extrair_em_lote(tarefas(), self.workers):
+            if erro:
+                logger.error(f"   ❌ Erro ao extrair PDF (download {download_id}): {erro}")
+                self.stats['erros'] += 1
+                continue
+
+            dados['pdf_sha256'] = hash_por_download[download_id]
+            dados_por_download[download_id] = dados
+            novas_extracoes.append((dados['pdf_sha256'], dados))
+
+        # Próximas leituras (disparo, reimportação) não reabrem esses PDFs
+        for lote in _lotes(novas_extracoes):
+            conn = Database.get_connection()
+            try:
+                with conn.cursor() as cur:
+                    salvar_extracoes(cur, lote)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.warning(f"⚠️ Não foi possível gravar extrações: {e}")
+            finally:
+                Database.return_connection(conn)
+
+        return dados_por_download
+
+    # ------------------------------------------------------------------
+    # Etapa 2: clientes (CPF → id)
+    # ------------------------------------------------------------------
+
+    def _resolver_clientes(self, cur, registros: List[Dict]) -> Dict[str, int]:
+        """Busca todos os CPFs numa consulta e cria os que faltam em lotes"""
+        cpfs = list({r['cpf'] for r in registros})
+
+        cur.execute("""
+            SELECT id, cpf FROM clientes_finais
+            WHERE cliente_nexus_id = %s AND cpf = ANY(%s)
+        """, (self.cliente_nexus_id, cpfs))
+        clientes = {row['cpf']: row['id'] for row in cur.fetchall()}
+        self.stats['clientes_existentes'] = len(clientes)
+
+        # Primeiro registro de cada CPF novo define o cadastro
+        novos = {}
+        for registro in registros:
+            if registro['cpf'] not in clientes and registro['cpf'] not in novos:
+                novos[registro['cpf']] = registro
+
+        for lote in _lotes(list(novos.values())):
+            cur.execute("""
+                INSERT INTO clientes_finais
+                (cliente_nexus_id, nome_completo, cpf, whatsapp, telefone_celular, numero_contrato,
+                 grupo_consorcio, cota_consorcio, valor_credito, valor_parcela, prazo_meses,
+                 data_adesao, ativo)
+                SELECT %s, n.nome, n.cpf, %s, %s, 'TEMP-' || n.cpf,
+                       n.grupo, n.cota, 0.0, n.valor, 60,
+                       CURRENT_DATE, TRUE
+                FROM unnest(%s::text[], %s::text[], %s::text[], %s::text[], %s::numeric[])
+                    AS n(nome, cpf, grupo, cota, valor)
+                ON CONFLICT DO NOTHING
+                RETURNING id, cpf
+            """, (
+                self.cliente_nexus_id, WHATSAPP_PLACEHOLDER, WHATSAPP_PLACEHOLDER,
+                [r['nome'] for r in lote],
+                [r['cpf'] for r in lote],
+                [r['grupo'] for r in lote],
+                [r['cota'] for r in lote],
+                [r['valor'] for r in lote],
+            ))
+            criados = cur.fetchall()
+            clientes.update({row['cpf']: row['id'] for row in criados})
+            self.stats['clientes_criados'] += len(criados)
+
+        return clientes
+
+    # ------------------------------------------------------------------
+    # Etapa 3: boletos
+    # ------------------------------------------------------------------
+
+    def _inserir_boletos(self, cur, registros: List[Dict], clientes: Dict[str, int]):
+        """Um boleto por cliente/mês/ano, gravado em lotes"""
+        cur.execute("""
+            SELECT cliente_final_id, mes_referencia, ano_referencia
+            FROM boletos
+            WHERE cliente_final_id = ANY(%s)
+        """, (list(set(clientes.values())),))
+        existentes = {(row['cliente_final_id'], row['mes_referencia'], row['ano_referencia'])
+                      for row in cur.fetchall()}
+
+        novos = []
+        for registro in registros:
+            cliente_id = clientes.get(registro['cpf'])
+            if cliente_id is None:
+                # CPF já cadastrado para outro cliente Nexus
+                logger.error(f"   ❌ CPF {registro['cpf']} pertence a outro cliente Nexus")
+                self.stats['erros'] += 1
+                continue
+
+            chave = (cliente_id, registro['mes_ref'], registro['ano_ref'])
+            if chave in existentes:
+                self.stats['boletos_ja_existentes'] += 1
+                continue
+
+            existentes.add(chave)
+            registro['cliente_id'] = cliente_id
+            registro['numero_boleto'] = (registro['contrato'] or
+                                         f"CANOPUS-{registro['cpf']}-{registro['mes_ref']:02d}{registro['ano_ref']}")
+            novos.append(registro)
+
+        for lote in _lotes(novos):
+            # pdf_path fica NULL: o PDF está em downloads_canopus/pdf_blobs
+            cur.execute("""
+                INSERT INTO boletos
+                (cliente_nexus_id, cliente_final_id, numero_boleto, valor_original,
+                 data_vencimento, data_emissao, mes_referencia, ano_referencia,
+                 numero_parcela, pdf_path, pdf_filename, pdf_size, pdf_sha256, status, status_envio, gerado_por)
+                SELECT %s, n.cliente_id, n.numero_boleto, n.valor,
+                       n.vencimento, CURRENT_DATE, n.mes, n.ano,
+                       1, NULL, n.pdf_filename, n.pdf_size, n.pdf_sha256,
+                       'pendente', 'nao_enviado', 'importacao_canopus'
+                FROM unnest(%s::int[], %s::text[], %s::numeric[], %s::date[], %s::int[], %s::int[],
+                            %s::text[], %s::int[], %s::text[])
+                    AS n(cliente_id, numero_boleto, valor, vencimento, mes, ano,
+                         pdf_filename, pdf_size, pdf_sha256)
+                ON CONFLICT DO NOTHING
+                RETURNING id
+            """, (
+                self.cliente_nexus_id,
+                [r['cliente_id'] for r in lote],
+                [r['numero_boleto'] for r in lote],
+                [r['valor'] for r in lote],
+                [r['vencimento'] for r in lote],
+                [r['mes_ref'] for r in lote],
+                [r['ano_ref'] for r in lote],
+                [r['pdf_filename'] for r in lote],
+                [r['pdf_size'] for r in lote],
+                [r['pdf_sha256'] for r in lote],
+            ))
+            criados = len(cur.fetchall())
+            self.stats['boletos_criados'] += criados
+            # Conflito em numero_boleto (UNIQUE) = boleto já importado
+            self.stats['boletos_ja_existentes'] += len(lote) - criados
+
+    # ------------------------------------------------------------------
+
+    def importar(self, downloads: List[Dict]) -> Dict:
+        """
+        Importa os downloads informados
+
+        Args:
+            downloads: Registros de downloads_canopus (id, cpf, nome_arquivo,
+                       pdf_sha256, caminho_arquivo, tamanho_bytes)
+
+        Returns:
+            Estatísticas da importação
+        """
+        self.stats['total_pdfs'] = len(downloads)
+        inicio = datetime.now()
+
+        dados_por_download = self._extrair_dados(downloads)
+
+        registros = []
+        for download in downloads:
+            dados = dados_por_download.get(download['id'])
+            if dados is None:
+                continue  # erro já contabilizado
+
+            if not dados.get('sucesso'):
+                logger.warning(f"   ⚠️  Não foi possível extrair dados do PDF {download['nome_arquivo'][:50]}")
+                self.stats['pdfs_sem_dados'] += 1
+                continue
+
+            registro = _validar(dados, download['nome_arquivo'])
+            if registro is None:
+                self.stats['erros'] += 1
+                continue
+
+            registro['pdf_filename'] = download['nome_arquivo']
+            registro['pdf_size'] = download['tamanho_bytes']
+            registros.append(registro)
+
+        if registros:
+            conn = Database.get_connection()
+            try:
+                with conn.cursor(row_factory=dict_row) as cur:
+                    clientes = self._resolver_clientes(cur, registros)
+                    self._inserir_boletos(cur, registros, clientes)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                Database.return_connection(conn)
+
+        logger.info(f"✅ Importação concluída em {(datetime.now() - inicio).total_seconds():.1f}s: "
+                    f"{self.stats['boletos_criados']} boletos criados, "
+                    f"{self.stats['clientes_criados']} clientes criados")
+        return self.stats
@@ -0,0 +1,234 @@
+"""
+Armazenamento de PDFs endereçado por conteúdo (SHA-256)
+
+Os PDFs baixados do Canopus ficam uma única vez na tabela pdf_blobs
+(BYTEA, chave = SHA-256 do conteúdo). downloads_canopus guarda só o hash
+em pdf_sha256 - nada de base64 no caminho_arquivo.
+
+Leitura: o blob é copiado em blocos para um cache local imutável
+(PDF_BLOB_CACHE_DIR/ab/abcdef....pdf) e o leitor recebe o caminho ou um
+handle de arquivo. Como a chave é o próprio hash, o cache nunca fica
+desatualizado e não precisa de arquivo temporário por requisição.
+"""
+
+import base64
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional, Tuple
+
+from psycopg.rows import tuple_row
+
+logger = logging.getLogger(__name__)
+
+
+# Tamanho de cada bloco lido do banco / disco
+TAMANHO_BLOCO = 256 * 1024
+
+CACHE_DIR = Path(os.getenv('PDF_BLOB_CACHE_DIR', Path(tempfile.gettempdir()) / 'nexus_pdf_blobs'))
+
+# Base64 de PDF sempre começa com "JVBER" (%PDF em base64) - registros antigos
+PREFIXO_BASE64_PDF = 'JVBER'
+
+
+# ============================================================================
+# FUNÇÕES AUXILIARES
+# ============================================================================
+
+def calcular_sha256_arquivo(caminho_pdf) -> str:
+    """Calcula o SHA-256 de um arquivo lendo em blocos"""
+    sha = hashlib.sha256()
+    with open(caminho_pdf, 'rb') as f:
+        for bloco in iter(lambda: f.read(TAMANHO_BLOCO), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def caminho_cache(sha256: str) -> Path:
+    """Caminho do blob no cache local (dividido por prefixo para não lotar um diretório)"""
+    return CACHE_DIR / sha256[:2] / f'{sha256}.pdf'
+
+
+def _gravar_cache(sha256: str, origem) -> Path:
+    """
+    Grava o blob no cache de forma atômica (arquivo .part + os.replace)
+
+    Args:
+        sha256: Hash do conteúdo
+        origem: Caminho de arquivo existente ou bytes
+    """
+    destino = caminho_cache(sha256)
+    if destino.exists():
+        return destino
+
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=destino.parent, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if isinstance(origem, (bytes, bytearray, memoryview)):
+                f.write(origem)
+            else:
+                with open(origem, 'rb') as arquivo_origem:
+                    shutil.copyfileobj(arquivo_origem, f, TAMANHO_BLOCO)
+        os.replace(temporario, destino)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+    return destino
+
+
+def _obter_conexao(conn):
+    """Usa a conexão recebida ou pega uma do pool (retorna flag para devolver)"""
+    if conn is not None:
+        return conn, False
+
+    from models.database import Database
+    return Database.get_connection(), True
+
+
+def _devolver_conexao(conn, do_pool: bool):
+    if do_pool:
+        from models.database import Database
+        conn.commit()
+        Database.return_connection(conn)
+
+
+# ============================================================================
+# ESCRITA
+# ============================================================================
+
+def salvar_pdf_blob(cur, caminho_pdf) -> Tuple[str, int]:
+    """
+    Grava o PDF em pdf_blobs (deduplicado pelo hash) e no cache local
+
+    Não faz commit: participa da transação de quem chama.
+
+    Args:
+        cur: Cursor da transação atual
+        caminho_pdf: Caminho do PDF baixado
+
+    Returns:
+        (sha256, tamanho_bytes)
+    """
+    sha256 = calcular_sha256_arquivo(caminho_pdf)
+    tamanho = os.path.getsize(caminho_pdf)
+
+    cur.execute("SELECT 1 FROM pdf_blobs WHERE sha256 = %s", (sha256,))
+    if cur.fetchone() is None:
+        with open(caminho_pdf, 'rb') as f:
+            cur.execute("""
+                INSERT INTO pdf_blobs (sha256, conteudo, tamanho_bytes)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (sha256) DO NOTHING
+            """, (sha256, f.read(), tamanho))
+    else:
+        logger.info(f"♻️ PDF já armazenado (sha256 {sha256[:12]}...)")
+
+    # O arquivo já está em disco: aproveita para popular o cache
+    try:
+        _gravar_cache(sha256, caminho_pdf)
+    except OSError as e:
+        logger.warning(f"⚠️ Não foi possível copiar PDF para o cache: {e}")
+
+    return sha256, tamanho
+
+
+# ============================================================================
+# LEITURA
+# ============================================================================
+
+def caminho_pdf_blob(sha256: str, conn=None) -> Optional[Path]:
+    """
+    Garante o blob no cache local e retorna o caminho
+
+    Na primeira leitura o conteúdo vem do banco em blocos
+    (substring sobre o BYTEA), sem montar o PDF inteiro na memória.
+
+    Args:
+        sha256: Hash do PDF
+        conn: Conexão opcional (senão usa o pool)
+
+    Returns:
+        Path do arquivo no cache ou None se o blob não existir
+    """
+    destino = caminho_cache(sha256)
+    if destino.exists():
+        return destino
+
+    conn, do_pool = _obter_conexao(conn)
+    try:
+        with conn.cursor(row_factory=tuple_row) as cur:
+            cur.execute("SELECT tamanho_bytes FROM pdf_blobs WHERE sha256 = %s", (sha256,))
+            row = cur.fetchone()
+            if not row:
+                logger.error(f"❌ Blob não encontrado: {sha256}")
+                return None
+
+            tamanho = row[0]
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            fd, temporario = tempfile.mkstemp(dir=destino.parent, suffix='.part')
+            sha = hashlib.sha256()
+
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    # substring() do PostgreSQL é 1-indexado
+                    for inicio in range(1, tamanho + 1, TAMANHO_BLOCO):
+                        cur.execute(
+                            "SELECT substring(conteudo FROM %s FOR %s) FROM pdf_blobs WHERE sha256 = %s",
+                            (inicio, TAMANHO_BLOCO, sha256)
+                        )
+                        bloco = cur.fetchone()[0]
+                        sha.update(bloco)
+                        f.write(bloco)
+
+                if sha.hexdigest() != sha256:
+                    raise ValueError(f'Blob corrompido: hash não confere ({sha256})')
+
+                os.replace(temporario, destino)
+            finally:
+                if os.path.exists(temporario):
+                    os.remove(temporario)
+    finally:
+        _devolver_conexao(conn, do_pool)
+
+    return destino
+
+
+def abrir_pdf_blob(sha256: str, conn=None):
+    """
+    Abre o PDF como arquivo binário somente leitura
+
+    Returns:
+        Handle de arquivo (use com `with`) ou None se o blob não existir
+    """
+    caminho = caminho_pdf_blob(sha256, conn)
+    return open(caminho, 'rb') if caminho else None
+
+
+def caminho_pdf_download(row: dict, conn=None) -> Optional[Path]:
+    """
+    Caminho local do PDF de um registro de downloads_canopus
+
+    Aceita registros novos (pdf_sha256) e antigos ainda em base64 no
+    caminho_arquivo (decodificados uma vez e guardados no cache pelo hash).
+
+    Args:
+        row: Registro com pdf_sha256 e/ou caminho_arquivo
+        conn: Conexão opcional (senão usa o pool)
+
+    Returns:
+        Path do PDF ou None se o registro não tiver PDF
+    """
+    if row.get('pdf_sha256'):
+        return caminho_pdf_blob(row['pdf_sha256'], conn)
+
+    legado = row.get('caminho_arquivo') or ''
+    if legado.startswith(PREFIXO_BASE64_PDF):
+        pdf_bytes = base64.b64decode(legado)
+        return _gravar_cache(hashlib.sha256(pdf_bytes).hexdigest(), pdf_bytes)
+
+    return None
@@ -0,0 +1,255 @@
+"""
+Dados extraídos dos PDFs de boleto, calculados uma única vez
+
+O pdfplumber custa 100-300 ms por arquivo e o mesmo PDF era lido de novo
+na importação, na pré-visualização e no disparo. Agora os campos
+(vencimento, valor, nosso número, grupo/cota, linha digitável...) são
+extraídos no download e gravados em pdf_extracoes, chave = SHA-256 do PDF
+(o mesmo hash de pdf_blobs / downloads_canopus.pdf_sha256 / boletos.pdf_sha256).
+
+Quem precisa dos dados chama obter_dados_boleto(): lê do banco e só
+extrai (e grava) quando o hash ainda não tem extração.
+
+Reextração em lote: scripts/reextrair_dados_pdfs.py
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from psycopg.rows import dict_row
+
+from services.pdf_blob_store import (
+    calcular_sha256_arquivo, caminho_pdf_blob, _obter_conexao, _devolver_conexao
+)
+from services.pdf_extractor import extrair_dados_boleto
+
+logger = logging.getLogger(__name__)
+
+
+# Incrementar quando as regras do BoletoExtractor mudarem: o script de
+# reextração reprocessa tudo que estiver em versão anterior
+VERSAO_EXTRATOR = 1
+
+CAMPOS_TEXTO = ('vencimento_str', 'valor_str', 'nome_pagador', 'cpf', 'grupo_cota',
+                'nosso_numero', 'contrato', 'linha_digitavel')
+
+
+def _resultado_vazio() -> Dict:
+    """Mesmo formato de BoletoExtractor.extrair_dados sem nenhum campo"""
+    resultado = {campo: None for campo in CAMPOS_TEXTO}
+    resultado.update({'sucesso': False, 'vencimento': None, 'valor': 0.0})
+    return resultado
+
+
+def _de_linha(row: Dict) -> Dict:
+    """Converte o registro de pdf_extracoes para o formato do extrator"""
+    resultado = _resultado_vazio()
+    for campo in CAMPOS_TEXTO:
+        resultado[campo] = row.get(campo)
+
+    vencimento = row.get('vencimento')
+    if isinstance(vencimento, date) and not isinstance(vencimento, datetime):
+        vencimento = datetime.combine(vencimento, datetime.min.time())
+
+    resultado['vencimento'] = vencimento
+    resultado['valor'] = float(row['valor']) if row.get('valor') is not None else 0.0
+    resultado['sucesso'] = bool(row.get('sucesso'))
+    resultado['pdf_sha256'] = row.get('sha256')
+    return resultado
+
+
+def parametros_extracao(sha256: str, dados: Dict) -> tuple:
+    """Parâmetros do INSERT de salvar_extracao (também usado em lote)"""
+    vencimento = dados.get('vencimento')
+    if isinstance(vencimento, datetime):
+        vencimento = vencimento.date()
+
+    return (
+        sha256,
+        bool(dados.get('sucesso')),
+        vencimento,
+        dados.get('valor') or 0,
+        *(dados.get(campo) for campo in CAMPOS_TEXTO),
+        VERSAO_EXTRATOR,
+    )
+
+
+SQL_SALVAR_EXTRACAO = """
+    INSERT INTO pdf_extracoes (
+        sha256, sucesso, vencimento, valor,
+        vencimento_str, valor_str, nome_pagador, cpf, grupo_cota,
+        nosso_numero, contrato, linha_digitavel,
+        versao_extrator, extraido_em
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+    ON CONFLICT (sha256) DO UPDATE SET
+        sucesso = EXCLUDED.sucesso,
+        vencimento = EXCLUDED.vencimento,
+        valor = EXCLUDED.valor,
+        vencimento_str = EXCLUDED.vencimento_str,
+        valor_str = EXCLUDED.valor_str,
+        nome_pagador = EXCLUDED.nome_pagador,
+        cpf = EXCLUDED.cpf,
+        grupo_cota = EXCLUDED.grupo_cota,
+        nosso_numero = EXCLUDED.nosso_numero,
+        contrato = EXCLUDED.contrato,
+        linha_digitavel = EXCLUDED.linha_digitavel,
+        versao_extrator = EXCLUDED.versao_extrator,
+        extraido_em = NOW()
+"""
+
+
+# ============================================================================
+# ESCRITA
+# ============================================================================
+
+def salvar_extracao(cur, sha256: str, dados: Dict):
+    """
+    Grava (ou atualiza) a extração do PDF
+
+    Não faz commit: participa da transação de quem chama.
+    """
+    cur.execute(SQL_SALVAR_EXTRACAO, parametros_extracao(sha256, dados))
+
+
+def extrair_e_salvar(cur, sha256: str, caminho_pdf) -> Dict:
+    """
+    Extrai os dados do PDF e grava em pdf_extracoes (chamado no download)
+
+    Args:
+        cur: Cursor da transação atual
+        sha256: Hash do PDF (de salvar_pdf_blob)
+        caminho_pdf: PDF em disco
+
+    Returns:
+        Dados no formato de extrair_dados_boleto
+    """
+    dados = extrair_dados_boleto(str(caminho_pdf))
+    salvar_extracao(cur, sha256, dados)
+    dados['pdf_sha256'] = sha256
+    return dados
+
+
+# ============================================================================
+# LEITURA
+# ============================================================================
+
+def buscar_extracao(sha256: str, conn=None) -> Optional[Dict]:
+    """Extração gravada para o hash (None se ainda não extraído)"""
+    conn, do_pool = _obter_conexao(conn)
+    try:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute("SELECT * FROM pdf_extracoes WHERE sha256 = %s", (sha256,))
+            row = cur.fetchone()
+    finally:
+        _devolver_conexao(conn, do_pool)
+
+    return _de_linha(row) if row else None
+
+
+def buscar_extracoes(hashes: List[str], conn=None) -> Dict[str, Dict]:
+    """Extrações gravadas para vários hashes numa única consulta ({sha256: dados})"""
+    if not hashes:
+        return {}
+
+    conn, do_pool = _obter_conexao(conn)
+    try:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute("SELECT * FROM pdf_extracoes WHERE sha256 = ANY(%s)", (list(set(hashes)),))
+            rows = cur.fetchall()
+    finally:
+        _devolver_conexao(conn, do_pool)
+
+    return {row['sha256'].strip(): _de_linha(row) for row in rows}
+
+
+def salvar_extracoes(cur, extracoes: Iterable[Tuple[str, Dict]]):
+    """Grava várias extrações [(sha256, dados)] (sem commit)"""
+    cur.executemany(SQL_SALVAR_EXTRACAO,
+                    [parametros_extracao(sha256, dados) for sha256, dados in extracoes])
+
+
+# ============================================================================
+# EXTRAÇÃO EM LOTE (pool de processos)
+# ============================================================================
+
+def _extrair_tarefa(tarefa):
+    """Roda no processo filho: só lê o PDF (sem banco)"""
+    chave, caminho_pdf = tarefa
+    try:
+        return chave, extrair_dados_boleto(str(caminho_pdf)), None
+    except Exception as e:
+        return chave, None, str(e)
+
+
+def extrair_em_lote(tarefas: Iterable[Tuple[object, str]],
+                    workers: int = None) -> Iterator[Tuple[object, Optional[Dict], Optional[str]]]:
+    """
+    Extrai vários PDFs em paralelo (pdfplumber é CPU-bound)
+
+    As tarefas são enviadas ao pool conforme o iterável as produz, então
+    baixar/materializar o próximo PDF sobrepõe a extração dos anteriores.
+
+    Args:
+        tarefas: Iterável de (chave, caminho_pdf)
+        workers: Processos (padrão: núcleos da CPU)
+
+    Yields:
+        (chave, dados ou None, erro ou None) na ordem em que terminam
+    """
+    # Chamado de rotas do Flask: fork copiaria o processo com as threads do
+    # app (pool do banco, barramento, scheduler) e seus locks no meio do uso
+    metodo = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context(metodo)) as executor:
+        futuros = [executor.submit(_extrair_tarefa, tarefa) for tarefa in tarefas]
+        for futuro in as_completed(futuros):
+            yield futuro.result()
+
+
+def obter_dados_boleto(pdf_path: str = None, sha256: str = None, conn=None) -> Dict:
+    """
+    Dados do boleto sem reabrir o PDF quando já foram extraídos
+
+    Substitui extrair_dados_boleto() para quem tem o hash (boletos.pdf_sha256,
+    downloads_canopus.pdf_sha256) ou um PDF local: calcular o hash é muito
+    mais barato que rodar o pdfplumber.
+
+    Args:
+        pdf_path: PDF local (opcional se sha256 for informado)
+        sha256: Hash do PDF (opcional se pdf_path existir)
+        conn: Conexão opcional (senão usa o pool)
+
+    Returns:
+        Dict no formato de extrair_dados_boleto (+ 'pdf_sha256')
+    """
+    if not sha256:
+        if not pdf_path or not os.path.exists(pdf_path):
+            return _resultado_vazio()
+        sha256 = calcular_sha256_arquivo(pdf_path)
+
+    dados = buscar_extracao(sha256, conn)
+    if dados is not None:
+        return dados
+
+    # Primeira leitura deste PDF: extrai e grava para as próximas
+    if not pdf_path or not os.path.exists(pdf_path):
+        pdf_path = caminho_pdf_blob(sha256, conn)
+        if not pdf_path:
+            return _resultado_vazio()
+
+    logger.info(f"📄 Extraindo dados do PDF (sha256 {sha256[:12]}...)")
+    dados = extrair_dados_boleto(str(pdf_path))
+
+    conn, do_pool = _obter_conexao(conn)
+    try:
+        with conn.cursor() as cur:
+            salvar_extracao(cur, sha256, dados)
+    finally:
+        _devolver_conexao(conn, do_pool)
+
+    dados['pdf_sha256'] = sha256
+    return dados
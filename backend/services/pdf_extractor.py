@@ -68,7 +68,8 @@ class BoletoExtractor:
                 'cpf': str,
                 'grupo_cota': str,
                 'nosso_numero': str,
-                'contrato': str
+                'contrato': str,
+                'linha_digitavel': str
             }
         """
 
@@ -82,7 +83,8 @@ class BoletoExtractor:
             'cpf': None,
             'grupo_cota': None,
             'nosso_numero': None,
-            'contrato': None
+            'contrato': None,
+            'linha_digitavel': None
         }
 
         try:
@@ -164,6 +166,14 @@ class BoletoExtractor:
             if nosso_match:
                 resultado['nosso_numero'] = nosso_match.group(1)
 
+            # LINHA DIGITÁVEL - padrão: 00000.00000 00000.000000 00000.000000 0 00000000000000
+            linha_match = re.search(
+                r'(\d{5}\.\d{5}\s+\d{5}\.\d{6}\s+\d{5}\.\d{6}\s+\d\s+\d{14})',
+                texto
+            )
+            if linha_match:
+                resultado['linha_digitavel'] = re.sub(r'\s+', ' ', linha_match.group(1))
+
             # Verificar sucesso - pelo menos vencimento e valor devem ser extraídos
             resultado['sucesso'] = bool(resultado['vencimento_str'] and resultado['valor'] > 0)
 
@@ -231,6 +241,7 @@ if __name__ == '__main__':
         print(f"   Contrato: {dados.get('contrato', 'N/A')}")
         print(f"   Grupo/Cota: {dados.get('grupo_cota', 'N/A')}")
         print(f"   Nosso Número: {dados.get('nosso_numero', 'N/A')}")
+        print(f"   Linha Digitável: {dados.get('linha_digitavel', 'N/A')}")
         print()
     else:
         print(f"\n❌ PDF não encontrado: {pdf_path}")
@@ -1,6 +1,10 @@
 """
 Serviço de Geração de PDFs de Boletos
 Utiliza ReportLab para gerar boletos profissionais
+
+A parte fixa da página é montada uma vez por processo (LayoutGravado) e
+repetida como form XObject em cada documento; gerar_boletos_em_lote distribui os boletos no pool de processos de
+services/boleto_generator.py.
 """
 
 from reportlab.lib.pagesizes import A4
@@ -13,6 +17,24 @@ import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import Config
+from services.boleto_generator import MAX_PROCESSOS_PDF, MINIMO_LOTE_PARALELO, LayoutGravado, obter_pool_pdf
+
+
+# Nome do form XObject com a parte fixa da página
+FORM_LAYOUT = 'layout_boleto_nexus'
+
+# Layout fixo deste processo (montado no primeiro boleto)
+_layout_processo = None
+
+
+def _gerar_boleto_arquivo(tarefa: tuple):
+    """Gera um boleto do lote (roda nos processos do pool); None em caso de erro"""
+    indice, dados_boleto, output_path = tarefa
+    try:
+        return BoletoGenerator().gerar_boleto(dados_boleto, output_path)
+    except Exception as e:
+        print(f"❌ Erro ao gerar boleto {indice}: {e}")
+        return None
 
 
 class BoletoGenerator:
@@ -47,21 +69,30 @@ class BoletoGenerator:
         # Cria o PDF
         c = canvas.Canvas(output_path, pagesize=A4)
 
-        # Desenha o boleto
+        # Desenha o boleto (parte fixa primeiro)
+        self._layout().reproduzir(c)
+        c.doForm(FORM_LAYOUT)
         self._desenhar_cabecalho(c, dados_boleto)
         self._desenhar_dados_beneficiario(c, dados_boleto)
         self._desenhar_dados_pagador(c, dados_boleto)
         self._desenhar_valores(c, dados_boleto)
-        self._desenhar_rodape(c, dados_boleto)
 
         # Finaliza o PDF
         c.save()
 
         return output_path
 
-    def _desenhar_cabecalho(self, c: canvas.Canvas, dados: dict):
-        """Desenha o cabeçalho do boleto"""
-        # Cor da marca Nexus
+    def _layout(self) -> LayoutGravado:
+        """Layout fixo do processo, montado na primeira chamada"""
+        global _layout_processo
+        if _layout_processo is None:
+            layout = LayoutGravado(FORM_LAYOUT)
+            self._desenhar_layout(layout)
+            _layout_processo = layout
+        return _layout_processo
+
+    def _desenhar_layout(self, c):
+        """Desenha a parte fixa da página (gravada uma vez por processo em LayoutGravado)"""
         cor_nexus = HexColor('#00d4ff')
 
         # Retângulo superior azul
@@ -73,7 +104,30 @@ class BoletoGenerator:
         c.setFont("Helvetica-Bold", 24)
         c.drawCentredString(self.page_width/2, self.page_height - 30*mm, "BOLETO DE PAGAMENTO")
 
+        # Títulos das seções
+        c.setFillColor(black)
+        c.setFont("Helvetica-Bold", 12)
+        c.drawString(30*mm, self.page_height - 80*mm, "BENEFICIÁRIO")
+        c.drawString(30*mm, self.page_height - 115*mm, "PAGADOR")
+
+        # Caixa de destaque para o valor
+        y_valores = self.page_height - 155*mm
+        c.setFillColor(HexColor('#f0f0f0'))
+        c.setStrokeColor(HexColor('#cccccc'))
+        c.rect(20*mm, y_valores - 25*mm, self.page_width - 40*mm, 30*mm,
+               fill=True, stroke=True)
+
+        c.setFillColor(black)
+        c.setFont("Helvetica-Bold", 11)
+        c.drawString(30*mm, y_valores - 8*mm, "VALOR DO DOCUMENTO")
+        c.drawString(120*mm, y_valores - 8*mm, "VENCIMENTO")
+
+        self._desenhar_rodape(c)
+
+    def _desenhar_cabecalho(self, c: canvas.Canvas, dados: dict):
+        """Desenha a parte variável do cabeçalho (título e faixa azul estão no layout)"""
         # Subtítulo
+        c.setFillColor(white)
         c.setFont("Helvetica", 12)
         c.drawCentredString(self.page_width/2, self.page_height - 40*mm,
                            f"Referência: {dados.get('mes_referencia', 'N/A')}")
@@ -89,9 +143,6 @@ class BoletoGenerator:
         y_start = self.page_height - 80*mm
 
         c.setFillColor(black)
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(30*mm, y_start, "BENEFICIÁRIO")
-
         c.setFont("Helvetica", 10)
         y = y_start - 8*mm
 
@@ -112,9 +163,6 @@ class BoletoGenerator:
         y_start = self.page_height - 115*mm
 
         c.setFillColor(black)
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(30*mm, y_start, "PAGADOR")
-
         c.setFont("Helvetica", 10)
         y = y_start - 8*mm
 
@@ -139,25 +187,13 @@ class BoletoGenerator:
         """Desenha os valores e datas do boleto"""
         y_start = self.page_height - 155*mm
 
-        # Caixa de destaque para o valor
-        cor_caixa = HexColor('#f0f0f0')
-        c.setFillColor(cor_caixa)
-        c.rect(20*mm, y_start - 25*mm, self.page_width - 40*mm, 30*mm,
-               fill=True, stroke=True)
-
-        # Valor
+        # Valor (caixa e rótulos estão no layout)
         c.setFillColor(black)
-        c.setFont("Helvetica-Bold", 11)
-        c.drawString(30*mm, y_start - 8*mm, "VALOR DO DOCUMENTO")
-
         valor = dados.get('valor', 0)
         c.setFont("Helvetica-Bold", 20)
         c.drawString(30*mm, y_start - 18*mm, f"R$ {valor:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'))
 
         # Vencimento
-        c.setFont("Helvetica-Bold", 11)
-        c.drawString(120*mm, y_start - 8*mm, "VENCIMENTO")
-
         vencimento = dados.get('vencimento')
         if isinstance(vencimento, date):
             vencimento_str = vencimento.strftime("%d/%m/%Y")
@@ -176,8 +212,8 @@ class BoletoGenerator:
         c.setStrokeColor(HexColor('#cccccc'))
         c.line(20*mm, y - 4*mm, self.page_width - 20*mm, y - 4*mm)
 
-    def _desenhar_rodape(self, c: canvas.Canvas, dados: dict):
-        """Desenha o rodapé do boleto"""
+    def _desenhar_rodape(self, c: canvas.Canvas):
+        """Desenha o rodapé do boleto (parte do layout fixo)"""
         y_rodape = 40*mm
 
         # Instruções
@@ -215,26 +251,24 @@ class BoletoGenerator:
         Returns:
             Lista de caminhos dos arquivos gerados
         """
-        arquivos_gerados = []
+        tarefas = []
 
         for i, boleto_data in enumerate(lista_boletos):
-            try:
-                # Define o nome do arquivo
-                cliente_nome = boleto_data.get('pagador', 'cliente').replace(' ', '_')
-                mes_ref = boleto_data.get('mes_referencia', 'mes').replace('/', '_')
-                filename = f"boleto_{cliente_nome}_{mes_ref}_{i+1}.pdf"
+            # Define o nome do arquivo
+            cliente_nome = boleto_data.get('pagador', 'cliente').replace(' ', '_')
+            mes_ref = boleto_data.get('mes_referencia', 'mes').replace('/', '_')
+            filename = f"boleto_{cliente_nome}_{mes_ref}_{i+1}.pdf"
 
-                output_path = os.path.join(diretorio_base, filename)
+            tarefas.append((i + 1, boleto_data, os.path.join(diretorio_base, filename)))
 
-                # Gera o boleto
-                caminho = self.gerar_boleto(boleto_data, output_path)
-                arquivos_gerados.append(caminho)
-
-            except Exception as e:
-                print(f"❌ Erro ao gerar boleto {i+1}: {e}")
-                continue
+        # Lotes grandes vão para o pool de processos
+        if len(tarefas) < MINIMO_LOTE_PARALELO or MAX_PROCESSOS_PDF < 2:
+            caminhos = map(_gerar_boleto_arquivo, tarefas)
+        else:
+            tamanho_bloco = max(1, len(tarefas) // (MAX_PROCESSOS_PDF * 4))
+            caminhos = obter_pool_pdf().map(_gerar_boleto_arquivo, tarefas, chunksize=tamanho_bloco)
 
-        return arquivos_gerados
+        return [caminho for caminho in caminhos if caminho]
 
 
 def criar_boleto_exemplo():
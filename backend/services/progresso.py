@@ -0,0 +1,298 @@
+"""
+Progresso em tempo real (downloads do Canopus e disparos)
+
+O status ficava num dict global de automation_canopus (invisível para os
+outros processos do app) e a interface consultava /status-execucao e
+/scheduler/status-disparo-atual a cada 2 segundos.
+
+Agora cada execução publica seu estado num tópico:
+
+- publicar(): grava o último estado em progresso_execucoes (migração 017) e
+  avisa todos os processos por NOTIFY nexus_progresso
+- BarramentoProgresso: uma thread por processo faz LISTEN no canal e mantém
+  o último estado de cada tópico em memória; as conexões SSE só esperam a
+  versão do tópico mudar, sem consulta ao banco por espectador
+- resposta_sse(): stream text/event-stream de um tópico
+
+Tópicos: 'canopus' (download de boletos), 'disparo:<cliente_nexus_id>' e
+'importacao_clientes' (sincronização das planilhas com clientes_finais).
+
+Tópico com status final (concluido, erro, cancelado) expira depois de
+PROGRESSO_EXPIRACAO_SEGUNDOS: sai da tabela e da memória de cada processo,
+para os tópicos de disparo não se acumularem.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import psycopg
+from psycopg.rows import dict_row
+
+from config import Config
+from models.database import execute_query
+
+logger = logging.getLogger(__name__)
+
+
+CANAL = 'nexus_progresso'
+
+# NOTIFY aceita até 8000 bytes; acima disso vai só o tópico e o ouvinte lê a tabela
+TAMANHO_MAXIMO_PAYLOAD = 7500
+
+# Erros guardados no estado de cada execução (os mais recentes)
+ERROS_MAXIMO = int(os.getenv('PROGRESSO_ERROS_MAXIMO', 50))
+
+# Intervalo do comentário de keepalive no SSE (proxies fecham conexão ociosa)
+KEEPALIVE_SEGUNDOS = 15
+
+# Estado final fica visível por esse tempo e depois o tópico é removido
+STATUS_FINAIS = ('concluido', 'erro', 'cancelado')
+EXPIRACAO_SEGUNDOS = int(os.getenv('PROGRESSO_EXPIRACAO_SEGUNDOS', 3600))
+INTERVALO_EXPIRACAO_SEGUNDOS = 300
+
+SQL_EXPIRAR_FINALIZADOS = """
+    DELETE FROM progresso_execucoes
+    WHERE estado->>'status' = ANY(%s)
+    AND atualizado_em < NOW() - make_interval(secs => %s)
+"""
+
+
+def finalizado(estado: Optional[Dict]) -> bool:
+    """Se o estado é o último da execução (status final)"""
+    return isinstance(estado, dict) and estado.get('status') in STATUS_FINAIS
+
+
+def publicar(topico: str, estado: Dict):
+    """
+    Publica o estado atual de um tópico para todos os processos
+
+    Args:
+        topico: Ex.: 'canopus', 'disparo:3'
+        estado: Dicionário serializável em JSON (datas viram texto)
+    """
+    estado_json = json.dumps(estado, default=str)
+    payload = json.dumps({'topico': topico, 'estado': json.loads(estado_json)})
+    if len(payload.encode('utf-8')) > TAMANHO_MAXIMO_PAYLOAD:
+        payload = json.dumps({'topico': topico})
+
+    # Gravação e aviso na mesma transação: quem recebe o NOTIFY já lê o estado novo
+    execute_query("""
+        WITH gravado AS (
+            INSERT INTO progresso_execucoes (topico, estado, atualizado_em)
+            VALUES (%s, %s::jsonb, NOW())
+            ON CONFLICT (topico) DO UPDATE SET
+                estado = EXCLUDED.estado,
+                atualizado_em = EXCLUDED.atualizado_em
+            RETURNING topico
+        )
+        SELECT pg_notify(%s, %s) FROM gravado
+    """, (topico, estado_json, CANAL, payload), fetch=True)
+
+    # O próprio processo não precisa esperar o NOTIFY voltar
+    barramento_progresso.atualizar(topico, json.loads(estado_json))
+
+
+def ler_estado(topico: str) -> Optional[Dict]:
+    """Estado do tópico direto da tabela (fora do barramento)"""
+    resultado = execute_query(
+        "SELECT estado FROM progresso_execucoes WHERE topico = %s", (topico,), fetch=True
+    )
+    return resultado[0]['estado'] if resultado else None
+
+
+class BarramentoProgresso:
+    """Último estado de cada tópico no processo, alimentado por LISTEN"""
+
+    def __init__(self):
+        self._condicao = threading.Condition()
+        self._estados: Dict[str, Dict] = {}
+        self._versoes: Dict[str, int] = {}
+        self._finalizados: Dict[str, float] = {}  # tópico -> quando recebeu o status final
+        self._contador = 0  # versões nunca se repetem, nem depois de um tópico expirar
+        self._parar = threading.Event()
+        self._thread = None
+
+    @property
+    def ativo(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def parando(self) -> bool:
+        return self._parar.is_set()
+
+    # ------------------------------------------------------------------------
+    # Estado
+    # ------------------------------------------------------------------------
+
+    def atualizar(self, topico: str, estado: Dict):
+        """Troca o estado do tópico e acorda quem está esperando por ele"""
+        with self._condicao:
+            if self._estados.get(topico) == estado:
+                return
+            self._estados[topico] = estado
+            self._contador += 1
+            self._versoes[topico] = self._contador
+            if finalizado(estado):
+                self._finalizados[topico] = time.monotonic()
+            else:
+                self._finalizados.pop(topico, None)
+            self._condicao.notify_all()
+
+    def expirar(self):
+        """Remove da memória os tópicos finalizados há mais de EXPIRACAO_SEGUNDOS"""
+        limite = time.monotonic() - EXPIRACAO_SEGUNDOS
+        with self._condicao:
+            expirados = [t for t, quando in self._finalizados.items() if quando < limite]
+            if not expirados:
+                return
+            for topico in expirados:
+                del self._finalizados[topico]
+                self._estados.pop(topico, None)
+                self._versoes.pop(topico, None)
+            self._condicao.notify_all()
+
+    def estado(self, topico: str) -> Optional[Dict]:
+        """Último estado conhecido (lê a tabela se o ouvinte não está rodando)"""
+        if not self.ativo:
+            return ler_estado(topico)
+        with self._condicao:
+            return self._estados.get(topico)
+
+    def atual(self, topico: str) -> Tuple[int, Optional[Dict]]:
+        """(versão, estado) do tópico na memória do processo"""
+        with self._condicao:
+            return self._versoes.get(topico, 0), self._estados.get(topico)
+
+    def aguardar(self, topico: str, versao: int, timeout: float) -> Tuple[int, Optional[Dict]]:
+        """
+        Espera o tópico passar da versão informada
+
+        Returns:
+            (versão, estado) atuais; a versão é a mesma se deu timeout
+        """
+        with self._condicao:
+            self._condicao.wait_for(
+                lambda: self._versoes.get(topico, 0) != versao or self._parar.is_set(),
+                timeout
+            )
+            return self._versoes.get(topico, 0), self._estados.get(topico)
+
+    # ------------------------------------------------------------------------
+    # Ouvinte (LISTEN)
+    # ------------------------------------------------------------------------
+
+    def iniciar(self):
+        """Inicia a thread que escuta o canal (idempotente)"""
+        if self.ativo:
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name='barramento-progresso', daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        """Encerra o ouvinte e libera as conexões SSE que estão esperando"""
+        self._parar.set()
+        with self._condicao:
+            self._condicao.notify_all()
+
+    def _executar(self):
+        logger.info(f"📡 Barramento de progresso escutando '{CANAL}'")
+
+        while not self._parar.is_set():
+            try:
+                # Conexão dedicada: LISTEN prende a conexão, não pode vir do pool
+                with psycopg.connect(Config.DATABASE_URL, autocommit=True, row_factory=dict_row) as conn:
+                    conn.execute(f"LISTEN {CANAL}")
+
+                    # Carga depois do LISTEN: nada publicado no meio se perde
+                    self._expirar_tabela(conn)
+                    for linha in conn.execute("SELECT topico, estado FROM progresso_execucoes"):
+                        self.atualizar(linha['topico'], linha['estado'])
+                    ultima_expiracao = time.monotonic()
+
+                    while not self._parar.is_set():
+                        for notificacao in conn.notifies(timeout=5.0):
+                            self._receber(conn, notificacao.payload)
+
+                        if time.monotonic() - ultima_expiracao >= INTERVALO_EXPIRACAO_SEGUNDOS:
+                            self._expirar_tabela(conn)
+                            self.expirar()
+                            ultima_expiracao = time.monotonic()
+
+            except Exception as e:
+                logger.error(f"❌ Barramento de progresso desconectado: {e}")
+                self._parar.wait(5)
+
+    def _expirar_tabela(self, conn):
+        """Apaga da tabela os tópicos finalizados há mais de EXPIRACAO_SEGUNDOS"""
+        removidos = conn.execute(SQL_EXPIRAR_FINALIZADOS, (list(STATUS_FINAIS), EXPIRACAO_SEGUNDOS)).rowcount
+        if removidos:
+            logger.info(f"🧹 {removidos} tópico(s) de progresso finalizado(s) expirado(s)")
+
+    def _receber(self, conn, payload: str):
+        try:
+            mensagem = json.loads(payload)
+        except ValueError:
+            return
+
+        topico = mensagem.get('topico')
+        if not topico:
+            return
+
+        estado = mensagem.get('estado')
+        if estado is None:
+            # Estado grande demais para o NOTIFY: lê a tabela (uma vez por processo)
+            linha = conn.execute(
+                "SELECT estado FROM progresso_execucoes WHERE topico = %s", (topico,)
+            ).fetchone()
+            if not linha:
+                return
+            estado = linha['estado']
+
+        self.atualizar(topico, estado)
+
+
+# Instância global
+barramento_progresso = BarramentoProgresso()
+
+
+def resposta_sse(topico: str, formatar: Callable[[Optional[Dict]], Dict] = None):
+    """
+    Response text/event-stream com o estado do tópico a cada mudança
+
+    Args:
+        topico: Tópico acompanhado
+        formatar: Monta o evento a partir do estado (padrão: o próprio estado)
+    """
+    from flask import Response, current_app
+
+    barramento_progresso.iniciar()
+    formatar = formatar or (lambda estado: estado or {})
+    dumps = current_app.json.dumps
+
+    def evento(estado) -> str:
+        return f"data: {dumps(formatar(estado))}\n\n"
+
+    def gerar():
+        versao, estado = barramento_progresso.atual(topico)
+        if estado is None:
+            # Ouvinte recém-iniciado ainda sem a carga inicial: uma leitura na conexão
+            estado = ler_estado(topico)
+        yield evento(estado)
+
+        while not barramento_progresso.parando:
+            nova_versao, estado = barramento_progresso.aguardar(topico, versao, KEEPALIVE_SEGUNDOS)
+            if nova_versao == versao:
+                yield ": keepalive\n\n"
+                continue
+            versao = nova_versao
+            yield evento(estado)
+
+    return Response(gerar(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # nginx/Render: não segurar os eventos em buffer
+    })
@@ -0,0 +1,345 @@
+"""
+Sincronização em lote das planilhas de clientes com clientes_finais
+
+/upload-planilha, /importar-planilha-dener e
+CanopusOrquestrador.sincronizar_clientes faziam, para cada cliente, um SELECT
+pelo CPF e depois um INSERT ou UPDATE (com commits intermediários): uma
+planilha de 20 mil clientes virava dezenas de milhares de comandos.
+
+Agora, numa única transação:
+
+0. Cada linha é normalizada e validada contra as colunas de clientes_finais
+   (tamanho dos VARCHAR, faixa dos inteiros, NOT NULL sem padrão): linha
+   inválida fica de fora e volta em 'rejeitados', como o erro por cliente
+   de antes, sem abortar a importação inteira
+1. COPY das linhas extraídas para uma tabela temporária (em lotes, com
+   progresso a cada lote)
+2. Um INSERT ... SELECT ... ON CONFLICT (cpf) DO UPDATE que só regrava as
+   linhas que de fato mudaram
+
+O RETURNING (xmax = 0) separa as linhas criadas das atualizadas; o que foi
+para a tabela temporária e não voltou no RETURNING ficou inalterado.
+"""
+
+import logging
+import os
+from typing import Callable, Dict, Iterable, Optional, Sequence
+
+from psycopg import sql
+from psycopg.rows import tuple_row
+
+logger = logging.getLogger(__name__)
+
+
+# Linhas por COPY (o progresso é informado ao fim de cada lote)
+TAMANHO_LOTE = int(os.getenv('SINCRONIZACAO_TAMANHO_LOTE', 2000))
+
+TABELA_TEMPORARIA = 'clientes_sincronizacao'
+
+# Colunas que vêm de cada linha da planilha (tipo na tabela temporária)
+COLUNAS_LINHA = {
+    'cpf': 'TEXT',
+    'nome_completo': 'TEXT',
+    'ponto_venda': 'TEXT',
+    'numero_contrato': 'TEXT',
+    'whatsapp': 'TEXT',
+    'telefone_celular': 'TEXT',
+    'grupo_consorcio': 'TEXT',
+    'cota_consorcio': 'TEXT',
+    'consultor_id': 'INTEGER',
+    'origem': 'TEXT',
+}
+
+# Faixa de cada tipo inteiro do PostgreSQL
+FAIXAS_INTEIROS = {
+    'int2': (-2 ** 15, 2 ** 15 - 1),
+    'int4': (-2 ** 31, 2 ** 31 - 1),
+    'int8': (-2 ** 63, 2 ** 63 - 1),
+}
+
+SQL_COLUNAS_CLIENTES_FINAIS = """
+    SELECT
+        a.attname AS coluna,
+        t.typname AS tipo,
+        CASE WHEN t.typname IN ('varchar', 'bpchar') AND a.atttypmod > 4
+             THEN a.atttypmod - 4 END AS tamanho,
+        a.attnotnull AS obrigatoria,
+        a.atthasdef AS tem_default
+    FROM pg_attribute a
+    JOIN pg_type t ON t.oid = a.atttypid
+    WHERE a.attrelid = 'clientes_finais'::regclass
+    AND a.attnum > 0 AND NOT a.attisdropped
+"""
+
+# Colunas que só podem vir como valor fixo da importação inteira
+COLUNAS_FIXAS = (
+    'cliente_nexus_id',
+    'valor_credito',
+    'valor_parcela',
+    'prazo_meses',
+    'data_adesao',
+    'status_contrato',
+)
+
+
+def _normalizar(coluna: str, valor):
+    """Texto sem espaços nas pontas (vazio vira None); inteiros como int"""
+    if valor is None:
+        return None
+    if COLUNAS_LINHA[coluna] == 'INTEGER':
+        if isinstance(valor, str) and not valor.strip():
+            return None
+        try:
+            return int(valor)
+        except (TypeError, ValueError):
+            raise ValueError(f"{coluna} não é um número inteiro: {valor!r}")
+    valor = str(valor).strip()
+    return valor or None
+
+
+def _linha(cliente: Dict) -> tuple:
+    """Valores normalizados de um cliente na ordem de COLUNAS_LINHA"""
+    valores = {coluna: _normalizar(coluna, cliente.get(coluna)) for coluna in COLUNAS_LINHA}
+    if not valores['numero_contrato']:
+        valores['numero_contrato'] = f"CANOPUS-{valores['ponto_venda']}-{valores['cpf']}"
+    return tuple(valores.values())
+
+
+def _validar(linha: tuple, colunas: Dict[str, Dict], padroes: Dict, preenchidas: Sequence[str] = ()):
+    """
+    Levanta ValueError se a linha não cabe em clientes_finais
+
+    Coluna NOT NULL vazia só é erro se não há padrão da importação e a coluna
+    vai no INSERT (preenchida em outra linha) ou não tem DEFAULT na tabela.
+    """
+    for coluna, valor in zip(COLUNAS_LINHA, linha):
+        definicao = colunas.get(coluna)
+        if not definicao:
+            continue
+
+        if valor is None:
+            if (definicao['obrigatoria'] and padroes.get(coluna) is None
+                    and (coluna in preenchidas or not definicao['tem_default'])):
+                raise ValueError(f"{coluna} vazio")
+            continue
+
+        tamanho = definicao['tamanho']
+        if tamanho and len(valor) > tamanho:
+            raise ValueError(f"{coluna} com {len(valor)} caracteres (máximo {tamanho})")
+
+        faixa = FAIXAS_INTEIROS.get(definicao['tipo'])
+        if faixa and not faixa[0] <= valor <= faixa[1]:
+            raise ValueError(f"{coluna} fora da faixa do banco: {valor}")
+
+
+def _colunas_clientes_finais(cur) -> Dict[str, Dict]:
+    """{coluna: {'tipo', 'tamanho', 'obrigatoria', 'tem_default'}} de clientes_finais"""
+    cur.execute(SQL_COLUNAS_CLIENTES_FINAIS)
+    return {
+        coluna: {'tipo': tipo, 'tamanho': tamanho, 'obrigatoria': obrigatoria, 'tem_default': tem_default}
+        for coluna, tipo, tamanho, obrigatoria, tem_default in cur.fetchall()
+    }
+
+
+def _montar_upsert(padroes: Dict, atualizar: Sequence[str], preenchidas: Sequence[str]) -> sql.Composed:
+    """INSERT ... ON CONFLICT (cpf) com os padrões e colunas atualizáveis pedidos"""
+    invalidas = [c for c in padroes if c not in COLUNAS_LINHA and c not in COLUNAS_FIXAS]
+    invalidas += [c for c in atualizar if c == 'cpf' or (c not in COLUNAS_LINHA and c not in padroes)]
+    if invalidas:
+        raise ValueError(f"Colunas inválidas para sincronização: {invalidas}")
+
+    # Coluna sem valor em nenhuma linha nem padrão fica fora do INSERT (vale o
+    # DEFAULT da tabela, como nos INSERTs linha a linha de antes)
+    da_linha = [c for c in COLUNAS_LINHA if c in preenchidas or c in padroes]
+    fixas = [c for c in COLUNAS_FIXAS if c in padroes]
+    colunas = da_linha + fixas
+    # Sem valor novo não há o que regravar
+    atualizar = [c for c in atualizar if c in colunas]
+
+    # Coluna da planilha vazia cai no padrão; colunas fixas são o próprio padrão
+    valores = [
+        sql.SQL("COALESCE(s.{}, {})").format(sql.Identifier(c), sql.Placeholder(c))
+        if c in padroes else sql.SQL("s.{}").format(sql.Identifier(c))
+        for c in da_linha
+    ] + [sql.Placeholder(c) for c in fixas]
+
+    if atualizar:
+        # Valor vazio na planilha não apaga o que já está no banco
+        novos = [
+            sql.SQL("COALESCE(EXCLUDED.{0}, cf.{0})").format(sql.Identifier(c))
+            for c in atualizar
+        ]
+        conflito = sql.SQL("""
+            DO UPDATE SET {atribuicoes}, updated_at = CURRENT_TIMESTAMP
+            WHERE ({atuais}) IS DISTINCT FROM ({novos})
+        """).format(
+            atribuicoes=sql.SQL(', ').join(
+                sql.SQL("{} = {}").format(sql.Identifier(c), novo)
+                for c, novo in zip(atualizar, novos)
+            ),
+            atuais=sql.SQL(', ').join(
+                sql.SQL("cf.{}").format(sql.Identifier(c)) for c in atualizar
+            ),
+            novos=sql.SQL(', ').join(novos),
+        )
+    else:
+        conflito = sql.SQL("DO NOTHING")
+
+    # DISTINCT ON: CPF repetido na planilha fica com a última ocorrência
+    # (ON CONFLICT não aceita a mesma linha duas vezes no mesmo comando)
+    return sql.SQL("""
+        WITH aplicados AS (
+            INSERT INTO clientes_finais AS cf ({colunas}, ativo, created_at, updated_at)
+            SELECT DISTINCT ON (s.cpf) {valores}, true, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+            FROM {tabela} s
+            ORDER BY s.cpf, s.seq DESC
+            ON CONFLICT (cpf) {conflito}
+            RETURNING (xmax = 0) AS criado
+        )
+        SELECT
+            COUNT(*) FILTER (WHERE criado) AS criados,
+            COUNT(*) FILTER (WHERE NOT criado) AS atualizados,
+            (SELECT COUNT(DISTINCT cpf) FROM {tabela}) AS distintos
+        FROM aplicados
+    """).format(
+        colunas=sql.SQL(', ').join(map(sql.Identifier, colunas)),
+        valores=sql.SQL(', ').join(valores),
+        tabela=sql.Identifier(TABELA_TEMPORARIA),
+        conflito=conflito,
+    )
+
+
+def sincronizar_clientes_finais(
+    conn,
+    clientes: Iterable[Dict],
+    padroes: Optional[Dict] = None,
+    atualizar: Sequence[str] = ('nome_completo',),
+    ao_progredir: Optional[Callable[[str, int, int], None]] = None,
+    tamanho_lote: int = TAMANHO_LOTE,
+) -> Dict[str, int]:
+    """
+    Cria/atualiza clientes_finais a partir das linhas de uma planilha
+
+    Roda na transação de conn (o commit fica com quem chamou, ex.: o with de
+    Database.conexao); a tabela temporária some no commit.
+
+    Args:
+        conn: Conexão psycopg (qualquer row_factory)
+        clientes: Dicionários com as chaves de COLUNAS_LINHA (cpf obrigatório;
+            numero_contrato padrão: CANOPUS-<ponto_venda>-<cpf>)
+        padroes: Valor das colunas de COLUNAS_LINHA vazias e das COLUNAS_FIXAS
+            (só vão no INSERT as colunas fixas informadas aqui)
+        atualizar: Colunas regravadas quando o CPF já existe (vazio = só cria)
+        ao_progredir: Chamado com (etapa, processados, total) a cada lote
+            copiado ('copiando') e ao aplicar o upsert ('aplicando', 'concluido')
+        tamanho_lote: Linhas por COPY
+
+    Returns:
+        {'total', 'criados', 'atualizados', 'inalterados', 'ignorados',
+        'rejeitados'} (ignorados: linhas sem CPF; rejeitados: lista de
+        {'cpf', 'nome_completo', 'erro'} das linhas que não cabem na tabela;
+        CPF repetido conta uma vez)
+    """
+    padroes = padroes or {}
+
+    with conn.cursor(row_factory=tuple_row) as cur:
+        colunas = _colunas_clientes_finais(cur)
+
+    rejeitados = []
+    ignorados = 0
+
+    def rejeitar(cliente: Dict, erro: ValueError):
+        rejeitados.append({
+            'cpf': cliente.get('cpf'),
+            'nome_completo': cliente.get('nome_completo'),
+            'erro': str(erro),
+        })
+        logger.warning(f"⚠️ Cliente {cliente.get('nome_completo')} (CPF: {cliente.get('cpf')}) ignorado: {erro}")
+
+    def colunas_preenchidas(linhas):
+        return [
+            coluna for i, coluna in enumerate(COLUNAS_LINHA)
+            if any(linha[i] is not None for linha in linhas)
+        ]
+
+    validos = []
+    for cliente in clientes:
+        try:
+            linha = _linha(cliente)
+            if linha[0] is None:  # sem CPF
+                ignorados += 1
+                continue
+            _validar(linha, colunas, padroes)
+        except ValueError as e:
+            rejeitar(cliente, e)
+            continue
+        validos.append((cliente, linha))
+
+    # Segunda passada: NULL em coluna NOT NULL que vai no INSERT por causa de outra linha
+    preenchidas = colunas_preenchidas([linha for _, linha in validos])
+    linhas = []
+    for cliente, linha in validos:
+        try:
+            _validar(linha, colunas, padroes, preenchidas)
+        except ValueError as e:
+            rejeitar(cliente, e)
+            continue
+        linhas.append(linha)
+
+    total = len(linhas)
+    preenchidas = colunas_preenchidas(linhas)
+    consulta = _montar_upsert(padroes, atualizar, preenchidas)
+
+    def progredir(etapa: str, processados: int):
+        if ao_progredir:
+            try:
+                ao_progredir(etapa, processados, total)
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao informar progresso da sincronização: {e}")
+
+    with conn.cursor(row_factory=tuple_row) as cur:
+        cur.execute(sql.SQL("DROP TABLE IF EXISTS pg_temp.{}").format(
+            sql.Identifier(TABELA_TEMPORARIA)))
+        cur.execute(sql.SQL("CREATE TEMP TABLE {} (seq BIGSERIAL, {}) ON COMMIT DROP").format(
+            sql.Identifier(TABELA_TEMPORARIA),
+            sql.SQL(', ').join(
+                sql.SQL("{} {}").format(sql.Identifier(c), sql.SQL(tipo))
+                for c, tipo in COLUNAS_LINHA.items()
+            ),
+        ))
+
+        copy_sql = sql.SQL("COPY {} ({}) FROM STDIN").format(
+            sql.Identifier(TABELA_TEMPORARIA),
+            sql.SQL(', ').join(map(sql.Identifier, COLUNAS_LINHA)),
+        )
+
+        for inicio in range(0, total, tamanho_lote):
+            lote = linhas[inicio:inicio + tamanho_lote]
+            with cur.copy(copy_sql) as copy:
+                for linha in lote:
+                    copy.write_row(linha)
+
+            processados = inicio + len(lote)
+            logger.info(f"   📥 {processados}/{total} linhas na tabela temporária")
+            progredir('copiando', processados)
+
+        progredir('aplicando', total)
+        cur.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(TABELA_TEMPORARIA)))
+        cur.execute(consulta, padroes)
+        criados, atualizados, distintos = cur.fetchone()
+
+    resultado = {
+        'total': total,
+        'criados': criados,
+        'atualizados': atualizados,
+        'inalterados': distintos - criados - atualizados,
+        'ignorados': ignorados,
+        'rejeitados': rejeitados,
+    }
+    progredir('concluido', total)
+
+    logger.info(
+        f"✅ Sincronização: {criados} criados, {atualizados} atualizados, "
+        f"{resultado['inalterados']} inalterados"
+    )
+    return resultado
@@ -14,6 +14,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import Config
 from models import log_sistema
+from services.despacho_whatsapp import DespachanteWhatsApp
 
 
 class WPPConnectService:
@@ -404,6 +405,10 @@ class WPPConnectService:
         """
         Envia mensagens em massa
 
+        Os destinatários são processados em paralelo pelo DespachanteWhatsApp;
+        o espaçamento entre mensagens do número remetente segue
+        intervalo_min/max_segundos de configuracoes_automacao.
+
         Args:
             destinatarios: Lista de dicts com 'numero', 'mensagem' ou 'pdf_path'
             cliente_nexus_id: ID do cliente
@@ -411,84 +416,50 @@ class WPPConnectService:
         Returns:
             Estatísticas do envio em massa
         """
-        stats = {
-            'total': len(destinatarios),
-            'sucessos': 0,
-            'erros': 0,
-            'detalhes': []
-        }
-
         log_sistema('info', f'Iniciando envio em massa para {len(destinatarios)} destinatários',
                    'whatsapp', {
                        'servico': 'wppconnect',
                        'cliente_nexus_id': cliente_nexus_id
                    })
 
-        for idx, dest in enumerate(destinatarios, 1):
-            try:
-                numero = dest['numero']
+        if cliente_nexus_id:
+            despachante = DespachanteWhatsApp.para_cliente(self, cliente_nexus_id)
+        else:
+            despachante = DespachanteWhatsApp(self, 'wppconnect')
 
-                log_sistema('info', f'Processando envio {idx}/{len(destinatarios)}',
-                           'whatsapp', {'numero': numero})
-
-                if 'pdf_path' in dest:
-                    # Envia PDF com anti-bloqueio
-                    mensagem_anti = dest.get(
+        def preparar(dest: Dict) -> Dict:
+            if 'pdf_path' in dest:
+                # PDF com anti-bloqueio
+                return {
+                    'numero': dest['numero'],
+                    'mensagem': dest.get(
                         'mensagem_antibloqueio',
                         'Olá! Você receberá seu boleto em instantes.'
-                    )
-
-                    resultado = self.enviar_com_antibloqueio(
-                        numero=numero,
-                        pdf_path=dest['pdf_path'],
-                        mensagem_antibloqueio=mensagem_anti,
-                        intervalo_segundos=dest.get('intervalo', 5),
-                        cliente_nexus_id=cliente_nexus_id
-                    )
-
-                    if resultado.get('sucesso_total'):
-                        stats['sucessos'] += 1
-                    else:
-                        stats['erros'] += 1
-
-                elif 'mensagem' in dest:
-                    # Envia apenas mensagem
-                    resultado = self.enviar_mensagem(
-                        numero=numero,
-                        mensagem=dest['mensagem'],
-                        cliente_nexus_id=cliente_nexus_id
-                    )
-
-                    if resultado.get('success'):
-                        stats['sucessos'] += 1
-                    else:
-                        stats['erros'] += 1
-
-                stats['detalhes'].append({
-                    'numero': numero,
-                    'resultado': resultado
-                })
-
-                # Pequeno delay entre envios para evitar bloqueio
-                if idx < len(destinatarios):  # Não aguarda no último
-                    time.sleep(2)
-
-            except Exception as e:
-                stats['erros'] += 1
-                stats['detalhes'].append({
-                    'numero': dest.get('numero', 'N/A'),
-                    'erro': str(e)
-                })
-
-                log_sistema('error', f'Erro ao processar destinatário: {str(e)}',
+                    ),
+                    'pdf_path': dest['pdf_path'],
+                    'intervalo_pdf': dest.get('intervalo', 5),
+                    'cliente_nexus_id': cliente_nexus_id
+                }
+
+            return {
+                'numero': dest['numero'],
+                'mensagem': dest.get('mensagem'),
+                'cliente_nexus_id': cliente_nexus_id
+            }
+
+        def ao_concluir(dest: Dict, envio: Dict, resultado: Dict):
+            if not resultado.get('sucesso_total'):
+                log_sistema('error', f'Erro ao processar destinatário: {resultado.get("erro")}',
                            'whatsapp', {'numero': dest.get('numero', 'N/A')})
 
+        stats = despachante.despachar(destinatarios, preparar, ao_concluir)
+
         log_sistema('info',
                    f'Envio em massa concluído: {stats["sucessos"]} sucessos, {stats["erros"]} erros',
                    'whatsapp', {
                        'servico': 'wppconnect',
                        'cliente_nexus_id': cliente_nexus_id,
-                       'stats': stats
+                       'stats': {k: v for k, v in stats.items() if k != 'detalhes'}
                    })
 
         return stats
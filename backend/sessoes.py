@@ -0,0 +1,148 @@
+"""
+Armazenamento das sessões HTTP
+
+Config.SESSION_BACKEND escolhe o backend:
+
+- 'postgres' (padrão): tabela UNLOGGED sessoes_http (migração 016); o cookie
+  leva só o id aleatório da sessão e qualquer instância do app a encontra
+- 'cookie': cookie assinado do próprio Flask (SECRET_KEY), sem estado no
+  servidor; basta para o payload pequeno (usuario_id, cliente_nexus_id, ...)
+- 'filesystem': Flask-Session em flask_session/ (comportamento antigo)
+
+No backend Postgres a linha só é regravada quando o conteúdo da sessão muda
+ou quando a validade no banco precisa ser estendida (no máximo uma vez por
+SESSION_REFRESH_INTERVALO). A validade no banco leva essa folga a mais, então
+a sessão nunca expira antes do cookie. Linhas vencidas são apagadas pelo job
+do automation_scheduler (limpar_sessoes_expiradas).
+"""
+
+import logging
+import secrets
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSessionInterface, SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from config import Config
+from models.database import execute_query
+
+logger = logging.getLogger(__name__)
+
+
+class SessaoServidor(CallbackDict, SessionMixin):
+    """Sessão guardada no servidor; o cookie leva só o sid"""
+
+    def __init__(self, initial=None, sid: str = None, novo: bool = False,
+                 serializado: str = None, restante: float = None):
+        def on_update(self):
+            self.modified = True
+
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.new = novo
+        self.modified = False
+        # Conteúdo como estava no banco e segundos até vencer lá
+        self.serializado = serializado
+        self.restante = restante
+
+
+class SessaoPostgresInterface(SessionInterface):
+    """Sessões na tabela UNLOGGED sessoes_http"""
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, intervalo_refresh: int = 300):
+        self.intervalo_refresh = intervalo_refresh
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+
+        if sid:
+            resultado = execute_query("""
+                SELECT dados, EXTRACT(EPOCH FROM expira_em - NOW()) AS restante
+                FROM sessoes_http
+                WHERE id = %s AND expira_em > NOW()
+            """, (sid,), fetch=True)
+
+            if resultado:
+                try:
+                    dados = self.serializer.loads(resultado[0]['dados'])
+                except ValueError:
+                    logger.warning("⚠️ Sessão com conteúdo inválido descartada")
+                else:
+                    return SessaoServidor(dados, sid=sid, serializado=resultado[0]['dados'],
+                                          restante=float(resultado[0]['restante']))
+
+        return SessaoServidor(sid=secrets.token_urlsafe(32), novo=True)
+
+    def save_session(self, app, session, response):
+        nome = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        # Sessão esvaziada (logout): apaga a linha e o cookie
+        if not session:
+            if not session.new:
+                execute_query("DELETE FROM sessoes_http WHERE id = %s", (session.sid,))
+            if session.modified or not session.new:
+                response.delete_cookie(nome, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+            return
+
+        ttl = int(app.permanent_session_lifetime.total_seconds())
+        serializado = self.serializer.dumps(dict(session))
+
+        # Compara o conteúdo (pega também alterações em objetos aninhados)
+        mudou = serializado != session.serializado
+        renovar = session.restante is None or session.restante < ttl
+
+        if mudou or renovar:
+            execute_query("""
+                INSERT INTO sessoes_http (id, dados, expira_em, atualizado_em)
+                VALUES (%s, %s, NOW() + %s * INTERVAL '1 second', NOW())
+                ON CONFLICT (id) DO UPDATE SET
+                    dados = EXCLUDED.dados,
+                    expira_em = EXCLUDED.expira_em,
+                    atualizado_em = EXCLUDED.atualizado_em
+            """, (session.sid, serializado, ttl + self.intervalo_refresh))
+
+        if mudou or self.should_set_cookie(app, session):
+            response.set_cookie(
+                nome,
+                session.sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=httponly,
+                domain=domain,
+                path=path,
+                secure=secure,
+                samesite=samesite,
+            )
+
+
+def configurar_sessoes(app):
+    """Instala o backend de sessão de Config.SESSION_BACKEND"""
+    backend = app.config.get('SESSION_BACKEND', 'postgres')
+
+    if backend == 'filesystem':
+        from flask_session import Session
+        Session(app)
+    elif backend == 'cookie':
+        # O conteúdo vai no cookie: com a chave padrão qualquer um forja usuario_id
+        if app.config.get('SECRET_KEY') == Config.SECRET_KEY_PADRAO:
+            logger.warning("⚠️ SESSION_BACKEND=cookie com a SECRET_KEY padrão: defina FLASK_SECRET_KEY")
+        app.session_interface = SecureCookieSessionInterface()
+    else:
+        app.session_interface = SessaoPostgresInterface(app.config.get('SESSION_REFRESH_INTERVALO', 300))
+
+    logger.info(f"🔐 Sessões: {backend}")
+
+
+def limpar_sessoes_expiradas() -> int:
+    """Apaga as sessões vencidas de sessoes_http (job do scheduler)"""
+    return execute_query("DELETE FROM sessoes_http WHERE expira_em < NOW()") or 0
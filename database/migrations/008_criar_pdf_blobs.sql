@@ -0,0 +1,49 @@
+-- Migração 008: Armazenar PDFs do Canopus por hash (pdf_blobs)
+-- Data: 2026-10-18
+-- Descrição: Substitui o base64 em downloads_canopus.caminho_arquivo por uma
+--            tabela BYTEA endereçada por SHA-256 (sem inflar 33%, deduplicada)
+
+-- Criar tabela pdf_blobs
+CREATE TABLE IF NOT EXISTS pdf_blobs (
+    sha256 CHAR(64) PRIMARY KEY,
+    conteudo BYTEA NOT NULL,
+    tamanho_bytes INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- PDF já é comprimido: EXTERNAL evita recompressão e deixa substring() barato
+-- (leitura em blocos do services/pdf_blob_store.py)
+ALTER TABLE pdf_blobs ALTER COLUMN conteudo SET STORAGE EXTERNAL;
+
+-- Referência ao blob em downloads_canopus
+ALTER TABLE downloads_canopus ADD COLUMN IF NOT EXISTS pdf_sha256 CHAR(64) REFERENCES pdf_blobs(sha256);
+ALTER TABLE downloads_canopus ALTER COLUMN caminho_arquivo DROP NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_downloads_canopus_pdf_sha256
+ON downloads_canopus(pdf_sha256);
+
+-- Migrar registros antigos em base64 (base64 de PDF começa com "JVBER")
+INSERT INTO pdf_blobs (sha256, conteudo, tamanho_bytes)
+SELECT DISTINCT ON (sha256) sha256, conteudo, LENGTH(conteudo)
+FROM (
+    SELECT
+        encode(sha256(decode(caminho_arquivo, 'base64')), 'hex') AS sha256,
+        decode(caminho_arquivo, 'base64') AS conteudo
+    FROM downloads_canopus
+    WHERE pdf_sha256 IS NULL
+    AND caminho_arquivo LIKE 'JVBER%'
+) convertidos
+ON CONFLICT (sha256) DO NOTHING;
+
+UPDATE downloads_canopus
+SET pdf_sha256 = encode(sha256(decode(caminho_arquivo, 'base64')), 'hex'),
+    caminho_arquivo = NULL
+WHERE pdf_sha256 IS NULL
+AND caminho_arquivo LIKE 'JVBER%';
+
+-- Comentários
+COMMENT ON TABLE pdf_blobs IS 'PDFs de boletos armazenados uma única vez, chave = SHA-256 do conteúdo';
+COMMENT ON COLUMN downloads_canopus.pdf_sha256 IS 'Hash do PDF em pdf_blobs (substitui o base64 em caminho_arquivo)';
+
+-- Após rodar, recuperar o espaço do base64 antigo (fora de transação):
+-- VACUUM FULL downloads_canopus;
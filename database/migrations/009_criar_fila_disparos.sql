@@ -0,0 +1,47 @@
+-- Migração 009: Criar tabela fila_disparos
+-- Data: 2026-10-18
+-- Descrição: Fila de jobs (um por boleto) do disparo completo, consumida pelo
+--            worker em services/fila_disparos.py com FOR UPDATE SKIP LOCKED
+
+-- Criar tabela fila_disparos
+CREATE TABLE IF NOT EXISTS fila_disparos (
+    id SERIAL PRIMARY KEY,
+    historico_disparo_id INTEGER NOT NULL REFERENCES historico_disparos(id) ON DELETE CASCADE,
+    cliente_nexus_id INTEGER NOT NULL REFERENCES clientes_nexus(id) ON DELETE CASCADE,
+    boleto_id INTEGER NOT NULL REFERENCES boletos(id) ON DELETE CASCADE,
+    status VARCHAR(20) NOT NULL DEFAULT 'pendente'
+        CHECK (status IN ('pendente', 'processando', 'enviado', 'erro', 'cancelado')),
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    executar_apos TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    locked_at TIMESTAMP,
+    locked_by VARCHAR(100),
+    texto_enviado_em TIMESTAMP,
+    pdf_enviado_em TIMESTAMP,
+    proximo_permitido_em TIMESTAMP,
+    erro TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Um boleto não pode estar em dois jobs ativos ao mesmo tempo (evita envio duplo)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_fila_disparos_boleto_ativo
+ON fila_disparos(boleto_id)
+WHERE status IN ('pendente', 'processando');
+
+-- Busca de jobs prontos pelo worker
+CREATE INDEX IF NOT EXISTS idx_fila_disparos_prontos
+ON fila_disparos(status, executar_apos, id);
+
+-- Progresso por disparo e pacing por cliente
+CREATE INDEX IF NOT EXISTS idx_fila_disparos_historico
+ON fila_disparos(historico_disparo_id, status);
+
+CREATE INDEX IF NOT EXISTS idx_fila_disparos_cliente
+ON fila_disparos(cliente_nexus_id, status, proximo_permitido_em);
+
+-- Comentários
+COMMENT ON TABLE fila_disparos IS 'Jobs do disparo completo (um por boleto), processados pelo worker da fila';
+COMMENT ON COLUMN fila_disparos.locked_at IS 'Início do processamento; job travado há mais que o lease volta para a fila';
+COMMENT ON COLUMN fila_disparos.texto_enviado_em IS 'Mensagem de texto já enviada (não reenviar ao retomar)';
+COMMENT ON COLUMN fila_disparos.pdf_enviado_em IS 'PDF já enviado (não reenviar ao retomar)';
+COMMENT ON COLUMN fila_disparos.proximo_permitido_em IS 'Intervalo anti-bloqueio: próximo job do mesmo cliente só depois deste horário';
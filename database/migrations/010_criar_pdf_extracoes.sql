@@ -0,0 +1,45 @@
+-- Migração 010: Dados extraídos dos PDFs por hash (pdf_extracoes)
+-- Data: 2026-10-18
+-- Descrição: Campos do boleto extraídos uma única vez no download e lidos
+--            pelo hash do PDF (services/pdf_extracao_store.py)
+
+-- Criar tabela pdf_extracoes
+CREATE TABLE IF NOT EXISTS pdf_extracoes (
+    sha256 CHAR(64) PRIMARY KEY,
+    sucesso BOOLEAN NOT NULL DEFAULT FALSE,
+    vencimento DATE,
+    valor NUMERIC(12, 2),
+    vencimento_str VARCHAR(10),
+    valor_str VARCHAR(20),
+    nome_pagador VARCHAR(255),
+    cpf VARCHAR(14),
+    grupo_cota VARCHAR(50),
+    nosso_numero VARCHAR(50),
+    contrato VARCHAR(50),
+    linha_digitavel VARCHAR(60),
+    versao_extrator INTEGER NOT NULL DEFAULT 1,
+    extraido_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Reextração em lote busca versões antigas
+CREATE INDEX IF NOT EXISTS idx_pdf_extracoes_versao
+ON pdf_extracoes(versao_extrator);
+
+-- Hash do PDF também no boleto (mesma chave de pdf_blobs/downloads_canopus)
+ALTER TABLE boletos ADD COLUMN IF NOT EXISTS pdf_sha256 CHAR(64);
+
+CREATE INDEX IF NOT EXISTS idx_boletos_pdf_sha256
+ON boletos(pdf_sha256);
+
+-- Boletos importados do Canopus: herdar o hash do download de mesmo arquivo
+UPDATE boletos b
+SET pdf_sha256 = dc.pdf_sha256
+FROM downloads_canopus dc
+WHERE b.pdf_sha256 IS NULL
+AND dc.pdf_sha256 IS NOT NULL
+AND dc.nome_arquivo = b.pdf_filename;
+
+-- Comentários
+COMMENT ON TABLE pdf_extracoes IS 'Campos extraídos de cada PDF de boleto (uma vez por conteúdo), chave = SHA-256';
+COMMENT ON COLUMN pdf_extracoes.versao_extrator IS 'Versão das regras do BoletoExtractor usada; scripts/reextrair_dados_pdfs.py atualiza as antigas';
+COMMENT ON COLUMN boletos.pdf_sha256 IS 'Hash do PDF do boleto (pdf_blobs / pdf_extracoes)';
@@ -0,0 +1,410 @@
+-- Migração 011: Contadores do dashboard por cliente (dashboard_counters)
+-- Data: 2026-10-18
+-- Descrição: Totais de clientes/boletos/disparos mantidos por triggers a cada
+--            INSERT/UPDATE/DELETE, lidos pelos dashboards numa consulta por
+--            chave primária (services/contadores_dashboard.py).
+--            dashboard_reconciliar() recalcula tudo e corrige desvios.
+
+-- ============================================================================
+-- TABELAS
+-- ============================================================================
+
+-- Um registro por cliente_nexus_id (0 = registros sem cliente_nexus_id)
+CREATE TABLE IF NOT EXISTS dashboard_counters (
+    cliente_nexus_id INTEGER PRIMARY KEY,
+    -- clientes_finais
+    clientes_ativos BIGINT NOT NULL DEFAULT 0,
+    contratos_ativos BIGINT NOT NULL DEFAULT 0,
+    valor_credito_ativo NUMERIC(18, 2) NOT NULL DEFAULT 0,
+    valor_credito_contratos_ativos NUMERIC(18, 2) NOT NULL DEFAULT 0,
+    -- boletos
+    boletos_total BIGINT NOT NULL DEFAULT 0,
+    boletos_enviados BIGINT NOT NULL DEFAULT 0,
+    boletos_nao_enviados BIGINT NOT NULL DEFAULT 0,
+    boletos_envio_pendente BIGINT NOT NULL DEFAULT 0,
+    boletos_pagos BIGINT NOT NULL DEFAULT 0,
+    boletos_pendentes BIGINT NOT NULL DEFAULT 0,
+    valor_pendente NUMERIC(18, 2) NOT NULL DEFAULT 0,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Boletos pendentes por data de vencimento ("vencidos" e "vencendo em 7 dias"
+-- mudam com a data, então ficam por dia e são somados na leitura)
+CREATE TABLE IF NOT EXISTS dashboard_vencimentos (
+    cliente_nexus_id INTEGER NOT NULL,
+    data_vencimento DATE NOT NULL,
+    boletos_pendentes BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (cliente_nexus_id, data_vencimento)
+);
+
+-- Disparos por dia (monitoramento: hoje, últimos 7 e 30 dias)
+CREATE TABLE IF NOT EXISTS dashboard_disparos_dia (
+    cliente_nexus_id INTEGER NOT NULL,
+    dia DATE NOT NULL,
+    total BIGINT NOT NULL DEFAULT 0,
+    enviados BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (cliente_nexus_id, dia)
+);
+
+-- ============================================================================
+-- APLICAÇÃO DOS DELTAS (linhas novas somam, linhas antigas subtraem)
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION dashboard_aplicar_clientes(novas clientes_finais[], antigas clientes_finais[])
+RETURNS void AS $$
+BEGIN
+    INSERT INTO dashboard_counters AS d (
+        cliente_nexus_id, clientes_ativos, contratos_ativos,
+        valor_credito_ativo, valor_credito_contratos_ativos
+    )
+    SELECT * FROM (
+        SELECT
+            COALESCE(cliente_nexus_id, 0),
+            SUM(CASE WHEN ativo THEN sinal ELSE 0 END),
+            SUM(CASE WHEN ativo AND status_contrato = 'ativo' THEN sinal ELSE 0 END),
+            SUM(CASE WHEN ativo THEN sinal * COALESCE(valor_credito, 0) ELSE 0 END),
+            SUM(CASE WHEN ativo AND status_contrato = 'ativo' THEN sinal * COALESCE(valor_credito, 0) ELSE 0 END)
+        FROM (
+            SELECT 1 AS sinal, n.* FROM unnest(novas) n
+            UNION ALL
+            SELECT -1 AS sinal, a.* FROM unnest(antigas) a
+        ) delta
+        GROUP BY 1
+        ORDER BY 1
+    ) t (cliente_nexus_id, clientes_ativos, contratos_ativos, valor_credito_ativo, valor_credito_contratos_ativos)
+    WHERE clientes_ativos <> 0 OR contratos_ativos <> 0
+       OR valor_credito_ativo <> 0 OR valor_credito_contratos_ativos <> 0
+    ON CONFLICT (cliente_nexus_id) DO UPDATE SET
+        clientes_ativos = d.clientes_ativos + EXCLUDED.clientes_ativos,
+        contratos_ativos = d.contratos_ativos + EXCLUDED.contratos_ativos,
+        valor_credito_ativo = d.valor_credito_ativo + EXCLUDED.valor_credito_ativo,
+        valor_credito_contratos_ativos = d.valor_credito_contratos_ativos + EXCLUDED.valor_credito_contratos_ativos,
+        atualizado_em = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION dashboard_aplicar_boletos(novas boletos[], antigas boletos[])
+RETURNS void AS $$
+BEGIN
+    WITH delta AS (
+        SELECT 1 AS sinal, n.* FROM unnest(novas) n
+        UNION ALL
+        SELECT -1 AS sinal, a.* FROM unnest(antigas) a
+    ),
+    contadores AS (
+        INSERT INTO dashboard_counters AS d (
+            cliente_nexus_id, boletos_total, boletos_enviados, boletos_nao_enviados,
+            boletos_envio_pendente, boletos_pagos, boletos_pendentes, valor_pendente
+        )
+        SELECT * FROM (
+            SELECT
+                COALESCE(cliente_nexus_id, 0),
+                SUM(sinal),
+                SUM(CASE WHEN status_envio = 'enviado' THEN sinal ELSE 0 END),
+                SUM(CASE WHEN status_envio = 'nao_enviado' THEN sinal ELSE 0 END),
+                SUM(CASE WHEN status_envio IS NULL OR status_envio IN ('nao_enviado', 'pendente') THEN sinal ELSE 0 END),
+                SUM(CASE WHEN status = 'pago' THEN sinal ELSE 0 END),
+                SUM(CASE WHEN status = 'pendente' THEN sinal ELSE 0 END),
+                SUM(CASE WHEN status = 'pendente' THEN sinal * COALESCE(valor_original, 0) ELSE 0 END)
+            FROM delta
+            GROUP BY 1
+            ORDER BY 1
+        ) t (cliente_nexus_id, boletos_total, boletos_enviados, boletos_nao_enviados,
+             boletos_envio_pendente, boletos_pagos, boletos_pendentes, valor_pendente)
+        WHERE boletos_total <> 0 OR boletos_enviados <> 0 OR boletos_nao_enviados <> 0
+           OR boletos_envio_pendente <> 0 OR boletos_pagos <> 0 OR boletos_pendentes <> 0
+           OR valor_pendente <> 0
+        ON CONFLICT (cliente_nexus_id) DO UPDATE SET
+            boletos_total = d.boletos_total + EXCLUDED.boletos_total,
+            boletos_enviados = d.boletos_enviados + EXCLUDED.boletos_enviados,
+            boletos_nao_enviados = d.boletos_nao_enviados + EXCLUDED.boletos_nao_enviados,
+            boletos_envio_pendente = d.boletos_envio_pendente + EXCLUDED.boletos_envio_pendente,
+            boletos_pagos = d.boletos_pagos + EXCLUDED.boletos_pagos,
+            boletos_pendentes = d.boletos_pendentes + EXCLUDED.boletos_pendentes,
+            valor_pendente = d.valor_pendente + EXCLUDED.valor_pendente,
+            atualizado_em = NOW()
+        RETURNING 1
+    )
+    INSERT INTO dashboard_vencimentos AS v (cliente_nexus_id, data_vencimento, boletos_pendentes)
+    SELECT COALESCE(cliente_nexus_id, 0), data_vencimento, SUM(sinal)
+    FROM delta
+    WHERE status = 'pendente' AND data_vencimento IS NOT NULL
+    GROUP BY 1, 2
+    HAVING SUM(sinal) <> 0
+    ORDER BY 1, 2
+    ON CONFLICT (cliente_nexus_id, data_vencimento) DO UPDATE SET
+        boletos_pendentes = v.boletos_pendentes + EXCLUDED.boletos_pendentes;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION dashboard_aplicar_disparos(novas disparos[], antigas disparos[])
+RETURNS void AS $$
+BEGIN
+    INSERT INTO dashboard_disparos_dia AS dd (cliente_nexus_id, dia, total, enviados)
+    SELECT * FROM (
+        SELECT
+            COALESCE(cliente_nexus_id, 0),
+            data_disparo::date,
+            SUM(sinal),
+            SUM(CASE WHEN status = 'enviado' THEN sinal ELSE 0 END)
+        FROM (
+            SELECT 1 AS sinal, n.* FROM unnest(novas) n
+            UNION ALL
+            SELECT -1 AS sinal, a.* FROM unnest(antigas) a
+        ) delta
+        WHERE data_disparo IS NOT NULL
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+    ) t (cliente_nexus_id, dia, total, enviados)
+    WHERE total <> 0 OR enviados <> 0
+    ON CONFLICT (cliente_nexus_id, dia) DO UPDATE SET
+        total = dd.total + EXCLUDED.total,
+        enviados = dd.enviados + EXCLUDED.enviados;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================================================
+-- TRIGGERS (por comando, com tabelas de transição: um lote de 500 boletos
+-- atualiza o contador uma vez, não 500)
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION dashboard_trigger_clientes() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM dashboard_aplicar_clientes(ARRAY(SELECT n FROM novas n), '{}');
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM dashboard_aplicar_clientes(ARRAY(SELECT n FROM novas n), ARRAY(SELECT a FROM antigas a));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM dashboard_aplicar_clientes('{}', ARRAY(SELECT a FROM antigas a));
+    ELSE
+        UPDATE dashboard_counters SET
+            clientes_ativos = 0, contratos_ativos = 0,
+            valor_credito_ativo = 0, valor_credito_contratos_ativos = 0,
+            atualizado_em = NOW();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION dashboard_trigger_boletos() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM dashboard_aplicar_boletos(ARRAY(SELECT n FROM novas n), '{}');
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM dashboard_aplicar_boletos(ARRAY(SELECT n FROM novas n), ARRAY(SELECT a FROM antigas a));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM dashboard_aplicar_boletos('{}', ARRAY(SELECT a FROM antigas a));
+    ELSE
+        UPDATE dashboard_counters SET
+            boletos_total = 0, boletos_enviados = 0, boletos_nao_enviados = 0,
+            boletos_envio_pendente = 0, boletos_pagos = 0, boletos_pendentes = 0,
+            valor_pendente = 0, atualizado_em = NOW();
+        DELETE FROM dashboard_vencimentos;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION dashboard_trigger_disparos() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM dashboard_aplicar_disparos(ARRAY(SELECT n FROM novas n), '{}');
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM dashboard_aplicar_disparos(ARRAY(SELECT n FROM novas n), ARRAY(SELECT a FROM antigas a));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM dashboard_aplicar_disparos('{}', ARRAY(SELECT a FROM antigas a));
+    ELSE
+        DELETE FROM dashboard_disparos_dia;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Tabelas de transição exigem um trigger por evento
+DROP TRIGGER IF EXISTS trg_dashboard_clientes_insert ON clientes_finais;
+DROP TRIGGER IF EXISTS trg_dashboard_clientes_update ON clientes_finais;
+DROP TRIGGER IF EXISTS trg_dashboard_clientes_delete ON clientes_finais;
+DROP TRIGGER IF EXISTS trg_dashboard_clientes_truncate ON clientes_finais;
+
+CREATE TRIGGER trg_dashboard_clientes_insert AFTER INSERT ON clientes_finais
+REFERENCING NEW TABLE AS novas
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_trigger_clientes();
+
+CREATE TRIGGER trg_dashboard_clientes_update AFTER UPDATE ON clientes_finais
+REFERENCING OLD TABLE AS antigas NEW TABLE AS novas
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_trigger_clientes();
+
+CREATE TRIGGER trg_dashboard_clientes_delete AFTER DELETE ON clientes_finais
+REFERENCING OLD TABLE AS antigas
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_trigger_clientes();
+
+CREATE TRIGGER trg_dashboard_clientes_truncate AFTER TRUNCATE ON clientes_finais
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_trigger_clientes();
+
+DROP TRIGGER IF EXISTS trg_dashboard_boletos_insert ON boletos;
+DROP TRIGGER IF EXISTS trg_dashboard_boletos_update ON boletos;
+DROP TRIGGER IF EXISTS trg_dashboard_boletos_delete ON boletos;
+DROP TRIGGER IF EXISTS trg_dashboard_boletos_truncate ON boletos;
+
+CREATE TRIGGER trg_dashboard_boletos_insert AFTER INSERT ON boletos
+REFERENCING NEW TABLE AS novas
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_trigger_boletos();
+
+CREATE TRIGGER trg_dashboard_boletos_update AFTER UPDATE ON boletos
+REFERENCING OLD TABLE AS antigas NEW TABLE AS novas
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_trigger_boletos();
+
+CREATE TRIGGER trg_dashboard_boletos_delete AFTER DELETE ON boletos
+REFERENCING OLD TABLE AS antigas
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_trigger_boletos();
+
+CREATE TRIGGER trg_dashboard_boletos_truncate AFTER TRUNCATE ON boletos
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_trigger_boletos();
+
+DROP TRIGGER IF EXISTS trg_dashboard_disparos_insert ON disparos;
+DROP TRIGGER IF EXISTS trg_dashboard_disparos_update ON disparos;
+DROP TRIGGER IF EXISTS trg_dashboard_disparos_delete ON disparos;
+DROP TRIGGER IF EXISTS trg_dashboard_disparos_truncate ON disparos;
+
+CREATE TRIGGER trg_dashboard_disparos_insert AFTER INSERT ON disparos
+REFERENCING NEW TABLE AS novas
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_trigger_disparos();
+
+CREATE TRIGGER trg_dashboard_disparos_update AFTER UPDATE ON disparos
+REFERENCING OLD TABLE AS antigas NEW TABLE AS novas
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_trigger_disparos();
+
+CREATE TRIGGER trg_dashboard_disparos_delete AFTER DELETE ON disparos
+REFERENCING OLD TABLE AS antigas
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_trigger_disparos();
+
+CREATE TRIGGER trg_dashboard_disparos_truncate AFTER TRUNCATE ON disparos
+FOR EACH STATEMENT EXECUTE FUNCTION dashboard_trigger_disparos();
+
+-- ============================================================================
+-- RECONCILIAÇÃO (job noturno do automation_scheduler e carga inicial)
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION dashboard_reconciliar() RETURNS INTEGER AS $$
+DECLARE
+    corrigidos INTEGER;
+    zerados INTEGER;
+BEGIN
+    -- Escritas concorrentes esperam o fim do recálculo: um delta aplicado
+    -- durante a contagem seria sobrescrito pelo valor absoluto
+    LOCK TABLE clientes_finais, boletos, disparos IN SHARE MODE;
+
+    DROP TABLE IF EXISTS tmp_dashboard_counters;
+    CREATE TEMP TABLE tmp_dashboard_counters ON COMMIT DROP AS
+    SELECT
+        COALESCE(c.cliente_nexus_id, b.cliente_nexus_id) AS cliente_nexus_id,
+        COALESCE(c.clientes_ativos, 0) AS clientes_ativos,
+        COALESCE(c.contratos_ativos, 0) AS contratos_ativos,
+        COALESCE(c.valor_credito_ativo, 0) AS valor_credito_ativo,
+        COALESCE(c.valor_credito_contratos_ativos, 0) AS valor_credito_contratos_ativos,
+        COALESCE(b.boletos_total, 0) AS boletos_total,
+        COALESCE(b.boletos_enviados, 0) AS boletos_enviados,
+        COALESCE(b.boletos_nao_enviados, 0) AS boletos_nao_enviados,
+        COALESCE(b.boletos_envio_pendente, 0) AS boletos_envio_pendente,
+        COALESCE(b.boletos_pagos, 0) AS boletos_pagos,
+        COALESCE(b.boletos_pendentes, 0) AS boletos_pendentes,
+        COALESCE(b.valor_pendente, 0) AS valor_pendente
+    FROM (
+        SELECT
+            COALESCE(cliente_nexus_id, 0) AS cliente_nexus_id,
+            COUNT(*) FILTER (WHERE ativo) AS clientes_ativos,
+            COUNT(*) FILTER (WHERE ativo AND status_contrato = 'ativo') AS contratos_ativos,
+            COALESCE(SUM(valor_credito) FILTER (WHERE ativo), 0) AS valor_credito_ativo,
+            COALESCE(SUM(valor_credito) FILTER (WHERE ativo AND status_contrato = 'ativo'), 0) AS valor_credito_contratos_ativos
+        FROM clientes_finais
+        GROUP BY 1
+    ) c
+    FULL JOIN (
+        SELECT
+            COALESCE(cliente_nexus_id, 0) AS cliente_nexus_id,
+            COUNT(*) AS boletos_total,
+            COUNT(*) FILTER (WHERE status_envio = 'enviado') AS boletos_enviados,
+            COUNT(*) FILTER (WHERE status_envio = 'nao_enviado') AS boletos_nao_enviados,
+            COUNT(*) FILTER (WHERE status_envio IS NULL OR status_envio IN ('nao_enviado', 'pendente')) AS boletos_envio_pendente,
+            COUNT(*) FILTER (WHERE status = 'pago') AS boletos_pagos,
+            COUNT(*) FILTER (WHERE status = 'pendente') AS boletos_pendentes,
+            COALESCE(SUM(valor_original) FILTER (WHERE status = 'pendente'), 0) AS valor_pendente
+        FROM boletos
+        GROUP BY 1
+    ) b ON b.cliente_nexus_id = c.cliente_nexus_id;
+
+    INSERT INTO dashboard_counters AS d (
+        cliente_nexus_id, clientes_ativos, contratos_ativos,
+        valor_credito_ativo, valor_credito_contratos_ativos,
+        boletos_total, boletos_enviados, boletos_nao_enviados, boletos_envio_pendente,
+        boletos_pagos, boletos_pendentes, valor_pendente
+    )
+    SELECT * FROM tmp_dashboard_counters
+    ON CONFLICT (cliente_nexus_id) DO UPDATE SET
+        clientes_ativos = EXCLUDED.clientes_ativos,
+        contratos_ativos = EXCLUDED.contratos_ativos,
+        valor_credito_ativo = EXCLUDED.valor_credito_ativo,
+        valor_credito_contratos_ativos = EXCLUDED.valor_credito_contratos_ativos,
+        boletos_total = EXCLUDED.boletos_total,
+        boletos_enviados = EXCLUDED.boletos_enviados,
+        boletos_nao_enviados = EXCLUDED.boletos_nao_enviados,
+        boletos_envio_pendente = EXCLUDED.boletos_envio_pendente,
+        boletos_pagos = EXCLUDED.boletos_pagos,
+        boletos_pendentes = EXCLUDED.boletos_pendentes,
+        valor_pendente = EXCLUDED.valor_pendente,
+        atualizado_em = NOW()
+    WHERE (d.clientes_ativos, d.contratos_ativos, d.valor_credito_ativo, d.valor_credito_contratos_ativos,
+           d.boletos_total, d.boletos_enviados, d.boletos_nao_enviados, d.boletos_envio_pendente,
+           d.boletos_pagos, d.boletos_pendentes, d.valor_pendente)
+          IS DISTINCT FROM
+          (EXCLUDED.clientes_ativos, EXCLUDED.contratos_ativos, EXCLUDED.valor_credito_ativo,
+           EXCLUDED.valor_credito_contratos_ativos, EXCLUDED.boletos_total, EXCLUDED.boletos_enviados,
+           EXCLUDED.boletos_nao_enviados, EXCLUDED.boletos_envio_pendente, EXCLUDED.boletos_pagos,
+           EXCLUDED.boletos_pendentes, EXCLUDED.valor_pendente);
+    GET DIAGNOSTICS corrigidos = ROW_COUNT;
+
+    -- Clientes sem nenhum registro restante
+    UPDATE dashboard_counters d SET
+        clientes_ativos = 0, contratos_ativos = 0,
+        valor_credito_ativo = 0, valor_credito_contratos_ativos = 0,
+        boletos_total = 0, boletos_enviados = 0, boletos_nao_enviados = 0,
+        boletos_envio_pendente = 0, boletos_pagos = 0, boletos_pendentes = 0,
+        valor_pendente = 0, atualizado_em = NOW()
+    WHERE NOT EXISTS (SELECT 1 FROM tmp_dashboard_counters t WHERE t.cliente_nexus_id = d.cliente_nexus_id)
+    AND (d.clientes_ativos <> 0 OR d.contratos_ativos <> 0 OR d.valor_credito_ativo <> 0
+         OR d.valor_credito_contratos_ativos <> 0 OR d.boletos_total <> 0 OR d.boletos_enviados <> 0
+         OR d.boletos_nao_enviados <> 0 OR d.boletos_envio_pendente <> 0 OR d.boletos_pagos <> 0
+         OR d.boletos_pendentes <> 0 OR d.valor_pendente <> 0);
+    GET DIAGNOSTICS zerados = ROW_COUNT;
+
+    -- Tabelas por dia: reconstruídas (também remove dias que zeraram)
+    DELETE FROM dashboard_vencimentos;
+    INSERT INTO dashboard_vencimentos (cliente_nexus_id, data_vencimento, boletos_pendentes)
+    SELECT COALESCE(cliente_nexus_id, 0), data_vencimento, COUNT(*)
+    FROM boletos
+    WHERE status = 'pendente' AND data_vencimento IS NOT NULL
+    GROUP BY 1, 2;
+
+    DELETE FROM dashboard_disparos_dia;
+    INSERT INTO dashboard_disparos_dia (cliente_nexus_id, dia, total, enviados)
+    SELECT COALESCE(cliente_nexus_id, 0), data_disparo::date, COUNT(*),
+           COUNT(*) FILTER (WHERE status = 'enviado')
+    FROM disparos
+    WHERE data_disparo IS NOT NULL
+    GROUP BY 1, 2;
+
+    RETURN corrigidos + zerados;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Carga inicial
+SELECT dashboard_reconciliar();
+
+-- Comentários
+COMMENT ON TABLE dashboard_counters IS 'Totais do dashboard por cliente_nexus_id (0 = sem cliente), mantidos por triggers';
+COMMENT ON TABLE dashboard_vencimentos IS 'Boletos pendentes por cliente e data de vencimento (vencidos/vencendo)';
+COMMENT ON TABLE dashboard_disparos_dia IS 'Disparos (total e enviados) por cliente e dia de data_disparo';
+COMMENT ON COLUMN dashboard_counters.boletos_envio_pendente IS 'status_envio nao_enviado, pendente ou NULL';
+COMMENT ON FUNCTION dashboard_reconciliar() IS 'Recalcula os contadores a partir das tabelas; retorna quantos clientes estavam com desvio';
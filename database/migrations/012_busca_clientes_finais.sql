@@ -0,0 +1,69 @@
+-- Migração 012: Busca de clientes finais (pg_trgm + prefixo de CPF/telefone)
+-- Data: 2026-10-18
+-- Descrição: Colunas geradas normalizadas e índices para ClienteFinal.buscar_com_filtro
+--            (texto sem acento por trigramas, dígitos por prefixo) e para a
+--            paginação por cursor de /api/crm/clientes
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() é STABLE (depende do dicionário); o wrapper fixa o dicionário
+-- e pode ser usado em colunas geradas e índices
+CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text AS $$
+    SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+
+-- Nome + email em minúsculas e sem acento (busca por trecho)
+ALTER TABLE clientes_finais ADD COLUMN IF NOT EXISTS busca_texto TEXT
+    GENERATED ALWAYS AS (lower(f_unaccent(coalesce(nome_completo, '') || ' ' || coalesce(email, '')))) STORED;
+
+-- Só os dígitos (busca por prefixo)
+ALTER TABLE clientes_finais ADD COLUMN IF NOT EXISTS cpf_digitos TEXT
+    GENERATED ALWAYS AS (regexp_replace(coalesce(cpf, ''), '[^0-9]', '', 'g')) STORED;
+
+ALTER TABLE clientes_finais ADD COLUMN IF NOT EXISTS whatsapp_digitos TEXT
+    GENERATED ALWAYS AS (regexp_replace(coalesce(whatsapp, ''), '[^0-9]', '', 'g')) STORED;
+
+ALTER TABLE clientes_finais ADD COLUMN IF NOT EXISTS telefone_digitos TEXT
+    GENERATED ALWAYS AS (regexp_replace(coalesce(telefone_celular, ''), '[^0-9]', '', 'g')) STORED;
+
+-- Trecho do nome/email (LIKE '%termo%', termos com 3+ caracteres)
+CREATE INDEX IF NOT EXISTS idx_clientes_finais_busca_trgm
+ON clientes_finais USING gin (busca_texto gin_trgm_ops);
+
+-- Início do nome (termos com 1-2 caracteres, sem trigramas suficientes)
+CREATE INDEX IF NOT EXISTS idx_clientes_finais_busca_prefixo
+ON clientes_finais(cliente_nexus_id, busca_texto text_pattern_ops)
+WHERE ativo = true;
+
+-- Prefixo de CPF / WhatsApp / telefone
+CREATE INDEX IF NOT EXISTS idx_clientes_finais_cpf_digitos
+ON clientes_finais(cliente_nexus_id, cpf_digitos text_pattern_ops)
+WHERE ativo = true;
+
+CREATE INDEX IF NOT EXISTS idx_clientes_finais_whatsapp_digitos
+ON clientes_finais(cliente_nexus_id, whatsapp_digitos text_pattern_ops)
+WHERE ativo = true;
+
+CREATE INDEX IF NOT EXISTS idx_clientes_finais_telefone_digitos
+ON clientes_finais(cliente_nexus_id, telefone_digitos text_pattern_ops)
+WHERE ativo = true;
+
+-- Paginação por cursor: busca (nome, id) e listagem (created_at DESC, id DESC)
+CREATE INDEX IF NOT EXISTS idx_clientes_finais_nome_id
+ON clientes_finais(cliente_nexus_id, nome_completo, id)
+WHERE ativo = true;
+
+CREATE INDEX IF NOT EXISTS idx_clientes_finais_recentes
+ON clientes_finais(cliente_nexus_id, created_at DESC, id DESC)
+WHERE ativo = true;
+
+-- Contagem de boletos por cliente na listagem
+CREATE INDEX IF NOT EXISTS idx_boletos_cliente_final
+ON boletos(cliente_final_id);
+
+-- Comentários
+COMMENT ON COLUMN clientes_finais.busca_texto IS 'Nome + email em minúsculas e sem acento (índice de trigramas)';
+COMMENT ON COLUMN clientes_finais.cpf_digitos IS 'CPF só com dígitos (busca por prefixo)';
+COMMENT ON COLUMN clientes_finais.whatsapp_digitos IS 'WhatsApp só com dígitos (busca por prefixo)';
+COMMENT ON COLUMN clientes_finais.telefone_digitos IS 'Telefone celular só com dígitos (busca por prefixo)';
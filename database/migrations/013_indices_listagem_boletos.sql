@@ -0,0 +1,14 @@
+-- Migração 013: Índices da listagem de boletos por cursor
+-- Data: 2026-10-18
+-- Descrição: Ordem (created_at DESC, id DESC) das listagens em streaming
+--            (/api/crm/boletos-portal, /portal-consorcio/api/boletos,
+--            /api/crm/boletos-debug/todos); a página seguinte continua do
+--            cursor com um range scan no índice, sem ordenar a tabela
+
+-- Listagem por cliente Nexus (CRM)
+CREATE INDEX IF NOT EXISTS idx_boletos_nexus_recentes
+ON boletos(cliente_nexus_id, created_at DESC, id DESC);
+
+-- Listagem geral (Portal Consórcio, debug)
+CREATE INDEX IF NOT EXISTS idx_boletos_recentes
+ON boletos(created_at DESC, id DESC);
@@ -0,0 +1,49 @@
+-- Migração 014: Catálogo dos PDFs baixados do Canopus
+-- Data: 2026-10-18
+-- Descrição: Uma linha por PDF da pasta de downloads, com o nome já
+--            normalizado, as palavras (índice GIN), CPF, mês e ano.
+--            Substitui a varredura da pasta em crm.buscar_pdfs_cliente e a
+--            interpretação dos nomes em orquestrador.importar_boletos_para_crm
+--            (mantido por services/catalogo_pdfs.py)
+
+CREATE TABLE IF NOT EXISTS catalogo_pdfs (
+    id SERIAL PRIMARY KEY,
+    caminho TEXT UNIQUE NOT NULL,
+    pasta TEXT NOT NULL,
+    arquivo VARCHAR(255) NOT NULL,
+
+    -- Nome do arquivo em maiúsculas, sem acentos nem separadores (match por trecho)
+    nome_normalizado TEXT NOT NULL,
+    -- Palavras do nome normalizadas (candidatos por sobreposição)
+    palavras TEXT[] NOT NULL DEFAULT '{}',
+
+    -- Interpretado de NOME_CLIENTE_MES[_ANO].pdf
+    nome_cliente VARCHAR(255),
+    mes_referencia VARCHAR(50),
+    mes INTEGER,
+    ano INTEGER,
+    cpf VARCHAR(14),
+
+    tamanho BIGINT,
+    data_modificacao DOUBLE PRECISION, -- mtime do arquivo (epoch)
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_catalogo_pdfs_palavras
+ON catalogo_pdfs USING gin (palavras);
+
+CREATE INDEX IF NOT EXISTS idx_catalogo_pdfs_pasta_recentes
+ON catalogo_pdfs(pasta, data_modificacao DESC);
+
+CREATE INDEX IF NOT EXISTS idx_catalogo_pdfs_cpf
+ON catalogo_pdfs(cpf, ano, mes)
+WHERE cpf IS NOT NULL;
+
+-- CPF dos PDFs encontrados pelo monitor (vem do registro do download)
+CREATE INDEX IF NOT EXISTS idx_downloads_canopus_nome_arquivo
+ON downloads_canopus(nome_arquivo);
+
+COMMENT ON TABLE catalogo_pdfs IS 'PDFs da pasta de downloads do Canopus (atualizado por download, monitor da pasta e sincronização incremental)';
+COMMENT ON COLUMN catalogo_pdfs.palavras IS 'Palavras normalizadas do nome do arquivo (índice GIN)';
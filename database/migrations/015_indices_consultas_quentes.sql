@@ -0,0 +1,36 @@
+-- Migração 015: Índices compostos/parciais das consultas quentes
+-- Data: 2026-10-18
+-- Descrição: database/schema.sql só indexa colunas isoladas; as consultas de
+--            disparo, monitoramento, fallback de PDF e checagem de disparo em
+--            andamento filtram por combinações sem índice e caíam em seq scan.
+--            Regressão dos planos: tests/test_planos_consultas.py
+--
+-- Obs.: run_migration.py executa o arquivo numa transação, por isso sem
+--       CONCURRENTLY. Em base grande, crie os índices à mão com
+--       CREATE INDEX CONCURRENTLY antes de rodar a migração (IF NOT EXISTS).
+
+-- Seleção de boletos para disparo (automation_service, /boletos-portal/pendentes-envio)
+-- WHERE cliente_nexus_id = ? AND status_envio IN (...) ORDER BY data_vencimento
+CREATE INDEX IF NOT EXISTS idx_boletos_nexus_envio_vencimento
+ON boletos(cliente_nexus_id, status_envio, data_vencimento);
+
+-- Monitoramento e gráficos (/scheduler/status-disparo-atual, /graficos):
+-- só disparos já executados têm data_disparo
+CREATE INDEX IF NOT EXISTS idx_disparos_nexus_data
+ON disparos(cliente_nexus_id, data_disparo DESC)
+WHERE data_disparo IS NOT NULL;
+
+-- Fallback do PDF pelo último download com sucesso (fila_disparos)
+-- WHERE cpf = ? AND status = 'sucesso' ORDER BY created_at DESC LIMIT 1
+CREATE INDEX IF NOT EXISTS idx_downloads_canopus_cpf_status_recentes
+ON downloads_canopus(cpf, status, created_at DESC);
+
+-- Disparo em andamento / última execução do cliente
+-- WHERE cliente_nexus_id = ? AND status = 'em_andamento' AND horario_execucao > ?
+CREATE INDEX IF NOT EXISTS idx_historico_disparos_nexus_status_horario
+ON historico_disparos(cliente_nexus_id, status, horario_execucao DESC);
+
+ANALYZE boletos;
+ANALYZE disparos;
+ANALYZE downloads_canopus;
+ANALYZE historico_disparos;
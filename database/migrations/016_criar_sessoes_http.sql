@@ -0,0 +1,19 @@
+-- Migração 016: Sessões HTTP no Postgres
+-- Data: 2026-10-18
+-- Descrição: Substitui o Flask-Session em disco (flask_session/) por uma tabela
+--            compartilhada entre instâncias (SESSION_BACKEND=postgres, ver
+--            backend/sessoes.py). UNLOGGED: sem WAL; após um crash do
+--            Postgres a tabela volta vazia e os usuários fazem login de novo.
+
+CREATE UNLOGGED TABLE IF NOT EXISTS sessoes_http (
+    id VARCHAR(64) PRIMARY KEY,
+    dados TEXT NOT NULL, -- JSON com tags do Flask (TaggedJSONSerializer)
+    expira_em TIMESTAMP NOT NULL,
+    atualizado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Limpeza das vencidas (job a cada 15 minutos no automation_scheduler)
+CREATE INDEX IF NOT EXISTS idx_sessoes_http_expira_em
+ON sessoes_http(expira_em);
+
+COMMENT ON TABLE sessoes_http IS 'Sessões HTTP do Flask (cookie leva só o id)';
@@ -0,0 +1,15 @@
+-- Migração 017: Estado compartilhado do progresso em tempo real
+-- Data: 2026-10-18
+-- Descrição: Último estado de cada execução acompanhada pela interface
+--            (download de boletos do Canopus, disparo de cada cliente Nexus).
+--            Quem publica grava aqui e avisa por NOTIFY nexus_progresso; cada
+--            processo do app escuta o canal e repassa às conexões SSE
+--            (services/progresso.py). UNLOGGED: é só estado de tela.
+
+CREATE UNLOGGED TABLE IF NOT EXISTS progresso_execucoes (
+    topico VARCHAR(100) PRIMARY KEY,  -- 'canopus' ou 'disparo:<cliente_nexus_id>'
+    estado JSONB NOT NULL,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE progresso_execucoes IS 'Último estado publicado de cada execução acompanhada por SSE (services/progresso.py)';
@@ -0,0 +1,20 @@
+-- Migração 018: Metadados da última versão baixada da planilha do consultor
+-- Data: 2026-10-18
+-- Descrição: /atualizar-todas-planilhas baixava e regravava todas as planilhas
+--            a cada chamada. Com ETag/Last-Modified a requisição vira
+--            condicional (304 sem corpo) e o MD5 do conteúdo (o mesmo de
+--            ExcelImporter.gerar_hash_planilha) identifica arquivo igual
+--            quando o Drive não informa validadores.
+
+ALTER TABLE consultores
+ADD COLUMN IF NOT EXISTS planilha_etag TEXT;
+
+ALTER TABLE consultores
+ADD COLUMN IF NOT EXISTS planilha_last_modified TEXT;
+
+ALTER TABLE consultores
+ADD COLUMN IF NOT EXISTS planilha_hash VARCHAR(32);
+
+COMMENT ON COLUMN consultores.planilha_etag IS 'ETag da última planilha baixada do Drive (If-None-Match)';
+COMMENT ON COLUMN consultores.planilha_last_modified IS 'Last-Modified da última planilha baixada do Drive (If-Modified-Since)';
+COMMENT ON COLUMN consultores.planilha_hash IS 'MD5 do arquivo da última planilha baixada';
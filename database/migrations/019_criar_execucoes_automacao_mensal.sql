@@ -0,0 +1,29 @@
+-- Migração 019: Reivindicação das automações mensais por cliente e dia
+-- Data: 2026-10-18
+-- Descrição: O AutomationScheduler conferia "já executou hoje?" com um COUNT
+--            em historico_disparos, que só recebe a linha no fim da execução:
+--            dois processos (ou duas verificações seguidas de uma execução
+--            longa) disparavam o mesmo cliente duas vezes. Agora o líder
+--            reivindica os clientes do dia com INSERT ... ON CONFLICT nesta
+--            tabela; só quem inseriu a linha executa.
+
+CREATE TABLE IF NOT EXISTS execucoes_automacao_mensal (
+    cliente_nexus_id INTEGER NOT NULL REFERENCES clientes_nexus(id) ON DELETE CASCADE,
+    data_referencia DATE NOT NULL, -- Dia da execução no horário de MS
+    status VARCHAR(20) NOT NULL DEFAULT 'em_andamento', -- em_andamento, concluido, erro
+    executado_por VARCHAR(100), -- host:pid do processo que reivindicou
+    iniciado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    concluido_em TIMESTAMP,
+
+    PRIMARY KEY (cliente_nexus_id, data_referencia),
+    CONSTRAINT execucoes_automacao_mensal_status_check CHECK (
+        status IN ('em_andamento', 'concluido', 'erro')
+    )
+);
+
+-- Execuções em andamento (status do scheduler e reivindicação das abandonadas)
+CREATE INDEX IF NOT EXISTS idx_execucoes_automacao_mensal_andamento
+ON execucoes_automacao_mensal(iniciado_em)
+WHERE status = 'em_andamento';
+
+COMMENT ON TABLE execucoes_automacao_mensal IS 'Uma linha por cliente Nexus e dia: reivindicação atômica da automação mensal pelo scheduler';
@@ -0,0 +1,22 @@
+-- Migração 020: Cache das sessões autenticadas do Canopus
+-- Data: 2026-10-18
+-- Descrição: Cada execução (e cada worker do pool, e cada nova tentativa)
+--            fazia login do zero no Canopus. A sessão de cada ponto de venda
+--            fica aqui, ao lado de credenciais_canopus, criptografada com a
+--            mesma chave Fernet da senha (automation/canopus/sessao_canopus.py).
+--            Antes de usar, a sessão é validada com uma requisição barata;
+--            login de novo só quando expirou.
+
+CREATE TABLE IF NOT EXISTS sessoes_canopus (
+    credencial_id INTEGER NOT NULL REFERENCES credenciais_canopus(id) ON DELETE CASCADE,
+    tipo VARCHAR(20) NOT NULL, -- playwright (storage_state), http (cookies da requests)
+    slot INTEGER NOT NULL DEFAULT 0, -- Worker do pool (cada um com sua sessão ASP.NET)
+    estado_encrypted TEXT NOT NULL, -- JSON {usuario, estado} criptografado (Fernet)
+    atualizado_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (credencial_id, tipo, slot),
+    CONSTRAINT sessoes_canopus_tipo_check CHECK (tipo IN ('playwright', 'http'))
+);
+
+COMMENT ON TABLE sessoes_canopus IS 'Sessões autenticadas do Canopus em cache por credencial, backend e worker';
+COMMENT ON COLUMN sessoes_canopus.atualizado_em IS 'Último login ou fim de execução com a sessão (validade renovada pelo Canopus)';
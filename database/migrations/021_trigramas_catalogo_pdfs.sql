@@ -0,0 +1,17 @@
+-- Migração 021: Busca por trecho no catálogo de PDFs (pg_trgm)
+-- Data: 2026-10-18
+-- Descrição: buscar_pdfs_por_nome pré-filtrava por palavra inteira
+--            (palavras && ...), mais restrito que a varredura antiga, que
+--            aceitava a palavra do cliente como trecho do nome do arquivo.
+--            O pré-filtro agora é LIKE '%palavra%' em nome_normalizado,
+--            atendido por este índice de trigramas; o GIN de palavras
+--            deixa de ser usado.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_catalogo_pdfs_nome_trgm
+ON catalogo_pdfs USING gin (nome_normalizado gin_trgm_ops);
+
+DROP INDEX IF EXISTS idx_catalogo_pdfs_palavras;
+
+COMMENT ON COLUMN catalogo_pdfs.palavras IS 'Palavras normalizadas do nome do arquivo';
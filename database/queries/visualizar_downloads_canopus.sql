@@ -11,7 +11,7 @@ SELECT
     consultor_id,
     cpf,
     nome_arquivo,
-    LENGTH(caminho_arquivo) as tamanho_base64,  -- Mostra tamanho do base64
+    pdf_sha256,  -- Hash do PDF em pdf_blobs
     tamanho_bytes,
     status,
     data_download,
@@ -71,7 +71,7 @@ SELECT
     consultor_id,
     cpf,
     nome_arquivo,
-    LENGTH(caminho_arquivo) as tamanho_base64,
+    pdf_sha256,
     tamanho_bytes,
     status,
     data_download
@@ -79,15 +79,17 @@ FROM downloads_canopus
 WHERE cpf = '12345678900';
 
 
--- 6. OBTER PDF BASE64 DE UM REGISTRO ESPECÍFICO
+-- 6. OBTER PDF DE UM REGISTRO ESPECÍFICO
 -- Use apenas quando precisar do PDF (substitua o ID)
--- ⚠️ CUIDADO: Isso pode ser lento com PDFs grandes
+-- O conteúdo fica em pdf_blobs (migração 008), uma vez por hash
 SELECT
-    id,
-    nome_arquivo,
-    caminho_arquivo  -- Este campo contém o base64
-FROM downloads_canopus
-WHERE id = 1;  -- Substitua pelo ID desejado
+    dc.id,
+    dc.nome_arquivo,
+    pb.tamanho_bytes,
+    pb.conteudo  -- BYTEA do PDF
+FROM downloads_canopus dc
+JOIN pdf_blobs pb ON pb.sha256 = dc.pdf_sha256
+WHERE dc.id = 1;  -- Substitua pelo ID desejado
 
 
 -- 7. DOWNLOADS COM ERRO
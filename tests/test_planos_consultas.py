@@ -0,0 +1,265 @@
+"""
+Regressão dos planos das consultas quentes (migração 015)
+
+Cria cópias temporárias das tabelas (CREATE TEMP TABLE ... LIKE, com os
+índices reais), popula com volumes realistas, roda ANALYZE e confere com
+EXPLAIN que cada consulta usa índice na tabela principal, sem seq scan. As
+consultas são as constantes SQL_* dos próprios módulos: o teste não tem
+cópia do SQL que possa ficar para trás.
+Tudo numa transação desfeita no final: os dados reais não são tocados.
+
+Requer o banco configurado em backend/config.py com as migrações aplicadas.
+"""
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+from config import Config
+from routes.crm import (SQL_BOLETOS_PENDENTES_ENVIO, SQL_DISPARO_ATUAL, SQL_DISPARO_EM_ANDAMENTO,
+                        SQL_DISPAROS_POR_MES)
+from services.automation_scheduler import SQL_REIVINDICAR_AUTOMACOES
+from services.automation_service import SQL_BOLETOS_PARA_DISPARO
+from services.fila_disparos import SQL_ULTIMO_DOWNLOAD_PDF
+
+
+# Volumes do seed (por tabela)
+CLIENTES_NEXUS = 50
+CLIENTES_FINAIS = 20_000
+BOLETOS = 200_000
+DISPAROS = 300_000
+DOWNLOADS = 100_000
+HISTORICO = 50_000
+
+TABELAS = ('clientes_nexus', 'configuracoes_automacao', 'execucoes_automacao_mensal',
+           'clientes_finais', 'boletos', 'disparos', 'downloads_canopus', 'historico_disparos')
+
+SEED = f"""
+    INSERT INTO clientes_nexus (id, nome_empresa, whatsapp_numero, ativo)
+    SELECT i, 'EMPRESA ' || i, '5567988' || lpad(i::text, 6, '0'), true
+    FROM generate_series(1, {CLIENTES_NEXUS}) AS i;
+
+    INSERT INTO configuracoes_automacao (id, cliente_nexus_id, disparo_automatico_habilitado, dia_do_mes)
+    SELECT i, i, true, 1 + i % 28
+    FROM generate_series(1, {CLIENTES_NEXUS}) AS i;
+
+    INSERT INTO clientes_finais (id, cliente_nexus_id, nome_completo, cpf, whatsapp, telefone_celular, numero_contrato)
+    SELECT i, 1 + i % {CLIENTES_NEXUS}, 'CLIENTE ' || i, lpad(i::text, 11, '0'),
+           '5567999' || lpad(i::text, 6, '0'), '67999' || lpad(i::text, 6, '0'), 'CT-' || i
+    FROM generate_series(1, {CLIENTES_FINAIS}) AS i;
+
+    INSERT INTO boletos (id, cliente_nexus_id, cliente_final_id, numero_boleto, valor_original,
+                         data_vencimento, data_emissao, mes_referencia, ano_referencia, numero_parcela,
+                         status, status_envio, pdf_path, created_at)
+    SELECT i, 1 + c % {CLIENTES_NEXUS}, c, 'BOL-' || i, 500,
+           CURRENT_DATE - (i % 720), CURRENT_DATE - (i % 720) - 10, 1 + i % 12, 2024 + i % 3, 1 + i % 60,
+           CASE WHEN i % 20 < 14 THEN 'pago' WHEN i % 20 < 19 THEN 'pendente' ELSE 'vencido' END,
+           CASE WHEN i % 50 < 45 THEN 'enviado' WHEN i % 50 < 49 THEN 'nao_enviado' ELSE 'erro' END,
+           '/pdfs/' || i || '.pdf', NOW() - (i % 720) * INTERVAL '1 day'
+    FROM generate_series(1, {BOLETOS}) AS i, LATERAL (SELECT 1 + i % {CLIENTES_FINAIS} AS c) AS x;
+
+    INSERT INTO disparos (id, cliente_nexus_id, boleto_id, telefone_destino, status, data_disparo)
+    SELECT i, 1 + b % {CLIENTES_NEXUS}, b, '5567999000000',
+           CASE WHEN i % 10 = 0 THEN 'erro' ELSE 'enviado' END,
+           CASE WHEN i % 25 = 0 THEN NULL ELSE NOW() - (i % 730) * INTERVAL '1 day' - (i % 1440) * INTERVAL '1 minute' END
+    FROM generate_series(1, {DISPAROS}) AS i, LATERAL (SELECT 1 + i % {BOLETOS} AS b) AS x;
+
+    INSERT INTO downloads_canopus (id, cpf, nome_arquivo, caminho_arquivo, status, created_at)
+    SELECT i, lpad((1 + i % {CLIENTES_FINAIS})::text, 11, '0'), 'BOLETO_' || i || '.pdf', '/downloads/BOLETO_' || i || '.pdf',
+           CASE WHEN i % 10 = 0 THEN 'erro' ELSE 'sucesso' END, NOW() - (i % 365) * INTERVAL '1 day'
+    FROM generate_series(1, {DOWNLOADS}) AS i;
+
+    INSERT INTO historico_disparos (id, cliente_nexus_id, tipo_disparo, status, total_envios, horario_execucao)
+    SELECT i, 1 + i % {CLIENTES_NEXUS},
+           CASE WHEN i % 3 = 0 THEN 'automatico_mensal' ELSE 'manual_completo' END,
+           CASE WHEN i % 1000 = 0 THEN 'em_andamento' WHEN i % 10 = 0 THEN 'erro' ELSE 'concluido' END,
+           100, NOW() - (i % 1000) * INTERVAL '1 day' - (i % 1440) * INTERVAL '1 minute'
+    FROM generate_series(1, {HISTORICO}) AS i;
+"""
+
+# Consultas quentes: (nome, origem, tabela que precisa de índice, SQL, parâmetros)
+CONSULTAS = [
+    (
+        'boletos_para_disparo', 'services/automation_service.py (executar_automacao_completa)', 'boletos',
+        SQL_BOLETOS_PARA_DISPARO, (7,),
+    ),
+    (
+        'boletos_pendentes_envio', 'routes/crm.py (/boletos-portal/pendentes-envio)', 'boletos',
+        SQL_BOLETOS_PENDENTES_ENVIO, (7,),
+    ),
+    (
+        'disparo_atual', 'routes/crm.py (/scheduler/status-disparo-atual)', 'disparos',
+        SQL_DISPARO_ATUAL, (7,),
+    ),
+    (
+        'disparos_por_mes', 'routes/crm.py (/graficos)', 'disparos',
+        SQL_DISPAROS_POR_MES, (7,),
+    ),
+    (
+        'pdf_fallback_downloads', 'services/fila_disparos.py (fallback do PDF)', 'downloads_canopus',
+        SQL_ULTIMO_DOWNLOAD_PDF, ('00000000042',),
+    ),
+    (
+        'disparo_em_andamento', 'routes/crm.py (/scheduler/pausar-disparo)', 'historico_disparos',
+        SQL_DISPARO_EM_ANDAMENTO, (7,),
+    ),
+    (
+        'reivindicar_automacoes', 'services/automation_scheduler.py (verificar_e_executar_automacoes)',
+        'historico_disparos',
+        SQL_REIVINDICAR_AUTOMACOES,
+        {'hoje': date.today(), 'executor': 'teste', 'dia': 7, 'horas': 6},
+    ),
+]
+
+
+def print_section(title):
+    """Imprime um separador de seção"""
+    print(f"\n{'='*70}")
+    print(f"  {title}")
+    print(f"{'='*70}\n")
+
+
+def criar_conexao_com_dados():
+    """
+    Conexão com as tabelas temporárias populadas
+
+    As tabelas temporárias têm o mesmo nome das reais e ficam antes delas no
+    search_path, então as consultas rodam sem alteração.
+    """
+    import psycopg
+    from psycopg.rows import dict_row
+
+    conninfo = f"host={Config.DB_HOST} port={Config.DB_PORT} dbname={Config.DB_NAME} user={Config.DB_USER} password={Config.DB_PASSWORD}"
+    conn = psycopg.connect(conninfo, row_factory=dict_row)
+
+    with conn.cursor() as cur:
+        for tabela in TABELAS:
+            cur.execute(f"""
+                CREATE TEMP TABLE {tabela}
+                (LIKE public.{tabela} INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING INDEXES)
+                ON COMMIT DROP
+            """)
+
+            # O seed preenche só as colunas usadas pelas consultas
+            cur.execute("""
+                SELECT a.attname
+                FROM pg_attribute a
+                WHERE a.attrelid = %s::regclass
+                AND a.attnum > 0 AND NOT a.attisdropped AND a.attnotnull
+                AND a.attname <> 'id'
+            """, (f'pg_temp.{tabela}',))
+            for coluna in cur.fetchall():
+                cur.execute(f'ALTER TABLE pg_temp.{tabela} ALTER COLUMN "{coluna["attname"]}" DROP NOT NULL')
+
+        cur.execute(SEED)
+
+        for tabela in TABELAS:
+            cur.execute(f"ANALYZE pg_temp.{tabela}")
+
+    return conn
+
+
+def desfazer(conn):
+    """Desfaz o seed (ON COMMIT DROP + rollback) e fecha a conexão"""
+    conn.rollback()
+    conn.close()
+
+
+@pytest.fixture(scope='module')
+def conexao(request):
+    """Seed único para o módulo, desfeito no fim mesmo se um teste falhar"""
+    conn = criar_conexao_com_dados()
+    request.addfinalizer(lambda: desfazer(conn))
+    return conn
+
+
+def _nos_do_plano(no):
+    yield no
+    for filho in no.get('Plans', []):
+        yield from _nos_do_plano(filho)
+
+
+def verificar_plano(conn, nome: str) -> bool:
+    """EXPLAIN da consulta: a tabela principal tem que ser lida por índice"""
+    _, origem, tabela, sql, params = next(c for c in CONSULTAS if c[0] == nome)
+
+    with conn.cursor() as cur:
+        cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plano = cur.fetchone()['QUERY PLAN'][0]['Plan']
+
+    leituras = [no for no in _nos_do_plano(plano) if no.get('Relation Name') == tabela]
+    seq_scans = [no for no in leituras if no['Node Type'] == 'Seq Scan']
+    indices = [no['Index Name'] for no in leituras if 'Index Name' in no]
+
+    ok = bool(indices) and not seq_scans
+    simbolo = "[OK]" if ok else "[ERRO]"
+    print(f"  {simbolo} {nome} ({origem})")
+    print(f"      {tabela}: {', '.join(no['Node Type'] for no in leituras) or 'não lida'}"
+          f"{' -> ' + ', '.join(indices) if indices else ''}")
+    return ok
+
+
+def test_boletos_para_disparo(conexao):
+    assert verificar_plano(conexao, 'boletos_para_disparo')
+
+
+def test_boletos_pendentes_envio(conexao):
+    assert verificar_plano(conexao, 'boletos_pendentes_envio')
+
+
+def test_disparo_atual(conexao):
+    assert verificar_plano(conexao, 'disparo_atual')
+
+
+def test_disparos_por_mes(conexao):
+    assert verificar_plano(conexao, 'disparos_por_mes')
+
+
+def test_pdf_fallback_downloads(conexao):
+    assert verificar_plano(conexao, 'pdf_fallback_downloads')
+
+
+def test_disparo_em_andamento(conexao):
+    assert verificar_plano(conexao, 'disparo_em_andamento')
+
+
+def test_reivindicar_automacoes(conexao):
+    assert verificar_plano(conexao, 'reivindicar_automacoes')
+
+
+def run_all_tests():
+    """Executa todos os testes"""
+    print("\n" + "="*70)
+    print("  SUITE DE TESTES - PLANOS DAS CONSULTAS QUENTES")
+    print("="*70)
+
+    print_section("SEED (tabelas temporárias)")
+    conn = criar_conexao_com_dados()
+    print(f"  {BOLETOS} boletos, {DISPAROS} disparos, {DOWNLOADS} downloads, "
+          f"{HISTORICO} execuções, {CLIENTES_FINAIS} clientes em {CLIENTES_NEXUS} clientes Nexus")
+
+    try:
+        print_section("PLANOS")
+        results = {nome: verificar_plano(conn, nome) for nome, *_ in CONSULTAS}
+    finally:
+        desfazer(conn)
+
+    print_section("RESUMO DOS TESTES")
+
+    total = len(results)
+    passed = sum(1 for r in results.values() if r)
+    failed = total - passed
+
+    print(f"  Total: {total} | Passou: {passed} | Falhou: {failed}")
+    print(f"{'='*70}\n")
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,169 @@
+"""
+Teste da rota /api/automation/resetar-e-reimportar
+
+Executa a rota de verdade (test client do Flask) contra cópias temporárias
+das tabelas (CREATE TEMP TABLE ... LIKE, à frente das reais no search_path),
+com uma planilha e uma pasta de boletos geradas no tmp_path. A transação do
+teste é sempre desfeita: os dados reais não são tocados.
+
+Requer o banco configurado em backend/config.py com as migrações aplicadas.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Adicionar backend ao path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+from config import Config
+
+
+TABELAS = ('clientes_nexus', 'consultores', 'clientes_finais', 'boletos')
+
+
+class _ConexaoTeste:
+    """Database.conexao() da rota: savepoint na transação do teste (nunca commita de verdade)"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._savepoint = None
+
+    def __enter__(self):
+        self._savepoint = self.conn.transaction()
+        self._savepoint.__enter__()
+        return self.conn
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return self._savepoint.__exit__(exc_type, exc_val, exc_tb)
+
+
+@pytest.fixture(scope='module')
+def conexao():
+    """Conexão com as tabelas temporárias, desfeita e fechada no fim do módulo"""
+    import psycopg
+
+    conninfo = f"host={Config.DB_HOST} port={Config.DB_PORT} dbname={Config.DB_NAME} user={Config.DB_USER} password={Config.DB_PASSWORD}"
+    conn = psycopg.connect(conninfo)
+
+    with conn.cursor() as cur:
+        for tabela in TABELAS:
+            cur.execute(f"""
+                CREATE TEMP TABLE {tabela}
+                (LIKE public.{tabela} INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING INDEXES)
+                ON COMMIT DROP
+            """)
+
+            # O teste preenche só as colunas que a rota usa
+            cur.execute("""
+                SELECT a.attname
+                FROM pg_attribute a
+                WHERE a.attrelid = %s::regclass
+                AND a.attnum > 0 AND NOT a.attisdropped AND a.attnotnull
+                AND a.attname <> 'id'
+            """, (f'pg_temp.{tabela}',))
+            for (coluna,) in cur.fetchall():
+                cur.execute(f'ALTER TABLE pg_temp.{tabela} ALTER COLUMN "{coluna}" DROP NOT NULL')
+
+        cur.execute("INSERT INTO clientes_nexus (id, nome_empresa) VALUES (1, 'Nexus Teste')")
+        cur.execute("INSERT INTO consultores (id, nome) VALUES (1, 'Danner')")
+
+    yield conn
+
+    conn.rollback()
+    conn.close()
+
+
+@pytest.fixture
+def app(conexao, tmp_path, monkeypatch):
+    from flask import Flask
+    from openpyxl import Workbook
+
+    import routes.automation_canopus as rotas
+
+    # Planilha no layout do Dener: cabeçalho na linha 12, cabeçalho repetido na 13
+    planilha = tmp_path / 'DENER__PLANILHA_GERAL.xlsx'
+    wb = Workbook()
+    ws = wb.active
+    for _ in range(11):
+        ws.append([])
+    ws.append(['CPF', '', '', '', '', 'Nome do Cliente'])
+    ws.append(['CPF', '', '', '', '', 'Nome do Cliente'])
+    ws.append(['111.111.111-11', '', '', '', '', 'MARIA SILVA - 70%'])
+    ws.append([22222222222, '', '', '', '', 'JOAO SOUZA'])
+    ws.append(['123', '', '', '', '', 'CPF INVALIDO'])
+    wb.save(planilha)
+
+    pasta = tmp_path / 'Danner'
+    pasta.mkdir()
+    (pasta / 'MARIA_SILVA_DEZEMBRO.pdf').write_bytes(b'%PDF-1.4 teste')
+    (pasta / 'FULANO_SEM_CADASTRO_DEZEMBRO.pdf').write_bytes(b'%PDF-1.4 teste')
+
+    monkeypatch.setattr(rotas, 'PLANILHA_REIMPORTACAO', planilha)
+    monkeypatch.setattr(rotas, 'PASTA_BOLETOS_REIMPORTACAO', pasta)
+    monkeypatch.setattr(rotas.Database, 'conexao', lambda *a, **k: _ConexaoTeste(conexao))
+
+    app = Flask(__name__)
+    app.register_blueprint(rotas.automation_canopus_bp)
+    return app
+
+
+def _contar(conn, tabela):
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT COUNT(*) FROM pg_temp.{tabela}")
+        return cur.fetchone()[0]
+
+
+def test_reimporta_clientes_e_boletos(app, conexao):
+    with conexao.cursor() as cur:
+        cur.execute("""
+            INSERT INTO clientes_finais (cliente_nexus_id, nome_completo, cpf, numero_contrato)
+            VALUES (1, 'ANTIGO', '999.999.999-99', 'CT-ANTIGO')
+        """)
+
+    resposta = app.test_client().post('/api/automation/resetar-e-reimportar')
+    dados = resposta.get_json()
+
+    assert resposta.status_code == 200, dados
+    assert dados['dados_antigos']['clientes_deletados'] == 1
+    assert dados['dados_novos']['clientes_importados'] == 2
+    assert dados['dados_novos']['clientes_erros'] == 1
+    assert dados['dados_novos']['boletos_importados'] == 1
+    assert dados['dados_novos']['boletos_sem_cliente'] == 1
+
+    with conexao.cursor() as cur:
+        cur.execute("SELECT cpf, nome_completo FROM pg_temp.clientes_finais ORDER BY cpf")
+        assert cur.fetchall() == [('111.111.111-11', 'MARIA SILVA'), ('222.222.222-22', 'JOAO SOUZA')]
+
+
+def test_falha_na_reimportacao_nao_apaga_dados(app, conexao, monkeypatch):
+    import services.excel_extractor as extractor
+
+    with conexao.cursor() as cur:
+        cur.execute("DELETE FROM pg_temp.clientes_finais")
+        cur.execute("""
+            INSERT INTO clientes_finais (cliente_nexus_id, nome_completo, cpf, numero_contrato)
+            VALUES (1, 'ANTIGO', '999.999.999-99', 'CT-ANTIGO')
+        """)
+
+    def planilha_quebrada(*args, **kwargs):
+        raise OSError('planilha corrompida')
+
+    monkeypatch.setattr(extractor, 'ler_blocos_planilha', planilha_quebrada)
+
+    resposta = app.test_client().post('/api/automation/resetar-e-reimportar')
+
+    assert resposta.status_code == 500
+    assert _contar(conexao, 'clientes_finais') == 1
+
+
+def test_sem_planilha_nao_apaga_nada(app, conexao, monkeypatch, tmp_path):
+    import routes.automation_canopus as rotas
+
+    monkeypatch.setattr(rotas, 'PLANILHA_REIMPORTACAO', tmp_path / 'nao_existe.xlsx')
+    antes = _contar(conexao, 'clientes_finais')
+
+    resposta = app.test_client().post('/api/automation/resetar-e-reimportar')
+
+    assert resposta.status_code == 404
+    assert _contar(conexao, 'clientes_finais') == antes